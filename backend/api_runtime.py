@@ -0,0 +1,444 @@
+"""接口执行的公共逻辑：模板渲染、响应取值与断言判断
+
+单接口执行、流程执行和测试任务执行共用这些函数。
+"""
+import json
+import operator as operator_module
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from value_path import ASSERTION, EXTRACT, get_path
+
+
+def extract_json_path(data: Any, path: str) -> Any:
+    """从JSON数据中提取路径值（支持简单的点号分隔路径和数组索引，如 data.code 或 data.list[0].name）"""
+    if not path or not data:
+        return None
+    return get_path(data, path, ASSERTION)
+
+def format_value_for_display(value: Any) -> str:
+    """格式化值用于显示，将 None 显示为 null（与 JSON 保持一致）"""
+    if value is None:
+        return 'null'
+    return str(value)
+
+# 比较规则编译结果的缓存条数（按 比较符 + 期望值）
+COMPARISON_CACHE_SIZE = int(os.getenv("COMPARISON_CACHE_SIZE", "4096"))
+
+_ORDERING = {
+    'gt': operator_module.gt,
+    'gte': operator_module.ge,
+    'lt': operator_module.lt,
+    'lte': operator_module.le,
+}
+_NOT_NUMBER = object()
+
+
+def _number_from_string(text: str) -> Any:
+    return float(text) if '.' in text else int(text)
+
+
+def _never(actual: Any) -> bool:
+    return False
+
+
+def compile_comparison(operator: str, expected: Any) -> Callable[[Any], bool]:
+    """
+    将断言的比较规则编译为判断函数，期望值的转换只在编译时做一次
+
+    - 期望值为 None 或空字符串时断言不通过
+    - 字符串 "null"（不区分大小写）视为 null；以 [ 或 { 开头的字符串按 JSON 解析（失败时保持原值）
+    - eq / ne：一边是数字、另一边是数字字符串时按数字比较，否则直接比较
+    - gt / gte / lt / lte：两边转为浮点数比较，无法转换时不通过
+    - contains / not_contains：按字符串包含判断
+
+    Args:
+        operator: 比较符
+        expected: 期望值
+
+    Returns:
+        判断函数 check(actual) -> bool
+    """
+    if expected is None or expected == '':
+        return _never
+
+    if isinstance(expected, str):
+        expected_trimmed = expected.strip()
+        if expected_trimmed.lower() == 'null':
+            expected = None
+        elif expected_trimmed.startswith('[') or expected_trimmed.startswith('{'):
+            try:
+                expected = json.loads(expected_trimmed)
+            except ValueError:
+                pass
+
+    if operator in ('eq', 'ne'):
+        if isinstance(expected, str):
+            # actual 为数字时按数字比较
+            try:
+                expected_num = _number_from_string(expected)
+            except (ValueError, TypeError):
+                expected_num = _NOT_NUMBER
+
+            def equals(actual: Any) -> bool:
+                if expected_num is not _NOT_NUMBER and isinstance(actual, (int, float)):
+                    return actual == expected_num
+                return actual == expected
+        elif isinstance(expected, (int, float)):
+            # actual 为数字字符串时按数字比较
+            def equals(actual: Any) -> bool:
+                if isinstance(actual, str):
+                    try:
+                        return _number_from_string(actual) == expected
+                    except (ValueError, TypeError):
+                        pass
+                return actual == expected
+        else:
+            def equals(actual: Any) -> bool:
+                return actual == expected
+        if operator == 'eq':
+            return equals
+        return lambda actual: not equals(actual)
+
+    if operator in _ORDERING:
+        try:
+            bound = float(expected)
+        except (ValueError, TypeError):
+            return _never
+        compare = _ORDERING[operator]
+
+        def ordered(actual: Any) -> bool:
+            try:
+                return compare(float(actual), bound)
+            except (ValueError, TypeError):
+                return False
+        return ordered
+
+    if operator == 'contains':
+        expected_text = str(expected)
+        return lambda actual: expected_text in str(actual)
+    if operator == 'not_contains':
+        expected_text = str(expected)
+        return lambda actual: expected_text not in str(actual)
+    return _never
+
+
+@lru_cache(maxsize=COMPARISON_CACHE_SIZE, typed=True)
+def _cached_comparison(operator: str, expected: Any) -> Callable[[Any], bool]:
+    return compile_comparison(operator, expected)
+
+
+def check_assertion(actual: Any, operator: str, expected: Any) -> bool:
+    """检查断言是否通过（规则见 compile_comparison，按比较符和期望值缓存编译结果）"""
+    try:
+        check = _cached_comparison(operator, expected)
+    except TypeError:
+        # 期望值为列表/字典等不可哈希的值
+        check = compile_comparison(operator, expected)
+    return check(actual)
+
+
+# 模板编译结果的缓存条数
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "4096"))
+
+# 模板片段类型
+_NUM_API, _NUM_VAR, _STR_API, _STR_VAR, _API, _VAR, _BRACES = range(7)
+
+# 按顺序逐个替换，后面的规则会匹配前面的替换结果
+_TEMPLATE_PASSES = (
+    (_NUM_API, re.compile(r'NUM\(\$?API\[(\d+)\]\.([a-zA-Z0-9_.]+)\)')),
+    (_NUM_VAR, re.compile(r'NUM\(\$([a-zA-Z_][a-zA-Z0-9_]*)\)')),
+    (_STR_API, re.compile(r'STR\(\$?API\[(\d+)\]\.([a-zA-Z0-9_.]+)\)')),
+    (_STR_VAR, re.compile(r'STR\(\$([a-zA-Z_][a-zA-Z0-9_]*)\)')),
+    (_API, re.compile(r'\$API\[(\d+)\]\.([a-zA-Z0-9_.]+)')),
+    (_VAR, re.compile(r'\$([a-zA-Z_][a-zA-Z0-9_]*)(?![\[\.])')),
+    (_BRACES, re.compile(r"\{\{\s*([^{}]+)\s*\}\}")),
+)
+_API_EXPR = re.compile(r'\$?API\[(\d+)\]\.(.+)')
+# 编译时用占位符代替已识别的片段
+_PLACEHOLDER = re.compile(r'\x00(\d+)\x00')
+# 字面量中出现这些内容时，前面的替换结果可能与之拼成 NUM()/STR()/$ 语法（{{ }} 由 rescan_braces 处理）
+_UNSAFE_LITERAL = re.compile(r'\$|NUM\(|STR\(')
+
+
+class CompiledTemplate:
+    """
+    编译后的模板
+
+    parts 为字面量（str）与变量片段（元组）的序列；rescan_braces 为 True 时 {{ }} 中含有其他变量（如 {{ $var }}），
+    渲染时先替换其他片段，再对结果执行 {{ }} 替换。
+    """
+    __slots__ = ("parts", "rescan_braces")
+
+    def __init__(self, parts: Tuple[Any, ...], rescan_braces: bool = False):
+        self.parts = parts
+        self.rescan_braces = rescan_braces
+
+
+def _make_token(kind: int, match: re.Match) -> Tuple[int, Optional[str], str, str]:
+    """片段表示为 (类型, API[N] 键或 None, 取值路径或变量名, 原始文本)"""
+    raw = match.group(0)
+    if kind in (_NUM_API, _STR_API, _API):
+        return kind, f"API[{int(match.group(1))}]", match.group(2), raw
+    if kind == _BRACES:
+        expr = match.group(1).strip()
+        api_match = _API_EXPR.match(expr)
+        if api_match:
+            return kind, f"API[{int(api_match.group(1))}]", api_match.group(2), raw
+        return kind, None, expr[1:].strip() if expr.startswith('$') else expr, raw
+    return kind, None, match.group(1), raw
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(source: str) -> Optional[CompiledTemplate]:
+    """
+    将模板字符串解析为字面量与变量片段的列表（结果会缓存）
+
+    识别顺序与逐个正则替换相同：先 NUM()、STR()，再 $API[N].path、$var，最后 {{ }}。
+
+    Returns:
+        编译结果；片段的边界取决于前面的替换结果时（如紧跟在 $var 后面的 NUM()、未被识别的 $），
+        返回 None，由调用方逐个正则替换
+    """
+    if '\x00' in source:
+        return None
+    tokens = []
+    marked = source
+    rescan_braces = False
+    for kind, pattern in _TEMPLATE_PASSES:
+        pieces = []
+        pos = 0
+        for match in pattern.finditer(marked):
+            if '\x00' in match.group(0):
+                if kind == _BRACES:
+                    # {{ }} 中含有其他片段，替换后再匹配
+                    rescan_braces = True
+                    continue
+                return None
+            # $API[N].path 和 $var 的结尾取决于后面的字符，后面紧跟替换结果时无法提前确定
+            if kind in (_API, _VAR) and marked.startswith('\x00', match.end()):
+                return None
+            pieces.append(marked[pos:match.start()])
+            pieces.append(f"\x00{len(tokens)}\x00")
+            tokens.append(_make_token(kind, match))
+            pos = match.end()
+        if pieces:
+            pieces.append(marked[pos:])
+            marked = ''.join(pieces)
+    if not tokens:
+        return CompiledTemplate((source,))
+
+    parts = []
+    for i, piece in enumerate(_PLACEHOLDER.split(marked)):
+        if i % 2:
+            parts.append(tokens[int(piece)])
+        elif piece:
+            if _UNSAFE_LITERAL.search(piece):
+                return None
+            parts.append(piece)
+    return CompiledTemplate(tuple(parts), rescan_braces)
+
+
+def _lookup(context: Dict[str, Any], api_key: Optional[str], key: str) -> Any:
+    if api_key is None:
+        return context.get(key)
+    api_data = context.get(api_key)
+    return extract_value(api_data, key) if api_data is not None else None
+
+
+def _format_number(value: Any) -> str:
+    try:
+        if isinstance(value, bool):
+            num_value = 1 if value else 0
+        elif isinstance(value, (int, float)):
+            num_value = value
+        else:
+            num_value = float(value)
+        return str(int(num_value) if isinstance(num_value, float) and num_value.is_integer() else num_value)
+    except (ValueError, TypeError):
+        return '0'
+
+
+def _format_string(value: Any) -> str:
+    """替换到字符串中的值：数字、布尔值原样，字符串加引号并转义，对象和数组序列化为 JSON"""
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    if isinstance(value, str):
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r')
+        return f'"{escaped}"'
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _substitute(token: Tuple[int, Optional[str], str, str], context: Dict[str, Any]) -> str:
+    """计算变量片段的替换文本（未找到的 $API[N].path、$var 和 {{ }} 原样保留）"""
+    kind, api_key, key, raw = token
+    value = _lookup(context, api_key, key)
+    if kind in (_NUM_API, _NUM_VAR):
+        return '0' if value is None else _format_number(value)
+    if kind in (_STR_API, _STR_VAR):
+        return '""' if value is None else json.dumps(str(value))
+    return raw if value is None else _format_string(value)
+
+
+def _rescanned(token: Tuple[int, Optional[str], str, str], text: str, context: Dict[str, Any]) -> bool:
+    """替换结果是否可能被后面的 NUM()/STR()/$API[N]/$var 规则再次匹配（{{ }} 另行处理）"""
+    if token[0] == _VAR or '$' not in text:
+        return False
+    if token[0] == _API and text == token[3]:
+        # 未找到的 $API[N].path 原样保留，其中的 $AP 只有在变量 AP 存在时才会被替换
+        return context.get("AP") is not None
+    return True
+
+
+def _render_passes(value: str, context: Dict[str, Any], passes=_TEMPLATE_PASSES) -> str:
+    """逐个规则用正则替换（编译结果无法确定片段边界时使用）"""
+    for kind, pattern in passes:
+        value = pattern.sub(lambda match: _substitute(_make_token(kind, match), context), value)
+    return value
+
+
+def _render_string(value: str, context: Dict[str, Any]) -> str:
+    if '$' not in value and '{{' not in value and 'NUM(' not in value and 'STR(' not in value:
+        return value
+    compiled = compile_template(value)
+    if compiled is None:
+        return _render_passes(value, context)
+    rescan_braces = compiled.rescan_braces
+    texts = []
+    for part in compiled.parts:
+        if part.__class__ is str or part[0] == _BRACES:
+            texts.append(None)
+            continue
+        text = _substitute(part, context)
+        if _rescanned(part, text, context):
+            return _render_passes(value, context)
+        if '{' in text or '}' in text:
+            rescan_braces = True
+        texts.append(text)
+
+    rendered = []
+    for part, text in zip(compiled.parts, texts):
+        if part.__class__ is str:
+            rendered.append(part)
+        elif text is not None:
+            rendered.append(text)
+        elif rescan_braces:
+            # 保留原文，下面统一执行 {{ }} 替换
+            rendered.append(part[3])
+        else:
+            rendered.append(_substitute(part, context))
+    result = ''.join(rendered)
+    if rescan_braces and '{{' in result:
+        return _render_passes(result, context, _TEMPLATE_PASSES[-1:])
+    return result
+
+
+def render_template(value: Any, context: Dict[str, Any]) -> Any:
+    """使用 $ 关键字语法渲染数据，支持 $API[N].path 和 $var 语法，同时兼容 {{ var }} 语法
+    支持 NUM() 和 STR() 格式：
+    - NUM($API[N].path) 或 NUM($var) - 返回数字值（不加引号）
+    - STR($API[N].path) 或 STR($var) - 返回字符串值（自动添加引号）
+    """
+    if isinstance(value, str):
+        return _render_string(value, context)
+    if isinstance(value, dict):
+        # 对于字典，递归处理每个值
+        result = {}
+        for k, v in value.items():
+            # 如果值是字符串且包含模板语法
+            if isinstance(v, str) and ('$' in v or '{{' in v or 'NUM(' in v or 'STR(' in v):
+                # 进行模板渲染
+                rendered = render_template(v, context)
+                # 如果渲染结果是字符串且是带引号的 JSON 字符串，解析它
+                if isinstance(rendered, str) and len(rendered) >= 2 and rendered.startswith('"') and rendered.endswith('"'):
+                    import json
+                    try:
+                        # 解析 JSON 字符串，去掉外层引号，得到实际值
+                        result[k] = json.loads(rendered)
+                    except:
+                        # 解析失败，保持原样
+                        result[k] = rendered
+                else:
+                    # 不是带引号的 JSON 字符串，直接使用（可能是数字、布尔值等）
+                    result[k] = rendered
+            else:
+                # 递归处理
+                result[k] = render_template(v, context)
+        return result
+    if isinstance(value, list):
+        return [render_template(item, context) for item in value]
+    return value
+
+
+def extract_value(data: Any, path: str) -> Any:
+    """按照点路径提取值，支持列表下标"""
+    return get_path(data, path, EXTRACT)
+
+
+_STEP_API_REF = re.compile(r'API\[(\d+)\]')
+_STEP_VAR_REF = re.compile(r'\$([a-zA-Z_][a-zA-Z0-9_]*)')
+_STEP_BRACES_REF = re.compile(r"\{\{\s*([^{}]+)\s*\}\}")
+
+
+def _collect_refs(value: Any, refs: set) -> None:
+    if isinstance(value, str):
+        for api_index in _STEP_API_REF.findall(value):
+            refs.add(f"API[{int(api_index)}]")
+        refs.update(_STEP_VAR_REF.findall(value))
+        for expr in _STEP_BRACES_REF.findall(value):
+            expr = expr.strip()
+            refs.add(expr[1:].strip() if expr.startswith('$') else expr)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_refs(item, refs)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_refs(item, refs)
+
+
+def step_reads(step: Dict[str, Any]) -> set:
+    """步骤的模板（请求参数和 JSON 路径断言的期望值）引用的上下文键：API[N] 和变量名"""
+    refs = set()
+    for field in ("headers", "path_params", "query_params", "body"):
+        if step.get(field) is not None:
+            _collect_refs(step[field], refs)
+    for assertion in step.get("assertions") or []:
+        if isinstance(assertion, dict) and assertion.get("type") == 'json_path':
+            _collect_refs(assertion.get("expected"), refs)
+    return refs
+
+
+def step_writes(step: Dict[str, Any], step_idx: int) -> set:
+    """步骤执行后写入上下文的键：API[序号] 和从当前接口提取的变量"""
+    writes = {f"API[{step_idx + 1}]"}
+    for rule in step.get("extracts") or []:
+        rule_step_index = rule.get("step_index")
+        if rule.get("name") and (not rule_step_index or rule_step_index == step_idx + 1):
+            writes.add(rule["name"])
+    return writes
+
+
+def flow_step_dependencies(steps: List[Dict[str, Any]]) -> List[set]:
+    """
+    分析流程步骤之间的依赖，返回每个步骤必须等待的前面步骤的下标
+
+    步骤 j 在 i 之前（j < i）时，以下情况 i 依赖 j：
+    - i 读取 j 写入的键（API[j+1] 或 j 提取的变量）
+    - j 读取 i 写入的键（i 不能提前覆盖 j 要读的值）
+    - 两者写入同一个键（保证最后的值与顺序执行一致）
+
+    依赖只指向序号更小的步骤，按依赖并行执行时每一步看到的上下文与顺序执行相同。
+    """
+    reads = [step_reads(step) for step in steps]
+    writes = [step_writes(step, idx) for idx, step in enumerate(steps)]
+    dependencies = []
+    for i in range(len(steps)):
+        dependencies.append({
+            j for j in range(i)
+            if not reads[i].isdisjoint(writes[j])
+            or not reads[j].isdisjoint(writes[i])
+            or not writes[i].isdisjoint(writes[j])
+        })
+    return dependencies
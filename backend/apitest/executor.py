@@ -1,11 +1,12 @@
-import requests
 import time
 import re
 from typing import Dict, Any, Optional, List
 from models import API, Environment, TestData
 from sqlalchemy.orm import Session
 import json
-from jsonpath_ng import parse as jsonpath_parse
+from value_path import QUERY, compile_jsonpath, get_path
+from http_client import http_clients, timings_of
+import exec_log
 
 class APIExecutor:
     """API执行引擎"""
@@ -31,9 +32,7 @@ class APIExecutor:
         url = self._build_url(path_params)
         
         # 合并请求头
-        print(f"  🔗 合并前的 headers 参数: {headers}")
         request_headers = self._merge_headers(headers)
-        print(f"  📋 最终发送的 request_headers: {request_headers}")
         
         # 准备请求参数
         request_kwargs = {
@@ -41,8 +40,14 @@ class APIExecutor:
             'url': url,
             'headers': request_headers,
         }
-        print(f"  🚀 准备发送请求: {self.api.method} {url}")
-        print(f"  📦 请求头: {request_headers}")
+        exec_log.debug("apitest.request", lambda: {
+            "method": self.api.method,
+            "url": url,
+            "headers_param": headers,
+            "headers": request_headers,
+            "query_params": query_params,
+            "body": body,
+        })
         
         # 添加查询参数
         if query_params:
@@ -57,10 +62,10 @@ class APIExecutor:
                 request_kwargs['data'] = body
         
         # 执行请求
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            response = requests.request(**request_kwargs, timeout=30)
-            response_time = int((time.time() - start_time) * 1000)  # 毫秒
+            response = http_clients.request(**request_kwargs, timeout=30)
+            response_time = int((time.perf_counter() - start_time) * 1000)  # 毫秒
             
             # 解析响应体
             try:
@@ -80,11 +85,12 @@ class APIExecutor:
                 'response_headers': response_headers,
                 'response_body': response_body,
                 'response_time': response_time,
+                'timings': timings_of(response),
                 'success': 200 <= response.status_code < 300,
                 'error_message': None
             }
         except Exception as e:
-            response_time = int((time.time() - start_time) * 1000)
+            response_time = int((time.perf_counter() - start_time) * 1000)
             return {
                 'request_url': url,
                 'request_method': self.api.method,
@@ -94,6 +100,7 @@ class APIExecutor:
                 'response_headers': None,
                 'response_body': None,
                 'response_time': response_time,
+                'timings': timings_of(e),
                 'success': False,
                 'error_message': str(e)
             }
@@ -105,16 +112,15 @@ class APIExecutor:
             self._execute_pre_request(test_data)
         
         # 2. 替换参数中的变量占位符（包括 $.api[n] 等高级变量引用）
-        print(f"  🔧 开始替换变量，api_results 数量: {len(self.api_results)}")
-        print(f"  📥 替换前的 headers: {test_data.headers}")
-        
         path_params = self._replace_variables(test_data.path_params)
         query_params = self._replace_variables(test_data.query_params)
         headers = self._replace_variables(test_data.headers)
         body = self._replace_variables(test_data.body)
-        
-        print(f"  📤 替换后的 headers: {headers}")
-        print(f"  📤 替换后的 headers 类型: {type(headers)}")
+        exec_log.debug("apitest.variables", lambda: {
+            "api_results": len(self.api_results),
+            "headers_template": test_data.headers,
+            "headers": headers,
+        })
         
         # 3. 执行主接口
         return self.execute(
@@ -141,23 +147,16 @@ class APIExecutor:
         
         # 添加环境请求头
         if self.environment.headers:
-            print(f"    🌍 环境请求头: {self.environment.headers}")
             for key, value in self.environment.headers.items():
                 merged_headers[key] = str(value)
         
         # 添加自定义请求头
         if headers:
-            print(f"    📝 自定义请求头: {headers}")
-            print(f"    📝 自定义请求头类型: {type(headers)}")
             for key, value in headers.items():
                 # 确保值是字符串类型
                 str_value = str(value) if value is not None else ""
                 merged_headers[key] = str_value
-                print(f"      ✅ 添加 Header: {key} = {str_value}")
-        else:
-            print(f"    ⚠️ 自定义请求头为空或None")
         
-        print(f"    📋 合并后的请求头: {merged_headers}")
         return merged_headers
     
     def _execute_pre_request(self, test_data: TestData) -> None:
@@ -166,7 +165,7 @@ class APIExecutor:
             # 获取前置接口配置
             pre_api = self.db.query(API).filter(API.id == test_data.pre_request_api_id).first()
             if not pre_api:
-                print(f"⚠️ 警告: 找不到前置接口 ID={test_data.pre_request_api_id}")
+                exec_log.warning("apitest.pre_request.missing", {"pre_request_api_id": test_data.pre_request_api_id})
                 return
             
             # 获取前置接口的测试数据（如果指定）
@@ -186,8 +185,12 @@ class APIExecutor:
             )
             
             # 执行前置接口
+            exec_log.debug("apitest.pre_request", lambda: {
+                "method": pre_api.method,
+                "path": pre_api.path,
+                "test_data": pre_test_data.name if pre_test_data else None,
+            })
             if pre_test_data:
-                print(f"🔄 执行前置接口: {pre_api.method} {pre_api.path} (使用测试数据: {pre_test_data.name})")
                 result = pre_executor.execute(
                     path_params=pre_test_data.path_params,
                     query_params=pre_test_data.query_params,
@@ -195,30 +198,30 @@ class APIExecutor:
                     body=pre_test_data.body
                 )
             else:
-                print(f"🔄 执行前置接口: {pre_api.method} {pre_api.path} (无测试数据)")
                 result = pre_executor.execute()
             
             # 检查前置接口是否执行成功
             if not result.get('success'):
                 error_msg = result.get('error_message', '未知错误')
-                print(f"❌ 前置接口执行失败: {error_msg}")
+                exec_log.warning("apitest.pre_request.failed", {"pre_request_api_id": pre_api.id, "error": error_msg})
                 return
             
             # 保存前置接口结果到 api_results，供 $.api[n] 引用
             if not self.api_results:
                 self.api_results = []
             self.api_results.append(result)  # 追加到列表末尾
-            print(f"📦 前置接口结果已保存到 api_results，当前索引: {len(self.api_results) - 1}")
-            print(f"   响应体: {result.get('response_body')}")
+            exec_log.debug("apitest.pre_request.result", lambda: {
+                "index": len(self.api_results) - 1,
+                "response_body": result.get('response_body'),
+            })
             
             # 提取变量（用于 {{变量名}} 格式）
             response_body = result.get('response_body')
             if response_body and test_data.variable_extractions:
                 self._extract_variables(response_body, test_data.variable_extractions)
-                print(f"✅ 前置接口执行成功，提取变量: {list(self.variables.keys())}")
             
         except Exception as e:
-            print(f"❌ 执行前置接口时发生错误: {str(e)}")
+            exec_log.warning("apitest.pre_request.error", {"error": str(e)})
     
     def _extract_variables(self, response_body: Any, extraction_rules: Dict[str, str]) -> None:
         """从响应中提取变量
@@ -228,7 +231,7 @@ class APIExecutor:
             extraction_rules: 提取规则，格式: {"varName": "$.data.accessToken"}
         """
         if not isinstance(response_body, dict):
-            print(f"⚠️ 警告: 响应体不是字典类型，无法提取变量")
+            exec_log.debug("apitest.extract.skipped", {"reason": "响应体不是字典类型，无法提取变量"})
             return
         
         for var_name, jsonpath_expr in extraction_rules.items():
@@ -236,14 +239,14 @@ class APIExecutor:
                 # 使用 JSONPath 提取值
                 if jsonpath_expr.startswith('$.'):
                     # 使用 jsonpath_ng 库
-                    jsonpath_expression = jsonpath_parse(jsonpath_expr)
+                    jsonpath_expression = compile_jsonpath(jsonpath_expr)
                     matches = jsonpath_expression.find(response_body)
                     if matches:
                         value = matches[0].value
                         self.variables[var_name] = value
-                        print(f"  📌 提取变量 {var_name} = {value}")
+                        exec_log.debug("apitest.extract", lambda: {"name": var_name, "value": value})
                     else:
-                        print(f"  ⚠️ 未找到匹配的值: {jsonpath_expr}")
+                        exec_log.debug("apitest.extract.not_found", {"name": var_name, "path": jsonpath_expr})
                 else:
                     # 简单的字典键访问，支持点号分隔的路径
                     keys = jsonpath_expr.split('.')
@@ -252,14 +255,14 @@ class APIExecutor:
                         if isinstance(value, dict) and key in value:
                             value = value[key]
                         else:
-                            print(f"  ⚠️ 路径不存在: {jsonpath_expr}")
+                            exec_log.debug("apitest.extract.not_found", {"name": var_name, "path": jsonpath_expr})
                             value = None
                             break
                     if value is not None:
                         self.variables[var_name] = value
-                        print(f"  📌 提取变量 {var_name} = {value}")
+                        exec_log.debug("apitest.extract", lambda: {"name": var_name, "value": value})
             except Exception as e:
-                print(f"  ❌ 提取变量 {var_name} 时出错: {str(e)}")
+                exec_log.debug("apitest.extract.error", {"name": var_name, "error": str(e)})
     
     def _replace_variables(self, data: Any) -> Any:
         """递归替换数据中的变量占位符
@@ -348,33 +351,28 @@ class APIExecutor:
             array_index = user_index - 1
             
             # 检查索引是否有效
-            print(f"  🔍 尝试从 $.api[{user_index}] 提取值（数组索引: {array_index}），路径: {jsonpath}")
-            print(f"  📊 api_results 列表长度: {len(results)}")
-            
             if 0 <= array_index < len(results):
                 result = results[array_index]
                 response_body = result.get('response_body')
-                print(f"  📦 响应体类型: {type(response_body)}, 内容: {response_body}")
                 
                 if response_body:
                     # 提取值
                     value = self._extract_value_by_jsonpath(response_body, jsonpath)
-                    print(f"  🎯 提取到的值: {value}")
                     
                     if value is not None:
                         # 替换整个引用
                         full_ref = match.group(0)
                         text = text[:match.start()] + str(value) + text[match.end():]
-                        print(f"  ✅ 替换变量: {full_ref} -> {value}")
-                        print(f"  📝 替换后的文本: {text}")
+                        exec_log.debug("apitest.replace", lambda: {"ref": full_ref, "value": value, "text": text})
                     else:
-                        print(f"  ⚠️ 无法从 $.api[{user_index}].response_body.{jsonpath} 提取值")
-                        print(f"  📋 响应体: {response_body}")
-                        # 打印可用路径用于调试
-                        if isinstance(response_body, dict):
-                            print(f"  🔑 可用键: {list(response_body.keys())}")
+                        # 输出可用的键用于调试
+                        exec_log.debug("apitest.replace.not_found", lambda: {
+                            "ref": f"$.api[{user_index}].response_body.{jsonpath}",
+                            "keys": list(response_body.keys()) if isinstance(response_body, dict) else None,
+                            "response_body": response_body,
+                        })
             else:
-                print(f"  ❌ 索引 {user_index} 超出范围，api_results 列表只有 {len(results)} 个元素（有效范围: 1-{len(results)}）")
+                exec_log.debug("apitest.replace.out_of_range", {"index": user_index, "api_results": len(results)})
         
         # 匹配 $.global.变量名 格式
         if text.startswith('$.global.'):
@@ -394,7 +392,7 @@ class APIExecutor:
                     value = self.global_variables[var_name]
                     full_ref = match.group(0)
                     text = text[:match.start()] + str(value) + text[match.end():]
-                    print(f"  ✅ 替换全局变量: {full_ref} -> {value}")
+                    exec_log.debug("apitest.replace.global", lambda: {"ref": full_ref, "value": value})
         
         return text
     
@@ -440,113 +438,5 @@ class APIExecutor:
         return None
     
     def _extract_value_by_jsonpath(self, data: Any, jsonpath: str) -> Any:
-        """使用 JSONPath 从数据中提取值，支持 list.find(...) 语法"""
-        if not jsonpath or jsonpath == '':
-            return data
-        
-        # 处理 list.find(...) 语法
-        find_pattern = r'\.find\(([^)]+)\)'
-        find_match = re.search(find_pattern, jsonpath)
-        if find_match:
-            # 提取 find 条件，如 "id=122"
-            condition_str = find_match.group(1)
-            # 分割条件
-            if '=' in condition_str:
-                key, value = condition_str.split('=', 1)
-                key = key.strip()
-                value = value.strip().strip('"\'')  # 去除引号
-                
-                # 获取 find 之前的路径
-                before_find = jsonpath[:find_match.start()]
-                # 获取 find 之后的路径
-                after_find = jsonpath[find_match.end():]
-                
-                # 先获取列表
-                if before_find:
-                    list_data = self._extract_value_by_jsonpath(data, before_find)
-                else:
-                    list_data = data
-                
-                # 在列表中查找匹配的项
-                if isinstance(list_data, list):
-                    for item in list_data:
-                        if isinstance(item, dict):
-                            # 尝试匹配值（支持字符串和数字）
-                            item_value = item.get(key)
-                            if item_value is not None:
-                                # 尝试转换为相同类型进行比较
-                                try:
-                                    # 如果 value 是数字字符串，尝试转换为数字
-                                    if isinstance(item_value, (int, float)):
-                                        try:
-                                            value_num = float(value) if '.' in value else int(value)
-                                            if item_value == value_num:
-                                                # 找到匹配项，继续提取后续路径
-                                                if after_find:
-                                                    return self._extract_value_by_jsonpath(item, after_find)
-                                                else:
-                                                    return item
-                                        except ValueError:
-                                            pass
-                                    
-                                    # 字符串比较
-                                    if str(item_value) == str(value):
-                                        # 找到匹配项，继续提取后续路径
-                                        if after_find:
-                                            return self._extract_value_by_jsonpath(item, after_find)
-                                        else:
-                                            return item
-                                except Exception:
-                                    pass
-                    return None
-        
-        # 使用 JSONPath 提取
-        # 去掉开头的点（如果有）
-        jsonpath = jsonpath.lstrip('.')
-        
-        try:
-            # 使用 jsonpath_ng 库（如果路径以 $. 开头）
-            if jsonpath.startswith('$.'):
-                jsonpath_expression = jsonpath_parse(jsonpath)
-                matches = jsonpath_expression.find(data)
-                if matches:
-                    return matches[0].value
-            else:
-                # 简单的点号分隔路径
-                keys = jsonpath.split('.')
-                value = data
-                for key in keys:
-                    if not key:  # 跳过空键
-                        continue
-                    # 处理数组索引，如 list[0]
-                    if '[' in key and ']' in key:
-                        key_name, index_str = key.split('[')
-                        index = int(index_str.rstrip(']'))
-                        if isinstance(value, dict) and key_name in value:
-                            value = value[key_name]
-                            if isinstance(value, list) and 0 <= index < len(value):
-                                value = value[index]
-                            else:
-                                return None
-                        else:
-                            return None
-                    else:
-                        if isinstance(value, dict) and key in value:
-                            value = value[key]
-                        elif isinstance(value, list):
-                            # 如果是列表，尝试访问第一个元素
-                            if len(value) > 0:
-                                value = value[0]
-                                if isinstance(value, dict) and key in value:
-                                    value = value[key]
-                                else:
-                                    return None
-                            else:
-                                return None
-                        else:
-                            return None
-                return value
-        except Exception as e:
-            print(f"  ⚠️ JSONPath 提取失败: {jsonpath}, 错误: {str(e)}")
-            return None
-
+        """使用 JSONPath 从数据中提取值，支持 list.find(...) 语法（路径解析结果会缓存）"""
+        return get_path(data, jsonpath, QUERY)
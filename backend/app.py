@@ -1,87 +1,58 @@
 """缺陷管理系统 FastAPI 主应用"""
 from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, Request, Form, Body
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session, joinedload, noload, selectinload
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload, noload, selectinload, defer
 from sqlalchemy import func, and_, or_
 from typing import List, Optional, Any, Dict
 from datetime import datetime, timedelta, date
 import time
+import asyncio
 from pathlib import Path
 import json
 import io
 import csv
-import requests
 import re
-import hashlib
 import base64
 import os
 import subprocess
 import warnings
 from decimal import Decimal
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.worksheet.datavalidation import DataValidation
 
 # 过滤 Pydantic 的受保护命名空间警告
 warnings.filterwarnings('ignore', message='.*has conflict with protected namespace.*')
 
 import models
 import schemas
-from config import engine, get_db, SessionLocal
+from config import get_db
 from permissions import check_permission, require_permission, get_user_permissions, ROLE_NAMES
-from auth import hash_password, verify_password, create_access_token, decode_access_token, get_current_user, CurrentUser
+from auth import hash_password, verify_password, password_needs_rehash, create_access_token, decode_access_token, get_current_user, get_stream_user, CurrentUser, hash_token, token_cache
+from password_hasher import password_hasher, PasswordHasherBusy
+from membership import ProjectAccess, get_project_access, get_stream_project_access, membership_cache
+from session_activity import session_activity
+from http_client import http_clients, timings_of
+from latency import PhaseStats
+import blob_store
+import exec_log
+from retention import resolve_policy, retention_compactor
+from job_queue import enqueue_task_execution, job_workers, read_execution_progress, load_item_results
+from api_runtime import render_template as _render_template
+from assertions import compile_assertions, evaluate_assertions
+from flow_runner import (
+    DATASET_MAX_FAILED_DETAILS, build_flow_context, compile_flow_plan, detach_flow_plan, resolve_fail_action, run_flow
+)
+from dataset import check_row_count, expand_matrix, load_test_file_rows, validate_rows
+from flow_runs import flow_runs, load_run_steps, read_run_progress, row_result
+from flow_index import flows_using_endpoint, sync_flow_index, tasks_using_endpoint
+from load_test import LOAD_TEST_MAX_DURATION_SECONDS, LOAD_TEST_MAX_VIRTUAL_USERS, load_tests
 from swagger_parser import OpenAPIParser, parse_swagger_file
 from data_generator import TestDataGenerator
 
 
-# 创建数据库表
-models.Base.metadata.create_all(bind=engine)
-
-# 初始化默认管理员用户
-def init_default_admin():
-    """初始化默认管理员用户（如果不存在或密码不正确）"""
-    from config import SessionLocal
-    from auth import hash_password, verify_password
-    
-    db = SessionLocal()
-    try:
-        # 检查 admin 用户是否存在
-        admin_user = db.query(models.User).filter(models.User.username == 'admin').first()
-        if not admin_user:
-            # 创建默认管理员用户
-            admin_password_hash = hash_password('admin123')
-            admin_user = models.User(
-                username='admin',
-                email='admin@example.com',
-                password=admin_password_hash,
-                display_name='系统管理员',
-                roles=['admin'],
-                status='active'
-            )
-            db.add(admin_user)
-            db.commit()
-            print("✅ 已创建默认管理员用户: admin/admin123")
-        else:
-            # 检查密码是否正确，如果不正确则更新
-            if not verify_password('admin123', admin_user.password):
-                print("⚠️  admin 用户密码不正确，正在更新...")
-                admin_user.password = hash_password('admin123')
-                db.commit()
-                print("✅ 已更新 admin 用户密码为: admin123")
-            else:
-                print("ℹ️  管理员用户已存在，密码正确")
-    except Exception as e:
-        import traceback
-        print(f"⚠️  初始化管理员用户时出错: {e}")
-        traceback.print_exc()
-        db.rollback()
-    finally:
-        db.close()
-
-# 应用启动时初始化默认管理员
-init_default_admin()
+# 建表和默认管理员初始化由 bootstrap.py 完成（python bootstrap.py），导入本模块不访问数据库；
+# 设置 AUTO_INIT_DB=1 时在启动事件中执行（幂等）
+AUTO_INIT_DB = os.getenv("AUTO_INIT_DB", "0") == "1"
 
 app = FastAPI(title="缺陷管理系统", version="1.0.0")
 
@@ -110,41 +81,34 @@ try:
 except Exception:
     pass  # 如果配置失败，不影响应用运行
 
-# ==================== 权限检查辅助函数 ====================
-
-def check_project_member_permission(
-    user: models.User, 
-    project: models.Project, 
-    action: str = "操作"
-) -> None:
-    """
-    检查用户是否是项目成员（admin 可以操作所有项目）
-    
-    Args:
-        user: 用户对象
-        project: 项目对象（需要已加载 members 关联）
-        action: 操作描述（用于错误消息）
-    
-    Raises:
-        HTTPException: 如果用户不是项目成员且不是 admin
-    """
-    # admin 可以操作所有项目
-    if user.roles and 'admin' in user.roles:
-        return
-    
-    # 加载项目成员（如果还没加载）
-    if not hasattr(project, 'members') or project.members is None:
-        raise HTTPException(
-            status_code=500, 
-            detail="项目成员信息未加载，请使用 joinedload"
-        )
-    
-    # 检查是否是项目成员
-    if user not in project.members:
-        raise HTTPException(
-            status_code=403, 
-            detail=f"您不是该项目成员，无权{action}"
-        )
+@app.on_event("startup")
+def start_background_workers():
+    """启动后台任务：会话活动时间批量写入、过期会话清理、测试任务 worker、执行历史清理、流程异步执行心跳、中断压测回收"""
+    if AUTO_INIT_DB:
+        from bootstrap import run_bootstrap
+        run_bootstrap()
+    session_activity.start()
+    job_workers.start()
+    retention_compactor.start()
+    flow_runs.start_monitor()
+    load_tests.start_monitor()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    load_tests.shutdown()
+    flow_runs.shutdown()
+    retention_compactor.stop()
+    job_workers.stop()
+    session_activity.stop()
+    password_hasher.shutdown()
+    http_clients.close_all()
+
+
+@app.exception_handler(PasswordHasherBusy)
+def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """密码哈希排队已满时返回 503，提示客户端稍后重试"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 # 配置CORS
 app.add_middleware(
@@ -205,6 +169,7 @@ def create_project(
         db_project.members.append(creator)
     
     db.commit()
+    membership_cache.invalidate_users(u.id for u in db_project.members)
     db.refresh(db_project)
     # 重新加载以包含成员信息
     db_project = db.query(models.Project).options(joinedload(models.Project.members)).filter(models.Project.id == db_project.id).first()
@@ -242,8 +207,11 @@ def update_project(
         setattr(db_project, key, value)
     
     # 更新项目成员
+    affected_user_ids = set()
     if 'member_ids' in project.model_dump(exclude_unset=True):
         member_ids = project.member_ids or []
+        affected_user_ids.update(u.id for u in db_project.members)
+        affected_user_ids.update(member_ids)
         # 清除现有成员
         db_project.members.clear()
         # 添加新成员
@@ -253,6 +221,8 @@ def update_project(
                 db_project.members.append(member_user)
     
     db.commit()
+    if affected_user_ids:
+        membership_cache.invalidate_users(affected_user_ids)
     db.refresh(db_project)
     # 重新加载以包含成员信息
     db_project = db.query(models.Project).options(joinedload(models.Project.members)).filter(models.Project.id == project_id).first()
@@ -272,10 +242,77 @@ def delete_project(
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
+    member_ids = [u.id for u in project.members]
     db.delete(project)
     db.commit()
+    membership_cache.invalidate_users(member_ids)
     return {"message": "项目已删除"}
 
+def _retention_policy_response(project_id: int, row: Optional[models.RetentionPolicy]) -> dict:
+    return {
+        "project_id": project_id,
+        "keep_last_runs": row.keep_last_runs if row else None,
+        "keep_days": row.keep_days if row else None,
+        "keep_failed_days": row.keep_failed_days if row else None,
+        "configured": row is not None,
+        "effective": resolve_policy(row).to_dict(),
+    }
+
+
+@app.get("/api/projects/{project_id}/retention-policy", response_model=schemas.RetentionPolicy)
+def get_retention_policy(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """获取项目的执行历史保留策略"""
+    if not db.query(models.Project.id).filter(models.Project.id == project_id).first():
+        raise HTTPException(status_code=404, detail="项目不存在")
+    row = db.query(models.RetentionPolicy).filter(models.RetentionPolicy.project_id == project_id).first()
+    return _retention_policy_response(project_id, row)
+
+
+@app.put("/api/projects/{project_id}/retention-policy", response_model=schemas.RetentionPolicy)
+def update_retention_policy(
+    project_id: int,
+    policy: schemas.RetentionPolicyUpdate,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """设置项目的执行历史保留策略（字段为空时使用默认值）"""
+    # 检查权限：只有管理员可以修改项目配置
+    require_permission(current_user.role, "projects", "update")
+    if not db.query(models.Project.id).filter(models.Project.id == project_id).first():
+        raise HTTPException(status_code=404, detail="项目不存在")
+
+    row = db.query(models.RetentionPolicy).filter(models.RetentionPolicy.project_id == project_id).first()
+    if row is None:
+        row = models.RetentionPolicy(project_id=project_id)
+        db.add(row)
+    for key, value in policy.model_dump().items():
+        setattr(row, key, value)
+    db.commit()
+    db.refresh(row)
+    return _retention_policy_response(project_id, row)
+
+
+@app.get("/api/retention/report")
+def get_retention_report(current_user: CurrentUser = Depends(get_current_user)):
+    """最近一次执行历史清理的报告（各表删除行数、释放的内容存储字节数）"""
+    require_permission(current_user.role, "projects", "update")
+    return retention_compactor.last_report or {}
+
+
+@app.post("/api/retention/run")
+def run_retention(current_user: CurrentUser = Depends(get_current_user)):
+    """立即按保留策略清理执行历史"""
+    require_permission(current_user.role, "projects", "update")
+    report = retention_compactor.run_once()
+    if report is None:
+        raise HTTPException(status_code=409, detail="清理任务正在执行，请稍后再试")
+    return report
+
+
 # ==================== 迭代管理 ====================
 
 @app.get("/api/sprints")
@@ -713,6 +750,7 @@ def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(ge
         setattr(db_user, key, value)
     
     db.commit()
+    membership_cache.invalidate_user(user_id)
     db.refresh(db_user)
     return db_user
 
@@ -725,6 +763,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     
     db.delete(user)
     db.commit()
+    membership_cache.invalidate_user(user_id)
     return {"message": "用户已删除"}
 
 # ==================== 缺陷管理 ====================
@@ -814,6 +853,10 @@ def export_bugs(
     current_user: CurrentUser = Depends(get_current_user),
 ):
     """导出缺陷列表为 Excel（按照当前查询条件）"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.worksheet.datavalidation import DataValidation
     query = db.query(models.Bug).options(
         joinedload(models.Bug.project),
         joinedload(models.Bug.assignee),
@@ -1016,6 +1059,10 @@ BUG_IMPORT_COLUMNS = [
 @app.get("/api/bugs/import/template")
 def get_bug_import_template():
     """下载缺陷导入模板（Excel），字段与新建缺陷表单一致"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.worksheet.datavalidation import DataValidation
     headers_cn = [col[1] for col in BUG_IMPORT_COLUMNS]
     filename_ts = datetime.now().strftime("%Y%m%d-%H%M%S")
 
@@ -1105,19 +1152,16 @@ async def import_bugs(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access),
 ):
     """从 Excel 导入缺陷，字段与模板一致"""
+    from openpyxl import load_workbook
     # 校验项目和权限（与 create_bug 一致）
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == project_id).first()
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
 
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建缺陷")
+    access.require_member(project.id, "创建缺陷")
 
     content = await file.read()
     if not content:
@@ -1400,21 +1444,17 @@ async def import_bugs(
 def create_bug(
     bug: schemas.BugCreate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """创建缺陷"""
-    # 检查项目是否存在并加载成员信息
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == bug.project_id).first()
+    # 检查项目是否存在
+    project = db.query(models.Project).filter(models.Project.id == bug.project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
     # 检查权限：只有项目成员可以创建缺陷
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建缺陷")
+    access.require_member(project.id, "创建缺陷")
     
     # 生成bug_key
     bug_key = generate_bug_key(db, bug.project_id)
@@ -1441,20 +1481,18 @@ def update_bug(
     bug_id: int, 
     bug: schemas.BugUpdate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """更新缺陷"""
     db_bug = db.query(models.Bug).options(
-        joinedload(models.Bug.project).joinedload(models.Project.members)
+        joinedload(models.Bug.project)
     ).filter(models.Bug.id == bug_id).first()
     if not db_bug:
         raise HTTPException(status_code=404, detail="缺陷不存在")
     
     # 检查权限：只有项目成员可以更新缺陷
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_bug.project, "更新缺陷")
+    access.require_member(db_bug.project_id, "更新缺陷")
     
     # 使用 Pydantic V2 的 model_dump
     bug_data = bug.model_dump(exclude_unset=True)
@@ -1490,20 +1528,18 @@ def update_bug(
 def delete_bug(
     bug_id: int, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """删除缺陷"""
     bug = db.query(models.Bug).options(
-        joinedload(models.Bug.project).joinedload(models.Project.members)
+        joinedload(models.Bug.project)
     ).filter(models.Bug.id == bug_id).first()
     if not bug:
         raise HTTPException(status_code=404, detail="缺陷不存在")
     
     # 检查权限：只有项目成员可以删除缺陷
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, bug.project, "删除缺陷")
+    access.require_member(bug.project_id, "删除缺陷")
     
     # 删除缺陷相关的图片文件夹
     bug_image_folder = os.path.join(BUG_IMAGE_DIR, bug.bug_key)
@@ -1524,6 +1560,7 @@ def batch_delete_bugs(
     bug_ids: list[int] = Body(..., embed=True, description="要删除的缺陷ID列表"),
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access),
 ):
     """批量删除缺陷"""
     if not bug_ids:
@@ -1531,22 +1568,17 @@ def batch_delete_bugs(
 
     # 查询所有待删除缺陷，带上项目信息和成员
     bugs = db.query(models.Bug).options(
-        joinedload(models.Bug.project).joinedload(models.Project.members)
+        joinedload(models.Bug.project)
     ).filter(models.Bug.id.in_(bug_ids)).all()
 
     if not bugs:
         return {"deleted": 0}
 
-    # 当前用户
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-
     # 权限检查：必须是每个缺陷所属项目的成员
     for bug in bugs:
-        if not bug.project:
+        if not bug.project_id:
             continue
-        check_project_member_permission(user, bug.project, "删除缺陷")
+        access.require_member(bug.project_id, "删除缺陷")
 
     # 删除相关图片文件夹
     import shutil
@@ -1715,21 +1747,19 @@ def get_comments(bug_id: int, db: Session = Depends(get_db)):
 def create_comment(
     comment: schemas.CommentCreate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """创建评论"""
     # 获取关联的缺陷并检查项目权限
     bug = db.query(models.Bug).options(
-        joinedload(models.Bug.project).joinedload(models.Project.members)
+        joinedload(models.Bug.project)
     ).filter(models.Bug.id == comment.bug_id).first()
     if not bug:
         raise HTTPException(status_code=404, detail="缺陷不存在")
     
     # 检查权限：只有项目成员可以创建评论
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, bug.project, "创建评论")
+    access.require_member(bug.project_id, "创建评论")
     
     db_comment = models.Comment(**comment.model_dump())
     db.add(db_comment)
@@ -1868,6 +1898,9 @@ def export_testcases(
     current_user: CurrentUser = Depends(get_current_user)
 ):
     """导出测试用例为 Excel 或 CSV"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import Font, PatternFill, Alignment
     require_permission(current_user.role, "testcases", "read")
 
     query = db.query(models.TestCase).options(
@@ -1978,23 +2011,19 @@ def export_testcases(
 def create_testcase(
     testcase: schemas.TestCaseCreate,
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """创建测试用例"""
     require_permission(current_user.role, "testcases", "create")
     
-    # 检查项目是否存在并加载成员信息
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == testcase.project_id).first()
+    # 检查项目是否存在
+    project = db.query(models.Project).filter(models.Project.id == testcase.project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
     # 检查权限：只有项目成员可以创建测试用例
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建测试用例")
+    access.require_member(project.id, "创建测试用例")
     
     # 生成用例唯一标识
     case_key = generate_case_key(db, testcase.project_id)
@@ -2027,22 +2056,20 @@ def update_testcase(
     testcase_id: int,
     testcase: schemas.TestCaseUpdate,
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """更新测试用例"""
     require_permission(current_user.role, "testcases", "update")
     
     db_testcase = db.query(models.TestCase).options(
-        joinedload(models.TestCase.project).joinedload(models.Project.members)
+        joinedload(models.TestCase.project)
     ).filter(models.TestCase.id == testcase_id).first()
     if not db_testcase:
         raise HTTPException(status_code=404, detail="测试用例不存在")
     
     # 检查权限：只有项目成员可以更新测试用例
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_testcase.project, "更新测试用例")
+    access.require_member(db_testcase.project_id, "更新测试用例")
     
     update_data = testcase.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -2056,22 +2083,20 @@ def update_testcase(
 def delete_testcase(
     testcase_id: int,
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """删除测试用例"""
     require_permission(current_user.role, "testcases", "delete")
     
     db_testcase = db.query(models.TestCase).options(
-        joinedload(models.TestCase.project).joinedload(models.Project.members)
+        joinedload(models.TestCase.project)
     ).filter(models.TestCase.id == testcase_id).first()
     if not db_testcase:
         raise HTTPException(status_code=404, detail="测试用例不存在")
     
     # 检查权限：只有项目成员可以删除测试用例
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_testcase.project, "删除测试用例")
+    access.require_member(db_testcase.project_id, "删除测试用例")
     
     db.delete(db_testcase)
     db.commit()
@@ -2081,27 +2106,18 @@ def delete_testcase(
 def batch_delete_testcases(
     ids: List[int] = Body(...),
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """批量删除测试用例"""
     require_permission(current_user.role, "testcases", "delete")
 
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-
     deleted = 0
     for testcase_id in ids:
-        db_testcase = db.query(models.TestCase).options(
-            joinedload(models.TestCase.project).joinedload(models.Project.members)
-        ).filter(models.TestCase.id == testcase_id).first()
-        if db_testcase:
-            try:
-                check_project_member_permission(user, db_testcase.project, "删除测试用例")
-                db.delete(db_testcase)
-                deleted += 1
-            except Exception:
-                pass
+        db_testcase = db.query(models.TestCase).filter(models.TestCase.id == testcase_id).first()
+        if db_testcase and access.is_member(db_testcase.project_id):
+            db.delete(db_testcase)
+            deleted += 1
     db.commit()
     return {"message": f"成功删除 {deleted} 个测试用例", "deleted": deleted}
 
@@ -2183,20 +2199,17 @@ async def import_testcases(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access),
 ):
     """从 Excel / CSV 导入测试用例（只解析：标题、分组、等级、前置条件、步骤N、预期结果N）"""
+    from openpyxl import load_workbook
     require_permission(current_user.role, "testcases", "create")
 
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == project_id).first()
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
 
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建测试用例")
+    access.require_member(project.id, "创建测试用例")
 
     content = await file.read()
     if not content:
@@ -3104,23 +3117,19 @@ def generate_testcases_from_image(
     image: UploadFile = File(...),
     model_id: Optional[int] = Form(None),
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """从设计原型图片智能生成测试用例"""
     require_permission(current_user.role, "testcases", "create")
     
-    # 检查项目是否存在并加载成员信息
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == project_id).first()
+    # 检查项目是否存在
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
     # 检查权限：只有项目成员可以创建测试用例
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建测试用例")
+    access.require_member(project.id, "创建测试用例")
     
     # 验证文件类型
     if not image.content_type or not image.content_type.startswith('image/'):
@@ -3598,6 +3607,15 @@ def login(request: schemas.LoginRequest, http_request: Request, db: Session = De
         if user.status != 'active':
             raise HTTPException(status_code=403, detail="用户已被禁用")
         
+        # 工作因子配置变更后，登录成功时透明地重新哈希
+        if password_needs_rehash(user.password):
+            try:
+                user.password = hash_password(request.password)
+                db.commit()
+            except PasswordHasherBusy:
+                # 重新哈希可以等到下次登录
+                pass
+        
         # 创建访问令牌
         # 从 roles 数组中取第一个角色（或优先使用 'admin'）
         primary_role = 'guest'
@@ -3611,7 +3629,7 @@ def login(request: schemas.LoginRequest, http_request: Request, db: Session = De
         )
         
         # 计算 token 的哈希值（用于在数据库中存储）
-        token_hash = hashlib.sha256(access_token.encode()).hexdigest()
+        token_hash = hash_token(access_token)
         
         # 获取客户端信息
         ip_address = http_request.client.host if http_request.client else None
@@ -3658,8 +3676,8 @@ def login(request: schemas.LoginRequest, http_request: Request, db: Session = De
             "token_type": "bearer",
             "user": user_dict
         }
-    except HTTPException:
-        # 重新抛出 HTTP 异常
+    except (HTTPException, PasswordHasherBusy):
+        # 重新抛出 HTTP 异常；哈希排队已满由全局处理器返回 503
         raise
     except Exception as e:
         # 捕获其他所有异常，记录并返回 500 错误
@@ -3680,20 +3698,9 @@ def get_current_user_info(
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     
-    # 更新会话的最后活动时间（如果提供了 token）
-    if http_request:
-        auth_header = http_request.headers.get("authorization", "")
-        if auth_header.startswith("Bearer "):
-            token = auth_header[7:]
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
-            session = db.query(models.UserSession).filter(
-                models.UserSession.token_hash == token_hash,
-                models.UserSession.user_id == current_user.id,
-                models.UserSession.is_active == True
-            ).first()
-            if session:
-                session.last_activity_at = datetime.utcnow()
-                db.commit()
+    # 记录会话的最后活动时间（由后台线程按粒度批量写入）
+    if current_user.token_hash:
+        session_activity.touch(current_user.token_hash)
     
     return user
 
@@ -3705,19 +3712,18 @@ def logout(
     db: Session = Depends(get_db)
 ):
     """用户登出"""
-    if http_request:
-        auth_header = http_request.headers.get("authorization", "")
-        if auth_header.startswith("Bearer "):
-            token = auth_header[7:]
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
-            session = db.query(models.UserSession).filter(
-                models.UserSession.token_hash == token_hash,
-                models.UserSession.user_id == current_user.id,
-                models.UserSession.is_active == True
-            ).first()
-            if session:
-                session.is_active = False
-                db.commit()
+    if current_user.token_hash:
+        session = db.query(models.UserSession).filter(
+            models.UserSession.token_hash == current_user.token_hash,
+            models.UserSession.user_id == current_user.id,
+            models.UserSession.is_active == True
+        ).first()
+        if session:
+            session.is_active = False
+            db.commit()
+        # 本进程内立即生效，其他进程在下一次复查会话状态时生效
+        token_cache.revoke(current_user.token_hash)
+        session_activity.discard(current_user.token_hash)
     
     return {"message": "登出成功"}
 
@@ -3840,21 +3846,17 @@ def get_api_environment(environment_id: int, db: Session = Depends(get_db)):
 def create_api_environment(
     environment: schemas.ApiEnvironmentCreate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """创建环境"""
-    # 检查项目是否存在并加载成员信息
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == environment.project_id).first()
+    # 检查项目是否存在
+    project = db.query(models.Project).filter(models.Project.id == environment.project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
     # 检查权限：只有项目成员可以创建环境
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建环境")
+    access.require_member(project.id, "创建环境")
     
     # 检查环境信息（base_url）在该项目下是否已存在（项目+环境信息组合唯一）
     if db.query(models.ApiEnvironment).filter(
@@ -3874,32 +3876,28 @@ def update_api_environment(
     environment_id: int, 
     environment: schemas.ApiEnvironmentUpdate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """更新环境"""
     db_environment = db.query(models.ApiEnvironment).options(
-        joinedload(models.ApiEnvironment.project).joinedload(models.Project.members)
+        joinedload(models.ApiEnvironment.project)
     ).filter(models.ApiEnvironment.id == environment_id).first()
     if not db_environment:
         raise HTTPException(status_code=404, detail="环境不存在")
     
     # 检查权限：只有项目成员可以更新环境
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_environment.project, "更新环境")
+    access.require_member(db_environment.project_id, "更新环境")
     
     update_data = environment.model_dump(exclude_unset=True)
     
     # 如果更新了项目ID，检查项目是否存在并检查新项目的权限
     if 'project_id' in update_data:
-        new_project = db.query(models.Project).options(
-            joinedload(models.Project.members)
-        ).filter(models.Project.id == update_data['project_id']).first()
+        new_project = db.query(models.Project).filter(models.Project.id == update_data['project_id']).first()
         if not new_project:
             raise HTTPException(status_code=404, detail="项目不存在")
         # 检查新项目的权限
-        check_project_member_permission(user, new_project, "更新环境到该项目")
+        access.require_member(new_project.id, "更新环境到该项目")
         
     # 如果更新了环境信息（base_url）或项目ID，检查组合是否已存在（排除当前环境）
     if 'base_url' in update_data or 'project_id' in update_data:
@@ -3923,20 +3921,18 @@ def update_api_environment(
 def delete_api_environment(
     environment_id: int, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """删除环境"""
     db_environment = db.query(models.ApiEnvironment).options(
-        joinedload(models.ApiEnvironment.project).joinedload(models.Project.members)
+        joinedload(models.ApiEnvironment.project)
     ).filter(models.ApiEnvironment.id == environment_id).first()
     if not db_environment:
         raise HTTPException(status_code=404, detail="环境不存在")
     
     # 检查权限：只有项目成员可以删除环境
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_environment.project, "删除环境")
+    access.require_member(db_environment.project_id, "删除环境")
     
     db.delete(db_environment)
     db.commit()
@@ -3984,7 +3980,8 @@ def get_code_scan(scan_id: int, db: Session = Depends(get_db), current_user: Cur
 def create_code_scan(
     scan: schemas.CodeScanCreate,
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """创建代码扫描任务"""
     # 检查项目是否存在
@@ -3993,10 +3990,7 @@ def create_code_scan(
         raise HTTPException(status_code=404, detail="项目不存在")
     
     # 检查权限
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建代码扫描任务")
+    access.require_member(project.id, "创建代码扫描任务")
     
     db_scan = models.CodeScan(**scan.model_dump())
     db.add(db_scan)
@@ -4009,20 +4003,18 @@ def update_code_scan(
     scan_id: int,
     scan: schemas.CodeScanUpdate,
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """更新代码扫描任务"""
     db_scan = db.query(models.CodeScan).options(
-        joinedload(models.CodeScan.project).joinedload(models.Project.members)
+        joinedload(models.CodeScan.project)
     ).filter(models.CodeScan.id == scan_id).first()
     if not db_scan:
         raise HTTPException(status_code=404, detail="扫描任务不存在")
     
     # 检查权限
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_scan.project, "更新代码扫描任务")
+    access.require_member(db_scan.project_id, "更新代码扫描任务")
     
     update_data = scan.model_dump(exclude_unset=True)
     for key, value in update_data.items():
@@ -4036,20 +4028,18 @@ def update_code_scan(
 def delete_code_scan(
     scan_id: int,
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """删除代码扫描任务"""
     db_scan = db.query(models.CodeScan).options(
-        joinedload(models.CodeScan.project).joinedload(models.Project.members)
+        joinedload(models.CodeScan.project)
     ).filter(models.CodeScan.id == scan_id).first()
     if not db_scan:
         raise HTTPException(status_code=404, detail="扫描任务不存在")
     
     # 检查权限
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_scan.project, "删除代码扫描任务")
+    access.require_member(db_scan.project_id, "删除代码扫描任务")
     
     db.delete(db_scan)
     db.commit()
@@ -4059,20 +4049,19 @@ def delete_code_scan(
 def execute_code_scan(
     scan_id: int,
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """调用 SonarQube 质量门 API，成功则根据返回结果更新扫描状态（不执行 mvn）"""
+    import requests
     db_scan = db.query(models.CodeScan).options(
-        joinedload(models.CodeScan.project).joinedload(models.Project.members)
+        joinedload(models.CodeScan.project)
     ).filter(models.CodeScan.id == scan_id).first()
     if not db_scan:
         raise HTTPException(status_code=404, detail="扫描任务不存在")
     
     # 检查权限
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_scan.project, "执行代码扫描")
+    access.require_member(db_scan.project_id, "执行代码扫描")
     
     # 检查是否配置了 Sonar Host
     if not db_scan.sonar_host:
@@ -4322,6 +4311,7 @@ def get_code_scan_status(
     current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取扫描任务的最新状态（从 SonarQube 实时查询）"""
+    import requests
     db_scan = db.query(models.CodeScan).filter(models.CodeScan.id == scan_id).first()
     if not db_scan:
         raise HTTPException(status_code=404, detail="扫描任务不存在")
@@ -5002,21 +4992,17 @@ def record_api_from_url(
 def create_api_endpoint(
     endpoint: schemas.ApiEndpointCreate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """创建接口"""
-    # 检查项目是否存在并加载成员信息
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == endpoint.project_id).first()
+    # 检查项目是否存在
+    project = db.query(models.Project).filter(models.Project.id == endpoint.project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
     # 检查权限：只有项目成员可以创建接口
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建接口")
+    access.require_member(project.id, "创建接口")
     
     db_endpoint = models.ApiEndpoint(**endpoint.model_dump())
     db.add(db_endpoint)
@@ -5037,31 +5023,27 @@ def update_api_endpoint(
     endpoint_id: int, 
     endpoint: schemas.ApiEndpointUpdate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """更新接口"""
     db_endpoint = db.query(models.ApiEndpoint).options(
-        joinedload(models.ApiEndpoint.project).joinedload(models.Project.members)
+        joinedload(models.ApiEndpoint.project)
     ).filter(models.ApiEndpoint.id == endpoint_id).first()
     if not db_endpoint:
         raise HTTPException(status_code=404, detail="接口不存在")
     
     # 检查权限：只有项目成员可以更新接口
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_endpoint.project, "更新接口")
+    access.require_member(db_endpoint.project_id, "更新接口")
     
     # 如果更新了项目ID，检查项目是否存在并检查新项目的权限
     update_data = endpoint.model_dump(exclude_unset=True)
     if 'project_id' in update_data:
-        new_project = db.query(models.Project).options(
-            joinedload(models.Project.members)
-        ).filter(models.Project.id == update_data['project_id']).first()
+        new_project = db.query(models.Project).filter(models.Project.id == update_data['project_id']).first()
         if not new_project:
             raise HTTPException(status_code=404, detail="项目不存在")
         # 检查新项目的权限
-        check_project_member_permission(user, new_project, "更新接口到该项目")
+        access.require_member(new_project.id, "更新接口到该项目")
     
     for key, value in update_data.items():
         setattr(db_endpoint, key, value)
@@ -5074,48 +5056,36 @@ def update_api_endpoint(
 def delete_api_endpoint(
     endpoint_id: int, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """删除接口"""
     endpoint = db.query(models.ApiEndpoint).options(
-        joinedload(models.ApiEndpoint.project).joinedload(models.Project.members)
+        joinedload(models.ApiEndpoint.project)
     ).filter(models.ApiEndpoint.id == endpoint_id).first()
     if not endpoint:
         raise HTTPException(status_code=404, detail="接口不存在")
     
     # 检查权限：只有项目成员可以删除接口
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, endpoint.project, "删除接口")
+    access.require_member(endpoint.project_id, "删除接口")
     
     # 检查依赖：是否有测试任务使用该接口
-    task_items = db.query(models.TestTaskItem).filter(
-        models.TestTaskItem.item_type == 'api',
-        models.TestTaskItem.item_id == endpoint_id
-    ).all()
-    if task_items:
-        task_names = []
-        for item in task_items:
-            task = db.query(models.TestTask).filter(models.TestTask.id == item.task_id).first()
-            if task:
-                task_names.append(task.name)
+    task_names = [
+        name for (name,) in db.query(models.TestTask.name).join(
+            models.TestTaskItem, models.TestTaskItem.task_id == models.TestTask.id
+        ).filter(
+            models.TestTaskItem.item_type == 'api',
+            models.TestTaskItem.item_id == endpoint_id
+        ).order_by(models.TestTask.id)
+    ]
+    if task_names:
         raise HTTPException(
             status_code=400,
             detail=f"无法删除接口：该接口正在被测试任务使用（{', '.join(task_names)}），请先从测试任务中移除该接口"
         )
     
-    # 检查依赖：是否有流程使用该接口
-    flows = db.query(models.ApiTestFlow).all()
-    dependent_flows = []
-    for flow in flows:
-        if flow.steps:
-            steps = flow.steps if isinstance(flow.steps, list) else []
-            for step in steps:
-                if isinstance(step, dict) and step.get('endpoint_id') == endpoint_id:
-                    dependent_flows.append(flow.name)
-                    break
-    
+    # 检查依赖：是否有流程使用该接口（flow_step_endpoints 索引）
+    dependent_flows = [flow["name"] for flow in flows_using_endpoint(db, endpoint_id)]
     if dependent_flows:
         raise HTTPException(
             status_code=400,
@@ -5126,25 +5096,32 @@ def delete_api_endpoint(
     db.commit()
     return {"message": "接口已删除"}
 
+@app.get("/api/api-endpoints/{endpoint_id}/usages")
+def get_api_endpoint_usages(endpoint_id: int, db: Session = Depends(get_db)):
+    """接口的引用情况：引用该接口的流程（及步骤序号），以及直接或通过这些流程使用该接口的测试任务"""
+    if not db.query(models.ApiEndpoint.id).filter(models.ApiEndpoint.id == endpoint_id).first():
+        raise HTTPException(status_code=404, detail="接口不存在")
+    flows = flows_using_endpoint(db, endpoint_id)
+    tasks = tasks_using_endpoint(db, endpoint_id, [flow["id"] for flow in flows])
+    return {"endpoint_id": endpoint_id, "flows": flows, "tasks": tasks}
+
 @app.put("/api/api-endpoints/{endpoint_id}/favorite")
 def toggle_favorite_endpoint(
     endpoint_id: int, 
     is_favorite: bool = Query(...), 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """收藏/取消收藏接口"""
     endpoint = db.query(models.ApiEndpoint).options(
-        joinedload(models.ApiEndpoint.project).joinedload(models.Project.members)
+        joinedload(models.ApiEndpoint.project)
     ).filter(models.ApiEndpoint.id == endpoint_id).first()
     if not endpoint:
         raise HTTPException(status_code=404, detail="接口不存在")
     
     # 检查权限：只有项目成员可以收藏接口
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, endpoint.project, "收藏接口")
+    access.require_member(endpoint.project_id, "收藏接口")
     
     endpoint.is_favorite = is_favorite
     db.commit()
@@ -5188,21 +5165,19 @@ def get_api_test_data(test_data_id: int, db: Session = Depends(get_db)):
 def create_api_test_data(
     test_data: schemas.ApiTestDataCreate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """创建测试数据"""
-    # 获取接口并加载项目成员信息
+    # 获取接口
     endpoint = db.query(models.ApiEndpoint).options(
-        joinedload(models.ApiEndpoint.project).joinedload(models.Project.members)
+        joinedload(models.ApiEndpoint.project)
     ).filter(models.ApiEndpoint.id == test_data.endpoint_id).first()
     if not endpoint:
         raise HTTPException(status_code=404, detail="接口不存在")
     
     # 检查权限：只有项目成员可以创建测试数据
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, endpoint.project, "创建测试数据")
+    access.require_member(endpoint.project_id, "创建测试数据")
     
     db_test_data = models.ApiTestData(**test_data.model_dump())
     db.add(db_test_data)
@@ -5215,20 +5190,18 @@ def update_api_test_data(
     test_data_id: int, 
     test_data: schemas.ApiTestDataUpdate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """更新测试数据"""
     db_test_data = db.query(models.ApiTestData).options(
-        joinedload(models.ApiTestData.endpoint).joinedload(models.ApiEndpoint.project).joinedload(models.Project.members)
+        joinedload(models.ApiTestData.endpoint).joinedload(models.ApiEndpoint.project)
     ).filter(models.ApiTestData.id == test_data_id).first()
     if not db_test_data:
         raise HTTPException(status_code=404, detail="测试数据不存在")
     
     # 检查权限：只有项目成员可以更新测试数据
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_test_data.endpoint.project, "更新测试数据")
+    access.require_member(db_test_data.endpoint.project_id, "更新测试数据")
     
     for key, value in test_data.model_dump(exclude_unset=True).items():
         setattr(db_test_data, key, value)
@@ -5241,20 +5214,18 @@ def update_api_test_data(
 def delete_api_test_data(
     test_data_id: int, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """删除测试数据"""
     test_data = db.query(models.ApiTestData).options(
-        joinedload(models.ApiTestData.endpoint).joinedload(models.ApiEndpoint.project).joinedload(models.Project.members)
+        joinedload(models.ApiTestData.endpoint).joinedload(models.ApiEndpoint.project)
     ).filter(models.ApiTestData.id == test_data_id).first()
     if not test_data:
         raise HTTPException(status_code=404, detail="测试数据不存在")
     
     # 检查权限：只有项目成员可以删除测试数据
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, test_data.endpoint.project, "删除测试数据")
+    access.require_member(test_data.endpoint.project_id, "删除测试数据")
     
     db.delete(test_data)
     db.commit()
@@ -5267,24 +5238,32 @@ def execute_api_endpoint(
     endpoint_id: int, 
     request: schemas.ApiExecuteRequest, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """执行接口（debug 为 true 时调试信息记录到执行记录的 debug_log 中，不输出到标准输出）"""
+    with exec_log.capture_debug(request.debug) as debug_log:
+        return _execute_api_endpoint(endpoint_id, request, db, access, debug_log)
+
+
+def _execute_api_endpoint(
+    endpoint_id: int,
+    request: schemas.ApiExecuteRequest,
+    db: Session,
+    access: ProjectAccess,
+    debug_log: Optional[List[Dict[str, Any]]]
 ):
-    """执行接口"""
-    import requests
     import time
     
-    # 获取接口并加载项目成员信息
+    # 获取接口
     endpoint = db.query(models.ApiEndpoint).options(
-        joinedload(models.ApiEndpoint.project).joinedload(models.Project.members)
+        joinedload(models.ApiEndpoint.project)
     ).filter(models.ApiEndpoint.id == endpoint_id).first()
     if not endpoint:
         raise HTTPException(status_code=404, detail="接口不存在")
     
     # 检查权限：只有项目成员可以执行接口
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, endpoint.project, "执行接口")
+    access.require_member(endpoint.project_id, "执行接口")
     
     # 获取环境
     environment = db.query(models.ApiEnvironment).filter(models.ApiEnvironment.id == request.environment_id).first()
@@ -5300,9 +5279,6 @@ def execute_api_endpoint(
     context: Dict[str, Any] = {}
     if request.global_variables:
         context.update(request.global_variables)
-        print(f"🔍 执行单个接口 - 从请求加载变量: {request.global_variables}")
-    else:
-        print(f"🔍 执行单个接口 - 请求中没有 global_variables")
     
     # 构建请求URL
     base_url = environment.base_url.rstrip('/')
@@ -5326,16 +5302,15 @@ def execute_api_endpoint(
         # 环境配置的 headers 也需要渲染
         env_headers = _render_template(environment.headers, context)
         headers.update(env_headers)
-        print(f"🔍 环境配置 Headers (渲染后): {env_headers}")
+        exec_log.debug("api.headers.environment", lambda: {"headers": env_headers})
     if test_data and test_data.headers:
         test_headers = _render_template(test_data.headers, context)
         headers.update(test_headers)
-        print(f"🔍 测试数据 Headers (渲染后): {test_headers}")
+        exec_log.debug("api.headers.test_data", lambda: {"headers": test_headers})
     if request.headers:
-        print(f"🔍 请求 Headers (渲染前): {request.headers}")
         request_headers = _render_template(request.headers, context)
         headers.update(request_headers)
-        print(f"🔍 请求 Headers (渲染后): {request_headers}")
+        exec_log.debug("api.headers.request", lambda: {"template": request.headers, "headers": request_headers})
     
     # 构建查询参数（支持变量替换）
     query_params = {}
@@ -5354,20 +5329,27 @@ def execute_api_endpoint(
         body = _render_template(request.body, context)
     
     # 调试日志：输出最终的 headers 和 context
-    print(f"🔍 执行单个接口 - 最终变量上下文: {context}")
-    print(f"🔍 执行单个接口 - 最终 Headers: {headers}")
+    exec_log.debug("api.request", lambda: {
+        "endpoint_id": endpoint_id,
+        "url": full_url,
+        "context": context,
+        "headers": headers,
+        "query_params": query_params,
+        "body": body,
+    })
     
     # 执行请求
-    start_time = time.time()
+    start_time = time.perf_counter()
     success = False
     response_status = None
     response_headers = None
     response_body = None
     error_message = None
+    timings = None
     
     try:
         if query_params:
-            response = requests.request(
+            response = http_clients.fetch(
                 method=endpoint.method.upper(),
                 url=full_url,
                 headers=headers,
@@ -5376,7 +5358,7 @@ def execute_api_endpoint(
                 timeout=30
             )
         else:
-            response = requests.request(
+            response = http_clients.fetch(
                 method=endpoint.method.upper(),
                 url=full_url,
                 headers=headers,
@@ -5384,92 +5366,28 @@ def execute_api_endpoint(
                 timeout=30
             )
         
-        response_time = int((time.time() - start_time) * 1000)
+        response_time = int((time.perf_counter() - start_time) * 1000)
+        timings = timings_of(response)
         response_status = response.status_code
         response_headers = dict(response.headers)
         
-        # 尝试解析响应体
-        try:
-            response_body = response.text
-            if len(response_body) > 10000:  # 限制响应体长度
-                response_body = response_body[:10000] + "... (truncated)"
-        except:
-            response_body = str(response.content)
-        
-        # 解析响应体为JSON（用于断言验证）
-        json_body = None
-        try:
-            json_body = response.json()
-        except:
-            json_body = None
+        # 记录中只保存响应体预览（RESPONSE_PREVIEW_MAX_CHARS）
+        response_body = response.preview()
         
         # 获取断言列表（优先使用请求中的断言，否则使用测试数据中的断言）
         assertions_list = request.assertions if request.assertions else (test_data.assertions if test_data and test_data.assertions else [])
         
-        # 验证断言
+        # 验证断言（JSON 路径断言的期望值使用 request.global_variables 渲染）
         success = True
         assertion_errors = []
         
         if assertions_list:
-            for assertion in assertions_list:
-                assertion_type = assertion.get('type')
-                operator = assertion.get('operator')
-                target = assertion.get('target')
-                expected = assertion.get('expected')
-                
-                if assertion_type == 'status_code':
-                    # 状态码断言
-                    actual_value = response_status
-                    if not _check_assertion(actual_value, operator, expected):
-                        success = False
-                        assertion_errors.append(f"状态码断言失败: 期望 {expected}，实际 {actual_value}")
-                
-                elif assertion_type == 'json_path':
-                    # JSON路径断言
-                    if json_body and target:
-                        # 先渲染 expected 值（处理变量替换，如 STR($CreateValue)）
-                        if expected:
-                            try:
-                                # 对于单个接口执行，使用 request.global_variables 作为 context
-                                exec_context = {}
-                                if request.global_variables:
-                                    exec_context.update(request.global_variables)
-                                expected_rendered = _render_template(expected, exec_context)
-                                # 如果渲染后是字符串且以引号开头结尾，去掉引号
-                                if isinstance(expected_rendered, str) and expected_rendered.startswith('"') and expected_rendered.endswith('"'):
-                                    expected_rendered = expected_rendered[1:-1]
-                                expected = expected_rendered
-                            except Exception as e:
-                                print(f"🔍 渲染 expected 值失败: {e}")
-                        
-                        actual_value = _extract_json_path(json_body, target)
-                        print(f"🔍 JSON路径断言: path={target}, expected={expected}, actual={actual_value}")
-                        
-                        if not _check_assertion(actual_value, operator, expected):
-                            success = False
-                            assertion_errors.append(f"JSON路径断言失败: {target} 期望 {expected}，实际 {_format_value_for_display(actual_value)}")
-                    else:
-                        success = False
-                        assertion_errors.append(f"JSON路径断言失败: 无法提取路径 {target}")
-                
-                elif assertion_type == 'response_time':
-                    # 响应时间断言
-                    actual_value = response_time
-                    if not _check_assertion(actual_value, operator, expected):
-                        success = False
-                        assertion_errors.append(f"响应时间断言失败: 期望 {expected}ms，实际 {actual_value}ms")
-                
-                elif assertion_type == 'contains':
-                    # 包含断言
-                    if json_body:
-                        body_str = json.dumps(json_body) if isinstance(json_body, dict) else str(json_body)
-                        if expected and expected not in body_str:
-                            success = False
-                            assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
-                    else:
-                        if expected and expected not in str(response_body):
-                            success = False
-                            assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
+            assertion_errors = evaluate_assertions(
+                compile_assertions(assertions_list), response, response_time,
+                context=dict(request.global_variables or {}), endpoint=endpoint
+            )
+            if assertion_errors:
+                success = False
         else:
             # 如果没有断言，使用默认逻辑：状态码在200-299之间
             success = 200 <= response_status < 300
@@ -5487,394 +5405,45 @@ def execute_api_endpoint(
             error_message = "\n".join(assertion_errors)
     
     except Exception as e:
-        response_time = int((time.time() - start_time) * 1000)
+        response_time = int((time.perf_counter() - start_time) * 1000)
+        timings = timings_of(e)
         error_message = str(e)
         success = False
     
-    # 保存执行记录
+    # 保存执行记录（请求头/请求体/响应头/响应体/调试日志去重压缩后存入 content_blobs）
+    payload = {
+        "request_headers": headers,
+        "request_body": body,
+        "response_headers": response_headers,
+        "response_body": response_body,
+        "debug_log": debug_log,
+    }
+    blob_refs = blob_store.offload(db, payload)
     record = models.ApiExecutionRecord(
         endpoint_id=endpoint_id,
         test_data_id=request.test_data_id,
         environment_id=request.environment_id,
         request_url=full_url,
         request_method=endpoint.method.upper(),
-        request_headers=headers,
         request_query_params=query_params if query_params else None,
         request_path_params=path_params if path_params else None,
-        request_body=body,
         response_status=response_status,
-        response_headers=response_headers,
-        response_body=response_body,
         response_time=response_time,
+        timings=timings,
         success=success,
-        error_message=error_message
+        error_message=error_message,
+        blob_refs=blob_refs or None,
+        **payload
     )
     db.add(record)
     db.commit()
     db.refresh(record)
+    blob_store.hydrate(db, [record])
     
     return record
 
 
-# ==================== 辅助函数 ====================
-def _extract_json_path(data: Any, path: str) -> Any:
-    """从JSON数据中提取路径值（支持简单的点号分隔路径和数组索引，如 data.code 或 data.list[0].name）"""
-    if not path or not data:
-        return None
-    
-    try:
-        # 处理路径，支持数组索引，如 data.list[0].name
-        # 将路径分割，但保留数组索引部分
-        import re
-        # 使用正则表达式分割路径，保留数组索引
-        parts = re.split(r'\.(?!\d)', path)  # 按点分割，但不分割数字后的点
-        
-        value = data
-        for part in parts:
-            if not part:
-                continue
-            
-            # 检查是否包含数组索引，如 list[0]
-            if '[' in part and ']' in part:
-                # 提取键名和索引
-                key_match = re.match(r'^([^\[]+)\[(\d+)\]$', part)
-                if key_match:
-                    key_name = key_match.group(1)
-                    index = int(key_match.group(2))
-                    
-                    # 从字典中获取列表
-                    if isinstance(value, dict) and key_name in value:
-                        value = value[key_name]
-                        # 从列表中获取指定索引的元素
-                        if isinstance(value, list) and 0 <= index < len(value):
-                            value = value[index]
-                        else:
-                            return None
-                    else:
-                        return None
-                else:
-                    return None
-            else:
-                # 普通键访问
-                if isinstance(value, dict) and part in value:
-                    value = value[part]
-                elif isinstance(value, list) and len(value) > 0:
-                    # 如果是列表，尝试访问第一个元素
-                    value = value[0]
-                    if isinstance(value, dict) and part in value:
-                        value = value[part]
-                    else:
-                        return None
-                else:
-                    return None
-        
-        return value
-    except Exception as e:
-        print(f"🔍 _extract_json_path 错误: path={path}, error={e}")
-        return None
-
-def _format_value_for_display(value: Any) -> str:
-    """格式化值用于显示，将 None 显示为 null（与 JSON 保持一致）"""
-    if value is None:
-        return 'null'
-    return str(value)
-
-def _check_assertion(actual: Any, operator: str, expected: Any) -> bool:
-    """检查断言是否通过 - 直接比较值，不做额外转换"""
-    # 如果expected为None或空字符串，返回False
-    if expected is None or expected == '':
-        return False
-    
-    # 处理用户输入 "null" 字符串的情况：JSON 中的 null 在 Python 中被解析为 None
-    # 如果用户输入字符串 "null"（不区分大小写），将其转换为 None 进行比较
-    if isinstance(expected, str):
-        expected_trimmed = expected.strip()
-        if expected_trimmed.lower() == 'null':
-            expected = None
-        # 处理 JSON 字符串的情况：如果 expected 是 JSON 字符串（如 "[]", "{}", "[1,2,3]" 等），尝试解析
-        elif expected_trimmed.startswith('[') or expected_trimmed.startswith('{'):
-            try:
-                import json
-                expected_parsed = json.loads(expected_trimmed)
-                expected = expected_parsed
-            except (json.JSONDecodeError, ValueError):
-                # 解析失败，保持原值
-                pass
-    
-    # 对于数值比较，尝试转换为相同类型
-    # 如果一个是数字，另一个是字符串形式的数字，转换为数字比较
-    if operator in ('eq', 'ne'):
-        # 尝试将字符串转换为数字进行比较
-        try:
-            if isinstance(actual, (int, float)) and isinstance(expected, str):
-                # actual 是数字，expected 是字符串，尝试转换 expected
-                if '.' in expected:
-                    expected_num = float(expected)
-                else:
-                    expected_num = int(expected)
-                if operator == 'eq':
-                    return actual == expected_num
-                else:
-                    return actual != expected_num
-            elif isinstance(expected, (int, float)) and isinstance(actual, str):
-                # expected 是数字，actual 是字符串，尝试转换 actual
-                if '.' in actual:
-                    actual_num = float(actual)
-                else:
-                    actual_num = int(actual)
-                if operator == 'eq':
-                    return actual_num == expected
-                else:
-                    return actual_num != expected
-        except (ValueError, TypeError):
-            # 转换失败，使用原始值比较
-            pass
-    
-    # 直接比较值，使用 Python 的 == 操作符
-    if operator == 'eq':
-        return actual == expected
-    elif operator == 'ne':
-        return actual != expected
-    elif operator == 'gt':
-        try:
-            return float(actual) > float(expected)
-        except:
-            return False
-    elif operator == 'gte':
-        try:
-            return float(actual) >= float(expected)
-        except:
-            return False
-    elif operator == 'lt':
-        try:
-            return float(actual) < float(expected)
-        except:
-            return False
-    elif operator == 'lte':
-        try:
-            return float(actual) <= float(expected)
-        except:
-            return False
-    elif operator == 'contains':
-        return str(expected) in str(actual)
-    elif operator == 'not_contains':
-        return str(expected) not in str(actual)
-    else:
-        return False
-
 # ==================== 接口流程测试 ====================
-def _render_template(value: Any, context: Dict[str, Any]) -> Any:
-    """使用 $ 关键字语法渲染数据，支持 $API[N].path 和 $var 语法，同时兼容 {{ var }} 语法
-    支持 NUM() 和 STR() 格式：
-    - NUM($API[N].path) 或 NUM($var) - 返回数字值（不加引号）
-    - STR($API[N].path) 或 STR($var) - 返回字符串值（自动添加引号）
-    """
-    if isinstance(value, str):
-        def extract_and_format(expr: str):
-            """提取值并返回 (值, 是否找到)"""
-            extracted_value = None
-            found = False
-            
-            # 支持 $API[N].path 语法，例如 $API[2].code 或 $API[2].data.code
-            api_match = re.match(r'\$?API\[(\d+)\]\.(.+)', expr)
-            if api_match:
-                api_index = int(api_match.group(1))
-                path = api_match.group(2)
-                # 从 context 中获取 API[N] 对象
-                api_key = f"API[{api_index}]"
-                api_data = context.get(api_key)
-                if api_data is not None:
-                    # 从 api_data 中提取路径值
-                    extracted_value = _extract_value(api_data, path)
-                    found = extracted_value is not None
-            # 支持 $var 语法（局部变量或全局变量）
-            elif expr.startswith('$'):
-                var_name = expr[1:].strip()
-                extracted_value = context.get(var_name)
-                found = extracted_value is not None
-            else:
-                # 传统方式：直接使用变量名（兼容旧语法）
-                extracted_value = context.get(expr)
-                found = extracted_value is not None
-            
-            return extracted_value, found
-        
-        def format_value(val: Any, return_string: bool = False):
-            """根据值的类型格式化输出
-            return_string: 如果为 True，返回带引号的字符串（用于 JSON 字符串替换）；如果为 False，返回原始值（用于字典/列表）
-            """
-            if return_string:
-                # 返回字符串格式（用于在 JSON 字符串中替换）
-                if val is None:
-                    return 'null'
-                # 如果是数字、布尔值，直接转换为字符串（不需要引号）
-                if isinstance(val, (int, float, bool)):
-                    return str(val)
-                # 如果是字符串，需要加引号（但需要转义内部的双引号和反斜杠）
-                elif isinstance(val, str):
-                    # 转义字符串中的双引号和反斜杠
-                    escaped = val.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r')
-                    return f'"{escaped}"'
-                # 如果是对象或数组，序列化为 JSON 字符串
-                else:
-                    import json
-                    json_str = json.dumps(val, ensure_ascii=False)
-                    return json_str
-            else:
-                # 返回原始值（用于字典/列表）
-                return val
-        
-        # 处理 NUM() 和 STR() 格式（优先级最高）
-        def repl_num_api(match: re.Match) -> str:
-            """处理 NUM($API[N].path) 格式，返回数字值（不加引号）"""
-            api_index = int(match.group(1))
-            path = match.group(2)
-            api_key = f"API[{api_index}]"
-            api_data = context.get(api_key)
-            if api_data is not None:
-                extracted_value = _extract_value(api_data, path)
-                if extracted_value is not None:
-                    try:
-                        if isinstance(extracted_value, bool):
-                            num_value = 1 if extracted_value else 0
-                        elif isinstance(extracted_value, (int, float)):
-                            num_value = extracted_value
-                        else:
-                            num_value = float(extracted_value)
-                        return str(int(num_value) if isinstance(num_value, float) and num_value.is_integer() else num_value)
-                    except (ValueError, TypeError):
-                        return '0'
-            return '0'
-        
-        def repl_num_var(match: re.Match) -> str:
-            """处理 NUM($var) 格式，返回数字值（不加引号）"""
-            var_name = match.group(1)
-            extracted_value = context.get(var_name)
-            if extracted_value is not None:
-                try:
-                    if isinstance(extracted_value, bool):
-                        num_value = 1 if extracted_value else 0
-                    elif isinstance(extracted_value, (int, float)):
-                        num_value = extracted_value
-                    else:
-                        num_value = float(extracted_value)
-                    return str(int(num_value) if isinstance(num_value, float) and num_value.is_integer() else num_value)
-                except (ValueError, TypeError):
-                    return '0'
-            return '0'
-        
-        def repl_str_api(match: re.Match) -> str:
-            """处理 STR($API[N].path) 格式，返回字符串值（自动添加引号）"""
-            api_index = int(match.group(1))
-            path = match.group(2)
-            api_key = f"API[{api_index}]"
-            api_data = context.get(api_key)
-            if api_data is not None:
-                extracted_value = _extract_value(api_data, path)
-                if extracted_value is not None:
-                    import json
-                    return json.dumps(str(extracted_value))
-            return '""'
-        
-        def repl_str_var(match: re.Match) -> str:
-            """处理 STR($var) 格式，返回字符串值（自动添加引号）"""
-            var_name = match.group(1)
-            extracted_value = context.get(var_name)
-            if extracted_value is not None:
-                import json
-                return json.dumps(str(extracted_value))
-            return '""'
-        
-        # 先处理 NUM($API[N].path) 和 NUM($var) 格式
-        value = re.sub(r'NUM\(\$?API\[(\d+)\]\.([a-zA-Z0-9_.]+)\)', repl_num_api, value)
-        value = re.sub(r'NUM\(\$([a-zA-Z_][a-zA-Z0-9_]*)\)', repl_num_var, value)
-        
-        # 再处理 STR($API[N].path) 和 STR($var) 格式
-        value = re.sub(r'STR\(\$?API\[(\d+)\]\.([a-zA-Z0-9_.]+)\)', repl_str_api, value)
-        value = re.sub(r'STR\(\$([a-zA-Z_][a-zA-Z0-9_]*)\)', repl_str_var, value)
-        
-        # 处理 $API[N].path 语法（不在引号内）
-        def repl_api(match: re.Match) -> str:
-            full_expr = match.group(0)  # 例如 $API[1].data
-            expr = full_expr.lstrip('$')  # 移除开头的 $
-            extracted_value, found = extract_and_format(expr)
-            if found:
-                return format_value(extracted_value, return_string=True)
-            return full_expr  # 如果找不到，返回原始表达式
-        
-        # 处理 $var 语法（变量名）
-        def repl_var(match: re.Match) -> str:
-            full_expr = match.group(0)  # 例如 $Tenant
-            var_name = match.group(1)  # 例如 Tenant
-            extracted_value = context.get(var_name)
-            if extracted_value is not None:
-                return format_value(extracted_value, return_string=True)
-            return full_expr  # 如果找不到，返回原始表达式
-        
-        # 先处理 $API[N].path 语法（更具体的模式优先）
-        # 匹配 $API[数字].路径，路径可以包含字母、数字、点、下划线
-        value = re.sub(r'\$API\[(\d+)\]\.([a-zA-Z0-9_.]+)', repl_api, value)
-        
-        # 再处理 $变量名 语法（但不能是 $API[ 开头，因为已经处理过了）
-        # 匹配 $ 后跟变量名（字母、数字、下划线），但不能是 API[ 开头
-        value = re.sub(r'\$([a-zA-Z_][a-zA-Z0-9_]*)(?![\[\.])', repl_var, value)
-        
-        # 兼容旧的 {{ var }} 语法
-        def repl_old(match: re.Match) -> str:
-            expr = match.group(1).strip()
-            extracted_value, found = extract_and_format(expr)
-            if found:
-                return format_value(extracted_value, return_string=True)
-            return match.group(0)  # 如果找不到，返回原始占位符
-        value = re.sub(r"\{\{\s*([^{}]+)\s*\}\}", repl_old, value)
-        
-        return value
-    if isinstance(value, dict):
-        # 对于字典，递归处理每个值
-        result = {}
-        for k, v in value.items():
-            # 如果值是字符串且包含模板语法
-            if isinstance(v, str) and ('$' in v or '{{' in v or 'NUM(' in v or 'STR(' in v):
-                # 进行模板渲染
-                rendered = _render_template(v, context)
-                # 如果渲染结果是字符串且是带引号的 JSON 字符串，解析它
-                if isinstance(rendered, str) and len(rendered) >= 2 and rendered.startswith('"') and rendered.endswith('"'):
-                    import json
-                    try:
-                        # 解析 JSON 字符串，去掉外层引号，得到实际值
-                        result[k] = json.loads(rendered)
-                    except:
-                        # 解析失败，保持原样
-                        result[k] = rendered
-                else:
-                    # 不是带引号的 JSON 字符串，直接使用（可能是数字、布尔值等）
-                    result[k] = rendered
-            else:
-                # 递归处理
-                result[k] = _render_template(v, context)
-        return result
-    if isinstance(value, list):
-        return [_render_template(item, context) for item in value]
-    return value
-
-
-def _extract_value(data: Any, path: str) -> Any:
-    """按照点路径提取值，支持列表下标"""
-    current = data
-    for part in path.split('.'):
-        if isinstance(current, dict):
-            current = current.get(part)
-        elif isinstance(current, list):
-            try:
-                idx = int(part)
-                current = current[idx]
-            except (ValueError, IndexError):
-                return None
-        else:
-            return None
-    return current
-
-
 @app.get("/api/api-flows")
 def list_api_flows(
     project_id: Optional[int] = Query(None),
@@ -5917,20 +5486,18 @@ def toggle_favorite_flow(
     flow_id: int, 
     is_favorite: bool = Query(...), 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """收藏/取消收藏流程"""
     flow = db.query(models.ApiTestFlow).options(
-        joinedload(models.ApiTestFlow.project).joinedload(models.Project.members)
+        joinedload(models.ApiTestFlow.project)
     ).filter(models.ApiTestFlow.id == flow_id).first()
     if not flow:
         raise HTTPException(status_code=404, detail="流程不存在")
     
     # 检查权限：只有项目成员可以收藏流程
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, flow.project, "收藏流程")
+    access.require_member(flow.project_id, "收藏流程")
     
     flow.is_favorite = is_favorite
     db.commit()
@@ -5942,20 +5509,16 @@ def toggle_favorite_flow(
 def create_api_flow(
     flow: schemas.ApiTestFlowCreate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
-    # 校验项目存在并加载成员信息
-    project = db.query(models.Project).options(
-        joinedload(models.Project.members)
-    ).filter(models.Project.id == flow.project_id).first()
+    # 校验项目存在
+    project = db.query(models.Project).filter(models.Project.id == flow.project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
     # 检查权限：只有项目成员可以创建流程
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, project, "创建流程")
+    access.require_member(project.id, "创建流程")
     
     # 检查同一项目下流程名称是否已存在
     existing_flow = db.query(models.ApiTestFlow).filter(
@@ -5967,6 +5530,8 @@ def create_api_flow(
     
     db_flow = models.ApiTestFlow(**flow.model_dump())
     db.add(db_flow)
+    db.flush()
+    sync_flow_index(db, db_flow.id, db_flow.steps)
     db.commit()
     db.refresh(db_flow)
     # 重新加载以包含关联的项目信息
@@ -5982,19 +5547,17 @@ def update_api_flow(
     flow_id: int, 
     flow: schemas.ApiTestFlowUpdate, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     db_flow = db.query(models.ApiTestFlow).options(
-        joinedload(models.ApiTestFlow.project).joinedload(models.Project.members)
+        joinedload(models.ApiTestFlow.project)
     ).filter(models.ApiTestFlow.id == flow_id).first()
     if not db_flow:
         raise HTTPException(status_code=404, detail="流程不存在")
     
     # 检查权限：只有项目成员可以更新流程
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_flow.project, "更新流程")
+    access.require_member(db_flow.project_id, "更新流程")
     update_data = flow.model_dump(exclude_unset=True)
     
     # 特别处理 steps：确保即使为空列表或包含空对象的步骤也能被保存
@@ -6060,6 +5623,8 @@ def update_api_flow(
     
     for key, value in update_data.items():
         setattr(db_flow, key, value)
+    if 'steps' in update_data:
+        sync_flow_index(db, flow_id, update_data['steps'])
     
     # 调试：确认保存前的数据
     print(f"DEBUG: 保存前 db_flow.steps 类型: {type(db_flow.steps)}, 长度: {len(db_flow.steps) if db_flow.steps else 0}")
@@ -6084,31 +5649,28 @@ def update_api_flow(
 def delete_api_flow(
     flow_id: int, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     db_flow = db.query(models.ApiTestFlow).options(
-        joinedload(models.ApiTestFlow.project).joinedload(models.Project.members)
+        joinedload(models.ApiTestFlow.project)
     ).filter(models.ApiTestFlow.id == flow_id).first()
     if not db_flow:
         raise HTTPException(status_code=404, detail="流程不存在")
     
     # 检查权限：只有项目成员可以删除流程
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, db_flow.project, "删除流程")
+    access.require_member(db_flow.project_id, "删除流程")
     
     # 检查依赖：是否有测试任务使用该流程
-    task_items = db.query(models.TestTaskItem).filter(
-        models.TestTaskItem.item_type == 'flow',
-        models.TestTaskItem.item_id == flow_id
-    ).all()
-    if task_items:
-        task_names = []
-        for item in task_items:
-            task = db.query(models.TestTask).filter(models.TestTask.id == item.task_id).first()
-            if task:
-                task_names.append(task.name)
+    task_names = [
+        name for (name,) in db.query(models.TestTask.name).join(
+            models.TestTaskItem, models.TestTaskItem.task_id == models.TestTask.id
+        ).filter(
+            models.TestTaskItem.item_type == 'flow',
+            models.TestTaskItem.item_id == flow_id
+        ).order_by(models.TestTask.id)
+    ]
+    if task_names:
         raise HTTPException(
             status_code=400,
             detail=f"无法删除流程：该流程正在被测试任务使用（{', '.join(task_names)}），请先从测试任务中移除该流程"
@@ -6226,343 +5788,439 @@ def delete_flow_variable(flow_id: int, variable_id: int, db: Session = Depends(g
 def execute_api_flow(
     flow_id: int,
     request: schemas.FlowExecuteRequest,
+    mode: str = Query("sync"),
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
-    # 使用 joinedload 确保加载 variables 和 project.members 关联
+    """
+    执行流程
+
+    mode=sync（默认）时执行完成后返回结果；mode=async 时放入执行队列，立即返回 run_id（202），
+    通过 /api/flow-runs/{run_id}、/stream、/result 查询状态、订阅进度和获取结果（见 flow_runs）
+    """
+    if mode not in ("sync", "async"):
+        raise HTTPException(status_code=400, detail="mode 只能为 sync 或 async")
+
+    # 使用 joinedload 确保加载 variables 和 project 关联
     flow = db.query(models.ApiTestFlow).options(
         joinedload(models.ApiTestFlow.variables),
-        joinedload(models.ApiTestFlow.project).joinedload(models.Project.members)
+        joinedload(models.ApiTestFlow.project)
     ).filter(models.ApiTestFlow.id == flow_id).first()
     if not flow:
         raise HTTPException(status_code=404, detail="流程不存在")
     
     # 检查权限：只有项目成员可以执行流程
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, flow.project, "执行流程")
+    access.require_member(flow.project_id, "执行流程")
+
+    # debug 为 true 时本次执行的调试信息随结果返回（debug_log），不输出到标准输出
+    with exec_log.capture_debug(request.debug) as debug_log:
+        context = build_flow_context(flow, request.global_variables)
+        fail_action = resolve_fail_action(request.failAction)
+
+        # 获取步骤间延迟时间（毫秒）
+        step_delay = request.delay or 0
+
+        # 重要：每个步骤的参数和执行都是完全独立的
+        # 即使多个步骤使用相同的接口（endpoint_id），每个步骤也有自己独立的参数
+        # 参数保存在 flow.steps 数组中，通过索引（idx）访问，确保独立性
+        # 过滤掉被禁用的步骤（enabled为False的步骤）
+        enabled_steps = [step for step in (flow.steps or []) if step.get("enabled") is not False]
+        # 一次性加载并校验所有步骤的接口、环境和测试数据，引用缺失时不会发出任何请求
+        environment_id = request.environment_id or flow.environment_id
+        step_plans = compile_flow_plan(db, enabled_steps, environment_id)
+        if mode == "async":
+            detach_flow_plan(db, step_plans)
+            run = models.FlowRun(
+                project_id=flow.project_id,
+                flow_id=flow.id,
+                environment_id=environment_id,
+                status="queued",
+                total_steps=len(step_plans),
+                created_by=current_user.id,
+                worker_id=flow_runs.worker_id,
+                heartbeat_at=datetime.now()
+            )
+            db.add(run)
+            db.commit()
+            # 调试日志在执行过程中继续追加，结束时写入 flow_runs.debug_log
+            flow_runs.start(
+                run.id, step_plans, context, fail_action=fail_action, step_delay=step_delay,
+                step_concurrency=request.step_concurrency, debug_log=debug_log
+            )
+            return JSONResponse(status_code=202, content={"run_id": run.id, "status": "queued"})
+        result = run_flow(
+            step_plans, context, fail_action=fail_action, step_delay=step_delay, concurrency=request.step_concurrency
+        )
+    if debug_log is not None:
+        result["debug_log"] = debug_log
+    return result
 
-    # 初始化上下文，优先加载流程变量
-    context: Dict[str, Any] = {}
-    # 从流程变量表加载（确保触发加载）
-    # 先访问 flow.variables 以确保 joinedload 生效
-    variables_list = list(flow.variables) if flow.variables else []
-    print(f"🔍 流程变量数量: {len(variables_list)}")
-    for var in variables_list:
-        context[var.key] = var.value
-        print(f"🔍 加载变量: {var.key} = {var.value}")
-    # 兼容旧的global_variables字段
-    if flow.global_variables:
-        # 确保 global_variables 是字典类型
-        if isinstance(flow.global_variables, dict):
-            context.update(flow.global_variables)
-        elif isinstance(flow.global_variables, str):
-            # 如果是字符串，尝试解析为JSON
-            try:
-                import json
-                parsed_vars = json.loads(flow.global_variables)
-                if isinstance(parsed_vars, dict):
-                    context.update(parsed_vars)
-            except:
-                pass
-        print(f"🔍 从global_variables加载: {flow.global_variables}")
-        print(f"🔍 加载后的context: {context}")
-    # 请求中的变量会覆盖流程变量
-    if request.global_variables:
-        context.update(request.global_variables)
-        print(f"🔍 从请求加载变量: {request.global_variables}")
-    
-    # 调试日志：输出变量上下文
-    print(f"🔍 最终变量上下文: {context}")
 
-    results = []
-    overall_success = True
-    
-    # 获取执行配置中的 failAction，优先使用请求中的，否则使用流程保存的，默认为 'stop'
-    fail_action = request.failAction
-    if not fail_action and flow.executionConfig:
-        fail_action = flow.executionConfig.get("failAction", "stop")
-    if not fail_action:
-        fail_action = "stop"
-    
-    # 获取步骤间延迟时间（毫秒）
-    step_delay = request.delay or 0
-    if step_delay > 0:
-        print(f"🔍 步骤间延迟设置为: {step_delay}ms")
+def _get_flow_run(db: Session, run_id: int, access: ProjectAccess) -> models.FlowRun:
+    run = db.query(models.FlowRun).filter(models.FlowRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="流程执行记录不存在")
+    access.require_member(run.project_id, "查看流程执行记录")
+    return run
+
+
+@app.get("/api/api-flows/{flow_id}/runs", response_model=List[schemas.FlowRun])
+def list_flow_runs(
+    flow_id: int,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """获取流程的异步执行记录（按时间倒序）"""
+    flow = db.query(models.ApiTestFlow.project_id).filter(models.ApiTestFlow.id == flow_id).first()
+    if not flow:
+        raise HTTPException(status_code=404, detail="流程不存在")
+    access.require_member(flow.project_id, "查看流程执行记录")
+    return db.query(models.FlowRun).filter(
+        models.FlowRun.flow_id == flow_id
+    ).order_by(models.FlowRun.id.desc()).limit(limit).all()
+
+
+@app.get("/api/flow-runs/{run_id}", response_model=schemas.FlowRun)
+def get_flow_run(
+    run_id: int,
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """获取流程异步执行的状态和步骤计数"""
+    return _get_flow_run(db, run_id, access)
+
+
+@app.get("/api/flow-runs/{run_id}/result")
+def get_flow_run_result(
+    run_id: int,
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """
+    获取流程异步执行的结果（与同步执行的返回值相同，另含 run_id / status / error_message），执行结束前返回 409
+
+    数据驱动执行返回汇总报告和失败行的完整步骤结果（failed_rows），所有行的结果通过 /rows 分页查询
+    """
+    run = _get_flow_run(db, run_id, access)
+    if run.status in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="流程仍在执行中，请稍后获取结果")
+    if run.run_type == "dataset":
+        failed_rows = db.query(models.FlowRunRow).filter(
+            models.FlowRunRow.run_id == run_id,
+            models.FlowRunRow.success == False,
+            models.FlowRunRow.results.isnot(None)
+        ).order_by(models.FlowRunRow.row_index).limit(DATASET_MAX_FAILED_DETAILS).all()
+        return {
+            **(run.report or {}),
+            "run_id": run.id,
+            "status": run.status,
+            "success": run.status == "success",
+            "failed_rows": [row_result(row) for row in failed_rows],
+            "error_message": run.error_message,
+        }
+    rows = db.query(models.FlowRunStep).filter(
+        models.FlowRunStep.run_id == run_id
+    ).order_by(models.FlowRunStep.step_index).all()
+    result = {
+        "run_id": run.id,
+        "status": run.status,
+        "success": run.status == "success",
+        "results": load_run_steps(db, rows),
+        "context": run.context,
+        "error_message": run.error_message,
+    }
+    if run.debug_log is not None:
+        result["debug_log"] = run.debug_log
+    return result
+
+
+@app.get("/api/flow-runs/{run_id}/rows")
+def list_flow_run_rows(
+    run_id: int,
+    success: Optional[bool] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """数据驱动执行的每行结果（按行号分页，success=false 只看失败行），执行过程中可查询已完成的行"""
+    run = _get_flow_run(db, run_id, access)
+    if run.run_type != "dataset":
+        raise HTTPException(status_code=400, detail="该执行记录不是数据驱动执行")
+    query = db.query(models.FlowRunRow).filter(models.FlowRunRow.run_id == run_id)
+    if success is not None:
+        query = query.filter(models.FlowRunRow.success == success)
+    total = query.count()
+    rows = query.order_by(models.FlowRunRow.row_index).offset((page - 1) * page_size).limit(page_size).all()
+    return {"total": total, "items": [row_result(row) for row in rows], "page": page, "page_size": page_size}
 
-    # 重要：每个步骤的参数和执行都是完全独立的
-    # 即使多个步骤使用相同的接口（endpoint_id），每个步骤也有自己独立的参数
-    # 参数保存在 flow.steps 数组中，通过索引（idx）访问，确保独立性
-    # 过滤掉被禁用的步骤（enabled为False的步骤）
+
+@app.get("/api/flow-runs/{run_id}/stream")
+async def stream_flow_run(
+    run_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_stream_project_access)
+):
+    """
+    实时推送流程异步执行进度（Server-Sent Events）
+
+    事件类型：
+    - step：一个步骤的结果（id 为步骤结果ID，data 含 step_index / result）
+    - progress：当前状态和成功/失败步骤数（数据驱动执行为行数，没有 step 事件）
+    - done：执行结束，data 为最终状态和计数，之后连接关闭
+
+    断线重连时浏览器会带上 Last-Event-ID，从该步骤结果之后继续推送；也可以通过 last_event_id 参数指定。
+    浏览器 EventSource 无法设置 Authorization 头，可通过 access_token 参数传递 token。
+    """
+    await run_in_threadpool(_get_flow_run, db, run_id, access)
+
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id") or "0"
+    try:
+        last_id = max(0, int(last_event_id))
+    except ValueError:
+        last_id = 0
+
+    async def event_stream():
+        nonlocal last_id
+        last_counts = None
+        last_sent = time.time()
+        while not await request.is_disconnected():
+            progress = await run_in_threadpool(read_run_progress, run_id, last_id)
+            if progress is None:
+                yield _sse_event("done", {"status": "deleted"})
+                return
+            for step in progress["steps"]:
+                last_id = step["id"]
+                yield _sse_event("step", step, step["id"])
+            counts = {key: progress[key] for key in ("status", "total_steps", "total_rows", "success_count", "failed_count")}
+            if counts != last_counts:
+                last_counts = counts
+                yield _sse_event("progress", counts)
+                last_sent = time.time()
+            elif progress["steps"]:
+                last_sent = time.time()
+            if progress["has_more"]:
+                continue
+            if progress["status"] not in ("queued", "running"):
+                yield _sse_event("done", dict(counts, error_message=progress["error_message"]))
+                return
+            if time.time() - last_sent >= EXECUTION_STREAM_PING_SECONDS:
+                yield ": ping\n\n"
+                last_sent = time.time()
+            await asyncio.sleep(EXECUTION_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/api-flows/{flow_id}/execute-dataset")
+def execute_api_flow_dataset(
+    flow_id: int,
+    request: schemas.FlowDatasetExecuteRequest,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """
+    数据驱动执行：按数据集（测试文件、数据行或参数矩阵）每行执行一次流程
+
+    执行放入异步执行队列，立即返回 run_id（202）；通过 /api/flow-runs/{run_id}、/stream 查询进度，
+    /result 获取汇总报告和失败行的步骤结果，/rows 分页查询每行的结果（见 flow_runs）
+    """
+    flow = db.query(models.ApiTestFlow).options(
+        joinedload(models.ApiTestFlow.variables)
+    ).filter(models.ApiTestFlow.id == flow_id).first()
+    if not flow:
+        raise HTTPException(status_code=404, detail="流程不存在")
+
+    # 检查权限：只有项目成员可以执行流程
+    access.require_member(flow.project_id, "执行流程")
+
+    if len([source for source in (request.test_file_id, request.rows, request.matrix) if source is not None]) != 1:
+        raise HTTPException(status_code=400, detail="请提供测试文件、数据行或参数矩阵中的一种")
+    if request.test_file_id is not None:
+        require_permission(current_user.role, "apitest", "read")
+        test_file = db.query(models.TestFile).filter(models.TestFile.id == request.test_file_id).first()
+        if not test_file:
+            raise HTTPException(status_code=404, detail="文件不存在")
+        rows = load_test_file_rows(test_file)
+    elif request.rows is not None:
+        rows = validate_rows(request.rows)
+    else:
+        rows = expand_matrix(request.matrix)
+    check_row_count(rows)
+
+    context = build_flow_context(flow, request.global_variables)
+    fail_action = resolve_fail_action(request.failAction)
     enabled_steps = [step for step in (flow.steps or []) if step.get("enabled") is not False]
-    
-    for idx, step in enumerate(enabled_steps):
-        endpoint = db.query(models.ApiEndpoint).filter(models.ApiEndpoint.id == step.get("endpoint_id")).first()
+    environment_id = request.environment_id or flow.environment_id
+    step_plans = compile_flow_plan(db, enabled_steps, environment_id)
+    detach_flow_plan(db, step_plans)
+    run = models.FlowRun(
+        project_id=flow.project_id,
+        flow_id=flow.id,
+        environment_id=environment_id,
+        status="queued",
+        run_type="dataset",
+        total_steps=len(step_plans),
+        total_rows=len(rows),
+        created_by=current_user.id,
+        worker_id=flow_runs.worker_id,
+        heartbeat_at=datetime.now()
+    )
+    db.add(run)
+    db.commit()
+    exec_log.info("flow.dataset", {"flow_id": flow_id, "run_id": run.id, "rows": len(rows)})
+    flow_runs.start_dataset(
+        run.id,
+        step_plans,
+        context,
+        rows,
+        fail_action=fail_action,
+        step_delay=request.delay or 0,
+        concurrency=request.concurrency,
+        step_concurrency=request.step_concurrency,
+        debug=bool(request.debug),
+    )
+    return JSONResponse(status_code=202, content={"run_id": run.id, "status": "queued"})
+
+
+# ==================== 压测 ====================
+
+@app.post("/api/load-tests", response_model=schemas.LoadTestRun)
+def create_load_test(
+    request: schemas.LoadTestCreate,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """启动压测：用 N 个虚拟用户重复执行流程或单个接口，压测在后台执行，报告定期更新"""
+    if request.virtual_users > LOAD_TEST_MAX_VIRTUAL_USERS:
+        raise HTTPException(status_code=400, detail=f"虚拟用户数不能超过 {LOAD_TEST_MAX_VIRTUAL_USERS}")
+    if not request.duration_seconds and not request.iterations:
+        raise HTTPException(status_code=400, detail="请设置压测时长或迭代次数")
+    if request.duration_seconds and request.duration_seconds > LOAD_TEST_MAX_DURATION_SECONDS:
+        raise HTTPException(status_code=400, detail=f"压测时长不能超过 {LOAD_TEST_MAX_DURATION_SECONDS} 秒")
+    if request.failAction not in (None, "stop", "continue"):
+        raise HTTPException(status_code=400, detail="failAction 只能为 stop 或 continue")
+
+    if request.target_type == "flow":
+        flow = db.query(models.ApiTestFlow).options(
+            joinedload(models.ApiTestFlow.variables)
+        ).filter(models.ApiTestFlow.id == request.target_id).first()
+        if not flow:
+            raise HTTPException(status_code=404, detail="流程不存在")
+        access.require_member(flow.project_id, "执行压测")
+        project_id = flow.project_id
+        environment_id = request.environment_id or flow.environment_id
+        context = build_flow_context(flow, request.global_variables)
+        fail_action = resolve_fail_action(request.failAction)
+        steps = [step for step in (flow.steps or []) if step.get("enabled") is not False]
+        if not steps:
+            raise HTTPException(status_code=400, detail="流程没有可执行的步骤")
+    else:
+        endpoint = db.query(models.ApiEndpoint).filter(models.ApiEndpoint.id == request.target_id).first()
         if not endpoint:
-            raise HTTPException(status_code=400, detail=f"第 {idx+1} 步接口不存在")
-
-        # 确定环境
-        environment_id = step.get("environment_id") or request.environment_id or flow.environment_id
-        if not environment_id:
-            raise HTTPException(status_code=400, detail="请为流程或步骤选择环境")
-        environment = db.query(models.ApiEnvironment).filter(models.ApiEnvironment.id == environment_id).first()
-        if not environment:
-            raise HTTPException(status_code=404, detail=f"第 {idx+1} 步环境不存在")
-
-        # 获取测试数据（可选）
-        test_data = None
-        test_data_id = step.get("test_data_id")
-        if test_data_id:
-            test_data = db.query(models.ApiTestData).filter(models.ApiTestData.id == test_data_id).first()
-        else:
-            test_data = db.query(models.ApiTestData).filter(models.ApiTestData.endpoint_id == endpoint.id).first()
+            raise HTTPException(status_code=404, detail="接口不存在")
+        access.require_member(endpoint.project_id, "执行压测")
+        project_id = endpoint.project_id
+        environment_id = request.environment_id
+        context = dict(request.global_variables or {})
+        fail_action = "stop"
+        # 单个接口按只有一个步骤的流程执行
+        steps = [{"endpoint_id": endpoint.id, "test_data_id": request.test_data_id}]
+
+    step_plans = compile_flow_plan(db, steps, environment_id)
+    if request.target_type == "api":
+        test_data = step_plans[0].test_data
+        if request.test_data_id and not test_data:
+            raise HTTPException(status_code=404, detail="测试数据不存在")
+        # 使用测试数据的断言判定请求是否成功，没有断言时按状态码 2xx 判定
+        if test_data and isinstance(test_data.assertions, list):
+            step_plans[0].step["assertions"] = test_data.assertions
+    detach_flow_plan(db, step_plans)
+
+    config = request.model_dump(exclude={"target_type", "target_id", "environment_id"})
+    config["fail_action"] = fail_action
+    run = models.LoadTestRun(
+        project_id=project_id,
+        target_type=request.target_type,
+        target_id=request.target_id,
+        environment_id=environment_id,
+        config=config,
+        status="running",
+        created_by=current_user.id,
+        worker_id=load_tests.worker_id,
+        heartbeat_at=datetime.now()
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    load_tests.start(run.id, step_plans, context, config)
+    print(f"📈 开始压测: run_id={run.id}, {request.target_type}={request.target_id}, 虚拟用户 {request.virtual_users}")
+    return run
 
-        # 组装请求数据，优先级：环境默认 < 测试数据 < 步骤自定义参数（已模板渲染）
-        # 重要：每个步骤使用自己的参数（step.get("headers")等），不会影响其他步骤
-        # 即使第2个和第5个步骤使用相同的接口，它们也有完全独立的参数
-        headers = {}
-        if environment.headers:
-            headers.update(environment.headers)
-        if test_data and test_data.headers:
-            headers.update(test_data.headers)
-        # 步骤自己的headers优先级最高，会覆盖测试数据和环境配置
-        if step.get("headers") is not None:
-            # 调试日志：输出渲染前后的headers
-            original_headers = step["headers"]
-            rendered_headers = _render_template(step["headers"], context)
-            print(f"🔍 步骤 {idx+1} (endpoint_id={step.get('endpoint_id')}, alias={step.get('alias')}) Headers 渲染前: {original_headers}")
-            print(f"🔍 步骤 {idx+1} (endpoint_id={step.get('endpoint_id')}, alias={step.get('alias')}) Headers 渲染后: {rendered_headers}")
-            # 如果步骤的headers是空对象 {}，表示用户明确清空了headers，应该使用空对象
-            if isinstance(rendered_headers, dict):
-                headers = rendered_headers  # 使用步骤自己的headers，完全覆盖
-            else:
-                headers.update(rendered_headers if isinstance(rendered_headers, dict) else {})
-
-        # 路径参数：步骤自己的参数优先级最高
-        path_params = test_data.path_params if test_data else None
-        if step.get("path_params") is not None:
-            # 如果步骤有path_params（包括空对象 {}），使用步骤的参数
-            path_params = _render_template(step["path_params"], context)
-
-        # 查询参数：步骤自己的参数优先级最高
-        query_params = test_data.query_params if test_data else None
-        if step.get("query_params") is not None:
-            # 如果步骤有query_params（包括空对象 {}），使用步骤的参数
-            query_params = _render_template(step["query_params"], context)
-
-        # 请求体：步骤自己的参数优先级最高
-        body = test_data.body if test_data else None
-        if step.get("body") is not None:
-            # 如果步骤有body（包括空对象 {}），使用步骤的参数
-            body = _render_template(step["body"], context)
-        
-        # 调试日志：确认每个步骤使用自己的参数
-        print(f"🔍 步骤 {idx+1} (endpoint_id={step.get('endpoint_id')}, alias={step.get('alias')}) 使用的参数:")
-        print(f"  - path_params: {path_params}")
-        print(f"  - query_params: {query_params}")
-        print(f"  - headers: {headers}")
-        print(f"  - body: {body}")
-
-        # 拼接 URL 并替换路径参数
-        base_url = environment.base_url.rstrip('/')
-        path = endpoint.path.lstrip('/')
-        full_url = f"{base_url}/{path}"
-        if path_params:
-            for key, value in path_params.items():
-                full_url = full_url.replace(f"{{{key}}}", str(value))
-
-        start_time = time.time()
-        step_success = False
-        response_status = None
-        response_headers = None
-        response_body_text = None
-        error_message = None
-        json_body = None
-        assertions_list = []  # 初始化断言列表，确保在异常情况下也能使用
 
-        try:
-            # 调试日志：输出实际发送的请求headers
-            print(f"🔍 步骤 {idx+1} 实际发送的 Headers: {headers}")
-            response = requests.request(
-                method=endpoint.method.upper(),
-                url=full_url,
-                headers=headers,
-                params=query_params,
-                json=body if body is not None else None,
-                timeout=30
-            )
-            response_time = int((time.time() - start_time) * 1000)
-            response_status = response.status_code
-            response_headers = dict(response.headers)
-            response_body_text = response.text
-            try:
-                json_body = response.json()
-            except Exception:
-                json_body = None
-
-            # 检查断言
-            # 重要：每个步骤使用自己的断言列表，完全独立
-            # 即使多个步骤使用相同的接口，每个步骤也有自己独立的断言
-            # 重要：每个步骤使用自己的断言列表，完全独立
-            # 即使多个步骤使用相同的接口，每个步骤也有自己独立的断言
-            step_assertions = step.get("assertions")
-            if step_assertions is None:
-                assertions_list = []
-            elif isinstance(step_assertions, list):
-                assertions_list = step_assertions
-            else:
-                assertions_list = []
-            
-            print(f"🔍 步骤 {idx+1} (endpoint_id={step.get('endpoint_id')}, alias={step.get('alias')}) 使用的断言: {assertions_list}")
-            
-            print(f"🔍 步骤 {idx+1} (endpoint_id={step.get('endpoint_id')}) 使用的断言: {assertions_list}")
-            
-            assertion_errors = []
-            step_success = True
-            
-            if assertions_list and len(assertions_list) > 0:
-                # 有断言时，初始化为True，只有断言失败时才设为False
-                step_success = True
-                for assertion in assertions_list:
-                    assertion_type = assertion.get('type')
-                    operator = assertion.get('operator')
-                    target = assertion.get('target')
-                    expected = assertion.get('expected')
-                    
-                    # 跳过无效的断言
-                    if not assertion_type or not operator:
-                        continue
-                    
-                    if assertion_type == 'status_code':
-                        # 状态码断言
-                        actual_value = response_status
-                        # 确保expected不为None或空字符串
-                        if expected is None or expected == '':
-                            step_success = False
-                            assertion_errors.append(f"状态码断言失败: 期望值不能为空")
-                            continue
-                        # 检查断言（_check_assertion会将两者都转为字符串比较）
-                        # 确保expected是字符串类型，以便正确比较
-                        expected_str = str(expected).strip()
-                        # 确保actual_value也是整数类型（response_status已经是整数）
-                        assertion_passed = _check_assertion(actual_value, operator, expected_str)
-                        if not assertion_passed:
-                            step_success = False
-                            assertion_errors.append(f"状态码断言失败: 期望 {expected_str}，实际 {actual_value}")
-                        # 断言通过时，确保step_success保持为True
-                        else:
-                            # 断言通过，但需要确保step_success保持为True（防止被其他逻辑覆盖）
-                            pass
-                    
-                    elif assertion_type == 'json_path':
-                        # JSON路径断言
-                        if json_body and target:
-                            # 先渲染 expected 值（处理变量替换，如 STR($CreateValue)）
-                            if expected:
-                                try:
-                                    expected_rendered = _render_template(expected, context)
-                                    # 如果渲染后是字符串且以引号开头结尾，去掉引号
-                                    if isinstance(expected_rendered, str) and expected_rendered.startswith('"') and expected_rendered.endswith('"'):
-                                        expected_rendered = expected_rendered[1:-1]
-                                    expected = expected_rendered
-                                except Exception as e:
-                                    print(f"🔍 渲染 expected 值失败: {e}")
-                            
-                            actual_value = _extract_json_path(json_body, target)
-                            print(f"🔍 JSON路径断言: path={target}, expected={expected}, actual={actual_value}")
-                            
-                            if not _check_assertion(actual_value, operator, expected):
-                                step_success = False
-                                assertion_errors.append(f"JSON路径断言失败: {target} 期望 {expected}，实际 {_format_value_for_display(actual_value)}")
-                        else:
-                            step_success = False
-                            assertion_errors.append(f"JSON路径断言失败: 无法提取路径 {target}")
-                    
-                    elif assertion_type == 'response_time':
-                        # 响应时间断言
-                        actual_value = response_time
-                        if not _check_assertion(actual_value, operator, expected):
-                            step_success = False
-                            assertion_errors.append(f"响应时间断言失败: 期望 {expected}ms，实际 {actual_value}ms")
-                    
-                    elif assertion_type == 'contains':
-                        # 包含断言
-                        if json_body:
-                            body_str = json.dumps(json_body) if isinstance(json_body, dict) else str(json_body)
-                            if expected and expected not in body_str:
-                                step_success = False
-                                assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
-                        else:
-                            if expected and expected not in str(response_body_text):
-                                step_success = False
-                                assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
-                
-                # 如果有断言错误，设置错误消息
-                if assertion_errors:
-                    error_message = "\n".join(assertion_errors)
-            else:
-                # 如果没有断言，使用默认逻辑：状态码在200-299之间
-                step_success = 200 <= response_status < 300
-        except Exception as exc:  # pragma: no cover
-            response_time = int((time.time() - start_time) * 1000)
-            error_message = str(exc)
-            step_success = False
-
-        # 将当前接口的响应体存储到 context 中，支持 API[N] 语法
-        api_key = f"API[{idx + 1}]"
-        context[api_key] = json_body or {}
-        print(f"🔍 步骤 {idx+1} 存储响应体到 context[{api_key}]")
-        
-        # 变量提取：从当前接口提取（step_index 为 None、0 或等于当前接口序号）
-        for rule in step.get("extracts") or []:
-            rule_step_index = rule.get("step_index")
-            # 如果 step_index 为 None、0 或等于当前接口序号，从当前接口提取
-            if not rule_step_index or rule_step_index == 0 or rule_step_index == (idx + 1):
-                value = _extract_value(json_body or {}, rule.get("path", ""))
-                if rule.get("name"):
-                    context[rule["name"]] = value
-                    print(f"🔍 步骤 {idx+1} 从当前接口提取变量: {rule.get('name')} = {value}")
-
-        results.append({
-            "index": idx + 1,
-            "endpoint_id": endpoint.id,
-            "endpoint_name": endpoint.name,
-            "url": full_url,
-            "method": endpoint.method,
-            "success": step_success,
-            "status": response_status,
-            "response_time": response_time,
-            "error_message": error_message,
-            "alias": step.get("alias"),
-            "extracted": {rule.get("name"): _extract_value(json_body or {}, rule.get("path", "")) for rule in step.get("extracts") or []},
-            # 请求信息
-            "request_headers": headers,
-            "request_path_params": path_params,
-            "request_query_params": query_params,
-            "request_body": body,
-            "request_assertions": assertions_list,  # 添加断言信息
-            # 响应信息
-            "response_headers": response_headers,
-            "response_body": response_body_text
-        })
-        if not step_success:
-            overall_success = False
-            if fail_action == "stop":
-                # 停止执行
-                break
-            # 如果 fail_action == "continue"，继续执行下一个步骤
-        
-        # 步骤间延迟（不是最后一个步骤时）
-        if step_delay > 0 and idx < len(enabled_steps) - 1:
-            print(f"🔍 步骤 {idx+1} 执行完成，延迟 {step_delay}ms 后执行下一步骤")
-            time.sleep(step_delay / 1000.0)  # 转换为秒
+@app.get("/api/load-tests", response_model=List[schemas.LoadTestRun])
+def list_load_tests(
+    project_id: int = Query(...),
+    target_type: Optional[str] = Query(None),
+    target_id: Optional[int] = Query(None),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """获取项目的压测记录（按时间倒序），可按流程/接口筛选"""
+    access.require_member(project_id, "查看压测记录")
+    query = db.query(models.LoadTestRun).filter(models.LoadTestRun.project_id == project_id)
+    if target_type:
+        query = query.filter(models.LoadTestRun.target_type == target_type)
+    if target_id is not None:
+        query = query.filter(models.LoadTestRun.target_id == target_id)
+    return query.order_by(models.LoadTestRun.id.desc()).limit(limit).all()
+
+
+@app.get("/api/load-tests/{run_id}", response_model=schemas.LoadTestRun)
+def get_load_test(
+    run_id: int,
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """获取压测记录和报告（执行中的压测每隔 LOAD_TEST_REPORT_INTERVAL_SECONDS 秒更新一次报告）"""
+    run = db.query(models.LoadTestRun).filter(models.LoadTestRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="压测记录不存在")
+    access.require_member(run.project_id, "查看压测记录")
+    return run
 
-    return {
-        "success": overall_success,
-        "results": results,
-        "context": context
-    }
+
+@app.post("/api/load-tests/{run_id}/stop")
+def stop_load_test(
+    run_id: int,
+    db: Session = Depends(get_db),
+    access: ProjectAccess = Depends(get_project_access)
+):
+    """
+    停止压测：不再开始新的迭代，正在执行的迭代结束后写入最终报告
+
+    停止请求写入 stop_requested，执行该压测的服务进程在下次写入报告时停止（在本进程中执行时立即停止）。
+    """
+    run = db.query(models.LoadTestRun).filter(models.LoadTestRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="压测记录不存在")
+    access.require_member(run.project_id, "停止压测")
+    if run.status != "running":
+        raise HTTPException(status_code=400, detail="压测已结束")
+    run.stop_requested = True
+    db.commit()
+    load_tests.stop(run_id)
+    return {"message": "正在停止压测"}
 
 
 # ==================== 流程导出和导入 ====================
@@ -6647,20 +6305,18 @@ def import_api_flow(
     flow_id: int, 
     export_id: int, 
     db: Session = Depends(get_db),
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    access: ProjectAccess = Depends(get_project_access)
 ):
     """从导出记录导入流程数据"""
     flow = db.query(models.ApiTestFlow).options(
-        joinedload(models.ApiTestFlow.project).joinedload(models.Project.members)
+        joinedload(models.ApiTestFlow.project)
     ).filter(models.ApiTestFlow.id == flow_id).first()
     if not flow:
         raise HTTPException(status_code=404, detail="流程不存在")
     
     # 检查权限：只有项目成员可以导入流程
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="用户不存在")
-    check_project_member_permission(user, flow.project, "导入流程")
+    access.require_member(flow.project_id, "导入流程")
     
     export_record = db.query(models.FlowExportRecord).filter(
         models.FlowExportRecord.id == export_id,
@@ -6687,6 +6343,7 @@ def import_api_flow(
             flow.global_variables = flow_data["global_variables"]
         if "steps" in flow_data:
             flow.steps = flow_data["steps"]
+            sync_flow_index(db, flow_id, flow.steps)
     
     # 更新流程变量
     if "variables" in export_data:
@@ -6742,7 +6399,7 @@ def get_api_execution_records(
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    """获取执行记录"""
+    """获取执行记录（列表不读取存入 content_blobs 的请求/响应内容，详情接口中返回）"""
     query = db.query(models.ApiExecutionRecord).order_by(models.ApiExecutionRecord.executed_at.desc())
     
     if endpoint_id:
@@ -6759,6 +6416,7 @@ def get_api_execution_record(record_id: int, db: Session = Depends(get_db)):
     record = db.query(models.ApiExecutionRecord).filter(models.ApiExecutionRecord.id == record_id).first()
     if not record:
         raise HTTPException(status_code=404, detail="执行记录不存在")
+    blob_store.hydrate(db, [record])
     return record
 
 # ==================== Swagger同步和上传 ====================
@@ -6773,6 +6431,7 @@ def _fetch_openapi_spec_with_fallbacks(base_url: str, swagger_path: str) -> tupl
     401/403 不重试（需服务端允许匿名访问文档或单独配置）。
     返回 (spec_dict, 实际生效的路径)。
     """
+    import requests
     base = base_url.rstrip("/")
     raw = (swagger_path or "/v3/api-docs").strip()
     primary = raw if raw.startswith("/") else f"/{raw}"
@@ -6788,7 +6447,7 @@ def _fetch_openapi_spec_with_fallbacks(base_url: str, swagger_path: str) -> tupl
     for p in candidates:
         url = f"{base}{p}"
         try:
-            r = requests.get(url, timeout=30)
+            r = http_clients.request("GET", url, timeout=30)
         except requests.RequestException as e:
             errors.append(f"{url}: {e}")
             continue
@@ -6806,9 +6465,7 @@ def _fetch_openapi_spec_with_fallbacks(base_url: str, swagger_path: str) -> tupl
                 ),
             )
 
-        try:
-            r.raise_for_status()
-        except requests.RequestException as e:
+        if r.status_code >= 400:
             errors.append(f"{url}: HTTP {r.status_code}")
             continue
 
@@ -6908,7 +6565,8 @@ def sync_swagger_from_environment(
                 description=api_data.get('description', ''),
                 tags=api_data.get('tags', []),
                 parameters=parameters,  # 确保是列表
-                request_body=request_body  # 确保是字典或 None
+                request_body=request_body,  # 确保是字典或 None
+                response_schemas=api_data.get('response_schemas') or None
             )
             db.add(db_endpoint)
             created_endpoints.append(db_endpoint)
@@ -7071,7 +6729,8 @@ async def upload_swagger_file(
             description=api_data.get('description', ''),
             tags=api_data.get('tags', []),
             parameters=parameters,  # 确保是列表
-            request_body=request_body  # 确保是字典或 None
+            request_body=request_body,  # 确保是字典或 None
+            response_schemas=api_data.get('response_schemas') or None
         )
         db.add(db_endpoint)
         created_endpoints.append(db_endpoint)
@@ -7244,7 +6903,8 @@ def create_test_task(
         description=task.description,
         status='idle',
         cron_expression=task.cron_expression,
-        environment_id=task.environment_id
+        environment_id=task.environment_id,
+        max_concurrency=task.max_concurrency
     )
     db.add(db_task)
     db.flush()
@@ -7413,859 +7073,19 @@ def execute_test_task(
         status='running',
         total_count=len(task.items) if task.items else 0,
         success_count=0,
-        failed_count=0,
-        execution_results=[]
+        failed_count=0
     )
     db.add(execution)
+    db.flush()
+    
+    # 写入执行队列，由 worker 领取执行（见 job_queue）
+    enqueue_task_execution(db, task, execution, request)
     
     # 更新任务状态
     task.status = 'running'
     db.commit()
     db.refresh(execution)
-    
-    # 在后台执行任务（异步）
-    import threading
-    def run_task():
-        db_session = SessionLocal()
-        try:
-            results = []
-            success_count = 0
-            failed_count = 0
-            
-            # 重新加载任务和items（在后台线程中使用新的session）
-            db_task = db_session.query(models.TestTask).options(
-                joinedload(models.TestTask.items)
-            ).filter(models.TestTask.id == task_id).first()
-            
-            if not db_task:
-                raise Exception("任务不存在")
-            
-            # 按顺序执行每个任务项
-            sorted_items = sorted(db_task.items, key=lambda x: x.sort_order) if db_task.items else []
-            for item in sorted_items:
-                try:
-                    if item.item_type == 'api':
-                        # 执行接口测试
-                        endpoint = db_session.query(models.ApiEndpoint).filter(models.ApiEndpoint.id == item.item_id).first()
-                        if not endpoint:
-                            results.append({
-                                "item_type": "api",
-                                "item_id": item.item_id,
-                                "item_name": f"接口 {item.item_id}",
-                                "success": False,
-                                "error_message": "接口不存在"
-                            })
-                            failed_count += 1
-                            continue
-                        
-                        # 获取默认测试数据
-                        test_data = db_session.query(models.ApiTestData).filter(
-                            models.ApiTestData.endpoint_id == item.item_id
-                        ).first()
-                        
-                        # 使用任务选择的环境，而不是接口自己的环境
-                        # 构建执行请求
-                        from schemas import ApiExecuteRequest
-                        execute_request = ApiExecuteRequest(
-                            environment_id=request.environment_id,
-                            test_data_id=test_data.id if test_data else None,
-                            global_variables={}
-                        )
-                        
-                        # 调用现有的接口执行逻辑
-                        api_result = {
-                            "item_type": "api",
-                            "item_id": item.item_id,
-                            "item_name": endpoint.name or endpoint.path,
-                            "success": False,
-                            "status_code": None,
-                            "error_message": None,
-                            "execution_time": None,
-                            "details": {}
-                        }
-                        
-                        try:
-                            # 获取环境
-                            env = db_session.query(models.ApiEnvironment).filter(
-                                models.ApiEnvironment.id == request.environment_id
-                            ).first()
-                            
-                            if not env:
-                                raise Exception(f"环境不存在 (ID: {request.environment_id})")
-                            
-                            # 构建URL
-                            base_url = env.base_url.rstrip('/')
-                            path = endpoint.path.lstrip('/')
-                            url = f"{base_url}/{path}"
-                            
-                            # 处理路径参数
-                            path_params = {}
-                            if test_data and test_data.path_params:
-                                path_params = test_data.path_params
-                                for key, value in path_params.items():
-                                    url = url.replace(f'{{{key}}}', str(value))
-                            
-                            # 准备请求参数
-                            headers = {}
-                            if env.headers:
-                                headers.update(env.headers)
-                            if test_data and test_data.headers:
-                                headers.update(test_data.headers)
-                            
-                            # 应用 Header 替换
-                            if request.header_replacements:
-                                for replacement in request.header_replacements:
-                                    if replacement.key and replacement.value:
-                                        headers[replacement.key] = replacement.value
-                            
-                            query_params = {}
-                            if test_data and test_data.query_params:
-                                query_params = test_data.query_params
-                            
-                            body = None
-                            if endpoint.method.upper() in ['POST', 'PUT', 'PATCH']:
-                                if test_data and test_data.body:
-                                    body = test_data.body
-                            
-                            # 获取断言信息
-                            assertions_list = []
-                            if test_data and test_data.assertions:
-                                assertions_list = test_data.assertions
-                            
-                            # 应用断言替换（如果有替换配置，则使用替换的断言）
-                            if request.assertion_replacements:
-                                assertions_list = [
-                                    {
-                                        "type": a.type,
-                                        "target": a.target,
-                                        "operator": a.operator,
-                                        "expected": a.expected
-                                    }
-                                    for a in request.assertion_replacements
-                                    if a.type and a.operator and a.expected is not None
-                                ]
-                                print(f"🔍 测试任务断言替换: {assertions_list}")
-                            
-                            # 执行请求
-                            import requests
-                            request_kwargs = {
-                                'method': endpoint.method.upper(),
-                                'url': url,
-                                'headers': headers,
-                                'timeout': 30
-                            }
-                            
-                            if query_params:
-                                request_kwargs['params'] = query_params
-                            
-                            if body:
-                                request_kwargs['json'] = body
-                            
-                            # 记录请求详情
-                            api_result["details"] = {
-                                "request_url": url,
-                                "request_method": endpoint.method.upper(),
-                                "request_headers": headers,
-                                "request_query_params": query_params,
-                                "request_path_params": path_params,
-                                "request_body": body,
-                                "request_assertions": assertions_list,
-                                "environment": {
-                                    "id": env.id,
-                                    "name": env.name,
-                                    "base_url": env.base_url
-                                }
-                            }
-                            
-                            start_time = time.time()
-                            try:
-                                response = requests.request(**request_kwargs)
-                                response_time = int((time.time() - start_time) * 1000)
-                                
-                                # 尝试解析响应体
-                                response_body = None
-                                try:
-                                    response_body = response.text
-                                    if len(response_body) > 5000:
-                                        response_body = response_body[:5000] + "... (truncated)"
-                                except:
-                                    response_body = str(response.content)[:5000] if hasattr(response, 'content') else None
-                                
-                                api_result["status_code"] = response.status_code
-                                api_result["execution_time"] = response_time
-                                
-                                # 更新响应详情
-                                api_result["details"].update({
-                                    "response_status": response.status_code,
-                                    "response_headers": dict(response.headers),
-                                    "response_body": response_body,
-                                    "response_time": response_time
-                                })
-                                
-                                # 验证断言
-                                assertion_success = True
-                                assertion_errors = []
-                                
-                                print(f"🔍 开始验证断言，断言数量: {len(assertions_list) if assertions_list else 0}")
-                                
-                                if assertions_list:
-                                    # 尝试解析响应体为 JSON
-                                    json_body = None
-                                    try:
-                                        json_body = response.json()
-                                    except:
-                                        pass
-                                    
-                                    for assertion in assertions_list:
-                                        assertion_type = assertion.get('type')
-                                        operator = assertion.get('operator')
-                                        target = assertion.get('target')
-                                        expected = assertion.get('expected')
-                                        
-                                        if assertion_type == 'status_code':
-                                            # 状态码断言
-                                            actual_value = response.status_code
-                                            if not _check_assertion(actual_value, operator, expected):
-                                                assertion_success = False
-                                                assertion_errors.append(f"状态码断言失败: 期望 {expected}，实际 {actual_value}")
-                                        
-                                        elif assertion_type == 'json_path':
-                                            # JSON路径断言
-                                            if json_body and target:
-                                                actual_value = _extract_json_path(json_body, target)
-                                                print(f"🔍 JSON路径断言: path={target}, expected={expected}, actual={actual_value}, operator={operator}")
-                                                check_result = _check_assertion(actual_value, operator, expected)
-                                                print(f"🔍 断言检查结果: {check_result}")
-                                                if not check_result:
-                                                    assertion_success = False
-                                                    assertion_errors.append(f"JSON路径断言失败: {target} 期望 {expected}，实际 {_format_value_for_display(actual_value)}")
-                                            else:
-                                                assertion_success = False
-                                                assertion_errors.append(f"JSON路径断言失败: 无法提取路径 {target}")
-                                        
-                                        elif assertion_type == 'response_time':
-                                            # 响应时间断言
-                                            actual_value = response_time
-                                            if not _check_assertion(actual_value, operator, expected):
-                                                assertion_success = False
-                                                assertion_errors.append(f"响应时间断言失败: 期望 {expected}ms，实际 {actual_value}ms")
-                                        
-                                        elif assertion_type == 'contains':
-                                            # 包含断言
-                                            if json_body:
-                                                body_str = json.dumps(json_body) if isinstance(json_body, dict) else str(json_body)
-                                                if expected and expected not in body_str:
-                                                    assertion_success = False
-                                                    assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
-                                            else:
-                                                if expected and expected not in str(response_body):
-                                                    assertion_success = False
-                                                    assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
-                                    
-                                    # 记录断言结果
-                                    api_result["details"]["assertion_results"] = assertion_errors if assertion_errors else ["所有断言通过"]
-                                    api_result["success"] = assertion_success
-                                    
-                                    if not assertion_success:
-                                        api_result["error_message"] = "; ".join(assertion_errors)
-                                        failed_count += 1
-                                    else:
-                                        success_count += 1
-                                else:
-                                    # 如果没有断言，使用默认逻辑：HTTP 状态码判断
-                                    api_result["success"] = response.status_code < 400
-                                    if not api_result["success"]:
-                                        api_result["error_message"] = f"HTTP {response.status_code}: {response_body[:200] if response_body else '无响应内容'}"
-                                        failed_count += 1
-                                    else:
-                                        success_count += 1
-                            
-                            except requests.exceptions.Timeout:
-                                response_time = int((time.time() - start_time) * 1000)
-                                api_result["execution_time"] = response_time
-                                api_result["error_message"] = f"请求超时 (超过30秒)"
-                                api_result["details"]["error_type"] = "timeout"
-                                failed_count += 1
-                            
-                            except requests.exceptions.ConnectionError as e:
-                                response_time = int((time.time() - start_time) * 1000)
-                                api_result["execution_time"] = response_time
-                                api_result["error_message"] = f"连接错误: {str(e)}"
-                                api_result["details"]["error_type"] = "connection_error"
-                                failed_count += 1
-                            
-                            except requests.exceptions.RequestException as e:
-                                response_time = int((time.time() - start_time) * 1000)
-                                api_result["execution_time"] = response_time
-                                api_result["error_message"] = f"请求异常: {str(e)}"
-                                api_result["details"]["error_type"] = "request_exception"
-                                failed_count += 1
-                        
-                        except Exception as exec_error:
-                            import traceback
-                            error_msg = str(exec_error)
-                            traceback.print_exc()
-                            api_result["error_message"] = f"执行失败: {error_msg}"
-                            api_result["details"]["error_type"] = "execution_error"
-                            api_result["details"]["error_traceback"] = traceback.format_exc()
-                            failed_count += 1
-                        
-                        finally:
-                            # 确保结果被记录
-                            results.append(api_result)
-                    
-                    elif item.item_type == 'flow':
-                        # 执行流程测试
-                        flow = db_session.query(models.ApiTestFlow).filter(models.ApiTestFlow.id == item.item_id).first()
-                        if not flow:
-                            results.append({
-                                "item_type": "flow",
-                                "item_id": item.item_id,
-                                "item_name": f"流程 {item.item_id}",
-                                "success": False,
-                                "error_message": "流程不存在"
-                            })
-                            failed_count += 1
-                            continue
-                        
-                        # 使用任务选择的环境执行流程
-                        # 构建执行请求
-                        from schemas import FlowExecuteRequest
-                        flow_execute_request = FlowExecuteRequest(
-                            environment_id=request.environment_id,
-                            global_variables={}
-                        )
-                        
-                        # 流程执行结果
-                        flow_result = {
-                            "item_type": "flow",
-                            "item_id": item.item_id,
-                            "item_name": flow.name,
-                            "success": False,
-                            "execution_time": None,
-                            "error_message": None,
-                            "details": {
-                                "steps": []
-                            }
-                        }
-                        
-                        try:
-                            # 调用流程执行逻辑（简化版，直接执行流程的每个步骤）
-                            # 获取环境
-                            env = db_session.query(models.ApiEnvironment).filter(
-                                models.ApiEnvironment.id == request.environment_id
-                            ).first()
-                            
-                            if not env:
-                                raise Exception(f"环境不存在 (ID: {request.environment_id})")
-                            
-                            # 初始化上下文（用于变量替换和模板渲染）
-                            context: Dict[str, Any] = {}
-                            # 从流程变量加载（如果有）
-                            if flow.global_variables:
-                                if isinstance(flow.global_variables, dict):
-                                    context.update(flow.global_variables)
-                                elif isinstance(flow.global_variables, str):
-                                    try:
-                                        import json
-                                        parsed_vars = json.loads(flow.global_variables)
-                                        if isinstance(parsed_vars, dict):
-                                            context.update(parsed_vars)
-                                    except:
-                                        pass
-                            
-                            # 获取执行配置
-                            fail_action = "stop"
-                            if hasattr(flow, 'executionConfig') and flow.executionConfig:
-                                if isinstance(flow.executionConfig, dict):
-                                    fail_action = flow.executionConfig.get("failAction", "stop")
-                            elif hasattr(flow, 'execution_config') and flow.execution_config:
-                                if isinstance(flow.execution_config, dict):
-                                    fail_action = flow.execution_config.get("failAction", "stop")
-                            
-                            # 执行流程的每个步骤（过滤掉被禁用的步骤）
-                            enabled_steps = [step for step in (flow.steps or []) if step.get("enabled") is not False]
-                            flow_success = True
-                            flow_error = None
-                            total_flow_time = 0
-                            
-                            for step_idx, step in enumerate(enabled_steps):
-                                if not step.get("enabled", True):
-                                    continue
-                                
-                                step_result = {
-                                    "step_index": step_idx + 1,
-                                    "step_name": step.get("alias") or f"步骤 {step_idx + 1}",
-                                    "success": False,
-                                    "error_message": None,
-                                    "execution_time": None,
-                                    "details": {}
-                                }
-                                
-                                try:
-                                    step_endpoint_id = step.get("endpoint_id")
-                                    if not step_endpoint_id:
-                                        step_result["error_message"] = "步骤中未指定接口ID"
-                                        flow_result["details"]["steps"].append(step_result)
-                                        flow_success = False
-                                        continue
-                                    
-                                    step_endpoint = db_session.query(models.ApiEndpoint).filter(
-                                        models.ApiEndpoint.id == step_endpoint_id
-                                    ).first()
-                                    
-                                    if not step_endpoint:
-                                        step_result["error_message"] = f"步骤中的接口 {step_endpoint_id} 不存在"
-                                        flow_result["details"]["steps"].append(step_result)
-                                        flow_success = False
-                                        continue
-                                    
-                                    # 使用任务选择的环境，而不是步骤自己的环境
-                                    step_env = env
-                                    
-                                    # 获取步骤的测试数据
-                                    step_test_data_id = step.get("test_data_id")
-                                    step_test_data = None
-                                    if step_test_data_id:
-                                        step_test_data = db_session.query(models.ApiTestData).filter(
-                                            models.ApiTestData.id == step_test_data_id
-                                        ).first()
-                                    
-                                    # 从之前的步骤中提取变量（如果有）
-                                    # 注意：这里我们需要从 flow_result["details"]["steps"] 中提取之前步骤的响应
-                                    for prev_step_result in flow_result["details"]["steps"]:
-                                        prev_step_idx = prev_step_result.get("step_index", 0)
-                                        if prev_step_idx > 0 and prev_step_idx < step_idx + 1:
-                                            # 将之前步骤的响应体存储到 context 中
-                                            prev_response_body = prev_step_result.get("details", {}).get("response_body")
-                                            if prev_response_body:
-                                                try:
-                                                    import json
-                                                    prev_json_body = json.loads(prev_response_body) if isinstance(prev_response_body, str) else prev_response_body
-                                                    context[f"API[{prev_step_idx}]"] = prev_json_body or {}
-                                                except:
-                                                    pass
-                                            
-                                            # 从之前步骤的提取变量中获取
-                                            prev_extracted = prev_step_result.get("details", {}).get("extracted", {})
-                                            if prev_extracted:
-                                                context.update(prev_extracted)
-                                    
-                                    # 组装请求数据（和 execute_api_flow 中的逻辑一致，支持模板渲染）
-                                    headers = {}
-                                    if step_env.headers:
-                                        headers.update(step_env.headers)
-                                    if step_test_data and step_test_data.headers:
-                                        headers.update(step_test_data.headers)
-                                    if step.get("headers") is not None:
-                                        rendered_headers = _render_template(step["headers"], context)
-                                        if isinstance(rendered_headers, dict):
-                                            headers = rendered_headers
-                                        else:
-                                            headers.update(rendered_headers if isinstance(rendered_headers, dict) else {})
-                                    
-                                    # 路径参数：步骤自己的参数优先级最高，支持模板渲染
-                                    path_params = step_test_data.path_params if step_test_data else None
-                                    if step.get("path_params") is not None:
-                                        path_params = _render_template(step["path_params"], context)
-                                    
-                                    # 查询参数：步骤自己的参数优先级最高，支持模板渲染
-                                    query_params = step_test_data.query_params if step_test_data else None
-                                    if step.get("query_params") is not None:
-                                        query_params = _render_template(step["query_params"], context)
-                                    
-                                    # 请求体：步骤自己的参数优先级最高，支持模板渲染
-                                    body = step_test_data.body if step_test_data else None
-                                    if step.get("body") is not None:
-                                        body = _render_template(step["body"], context)
-                                    
-                                    # 拼接 URL 并替换路径参数
-                                    base_url = step_env.base_url.rstrip('/')
-                                    path = step_endpoint.path.lstrip('/')
-                                    step_url = f"{base_url}/{path}"
-                                    if path_params:
-                                        for key, value in path_params.items():
-                                            step_url = step_url.replace(f"{{{key}}}", str(value))
-                                    
-                                    # 记录步骤请求详情
-                                    step_result["details"] = {
-                                        "request_url": step_url,
-                                        "request_method": step_endpoint.method.upper(),
-                                        "request_headers": headers,
-                                        "request_path_params": path_params,
-                                        "request_query_params": query_params,
-                                        "request_body": body,
-                                        "endpoint_id": step_endpoint_id,
-                                        "endpoint_name": step_endpoint.name or step_endpoint.path
-                                    }
-                                    
-                                    # 执行请求
-                                    import requests
-                                    import json
-                                    step_request_kwargs = {
-                                        'method': step_endpoint.method.upper(),
-                                        'url': step_url,
-                                        'headers': headers,
-                                        'timeout': 30
-                                    }
-                                    
-                                    if query_params:
-                                        step_request_kwargs['params'] = query_params
-                                    
-                                    if body is not None:
-                                        step_request_kwargs['json'] = body
-                                    
-                                    step_start_time = time.time()
-                                    try:
-                                        step_response = requests.request(**step_request_kwargs)
-                                        step_response_time = int((time.time() - step_start_time) * 1000)
-                                        total_flow_time += step_response_time
-                                        
-                                        # 尝试解析响应体
-                                        step_response_body = None
-                                        try:
-                                            step_response_body = step_response.text
-                                            if len(step_response_body) > 5000:
-                                                step_response_body = step_response_body[:5000] + "... (truncated)"
-                                        except:
-                                            step_response_body = str(step_response.content)[:5000] if hasattr(step_response, 'content') else None
-                                        
-                                        step_result["execution_time"] = step_response_time
-                                        step_result["status_code"] = step_response.status_code
-                                        
-                                        # 获取断言信息
-                                        step_assertions_list = step.get("assertions") or []
-                                        
-                                        # 解析响应体为JSON（用于断言验证）
-                                        step_json_body = None
-                                        try:
-                                            step_json_body = step_response.json()
-                                        except:
-                                            step_json_body = None
-                                        
-                                        step_result["details"].update({
-                                            "response_status": step_response.status_code,
-                                            "response_headers": dict(step_response.headers),
-                                            "response_body": step_response_body,
-                                            "response_time": step_response_time,
-                                            "request_assertions": step_assertions_list
-                                        })
-                                        
-                                        # 验证断言
-                                        if step_assertions_list and len(step_assertions_list) > 0:
-                                            step_assertion_success = True
-                                            step_assertion_errors = []
-                                            
-                                            for assertion in step_assertions_list:
-                                                assertion_type = assertion.get('type')
-                                                operator = assertion.get('operator')
-                                                target = assertion.get('target')
-                                                expected = assertion.get('expected')
-                                                
-                                                # 跳过无效的断言
-                                                if not assertion_type or not operator:
-                                                    continue
-                                                
-                                                if assertion_type == 'status_code':
-                                                    # 状态码断言
-                                                    actual_value = step_response.status_code
-                                                    if expected is None or expected == '':
-                                                        step_assertion_success = False
-                                                        step_assertion_errors.append(f"状态码断言失败: 期望值不能为空")
-                                                        continue
-                                                    expected_str = str(expected).strip()
-                                                    if not _check_assertion(actual_value, operator, expected_str):
-                                                        step_assertion_success = False
-                                                        step_assertion_errors.append(f"状态码断言失败: 期望 {expected_str}，实际 {actual_value}")
-                                                
-                                                elif assertion_type == 'json_path':
-                                                    # JSON路径断言
-                                                    if step_json_body and target:
-                                                        # 渲染 expected 值（处理变量替换）
-                                                        if expected:
-                                                            try:
-                                                                expected_rendered = _render_template(expected, context)
-                                                                if isinstance(expected_rendered, str) and expected_rendered.startswith('"') and expected_rendered.endswith('"'):
-                                                                    expected_rendered = expected_rendered[1:-1]
-                                                                expected = expected_rendered
-                                                            except Exception as e:
-                                                                print(f"🔍 渲染 expected 值失败: {e}")
-                                                        
-                                                        actual_value = _extract_json_path(step_json_body, target)
-                                                        print(f"🔍 流程JSON路径断言: path={target}, expected={expected}, actual={actual_value}, operator={operator}")
-                                                        
-                                                        if not _check_assertion(actual_value, operator, expected):
-                                                            step_assertion_success = False
-                                                            step_assertion_errors.append(f"JSON路径断言失败: {target} 期望 {expected}，实际 {_format_value_for_display(actual_value)}")
-                                                    else:
-                                                        step_assertion_success = False
-                                                        step_assertion_errors.append(f"JSON路径断言失败: 无法提取路径 {target}")
-                                                
-                                                elif assertion_type == 'response_time':
-                                                    # 响应时间断言
-                                                    actual_value = step_response_time
-                                                    if not _check_assertion(actual_value, operator, expected):
-                                                        step_assertion_success = False
-                                                        step_assertion_errors.append(f"响应时间断言失败: 期望 {expected}ms，实际 {actual_value}ms")
-                                                
-                                                elif assertion_type == 'contains':
-                                                    # 包含断言
-                                                    if step_json_body:
-                                                        body_str = json.dumps(step_json_body) if isinstance(step_json_body, dict) else str(step_json_body)
-                                                        if expected and expected not in body_str:
-                                                            step_assertion_success = False
-                                                            step_assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
-                                                    else:
-                                                        if expected and expected not in str(step_response_body):
-                                                            step_assertion_success = False
-                                                            step_assertion_errors.append(f"包含断言失败: 响应体中不包含 {expected}")
-                                            
-                                            # 设置步骤成功状态
-                                            step_result["success"] = step_assertion_success
-                                            step_result["details"]["assertion_results"] = step_assertion_errors if step_assertion_errors else ["所有断言通过"]
-                                            
-                                            if not step_assertion_success:
-                                                step_result["error_message"] = "; ".join(step_assertion_errors)
-                                                flow_success = False
-                                                flow_error = f"步骤 {step_idx + 1} 断言失败: {'; '.join(step_assertion_errors)}"
-                                                if fail_action == "stop":
-                                                    flow_result["details"]["steps"].append(step_result)
-                                                    break
-                                        else:
-                                            # 没有断言，使用HTTP状态码判断
-                                            step_result["success"] = step_response.status_code < 400
-                                            if step_response.status_code >= 400:
-                                                step_result["error_message"] = f"HTTP {step_response.status_code}: {step_response_body[:200] if step_response_body else '无响应内容'}"
-                                                flow_success = False
-                                                flow_error = f"步骤 {step_idx + 1} 失败: HTTP {step_response.status_code}"
-                                                if fail_action == "stop":
-                                                    flow_result["details"]["steps"].append(step_result)
-                                                    break
-                                    
-                                    except requests.exceptions.Timeout:
-                                        step_response_time = int((time.time() - step_start_time) * 1000)
-                                        total_flow_time += step_response_time
-                                        step_result["execution_time"] = step_response_time
-                                        step_result["error_message"] = "请求超时 (超过30秒)"
-                                        step_result["details"]["error_type"] = "timeout"
-                                        step_result["success"] = False
-                                        flow_success = False
-                                        flow_error = f"步骤 {step_idx + 1} 超时"
-                                        if fail_action == "stop":
-                                            break
-                                    
-                                    except requests.exceptions.ConnectionError as e:
-                                        step_response_time = int((time.time() - step_start_time) * 1000)
-                                        total_flow_time += step_response_time
-                                        step_result["execution_time"] = step_response_time
-                                        step_result["error_message"] = f"连接错误: {str(e)}"
-                                        step_result["details"]["error_type"] = "connection_error"
-                                        step_result["success"] = False
-                                        flow_success = False
-                                        flow_error = f"步骤 {step_idx + 1} 连接失败: {str(e)}"
-                                        if fail_action == "stop":
-                                            break
-                                    
-                                    except requests.exceptions.RequestException as e:
-                                        step_response_time = int((time.time() - step_start_time) * 1000)
-                                        total_flow_time += step_response_time
-                                        step_result["execution_time"] = step_response_time
-                                        step_result["error_message"] = f"请求异常: {str(e)}"
-                                        step_result["details"]["error_type"] = "request_exception"
-                                        step_result["success"] = False
-                                        flow_success = False
-                                        flow_error = f"步骤 {step_idx + 1} 请求异常: {str(e)}"
-                                        if fail_action == "stop":
-                                            break
-                                    
-                                    except Exception as exc:
-                                        step_response_time = int((time.time() - step_start_time) * 1000) if 'step_start_time' in locals() else 0
-                                        total_flow_time += step_response_time
-                                        step_result["execution_time"] = step_response_time
-                                        step_result["error_message"] = f"执行异常: {str(exc)}"
-                                        step_result["details"]["error_type"] = "execution_error"
-                                        step_result["success"] = False
-                                        flow_success = False
-                                        flow_error = f"步骤 {step_idx + 1} 执行异常: {str(exc)}"
-                                        if fail_action == "stop":
-                                            break
-                                
-                                except Exception as step_error:
-                                    import traceback
-                                    step_result["error_message"] = f"步骤执行异常: {str(step_error)}"
-                                    step_result["details"]["error_type"] = "step_execution_error"
-                                    step_result["details"]["error_traceback"] = traceback.format_exc()
-                                    flow_success = False
-                                    flow_error = f"步骤 {step_idx + 1} 执行异常: {str(step_error)}"
-                                
-                                finally:
-                                    # 将步骤结果添加到流程结果中
-                                    flow_result["details"]["steps"].append(step_result)
-                            
-                            # 将流程的每个步骤转换为独立的执行结果项（用于前端展示）
-                            # 这样前端可以将流程拆分成多个单接口来展示
-                            for step_result_item in flow_result["details"]["steps"]:
-                                step_execution_result = {
-                                    "item_type": "api",  # 标记为api类型，以便前端统一展示
-                                    "item_id": step_result_item.get("details", {}).get("endpoint_id", 0),
-                                    "item_name": step_result_item.get("step_name", ""),
-                                    "success": step_result_item.get("success", False),
-                                    "status_code": step_result_item.get("status_code"),
-                                    "error_message": step_result_item.get("error_message"),
-                                    "execution_time": step_result_item.get("execution_time"),
-                                    "details": {
-                                        "request_url": step_result_item.get("details", {}).get("request_url", ""),
-                                        "request_method": step_result_item.get("details", {}).get("request_method", ""),
-                                        "request_headers": step_result_item.get("details", {}).get("request_headers", {}),
-                                        "request_path_params": step_result_item.get("details", {}).get("request_path_params", {}),
-                                        "request_query_params": step_result_item.get("details", {}).get("request_query_params", {}),
-                                        "request_body": step_result_item.get("details", {}).get("request_body"),
-                                        "request_assertions": step_result_item.get("details", {}).get("request_assertions", []),
-                                        "response_status": step_result_item.get("details", {}).get("response_status"),
-                                        "response_headers": step_result_item.get("details", {}).get("response_headers", {}),
-                                        "response_body": step_result_item.get("details", {}).get("response_body"),
-                                        "response_time": step_result_item.get("details", {}).get("response_time", 0)
-                                    }
-                                }
-                                results.append(step_execution_result)
-                            
-                            # 流程整体结果（不再添加到results，因为已经将每个步骤作为独立项添加了）
-                            flow_result["success"] = flow_success
-                            flow_result["execution_time"] = total_flow_time
-                            flow_result["error_message"] = flow_error
-                            flow_result["details"]["environment"] = {
-                                "id": env.id,
-                                "name": env.name,
-                                "base_url": env.base_url
-                            }
-                            
-                            # 注意：流程的整体结果不再添加到 results 中，因为我们已经将每个步骤作为独立的项添加了
-                            # 这样前端就可以将流程拆分成多个单接口来展示
-                            # 统计成功和失败数量
-                            for step_result_item in flow_result["details"]["steps"]:
-                                if step_result_item.get("success", False):
-                                    success_count += 1
-                                else:
-                                    failed_count += 1
-                        
-                        except Exception as flow_error:
-                            import traceback
-                            error_msg = str(flow_error)
-                            traceback.print_exc()
-                            flow_result["error_message"] = f"执行失败: {error_msg}"
-                            flow_result["details"]["error_type"] = "flow_execution_error"
-                            flow_result["details"]["error_traceback"] = traceback.format_exc()
-                            failed_count += 1
-                        
-                        finally:
-                            # 注意：流程的整体结果不再添加到 results 中，因为我们已经将每个步骤作为独立的项添加了
-                            # results.append(flow_result)  # 已移除
-                            pass
-                
-                except Exception as e:
-                    import traceback
-                    error_msg = str(e)
-                    traceback.print_exc()
-                    results.append({
-                        "item_type": item.item_type,
-                        "item_id": item.item_id,
-                        "item_name": f"{item.item_type} {item.item_id}",
-                        "success": False,
-                        "error_message": error_msg
-                    })
-                    failed_count += 1
-            
-            # 更新执行记录（确保所有结果都被记录）
-            try:
-                db_execution = db_session.query(models.TestTaskExecution).filter(
-                    models.TestTaskExecution.id == execution.id
-                ).first()
-                if db_execution:
-                    db_execution.status = 'success' if failed_count == 0 else 'failed'
-                    db_execution.success_count = success_count
-                    db_execution.failed_count = failed_count
-                    db_execution.total_count = len(results)  # 确保总数正确
-                    # 确保 execution_results 是 JSON 格式（列表）
-                    if results:
-                        db_execution.execution_results = results  # 保存所有执行结果
-                        print(f"✅ 保存执行记录: task_id={task_id}, execution_id={execution.id}, results_count={len(results)}, success={success_count}, failed={failed_count}")
-                        # 打印第一个结果的示例（用于调试）
-                        if results:
-                            import json
-                            print(f"   执行结果示例: {json.dumps(results[0], ensure_ascii=False, indent=2)[:500]}")
-                    else:
-                        db_execution.execution_results = []  # 如果没有结果，保存空数组
-                        print(f"⚠️ 执行记录为空: task_id={task_id}, execution_id={execution.id}")
-                    db_execution.completed_at = datetime.now()
-                    if failed_count > 0 and not db_execution.error_message:
-                        # 如果有失败，记录汇总错误信息
-                        failed_items = [r for r in results if not r.get("success", False)]
-                        error_summary = f"共 {failed_count} 个接口/流程执行失败"
-                        if failed_items:
-                            error_summary += f"，失败项: {', '.join([r.get('item_name', '未知') for r in failed_items[:5]])}"
-                            if len(failed_items) > 5:
-                                error_summary += f" 等"
-                        db_execution.error_message = error_summary
-                    db_session.commit()
-                
-                # 更新任务状态
-                db_task = db_session.query(models.TestTask).filter(models.TestTask.id == task_id).first()
-                if db_task:
-                    db_task.status = 'success' if failed_count == 0 else 'failed'
-                    db_session.commit()
-            except Exception as commit_error:
-                import traceback
-                print(f"❌ 更新执行记录失败: {commit_error}")
-                traceback.print_exc()
-                # 尝试回滚并重新提交
-                try:
-                    db_session.rollback()
-                    db_session.commit()
-                except:
-                    pass
-        
-        except Exception as e:
-            import traceback
-            error_msg = str(e)
-            traceback.print_exc()
-            # 即使出现异常，也要尝试保存已收集的结果
-            try:
-                db_execution = db_session.query(models.TestTaskExecution).filter(
-                    models.TestTaskExecution.id == execution.id
-                ).first()
-                if db_execution:
-                    # 保存已收集的结果（即使不完整）
-                    if results:
-                        db_execution.execution_results = results
-                        db_execution.success_count = success_count
-                        db_execution.failed_count = failed_count
-                        db_execution.total_count = len(results)
-                    else:
-                        db_execution.execution_results = []  # 如果没有结果，保存空数组
-                        db_execution.total_count = 0
-                    db_execution.status = 'failed'
-                    db_execution.error_message = f"任务执行异常: {error_msg}"
-                    db_execution.completed_at = datetime.now()
-                    print(f"❌ 保存异常执行记录: task_id={task_id}, execution_id={execution.id}, results_count={len(results) if results else 0}")
-                    db_session.commit()
-                
-                db_task = db_session.query(models.TestTask).filter(models.TestTask.id == task_id).first()
-                if db_task:
-                    db_task.status = 'failed'
-                    db_session.commit()
-            except Exception as save_error:
-                import traceback
-                print(f"❌ 保存异常执行记录失败: {save_error}")
-                traceback.print_exc()
-        finally:
-            try:
-                db_session.close()
-            except:
-                pass
-    
-    thread = threading.Thread(target=run_task)
-    thread.daemon = True
-    thread.start()
+    job_workers.notify()
     
     return execution
 
@@ -8322,10 +7142,16 @@ def get_test_task_execution(
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user)
 ):
-    """获取测试任务执行记录详情"""
+    """
+    获取测试任务执行记录详情（包含全部结果）
+
+    结果较多时建议使用 /summary 和分页的 /items 接口
+    """
     require_permission(current_user.role, "apitest", "read")
     
-    execution = db.query(models.TestTaskExecution).filter(
+    execution = db.query(models.TestTaskExecution).options(
+        defer(models.TestTaskExecution.execution_results)
+    ).filter(
         models.TestTaskExecution.id == execution_id,
         models.TestTaskExecution.task_id == task_id
     ).first()
@@ -8333,9 +7159,245 @@ def get_test_task_execution(
     if not execution:
         raise HTTPException(status_code=404, detail="执行记录不存在")
     
+    rows = db.query(models.TestTaskExecutionItem).filter(
+        models.TestTaskExecutionItem.execution_id == execution_id
+    ).order_by(models.TestTaskExecutionItem.item_index, models.TestTaskExecutionItem.result_index).all()
+    result = schemas.TestTaskExecutionSummary.model_validate(execution).model_dump()
+    # 旧执行记录的结果仍保存在 execution_results 中
+    result["execution_results"] = load_item_results(db, rows) if rows else (execution.execution_results or [])
+    return result
+
+
+@app.get("/api/test-tasks/{task_id}/executions/{execution_id}/summary", response_model=schemas.TestTaskExecutionSummary)
+def get_test_task_execution_summary(
+    task_id: int,
+    execution_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """获取执行记录摘要（状态和计数，不读取结果明细）"""
+    require_permission(current_user.role, "apitest", "read")
+
+    execution = db.query(
+        models.TestTaskExecution.id,
+        models.TestTaskExecution.task_id,
+        models.TestTaskExecution.environment_id,
+        models.TestTaskExecution.status,
+        models.TestTaskExecution.total_count,
+        models.TestTaskExecution.success_count,
+        models.TestTaskExecution.failed_count,
+        models.TestTaskExecution.error_message,
+        models.TestTaskExecution.started_at,
+        models.TestTaskExecution.completed_at
+    ).filter(
+        models.TestTaskExecution.id == execution_id,
+        models.TestTaskExecution.task_id == task_id
+    ).first()
+    if not execution:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
     return execution
 
 
+@app.get("/api/test-tasks/{task_id}/executions/{execution_id}/timings")
+def get_test_task_execution_timings(
+    task_id: int,
+    execution_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    请求分阶段耗时报告
+
+    汇总本次执行中所有请求的 DNS、建立连接、TLS、发送、服务端处理、下载和总耗时的分位数，
+    以及每个接口（流程按步骤）各自的统计
+    """
+    require_permission(current_user.role, "apitest", "read")
+
+    execution = db.query(models.TestTaskExecution.id).filter(
+        models.TestTaskExecution.id == execution_id,
+        models.TestTaskExecution.task_id == task_id
+    ).first()
+    if not execution:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
+
+    rows = db.query(
+        models.TestTaskExecutionItem.item_type,
+        models.TestTaskExecutionItem.item_id,
+        models.TestTaskExecutionItem.item_name,
+        models.TestTaskExecutionItem.timings,
+    ).filter(
+        models.TestTaskExecutionItem.execution_id == execution_id
+    ).order_by(models.TestTaskExecutionItem.item_index, models.TestTaskExecutionItem.result_index).all()
+
+    overall = PhaseStats()
+    items: Dict[tuple, PhaseStats] = {}
+    for row in rows:
+        if not row.timings:
+            continue
+        overall.record(row.timings)
+        key = (row.item_type, row.item_id, row.item_name)
+        if key not in items:
+            items[key] = PhaseStats()
+        items[key].record(row.timings)
+
+    return {
+        "execution_id": execution_id,
+        **overall.to_dict(),
+        "items": [
+            {"item_type": item_type, "item_id": item_id, "item_name": item_name, **stats.to_dict()}
+            for (item_type, item_id, item_name), stats in items.items()
+        ],
+    }
+
+
+@app.get("/api/test-tasks/{task_id}/executions/{execution_id}/items", response_model=schemas.TestTaskExecutionItemList)
+def get_test_task_execution_items(
+    task_id: int,
+    execution_id: int,
+    success: Optional[bool] = None,
+    item_type: Optional[str] = None,
+    item_id: Optional[int] = None,
+    keyword: Optional[str] = None,
+    include_details: bool = True,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    分页查询执行结果明细
+
+    Args:
+        success: 只看成功/失败的结果
+        item_type: 类型（api / flow）
+        item_id: 接口/流程ID
+        keyword: 按名称模糊匹配
+        include_details: 是否返回请求/响应详情
+    """
+    require_permission(current_user.role, "apitest", "read")
+
+    exists = db.query(models.TestTaskExecution.id).filter(
+        models.TestTaskExecution.id == execution_id,
+        models.TestTaskExecution.task_id == task_id
+    ).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
+
+    Item = models.TestTaskExecutionItem
+    query = db.query(Item).filter(Item.execution_id == execution_id)
+    if success is not None:
+        query = query.filter(Item.success == success)
+    if item_type:
+        query = query.filter(Item.item_type == item_type)
+    if item_id is not None:
+        query = query.filter(Item.item_id == item_id)
+    if keyword:
+        query = query.filter(Item.item_name.contains(keyword))
+    if not include_details:
+        query = query.options(defer(Item.details))
+    total = query.count()
+    rows = query.order_by(Item.item_index, Item.result_index).offset((page - 1) * page_size).limit(page_size).all()
+    # 转成字典，details 中的请求/响应内容从 content_blobs 批量读取
+    items = [dict(
+        result,
+        id=row.id,
+        execution_id=row.execution_id,
+        item_index=row.item_index,
+        result_index=row.result_index,
+        created_at=row.created_at,
+    ) for row, result in zip(rows, load_item_results(db, rows, include_details))]
+    return {"total": total, "items": items, "page": page, "page_size": page_size}
+
+
+# 执行进度推送的轮询间隔（秒）
+EXECUTION_STREAM_POLL_SECONDS = float(os.getenv("EXECUTION_STREAM_POLL_SECONDS", "1"))
+# 没有新进度时发送心跳注释的间隔（秒），避免代理断开空闲连接
+EXECUTION_STREAM_PING_SECONDS = 15
+
+
+def _sse_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _task_execution_exists(db: Session, task_id: int, execution_id: int) -> bool:
+    return db.query(models.TestTaskExecution.id).filter(
+        models.TestTaskExecution.id == execution_id,
+        models.TestTaskExecution.task_id == task_id
+    ).first() is not None
+
+
+@app.get("/api/test-tasks/{task_id}/executions/{execution_id}/stream")
+async def stream_test_task_execution(
+    task_id: int,
+    execution_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_stream_user)
+):
+    """
+    实时推送执行进度（Server-Sent Events）
+
+    事件类型：
+    - item：一条执行结果（id 为明细ID，data 含 item_index / result_index / result）
+    - progress：当前状态和成功/失败计数
+    - done：执行结束，data 为最终状态和计数，之后连接关闭
+
+    断线重连时浏览器会带上 Last-Event-ID，从该明细之后继续推送；也可以通过 last_event_id 参数指定。
+    浏览器 EventSource 无法设置 Authorization 头，可通过 access_token 参数传递 token。
+    """
+    require_permission(current_user.role, "apitest", "read")
+
+    exists = await run_in_threadpool(_task_execution_exists, db, task_id, execution_id)
+    if not exists:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
+
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id") or "0"
+    try:
+        last_id = max(0, int(last_event_id))
+    except ValueError:
+        last_id = 0
+
+    async def event_stream():
+        nonlocal last_id
+        last_counts = None
+        last_sent = time.time()
+        while not await request.is_disconnected():
+            progress = await run_in_threadpool(read_execution_progress, execution_id, last_id)
+            if progress is None:
+                yield _sse_event("done", {"status": "deleted"})
+                return
+            for item in progress["items"]:
+                last_id = item["id"]
+                yield _sse_event("item", item, item["id"])
+            counts = {key: progress[key] for key in ("status", "total_count", "success_count", "failed_count")}
+            if counts != last_counts:
+                last_counts = counts
+                yield _sse_event("progress", counts)
+                last_sent = time.time()
+            elif progress["items"]:
+                last_sent = time.time()
+            if progress["has_more"]:
+                continue
+            if progress["status"] != 'running':
+                yield _sse_event("done", dict(counts, error_message=progress["error_message"]))
+                return
+            if time.time() - last_sent >= EXECUTION_STREAM_PING_SECONDS:
+                yield ": ping\n\n"
+                last_sent = time.time()
+            await asyncio.sleep(EXECUTION_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ==================== 测试文件管理 ====================
 
 # 文件上传目录配置
@@ -8666,6 +7728,21 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/password-hashing")
+def password_hashing_stats():
+    """密码哈希进程池的排队统计"""
+    return password_hasher.stats()
+
+@app.get("/health/http-clients")
+def http_client_stats():
+    """出站 HTTP 连接池统计"""
+    return http_clients.stats()
+
+@app.get("/health/blob-store")
+def blob_store_stats(db: Session = Depends(get_db)):
+    """请求/响应内容存储的条数与压缩前后大小"""
+    return blob_store.stats(db)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=43211)
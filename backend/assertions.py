@@ -0,0 +1,172 @@
+"""接口断言
+
+单接口执行、流程执行和测试任务执行共用：断言在执行前编译一次（compile_assertions），
+比较符和期望值的转换（null、JSON 数组/对象、数字）在编译时完成，执行时只做判断。
+JSON 路径断言的期望值引用了变量时，每次执行先渲染，渲染结果的比较规则按期望值缓存（api_runtime.check_assertion）。
+
+断言类型：
+
+- status_code：响应状态码
+- json_path：响应体 JSON 中 target 路径的值
+- response_time：响应时间（毫秒）
+- contains：响应体包含期望值
+- schema：响应体符合接口的 OpenAPI 响应结构（按状态码选择，见 schema_validator），不需要比较符和期望值
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+import exec_log
+import schema_validator
+from api_runtime import check_assertion, compile_comparison, extract_json_path, format_value_for_display, render_template
+
+ASSERTION_TYPES = ("status_code", "json_path", "response_time", "contains", "schema")
+
+
+def _has_template(value: Any) -> bool:
+    return isinstance(value, str) and ('$' in value or '{{' in value or 'NUM(' in value or 'STR(' in value)
+
+
+def _strip_quotes(value: Any) -> Any:
+    # 渲染后是带引号的字符串时去掉引号（如 STR($name) 的结果）
+    if isinstance(value, str) and len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        return value[1:-1]
+    return value
+
+
+class CompiledAssertion:
+    """编译后的断言"""
+    __slots__ = ("type", "operator", "target", "expected", "check", "template")
+
+    def __init__(self, assertion_type: str, operator: Optional[str], target: Any, expected: Any):
+        self.type = assertion_type
+        self.operator = operator
+        self.target = target
+        self.expected = expected
+        # 期望值引用了变量（只对 json_path 断言渲染）
+        self.template = assertion_type == 'json_path' and _has_template(expected)
+        self.check: Optional[Callable[[Any], bool]] = None
+        if assertion_type == 'status_code':
+            if expected is not None and expected != '':
+                self.expected = str(expected).strip()
+                self.check = compile_comparison(operator, self.expected)
+        elif assertion_type == 'json_path':
+            self.expected = _strip_quotes(expected) if not self.template else expected
+            self.check = compile_comparison(operator, self.expected)
+        elif assertion_type == 'response_time':
+            self.check = compile_comparison(operator, expected)
+        elif assertion_type == 'contains':
+            self.expected = expected if isinstance(expected, str) or expected is None else str(expected)
+
+
+def compile_assertions(assertions: Any) -> List[CompiledAssertion]:
+    """
+    编译断言列表，跳过没有类型或比较符（schema 断言除外）的断言
+
+    Args:
+        assertions: 断言列表 [{type, operator, target, expected}]
+
+    Returns:
+        编译后的断言
+    """
+    compiled = []
+    if not isinstance(assertions, list):
+        return compiled
+    for assertion in assertions:
+        if not isinstance(assertion, dict):
+            continue
+        assertion_type = assertion.get('type')
+        operator = assertion.get('operator')
+        if not assertion_type or (not operator and assertion_type != 'schema'):
+            continue
+        compiled.append(CompiledAssertion(assertion_type, operator, assertion.get('target'), assertion.get('expected')))
+    return compiled
+
+
+def evaluate_assertions(
+    compiled: List[CompiledAssertion],
+    response,
+    response_time: int,
+    context: Optional[Dict[str, Any]] = None,
+    endpoint=None,
+    step: Optional[int] = None,
+) -> List[str]:
+    """
+    检查响应是否满足断言
+
+    Args:
+        compiled: compile_assertions 的结果
+        response: 响应（http_client.CapturedResponse），JSON 只在需要时解析一次
+        response_time: 响应时间（毫秒）
+        context: 渲染 JSON 路径断言期望值的变量上下文，为 None 时不渲染
+        endpoint: 接口（schema 断言使用其响应结构）
+        step: 流程步骤序号（调试日志使用）
+
+    Returns:
+        失败的断言信息列表，为空表示全部通过
+    """
+    errors = []
+    body_text = None
+    for assertion in compiled:
+        assertion_type = assertion.type
+
+        if assertion_type == 'status_code':
+            if assertion.check is None:
+                errors.append("状态码断言失败: 期望值不能为空")
+            elif not assertion.check(response.status_code):
+                errors.append(f"状态码断言失败: 期望 {assertion.expected}，实际 {response.status_code}")
+
+        elif assertion_type == 'json_path':
+            json_body = response.parsed_json()
+            target = assertion.target
+            if not json_body or not target:
+                errors.append(f"JSON路径断言失败: 无法提取路径 {target}")
+                continue
+            expected, check = assertion.expected, assertion.check
+            if assertion.template and context is not None:
+                try:
+                    expected = _strip_quotes(render_template(expected, context))
+                    check = None
+                except Exception as e:
+                    exec_log.debug("assertion.expected_render_failed", {"step": step, "expected": expected, "error": str(e)})
+            actual_value = extract_json_path(json_body, target)
+            exec_log.debug("assertion.json_path", lambda: {
+                "step": step, "path": target, "expected": expected, "actual": actual_value,
+            })
+            passed = check(actual_value) if check is not None else check_assertion(actual_value, assertion.operator, expected)
+            if not passed:
+                errors.append(f"JSON路径断言失败: {target} 期望 {expected}，实际 {format_value_for_display(actual_value)}")
+
+        elif assertion_type == 'response_time':
+            if not assertion.check(response_time):
+                errors.append(f"响应时间断言失败: 期望 {assertion.expected}ms，实际 {response_time}ms")
+
+        elif assertion_type == 'contains':
+            if not assertion.expected:
+                continue
+            if body_text is None:
+                json_body = response.parsed_json()
+                if json_body:
+                    body_text = json.dumps(json_body) if isinstance(json_body, dict) else str(json_body)
+                else:
+                    body_text = response.text
+            if assertion.expected not in body_text:
+                errors.append(f"包含断言失败: 响应体中不包含 {assertion.expected}")
+
+        elif assertion_type == 'schema':
+            error = _check_schema(response, endpoint)
+            if error:
+                errors.append(f"响应结构断言失败: {error}")
+    return errors
+
+
+def _check_schema(response, endpoint) -> Optional[str]:
+    validate = schema_validator.validator_for(endpoint, response.status_code) if endpoint is not None else None
+    if validate is None:
+        return f"接口没有状态码 {response.status_code} 的响应结构定义（请从 OpenAPI 文档同步接口）"
+    if response.truncated:
+        return "响应体超过读取上限，无法校验"
+    json_body = response.parsed_json()
+    if json_body is None and response.content.strip() != b"null":
+        return "响应体不是有效的 JSON"
+    problems = validate(json_body)
+    return "；".join(problems) if problems else None
@@ -1,23 +1,34 @@
 """认证相关工具函数"""
-import bcrypt
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status, Request
+from collections import OrderedDict
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 import hashlib
+import os
+import threading
+import time
+
+import models
+from config import get_db
+from password_hasher import password_hasher
 
 # JWT 配置
 SECRET_KEY = "your-secret-key-here-change-in-production"  # 生产环境应该使用环境变量
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24小时
 
+# 已验证 token 缓存配置
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))  # 最多缓存的 token 数
+SESSION_REVOCATION_CHECK_SECONDS = int(os.getenv("SESSION_REVOCATION_CHECK_SECONDS", "30"))  # 会话吊销状态的复查间隔
+
 
 def hash_password(password: str) -> str:
     """
-    加密密码
+    加密密码（在密码哈希进程池中执行）
     
     Args:
         password: 明文密码
@@ -25,16 +36,12 @@ def hash_password(password: str) -> str:
     Returns:
         加密后的密码
     """
-    # bcrypt 限制密码最多 72 字节
-    password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
+    return password_hasher.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    验证密码
+    验证密码（在密码哈希进程池中执行）
     
     Args:
         plain_password: 明文密码
@@ -43,10 +50,12 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         是否匹配
     """
-    # bcrypt 限制密码最多 72 字节
-    password_bytes = plain_password.encode('utf-8')[:72]
-    hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """密码哈希的工作因子与当前配置（BCRYPT_ROUNDS）不一致时返回 True"""
+    return password_hasher.needs_rehash(hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -88,6 +97,11 @@ def decode_access_token(token: str) -> Optional[dict]:
         return None
 
 
+def hash_token(token: str) -> str:
+    """计算 token 的哈希值（与 UserSession.token_hash 一致）"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 # HTTP Bearer 安全方案
 security = HTTPBearer(auto_error=False)
 
@@ -97,14 +111,102 @@ class CurrentUser(BaseModel):
     id: int
     username: str
     role: str
+    token_hash: Optional[str] = None  # 当前请求 token 的哈希值
+
+
+class _VerifiedToken:
+    """已验证 token 的缓存项"""
+    __slots__ = ("user", "expires_at", "checked_at", "revoked")
 
+    def __init__(self, user: CurrentUser, expires_at: Optional[float]):
+        self.user = user
+        self.expires_at = expires_at  # token 的 exp（Unix 时间戳）
+        self.checked_at = None  # 上次复查会话状态的时间（monotonic）
+        self.revoked = False
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> CurrentUser:
+
+class VerifiedTokenCache:
+    """
+    已验证 token 的 LRU 缓存（线程安全）
+
+    以 token 的 SHA-256 摘要为键，缓存签名校验后的用户信息，过期时间不超过 token 的 exp。
+    会话吊销状态每隔 revalidate_seconds 复查一次，本进程内的登出会立即生效。
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, revalidate_seconds: int = SESSION_REVOCATION_CHECK_SECONDS):
+        self.maxsize = maxsize
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: "OrderedDict[str, _VerifiedToken]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str) -> Optional[_VerifiedToken]:
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.time():
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return entry
+
+    def put(self, token_hash: str, user: CurrentUser, expires_at: Optional[float]) -> _VerifiedToken:
+        entry = _VerifiedToken(user, expires_at)
+        with self._lock:
+            self._entries[token_hash] = entry
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def needs_revocation_check(self, entry: _VerifiedToken) -> bool:
+        return entry.checked_at is None or time.monotonic() - entry.checked_at >= self.revalidate_seconds
+
+    def mark_checked(self, entry: _VerifiedToken, revoked: bool) -> None:
+        entry.checked_at = time.monotonic()
+        entry.revoked = revoked
+
+    def revoke(self, token_hash: str) -> None:
+        """标记 token 已吊销（登出时调用）"""
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is not None:
+                entry.revoked = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache()
+
+
+def is_session_revoked(db: Session, token_hash: str) -> bool:
+    """
+    检查 token 对应的会话是否已被吊销
+
+    没有会话记录的 token（例如会话表创建失败时签发的）视为未吊销。
+    """
+    try:
+        row = db.query(models.UserSession.is_active).filter(
+            models.UserSession.token_hash == token_hash
+        ).order_by(models.UserSession.id.desc()).first()
+    except Exception:
+        db.rollback()
+        return False
+    return row is not None and not row[0]
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
     """
     获取当前登录用户
     
     Args:
         credentials: HTTP Bearer 凭证
+        db: 数据库会话（仅在需要复查会话状态时使用）
     
     Returns:
         当前用户信息
@@ -120,26 +222,69 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    token = credentials.credentials
-    payload = decode_access_token(token)
+    return _authenticate(credentials.credentials, db)
+
+
+def get_stream_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    access_token: Optional[str] = Query(None, description="浏览器 EventSource 无法设置请求头时通过该参数传递 token"),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    """
+    获取当前登录用户（Server-Sent Events 接口使用）
     
-    if payload is None:
+    优先使用 Authorization 头，未提供时使用 access_token 查询参数。
+    """
+    if credentials is not None:
+        return _authenticate(credentials.credentials, db)
+    if not access_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证令牌",
+            detail="未提供认证信息",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return _authenticate(access_token, db)
+
+
+def _authenticate(token: str, db: Session) -> CurrentUser:
+    """校验 token 并返回用户，认证失败时抛出 401"""
+    token_hash = hash_token(token)
+    entry = token_cache.get(token_hash)
+    
+    if entry is None:
+        payload = decode_access_token(token)
+        
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="无效的认证令牌",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user_id = payload.get("sub")
+        username = payload.get("username")
+        role = payload.get("role")
+        
+        if user_id is None or username is None or role is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="认证令牌格式错误",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user = CurrentUser(id=int(user_id), username=username, role=role, token_hash=token_hash)
+        entry = token_cache.put(token_hash, user, payload.get("exp"))
     
-    user_id = payload.get("sub")
-    username = payload.get("username")
-    role = payload.get("role")
+    # 会话吊销状态按间隔复查，避免每个请求都查询数据库
+    if not entry.revoked and token_cache.needs_revocation_check(entry):
+        token_cache.mark_checked(entry, is_session_revoked(db, token_hash))
     
-    if user_id is None or username is None or role is None:
+    if entry.revoked:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="认证令牌格式错误",
+            detail="登录已失效，请重新登录",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return CurrentUser(id=int(user_id), username=username, role=role)
+    return entry.user
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""启动耗时基准：在全新子进程中多次导入 app 模块，统计导入耗时和进程总耗时
+
+用法：
+    python bench_startup.py            # 默认 5 次
+    python bench_startup.py -n 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def run_once(cwd: str) -> tuple:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - started
+    import_seconds = float(out.stdout.strip().splitlines()[-1])
+    return import_seconds, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量 app 模块冷启动耗时")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="运行次数")
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    imports, walls = [], []
+    for i in range(args.runs):
+        import_seconds, wall = run_once(cwd)
+        imports.append(import_seconds)
+        walls.append(wall)
+        print(f"第 {i + 1} 次: import app {import_seconds * 1000:.0f} ms, 进程总耗时 {wall * 1000:.0f} ms")
+
+    print("")
+    print(f"import app: 中位数 {statistics.median(imports) * 1000:.0f} ms, 最小 {min(imports) * 1000:.0f} ms")
+    print(f"进程总耗时: 中位数 {statistics.median(walls) * 1000:.0f} ms, 最小 {min(walls) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""请求/响应内容存储
+
+执行记录中的请求头、请求体、响应头、响应体（以及开启 debug 时的调试日志）按内容的 SHA-256 存入 content_blobs 表并压缩，
+记录本身只保存 {字段名: 内容哈希}。相同的内容（健康检查、固定的列表接口、环境公共请求头等）只存一份。
+
+压缩算法：安装了 zstandard 时默认使用 zstd，否则使用 gzip；每条内容记录自己的算法，
+切换配置后旧数据仍可读取。小于 BLOB_MIN_BYTES 的内容直接保存在记录中。
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+import models
+
+# 压缩算法：zstd | gzip | none
+BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "zstd").lower()
+# 序列化后小于该字节数的内容不单独存储
+BLOB_MIN_BYTES = int(os.getenv("BLOB_MIN_BYTES", "128"))
+# 压缩级别
+BLOB_ZSTD_LEVEL = int(os.getenv("BLOB_ZSTD_LEVEL", "3"))
+BLOB_GZIP_LEVEL = int(os.getenv("BLOB_GZIP_LEVEL", "6"))
+# 重复内容再次被引用时，距上次记录超过该时长才更新 last_referenced_at（减少写入）
+BLOB_TOUCH_INTERVAL = timedelta(hours=1)
+
+# 单独存储的字段
+PAYLOAD_FIELDS = ("request_headers", "request_body", "response_headers", "response_body", "debug_log")
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+_codec: Optional[str] = None
+
+
+def _resolve_codec() -> str:
+    """第一次写入内容时确定压缩算法（导入模块时不检查 zstandard）"""
+    global _codec
+    if _codec is None:
+        name = BLOB_COMPRESSION
+        if name == "zstd" and _zstd() is None:
+            print("⚠️ 未安装 zstandard，内容存储使用 gzip 压缩")
+            name = "gzip"
+        _codec = name if name in ("zstd", "gzip") else "none"
+    return _codec
+
+
+def _compress(raw: bytes) -> Tuple[str, bytes]:
+    codec = _resolve_codec()
+    if codec == "zstd":
+        data = _zstd().ZstdCompressor(level=BLOB_ZSTD_LEVEL).compress(raw)
+    elif codec == "gzip":
+        data = gzip.compress(raw, compresslevel=BLOB_GZIP_LEVEL, mtime=0)
+    else:
+        return "none", raw
+    # 压缩后没有变小（如已压缩的图片）时原样保存
+    return (codec, data) if len(data) < len(raw) else ("none", raw)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return _zstd().ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def put(db: Session, value: Any) -> Optional[str]:
+    """
+    保存内容（已存在时只更新引用时间），由调用方提交事务
+
+    Args:
+        db: 数据库会话
+        value: 可 JSON 序列化的值
+
+    Returns:
+        内容哈希；内容过小不需要单独存储时返回 None
+    """
+    if value is None:
+        return None
+    raw = _encode(value)
+    if len(raw) < BLOB_MIN_BYTES:
+        return None
+    digest = hashlib.sha256(raw).hexdigest()
+    now = datetime.now()
+
+    last_referenced_at = db.query(models.ContentBlob.last_referenced_at).filter(
+        models.ContentBlob.hash == digest
+    ).scalar()
+    if last_referenced_at is not None:
+        if now - last_referenced_at > BLOB_TOUCH_INTERVAL:
+            db.query(models.ContentBlob).filter(models.ContentBlob.hash == digest).update(
+                {models.ContentBlob.last_referenced_at: now}, synchronize_session=False
+            )
+        return digest
+
+    codec, data = _compress(raw)
+    try:
+        with db.begin_nested():
+            db.add(models.ContentBlob(
+                hash=digest,
+                codec=codec,
+                raw_size=len(raw),
+                stored_size=len(data),
+                data=data,
+                created_at=now,
+                last_referenced_at=now,
+            ))
+    except IntegrityError:
+        # 其他请求同时写入了相同内容
+        pass
+    return digest
+
+
+def get_many(db: Session, hashes: Iterable[str]) -> Dict[str, Any]:
+    """批量读取内容，返回 {哈希: 值}（不存在的哈希不出现在结果中）"""
+    hashes = {h for h in hashes if h}
+    if not hashes:
+        return {}
+    values = {}
+    for digest, codec, data in db.query(
+        models.ContentBlob.hash, models.ContentBlob.codec, models.ContentBlob.data
+    ).filter(models.ContentBlob.hash.in_(hashes)):
+        values[digest] = json.loads(_decompress(codec, data).decode("utf-8"))
+    return values
+
+
+def offload(db: Session, values: Dict[str, Any], fields: Sequence[str] = PAYLOAD_FIELDS) -> Dict[str, str]:
+    """
+    将 values 中的大字段存为内容记录，并在 values 中置为 None
+
+    Returns:
+        {字段名: 内容哈希}，写入记录的 blob_refs
+    """
+    refs = {}
+    for field in fields:
+        digest = put(db, values.get(field))
+        if digest:
+            refs[field] = digest
+            values[field] = None
+    return refs
+
+
+def hydrate(db: Session, records: List[Any]) -> None:
+    """为带 blob_refs 的 ORM 记录填回原始字段（不会标记为已修改）"""
+    blobs = get_many(db, (h for record in records for h in (record.blob_refs or {}).values()))
+    for record in records:
+        for field, digest in (record.blob_refs or {}).items():
+            if digest in blobs:
+                set_committed_value(record, field, blobs[digest])
+
+
+def hydrate_dicts(db: Session, pairs: List[Tuple[Dict[str, Any], Optional[Dict[str, str]]]]) -> None:
+    """为 (字典, blob_refs) 列表填回原始字段"""
+    blobs = get_many(db, (h for _, refs in pairs for h in (refs or {}).values()))
+    for values, refs in pairs:
+        for field, digest in (refs or {}).items():
+            if digest in blobs:
+                values[field] = blobs[digest]
+
+
+def stats(db: Session) -> Dict[str, int]:
+    """内容存储的条数、原始大小与实际占用"""
+    count, raw_size, stored_size = db.query(
+        func.count(models.ContentBlob.hash),
+        func.coalesce(func.sum(models.ContentBlob.raw_size), 0),
+        func.coalesce(func.sum(models.ContentBlob.stored_size), 0),
+    ).one()
+    return {"codec": _resolve_codec(), "blobs": count, "raw_bytes": int(raw_size), "stored_bytes": int(stored_size)}
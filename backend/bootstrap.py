@@ -0,0 +1,76 @@
+"""数据库初始化命令：创建数据表、确保默认管理员存在
+
+部署或升级后执行一次即可，应用导入/启动时不再做这些操作：
+
+    python bootstrap.py
+    python bootstrap.py --reset-admin-password   # 同时把 admin 密码重置为 admin123
+"""
+import argparse
+import traceback
+
+import models
+from config import engine, SessionLocal
+from auth import hash_password, verify_password
+
+DEFAULT_ADMIN_USERNAME = 'admin'
+DEFAULT_ADMIN_PASSWORD = 'admin123'
+
+
+def init_database():
+    """创建数据库表（已存在的表会跳过）"""
+    models.Base.metadata.create_all(bind=engine)
+
+
+def init_default_admin(reset_password: bool = False):
+    """
+    初始化默认管理员用户
+
+    Args:
+        reset_password: admin 已存在时是否把密码重置为默认密码
+    """
+    db = SessionLocal()
+    try:
+        # 检查 admin 用户是否存在
+        admin_user = db.query(models.User).filter(models.User.username == DEFAULT_ADMIN_USERNAME).first()
+        if not admin_user:
+            # 创建默认管理员用户
+            admin_user = models.User(
+                username=DEFAULT_ADMIN_USERNAME,
+                email='admin@example.com',
+                password=hash_password(DEFAULT_ADMIN_PASSWORD),
+                display_name='系统管理员',
+                roles=['admin'],
+                status='active'
+            )
+            db.add(admin_user)
+            db.commit()
+            print(f"✅ 已创建默认管理员用户: {DEFAULT_ADMIN_USERNAME}/{DEFAULT_ADMIN_PASSWORD}")
+        elif reset_password and not verify_password(DEFAULT_ADMIN_PASSWORD, admin_user.password):
+            admin_user.password = hash_password(DEFAULT_ADMIN_PASSWORD)
+            db.commit()
+            print(f"✅ 已重置 admin 用户密码为: {DEFAULT_ADMIN_PASSWORD}")
+        else:
+            print("ℹ️  管理员用户已存在")
+    except Exception as e:
+        print(f"⚠️  初始化管理员用户时出错: {e}")
+        traceback.print_exc()
+        db.rollback()
+    finally:
+        db.close()
+
+
+def run_bootstrap(reset_admin_password: bool = False):
+    """建表并初始化默认管理员（幂等，可重复执行）"""
+    init_database()
+    init_default_admin(reset_password=reset_admin_password)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="初始化数据库表和默认管理员")
+    parser.add_argument("--reset-admin-password", action="store_true", help="将 admin 密码重置为默认密码")
+    args = parser.parse_args()
+    run_bootstrap(reset_admin_password=args.reset_admin_password)
+
+
+if __name__ == "__main__":
+    main()
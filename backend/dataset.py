@@ -0,0 +1,132 @@
+"""数据驱动执行的数据集
+
+流程按数据集逐行执行，每行是一组变量 {列名: 值}，来源：
+
+- 测试文件（TestFile）：CSV / XLSX 第一行为列名；JSON 为对象数组
+- 请求中的 rows：对象数组
+- 请求中的 matrix：{变量名: [取值, ...]}，按所有取值的组合（笛卡尔积）生成行
+
+空单元格不生成变量，使用流程中的同名变量。
+"""
+import csv
+import io
+import itertools
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+import models
+
+# 单次数据驱动执行最多的行数
+DATASET_MAX_ROWS = int(os.getenv("DATASET_MAX_ROWS", "10000"))
+
+
+def _row_from_cells(headers: List[str], cells) -> Optional[Dict[str, Any]]:
+    row = {}
+    for name, value in zip(headers, cells):
+        if not name or value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        row[name] = value
+    return row or None
+
+
+def _rows_from_table(rows_iter) -> List[Dict[str, Any]]:
+    try:
+        header_cells = next(rows_iter)
+    except StopIteration:
+        raise HTTPException(status_code=400, detail="数据文件为空")
+    headers = [str(cell).strip() if cell is not None else "" for cell in header_cells]
+    if not any(headers):
+        raise HTTPException(status_code=400, detail="数据文件第一行应为变量名")
+    rows = []
+    for cells in rows_iter:
+        row = _row_from_cells(headers, cells)
+        if row is not None:
+            rows.append(row)
+            if len(rows) > DATASET_MAX_ROWS:
+                break
+    return rows
+
+
+def parse_rows(content: bytes, file_name: str) -> List[Dict[str, Any]]:
+    """
+    解析数据文件
+
+    Args:
+        content: 文件内容
+        file_name: 文件名（按扩展名识别 .csv / .xlsx / .json）
+
+    Returns:
+        数据行列表
+    """
+    ext = os.path.splitext(file_name or "")[1].lower()
+    if ext == ".csv":
+        try:
+            text = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV 文件请使用 UTF-8 编码")
+        return _rows_from_table(csv.reader(io.StringIO(text)))
+    if ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        try:
+            wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Excel 文件解析失败: {str(e)}")
+        try:
+            return _rows_from_table(wb.active.iter_rows(values_only=True))
+        finally:
+            wb.close()
+    if ext == ".json":
+        try:
+            data = json.loads(content.decode("utf-8-sig"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HTTPException(status_code=400, detail="文件内容不是有效的JSON格式")
+        return validate_rows(data)
+    raise HTTPException(status_code=400, detail="数据文件仅支持 CSV、XLSX 或 JSON 格式")
+
+
+def load_test_file_rows(test_file: models.TestFile) -> List[Dict[str, Any]]:
+    """读取测试文件中的数据行"""
+    if test_file.file_path and os.path.exists(test_file.file_path):
+        with open(test_file.file_path, "rb") as f:
+            content = f.read()
+        return parse_rows(content, test_file.file_name or test_file.file_path)
+    if test_file.file_content is not None:
+        return validate_rows(test_file.file_content)
+    raise HTTPException(status_code=404, detail="文件内容不存在")
+
+
+def validate_rows(data: Any) -> List[Dict[str, Any]]:
+    """检查对象数组形式的数据行"""
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise HTTPException(status_code=400, detail="数据应为对象数组，每个对象为一行变量")
+    return [row for row in data if row]
+
+
+def expand_matrix(matrix: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """按变量取值的所有组合生成数据行"""
+    names = list(matrix)
+    values = []
+    total = 1
+    for name in names:
+        options = matrix[name]
+        if not isinstance(options, list) or not options:
+            raise HTTPException(status_code=400, detail=f"参数矩阵中 {name} 的取值应为非空数组")
+        values.append(options)
+        total *= len(options)
+        if total > DATASET_MAX_ROWS:
+            raise HTTPException(status_code=400, detail=f"参数组合数不能超过 {DATASET_MAX_ROWS}")
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def check_row_count(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        raise HTTPException(status_code=400, detail="数据集中没有数据行")
+    if len(rows) > DATASET_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"数据行数不能超过 {DATASET_MAX_ROWS}")
@@ -0,0 +1,143 @@
+"""执行链路日志
+
+接口执行、流程执行、测试任务和 apitest 执行器的调试信息（变量上下文、请求头、请求体、断言明细）通过这里输出：
+
+- 日志级别由 EXECUTION_LOG_LEVEL 控制（默认 INFO），低于该级别的日志不会格式化
+- debug 的字段可以传入返回字典的函数，只在需要输出或记录时才调用
+- 单次执行开启 debug（请求中的 debug 字段）时，调试信息记录到该次执行的 debug_log 中，不输出到标准输出
+
+每条日志为 事件名 + 字段；EXECUTION_LOG_JSON=1 时每行输出一个 JSON 对象，便于日志系统采集。
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+# 执行链路日志级别：DEBUG | INFO | WARNING | ERROR
+EXECUTION_LOG_LEVEL = os.getenv("EXECUTION_LOG_LEVEL", "INFO").upper()
+# 是否按 JSON 行输出
+EXECUTION_LOG_JSON = os.getenv("EXECUTION_LOG_JSON", "0") == "1"
+# 单次执行最多记录的调试日志条数
+EXECUTION_DEBUG_LOG_MAX_ENTRIES = int(os.getenv("EXECUTION_DEBUG_LOG_MAX_ENTRIES", "500"))
+# 单条调试日志序列化后的最大字符数，超出时截断
+EXECUTION_DEBUG_LOG_MAX_CHARS = int(os.getenv("EXECUTION_DEBUG_LOG_MAX_CHARS", "20000"))
+
+Fields = Union[Dict[str, Any], Callable[[], Dict[str, Any]], None]
+
+logger = logging.getLogger("execution")
+logger.setLevel(getattr(logging, EXECUTION_LOG_LEVEL, logging.INFO))
+logger.propagate = False
+
+# 当前执行的调试日志（开启 debug 时为列表）
+_capture: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar(
+    "execution_debug_log", default=None
+)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class _Formatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if EXECUTION_LOG_JSON:
+            return _dumps({
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "event": record.getMessage(),
+                **fields,
+            })
+        line = f"{self.formatTime(record)} {record.levelname} {record.getMessage()}"
+        return f"{line} {_dumps(fields)}" if fields else line
+
+
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(_Formatter())
+    logger.addHandler(_handler)
+
+
+def _resolve(fields: Fields) -> Dict[str, Any]:
+    if callable(fields):
+        fields = fields()
+    return fields or {}
+
+
+def debug_enabled() -> bool:
+    """当前是否需要生成调试信息（记录到本次执行或输出到日志）"""
+    return _capture.get() is not None or logger.isEnabledFor(logging.DEBUG)
+
+
+def debug(event: str, fields: Fields = None) -> None:
+    """
+    记录调试信息
+
+    Args:
+        event: 事件名
+        fields: 字段字典，或返回字段字典的函数（只在需要时调用）
+    """
+    capture = _capture.get()
+    if capture is not None:
+        if len(capture) < EXECUTION_DEBUG_LOG_MAX_ENTRIES:
+            text = _dumps(_resolve(fields))
+            entry: Dict[str, Any] = {"time": datetime.now().isoformat(timespec="milliseconds"), "event": event}
+            if len(text) > EXECUTION_DEBUG_LOG_MAX_CHARS:
+                entry["truncated"] = text[:EXECUTION_DEBUG_LOG_MAX_CHARS]
+            else:
+                entry.update(json.loads(text))
+            capture.append(entry)
+        return
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(event, extra={"fields": _resolve(fields)})
+
+
+def info(event: str, fields: Fields = None) -> None:
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(event, extra={"fields": _resolve(fields)})
+
+
+def warning(event: str, fields: Fields = None) -> None:
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(event, extra={"fields": _resolve(fields)})
+
+
+@contextmanager
+def capture_debug(
+    enabled: bool = True, entries: Optional[List[Dict[str, Any]]] = None
+) -> Iterator[Optional[List[Dict[str, Any]]]]:
+    """
+    在 with 块内把调试信息记录到返回的列表中（不输出到标准输出）
+
+    Args:
+        enabled: 为 False 时不记录，返回 None
+        entries: 追加到已有的列表（同一次执行分多次记录时使用），为空时新建
+
+    用法：
+        with capture_debug(request.debug) as debug_log:
+            ...
+        record.debug_log = debug_log
+    """
+    if not enabled:
+        yield None
+        return
+    if entries is None:
+        entries = []
+    token = _capture.set(entries)
+    try:
+        yield entries
+    finally:
+        _capture.reset(token)
+
+
+def propagate(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """让提交到线程池的函数沿用当前线程的调试日志设置（线程池中的线程不会继承 contextvars）"""
+    ctx = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
@@ -0,0 +1,104 @@
+"""流程步骤 → 接口反向索引
+
+flow_step_endpoints 记录每个流程的每个步骤引用的接口（flow_id, step_index, endpoint_id），
+流程创建、更新、导入时随 steps 一起重写（sync_flow_index，与流程的修改在同一事务中提交）。
+删除接口时的依赖检查、接口的引用查询都是按 endpoint_id 的索引查询，不需要读取所有流程的 steps。
+
+升级时执行 migrations/migration_add_flow_step_endpoints.sql 建表并回填已有流程的索引。
+"""
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+import models
+
+
+def step_endpoints(steps: Any) -> List[Tuple[int, int]]:
+    """
+    流程步骤引用的接口
+
+    Args:
+        steps: api_test_flows.steps
+
+    Returns:
+        [(步骤序号（从 1 开始）, 接口ID)]，跳过没有接口的步骤
+    """
+    pairs = []
+    if not isinstance(steps, list):
+        return pairs
+    for idx, step in enumerate(steps):
+        if not isinstance(step, dict):
+            continue
+        try:
+            endpoint_id = int(step.get('endpoint_id'))
+        except (TypeError, ValueError):
+            continue
+        pairs.append((idx + 1, endpoint_id))
+    return pairs
+
+
+def sync_flow_index(db: Session, flow_id: int, steps: Any) -> None:
+    """
+    按流程当前的 steps 重写该流程的索引（不提交，随流程的修改一起提交）
+
+    Args:
+        db: 数据库会话
+        flow_id: 流程ID（新建流程需先 flush 拿到ID）
+        steps: 流程步骤
+    """
+    db.query(models.FlowStepEndpoint).filter(
+        models.FlowStepEndpoint.flow_id == flow_id
+    ).delete(synchronize_session=False)
+    db.add_all([
+        models.FlowStepEndpoint(flow_id=flow_id, step_index=step_index, endpoint_id=endpoint_id)
+        for step_index, endpoint_id in step_endpoints(steps)
+    ])
+
+
+def flows_using_endpoint(db: Session, endpoint_id: int) -> List[Dict[str, Any]]:
+    """
+    引用接口的流程
+
+    Returns:
+        [{"id", "name", "project_id", "steps": [步骤序号, ...]}]，按流程ID排序
+    """
+    rows = db.query(
+        models.ApiTestFlow.id, models.ApiTestFlow.name, models.ApiTestFlow.project_id,
+        models.FlowStepEndpoint.step_index
+    ).join(
+        models.FlowStepEndpoint, models.FlowStepEndpoint.flow_id == models.ApiTestFlow.id
+    ).filter(
+        models.FlowStepEndpoint.endpoint_id == endpoint_id
+    ).order_by(models.ApiTestFlow.id, models.FlowStepEndpoint.step_index).all()
+    flows: Dict[int, Dict[str, Any]] = {}
+    for flow_id, name, project_id, step_index in rows:
+        flow = flows.setdefault(flow_id, {"id": flow_id, "name": name, "project_id": project_id, "steps": []})
+        flow["steps"].append(step_index)
+    return list(flows.values())
+
+
+def tasks_using_endpoint(db: Session, endpoint_id: int, flow_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    直接包含接口、或包含引用该接口的流程的测试任务
+
+    Args:
+        endpoint_id: 接口ID
+        flow_ids: 引用该接口的流程ID（flows_using_endpoint 的结果）
+
+    Returns:
+        [{"id", "name", "project_id", "item_type": "api" | "flow", "item_id"}]，按任务ID排序
+    """
+    conditions = [(models.TestTaskItem.item_type == 'api') & (models.TestTaskItem.item_id == endpoint_id)]
+    if flow_ids:
+        conditions.append((models.TestTaskItem.item_type == 'flow') & models.TestTaskItem.item_id.in_(flow_ids))
+    rows = db.query(
+        models.TestTask.id, models.TestTask.name, models.TestTask.project_id,
+        models.TestTaskItem.item_type, models.TestTaskItem.item_id
+    ).join(
+        models.TestTaskItem, models.TestTaskItem.task_id == models.TestTask.id
+    ).filter(or_(*conditions)).order_by(models.TestTask.id, models.TestTaskItem.sort_order).all()
+    return [
+        {"id": task_id, "name": name, "project_id": project_id, "item_type": item_type, "item_id": item_id}
+        for task_id, name, project_id, item_type, item_id in rows
+    ]
@@ -0,0 +1,570 @@
+"""接口流程执行
+
+流程执行接口、压测和数据驱动执行共用：
+
+- compile_flow_plan：发送请求前一次性加载并校验步骤引用的接口、环境和测试数据
+- build_flow_context：变量优先级为 流程变量 < 流程 global_variables < 本次执行传入的变量
+- run_flow：按顺序执行步骤；开启步骤并行时按步骤间的依赖（api_runtime.flow_step_dependencies）并行执行
+- run_flow_dataset：按数据集逐行执行流程（多行并行），汇总为一份报告
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+import exec_log
+import models
+from assertions import compile_assertions, evaluate_assertions
+from http_client import http_clients, timings_of
+from latency import PhaseStats
+from api_runtime import (
+    render_template,
+    extract_value,
+    flow_step_dependencies,
+    step_reads,
+)
+
+# 流程中没有依赖关系的步骤默认同时执行的数量（默认 1，按顺序逐个执行；执行请求的 step_concurrency 可单独开启）
+FLOW_STEP_CONCURRENCY = int(os.getenv("FLOW_STEP_CONCURRENCY", "1"))
+# 单次流程执行最多同时执行的步骤数
+FLOW_STEP_MAX_CONCURRENCY = int(os.getenv("FLOW_STEP_MAX_CONCURRENCY", "16"))
+# 数据驱动执行时默认/最多同时执行的数据行数
+DATASET_ROW_CONCURRENCY = int(os.getenv("DATASET_ROW_CONCURRENCY", "4"))
+DATASET_MAX_ROW_CONCURRENCY = int(os.getenv("DATASET_MAX_ROW_CONCURRENCY", "32"))
+# 报告中最多返回完整步骤结果的失败行数
+DATASET_MAX_FAILED_DETAILS = int(os.getenv("DATASET_MAX_FAILED_DETAILS", "100"))
+
+
+class FlowStepPlan:
+    """
+    流程中一个步骤执行所需的接口、环境、测试数据和编译后的断言
+
+    keep_response：后面的步骤引用了本步骤的 API[N]，响应体 JSON 需要写入上下文；
+    parse_json：变量提取或 API[N] 需要解析响应体 JSON（断言需要时由断言解析）
+    """
+    __slots__ = ("step", "endpoint", "environment", "test_data", "assertions", "keep_response", "parse_json")
+
+    def __init__(self, step: Dict[str, Any], endpoint, environment, test_data, keep_response: bool = True):
+        self.step = step
+        self.endpoint = endpoint
+        self.environment = environment
+        self.test_data = test_data
+        self.assertions = compile_assertions(step.get("assertions"))
+        self.keep_response = keep_response
+        self.parse_json = keep_response or bool(step.get("extracts"))
+
+
+def compile_flow_plan(db: Session, steps: List[Dict[str, Any]], default_environment_id: Optional[int]) -> List[FlowStepPlan]:
+    """
+    在发送第一个请求前加载并校验流程步骤引用的接口、环境和测试数据（每类一次 IN 查询）
+
+    Args:
+        db: 数据库会话
+        steps: 启用的步骤
+        default_environment_id: 步骤未指定环境时使用的环境（请求中的环境优先于流程环境）
+
+    Raises:
+        HTTPException: 某一步的接口或环境不存在，或没有可用的环境
+    """
+    endpoint_ids = {step.get("endpoint_id") for step in steps if step.get("endpoint_id")}
+    environment_ids = {step.get("environment_id") or default_environment_id for step in steps}
+    environment_ids.discard(None)
+    test_data_ids = {step.get("test_data_id") for step in steps if step.get("test_data_id")}
+    # 未指定测试数据的步骤使用接口的第一条测试数据
+    default_endpoint_ids = {step.get("endpoint_id") for step in steps if not step.get("test_data_id")}
+    default_endpoint_ids &= endpoint_ids
+
+    endpoints = {}
+    if endpoint_ids:
+        endpoints = {e.id: e for e in db.query(models.ApiEndpoint).filter(models.ApiEndpoint.id.in_(endpoint_ids))}
+    environments = {}
+    if environment_ids:
+        environments = {
+            env.id: env for env in db.query(models.ApiEnvironment).filter(models.ApiEnvironment.id.in_(environment_ids))
+        }
+    test_data_by_id = {}
+    default_test_data = {}
+    if test_data_ids or default_endpoint_ids:
+        conditions = []
+        if test_data_ids:
+            conditions.append(models.ApiTestData.id.in_(test_data_ids))
+        if default_endpoint_ids:
+            conditions.append(models.ApiTestData.endpoint_id.in_(default_endpoint_ids))
+        for test_data in db.query(models.ApiTestData).filter(or_(*conditions)).order_by(models.ApiTestData.id):
+            if test_data.id in test_data_ids:
+                test_data_by_id[test_data.id] = test_data
+            if test_data.endpoint_id in default_endpoint_ids:
+                default_test_data.setdefault(test_data.endpoint_id, test_data)
+
+    # 被其他步骤引用的 API[N]，未被引用的步骤不在上下文中保留响应体
+    referenced = set()
+    for step in steps:
+        referenced |= step_reads(step)
+
+    plan = []
+    for idx, step in enumerate(steps):
+        endpoint = endpoints.get(step.get("endpoint_id"))
+        if not endpoint:
+            raise HTTPException(status_code=400, detail=f"第 {idx+1} 步接口不存在")
+        environment_id = step.get("environment_id") or default_environment_id
+        if not environment_id:
+            raise HTTPException(status_code=400, detail="请为流程或步骤选择环境")
+        environment = environments.get(environment_id)
+        if not environment:
+            raise HTTPException(status_code=404, detail=f"第 {idx+1} 步环境不存在")
+        if step.get("test_data_id"):
+            test_data = test_data_by_id.get(step.get("test_data_id"))
+        else:
+            test_data = default_test_data.get(endpoint.id)
+        plan.append(FlowStepPlan(step, endpoint, environment, test_data, keep_response=f"API[{idx + 1}]" in referenced))
+    return plan
+
+
+def detach_flow_plan(db: Session, step_plans: List[FlowStepPlan]) -> None:
+    """将步骤引用的接口、环境和测试数据从会话中分离，供会话关闭（或提交）后在后台线程中执行"""
+    objects = {}
+    for step_plan in step_plans:
+        for obj in (step_plan.endpoint, step_plan.environment, step_plan.test_data):
+            if obj is not None:
+                objects[id(obj)] = obj
+    for obj in objects.values():
+        if obj in db:
+            db.expunge(obj)
+
+
+def build_flow_context(flow: models.ApiTestFlow, global_variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """初始化流程执行的变量上下文"""
+    # 初始化上下文，优先加载流程变量
+    context: Dict[str, Any] = {}
+    # 从流程变量表加载（确保触发加载）
+    # 先访问 flow.variables 以确保 joinedload 生效
+    variables_list = list(flow.variables) if flow.variables else []
+    for var in variables_list:
+        context[var.key] = var.value
+    # 兼容旧的global_variables字段
+    if flow.global_variables:
+        # 确保 global_variables 是字典类型
+        if isinstance(flow.global_variables, dict):
+            context.update(flow.global_variables)
+        elif isinstance(flow.global_variables, str):
+            # 如果是字符串，尝试解析为JSON
+            try:
+                parsed_vars = json.loads(flow.global_variables)
+                if isinstance(parsed_vars, dict):
+                    context.update(parsed_vars)
+            except:
+                pass
+    # 请求中的变量会覆盖流程变量
+    if global_variables:
+        context.update(global_variables)
+
+    # 调试日志：输出变量上下文
+    exec_log.debug("flow.context", lambda: {
+        "flow_id": flow.id,
+        "flow_variables": len(variables_list),
+        "global_variables": flow.global_variables,
+        "request_variables": global_variables,
+        "context": context,
+    })
+    return context
+
+
+def resolve_fail_action(requested: Optional[str]) -> str:
+    """failAction 使用请求中的，默认为 'stop'（流程本身不保存 failAction）"""
+    return requested or "stop"
+
+
+def run_flow_step(idx: int, step_plan: FlowStepPlan, context: Dict[str, Any]) -> Tuple[Dict[str, Any], Any]:
+    """发送步骤的请求并检查断言，返回 (步骤结果, 响应 JSON)；只读取 context，不修改"""
+    step = step_plan.step
+    endpoint = step_plan.endpoint
+    environment = step_plan.environment
+    test_data = step_plan.test_data
+
+    # 组装请求数据，优先级：环境默认 < 测试数据 < 步骤自定义参数（已模板渲染）
+    # 重要：每个步骤使用自己的参数（step.get("headers")等），不会影响其他步骤
+    # 即使第2个和第5个步骤使用相同的接口，它们也有完全独立的参数
+    headers = {}
+    if environment.headers:
+        headers.update(environment.headers)
+    if test_data and test_data.headers:
+        headers.update(test_data.headers)
+    # 步骤自己的headers优先级最高，会覆盖测试数据和环境配置
+    if step.get("headers") is not None:
+        rendered_headers = render_template(step["headers"], context)
+        # 如果步骤的headers是空对象 {}，表示用户明确清空了headers，应该使用空对象
+        if isinstance(rendered_headers, dict):
+            headers = rendered_headers  # 使用步骤自己的headers，完全覆盖
+        else:
+            headers.update(rendered_headers if isinstance(rendered_headers, dict) else {})
+
+    # 路径参数：步骤自己的参数优先级最高
+    path_params = test_data.path_params if test_data else None
+    if step.get("path_params") is not None:
+        # 如果步骤有path_params（包括空对象 {}），使用步骤的参数
+        path_params = render_template(step["path_params"], context)
+
+    # 查询参数：步骤自己的参数优先级最高
+    query_params = test_data.query_params if test_data else None
+    if step.get("query_params") is not None:
+        # 如果步骤有query_params（包括空对象 {}），使用步骤的参数
+        query_params = render_template(step["query_params"], context)
+
+    # 请求体：步骤自己的参数优先级最高
+    body = test_data.body if test_data else None
+    if step.get("body") is not None:
+        # 如果步骤有body（包括空对象 {}），使用步骤的参数
+        body = render_template(step["body"], context)
+
+    # 调试日志：确认每个步骤使用自己的参数
+    exec_log.debug("flow.step.request", lambda: {
+        "step": idx + 1,
+        "endpoint_id": step.get("endpoint_id"),
+        "alias": step.get("alias"),
+        "step_headers": step.get("headers"),
+        "path_params": path_params,
+        "query_params": query_params,
+        "headers": headers,
+        "body": body,
+    })
+
+    # 拼接 URL 并替换路径参数
+    base_url = environment.base_url.rstrip('/')
+    path = endpoint.path.lstrip('/')
+    full_url = f"{base_url}/{path}"
+    if path_params:
+        for key, value in path_params.items():
+            full_url = full_url.replace(f"{{{key}}}", str(value))
+
+    start_time = time.perf_counter()
+    step_success = False
+    response_status = None
+    response_headers = None
+    response_body_text = None
+    response_summary = {}
+    error_message = None
+    timings = None
+    json_body = None
+    assertions_list = []  # 初始化断言列表，确保在异常情况下也能使用
+
+    try:
+        response = http_clients.fetch(
+            method=endpoint.method.upper(),
+            url=full_url,
+            headers=headers,
+            params=query_params,
+            json=body if body is not None else None,
+            timeout=30
+        )
+        response_time = int((time.perf_counter() - start_time) * 1000)
+        timings = timings_of(response)
+        response_status = response.status_code
+        response_headers = dict(response.headers)
+        response_body_text = response.preview()
+        response_summary = response.summary()
+        if step_plan.parse_json:
+            json_body = response.parsed_json()
+
+        # 检查断言
+        # 重要：每个步骤使用自己的断言列表，完全独立
+        # 即使多个步骤使用相同的接口，每个步骤也有自己独立的断言
+        step_assertions = step.get("assertions")
+        if step_assertions is None:
+            assertions_list = []
+        elif isinstance(step_assertions, list):
+            assertions_list = step_assertions
+        else:
+            assertions_list = []
+
+        exec_log.debug("flow.step.assertions", lambda: {"step": idx + 1, "assertions": assertions_list})
+
+        step_success = True
+        if assertions_list:
+            # 断言在 compile_flow_plan 中已编译（FlowStepPlan.assertions）
+            assertion_errors = evaluate_assertions(
+                step_plan.assertions, response, response_time, context=context, endpoint=endpoint, step=idx + 1
+            )
+            if assertion_errors:
+                step_success = False
+                error_message = "\n".join(assertion_errors)
+        else:
+            # 如果没有断言，使用默认逻辑：状态码在200-299之间
+            step_success = 200 <= response_status < 300
+    except Exception as exc:
+        response_time = int((time.perf_counter() - start_time) * 1000)
+        timings = timings_of(exc)
+        error_message = str(exc)
+        step_success = False
+
+    return {
+        "index": idx + 1,
+        "endpoint_id": endpoint.id,
+        "endpoint_name": endpoint.name,
+        "url": full_url,
+        "method": endpoint.method,
+        "success": step_success,
+        "status": response_status,
+        "response_time": response_time,
+        "timings": timings,
+        "error_message": error_message,
+        "alias": step.get("alias"),
+        "extracted": {rule.get("name"): extract_value(json_body or {}, rule.get("path", "")) for rule in step.get("extracts") or []},
+        # 请求信息
+        "request_headers": headers,
+        "request_path_params": path_params,
+        "request_query_params": query_params,
+        "request_body": body,
+        "request_assertions": assertions_list,  # 添加断言信息
+        # 响应信息
+        "response_headers": response_headers,
+        "response_body": response_body_text,
+        **response_summary,
+    }, json_body
+
+
+def store_step_output(context: Dict[str, Any], idx: int, step_plan: FlowStepPlan, json_body: Any) -> None:
+    """将步骤的响应体（API[N]，被后面的步骤引用时）和提取的变量写入上下文"""
+    step = step_plan.step
+    # 将当前接口的响应体存储到 context 中，支持 API[N] 语法
+    if step_plan.keep_response:
+        context[f"API[{idx + 1}]"] = json_body or {}
+
+    # 变量提取：从当前接口提取（step_index 为 None、0 或等于当前接口序号）
+    for rule in step.get("extracts") or []:
+        rule_step_index = rule.get("step_index")
+        # 如果 step_index 为 None、0 或等于当前接口序号，从当前接口提取
+        if not rule_step_index or rule_step_index == 0 or rule_step_index == (idx + 1):
+            value = extract_value(json_body or {}, rule.get("path", ""))
+            if rule.get("name"):
+                context[rule["name"]] = value
+                exec_log.debug("flow.step.extract", lambda: {"step": idx + 1, "name": rule.get("name"), "value": value})
+
+
+# 步骤完成回调：(步骤下标, 步骤结果, 耗时秒数)
+StepCallback = Callable[[int, Dict[str, Any], float], None]
+
+
+def run_flow(
+    step_plans: List[FlowStepPlan],
+    context: Dict[str, Any],
+    fail_action: str = "stop",
+    step_delay: int = 0,
+    concurrency: int = None,
+    on_step_done: Optional[StepCallback] = None,
+) -> Dict[str, Any]:
+    """
+    执行流程步骤
+
+    默认按顺序逐个执行。concurrency 大于 1 时按步骤间的依赖并行执行：步骤只等待它引用的 API[N]、变量的来源步骤；
+    步骤结果按步骤顺序生效（写入上下文、加入结果、回调），因此上下文、结果与顺序执行相同。
+    只通过服务端状态关联的步骤（如先创建再查询）没有引用关系，不适合开启并行。
+    设置了步骤间延迟时仍逐个执行。
+
+    fail_action 为 stop 时，某一步失败后不再启动新的步骤；并行执行时它之后已开始的步骤会执行完，
+    但结果被丢弃（不写入上下文、不返回、不回调），与顺序执行的结果相同。
+
+    Args:
+        step_plans: compile_flow_plan 的结果
+        context: 变量上下文，执行过程中写入各步骤的响应体和提取的变量
+        fail_action: stop 时某一步失败后不再执行它之后的步骤；continue 时继续执行
+        step_delay: 步骤间延迟（毫秒）
+        concurrency: 同时执行的步骤数，默认 FLOW_STEP_CONCURRENCY，最多 FLOW_STEP_MAX_CONCURRENCY
+        on_step_done: 每个步骤生效后回调（按步骤顺序，在调用 run_flow 的线程中执行）
+
+    Returns:
+        {"success": 是否全部成功, "results": 按步骤顺序的结果, "context": 上下文}
+    """
+    if concurrency is None:
+        concurrency = FLOW_STEP_CONCURRENCY
+    concurrency = min(concurrency, FLOW_STEP_MAX_CONCURRENCY)
+    if step_delay > 0:
+        concurrency = 1
+    step_results: Dict[int, Dict[str, Any]] = {}
+    overall_success = True
+    stop_at = None  # failAction 为 stop 时第一个失败步骤的下标
+
+    def timed_step(idx: int) -> Tuple[Dict[str, Any], Any, float]:
+        started = time.perf_counter()
+        step_result, json_body = run_flow_step(idx, step_plans[idx], context)
+        return step_result, json_body, time.perf_counter() - started
+
+    def finish(idx: int, step_result: Dict[str, Any], json_body: Any, elapsed: float) -> None:
+        nonlocal overall_success, stop_at
+        store_step_output(context, idx, step_plans[idx], json_body)
+        step_results[idx] = step_result
+        if on_step_done is not None:
+            on_step_done(idx, step_result, elapsed)
+        if not step_result["success"]:
+            overall_success = False
+            if fail_action == "stop" and (stop_at is None or idx < stop_at):
+                stop_at = idx
+
+    if concurrency <= 1:
+        for idx in range(len(step_plans)):
+            finish(idx, *timed_step(idx))
+            if stop_at is not None:
+                # 停止执行
+                break
+            # 步骤间延迟（不是最后一个步骤时）
+            if step_delay > 0 and idx < len(step_plans) - 1:
+                exec_log.debug("flow.step.delay", {"step": idx + 1, "delay_ms": step_delay})
+                time.sleep(step_delay / 1000.0)  # 转换为秒
+    else:
+        dependencies = flow_step_dependencies([step_plan.step for step_plan in step_plans])
+        waiting = {idx: set(deps) for idx, deps in enumerate(dependencies)}
+        running = {}
+        completed: Dict[int, Tuple[Dict[str, Any], Any, float]] = {}
+        next_idx = 0  # 下一个按顺序生效的步骤
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="flow-step") as pool:
+            while True:
+                # 有步骤失败且 failAction 为 stop 时，不再启动新的步骤（已开始的步骤会执行完）
+                if stop_at is None:
+                    ready = sorted(idx for idx, deps in waiting.items() if not deps)
+                    for idx in ready[:concurrency - len(running)]:
+                        del waiting[idx]
+                        running[pool.submit(exec_log.propagate(timed_step), idx)] = idx
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    completed[running.pop(future)] = future.result()
+                # 按步骤顺序生效：前面的步骤都生效后才写入上下文，依赖它的步骤才能开始
+                while stop_at is None and next_idx in completed:
+                    finish(next_idx, *completed.pop(next_idx))
+                    for deps in waiting.values():
+                        deps.discard(next_idx)
+                    next_idx += 1
+        if completed:
+            exec_log.debug("flow.step.discarded", {"steps": sorted(idx + 1 for idx in completed)})
+
+    return {
+        "success": overall_success,
+        "results": [step_results[idx] for idx in sorted(step_results)],
+        "context": context
+    }
+
+
+def run_flow_dataset(
+    step_plans: List[FlowStepPlan],
+    context: Dict[str, Any],
+    rows: List[Dict[str, Any]],
+    fail_action: str = "stop",
+    step_delay: int = 0,
+    concurrency: Optional[int] = None,
+    step_concurrency: Optional[int] = None,
+    debug: bool = False,
+    on_row_done: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    按数据集逐行执行流程，每行的变量覆盖 context 中的同名变量
+
+    多行并行执行时，每行内的步骤按顺序执行，同时发出的请求数不超过并行行数。
+
+    Args:
+        step_plans: compile_flow_plan 的结果
+        context: 流程变量上下文（每行使用一份副本）
+        rows: 数据行
+        fail_action: 行内某一步失败时的行为（stop / continue），不影响其他行
+        step_delay: 步骤间延迟（毫秒）
+        concurrency: 同时执行的行数，默认 DATASET_ROW_CONCURRENCY
+        step_concurrency: 只有一行同时执行时，行内同时执行的步骤数（见 run_flow）
+        debug: 记录每行的调试日志，失败行的 debug_log 中返回
+        on_row_done: 按行号顺序接收每行的结果 (行摘要, 失败行的完整步骤结果)，
+            失败行超过 DATASET_MAX_FAILED_DETAILS 后第二个参数为 None；提供时报告中不含 rows / failed_rows
+        should_stop: 返回 True 时不再开始执行新的行（已开始的行执行完）
+
+    Returns:
+        汇总报告：各行是否成功、各步骤失败次数和各阶段耗时分位数，以及失败行的完整步骤结果
+    """
+    concurrency = max(1, min(concurrency or DATASET_ROW_CONCURRENCY, DATASET_MAX_ROW_CONCURRENCY, len(rows) or 1))
+    if concurrency > 1:
+        step_concurrency = 1
+    started = time.perf_counter()
+
+    def run_row(row_index: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
+        row = rows[row_index]
+        row_context = dict(context)
+        row_context.update(row)
+        row_started = time.perf_counter()
+        with exec_log.capture_debug(debug) as debug_log:
+            try:
+                if should_stop is not None and should_stop():
+                    raise RuntimeError("执行已中断，该行未执行")
+                outcome = run_flow(step_plans, row_context, fail_action=fail_action, step_delay=step_delay, concurrency=step_concurrency)
+                results, success, error_message = outcome["results"], outcome["success"], None
+            except Exception as e:
+                results, success, error_message = [], False, str(e)
+        failed_step = next((result for result in results if not result["success"]), None)
+        if failed_step is not None:
+            error_message = failed_step.get("error_message") or (
+                f"HTTP {failed_step['status']}" if failed_step.get("status") is not None else "请求失败"
+            )
+        summary = {
+            "row": row_index + 1,
+            "variables": row,
+            "success": success,
+            "duration_ms": int((time.perf_counter() - row_started) * 1000),
+            "failed_step": failed_step["index"] if failed_step else None,
+            "error_message": error_message,
+        }
+        return summary, results, debug_log
+
+    summaries: List[Dict[str, Any]] = []
+    failed_rows = []
+    failed_details = 0
+    passed = 0
+    step_failures: Dict[int, int] = {}
+    step_timings = [PhaseStats() for _ in step_plans]
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="flow-row") as pool:
+        for summary, results, debug_log in pool.map(run_row, range(len(rows))):
+            for result in results:
+                step_timings[result["index"] - 1].record(result.get("timings"))
+            failed_row = None
+            if summary["success"]:
+                passed += 1
+            else:
+                for result in results:
+                    if not result["success"]:
+                        step_failures[result["index"]] = step_failures.get(result["index"], 0) + 1
+                if failed_details < DATASET_MAX_FAILED_DETAILS:
+                    failed_details += 1
+                    failed_row = {**summary, "results": results}
+                    if debug_log is not None:
+                        failed_row["debug_log"] = debug_log
+            if on_row_done is not None:
+                on_row_done(summary, failed_row)
+                continue
+            summaries.append(summary)
+            if failed_row is not None:
+                failed_rows.append(failed_row)
+
+    report = {
+        "success": passed == len(rows),
+        "total": len(rows),
+        "passed": passed,
+        "failed": len(rows) - passed,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+        "concurrency": concurrency,
+        "steps": [
+            {
+                "index": idx + 1,
+                "endpoint_id": step_plan.endpoint.id,
+                "endpoint_name": step_plan.endpoint.name,
+                "alias": step_plan.step.get("alias"),
+                "failed": step_failures.get(idx + 1, 0),
+                "timings": step_timings[idx].to_dict(),
+            }
+            for idx, step_plan in enumerate(step_plans)
+        ],
+    }
+    if on_row_done is None:
+        report["rows"] = summaries
+        # 失败行的完整步骤结果（按行号顺序，最多 DATASET_MAX_FAILED_DETAILS 行）
+        report["failed_rows"] = failed_rows
+    return report
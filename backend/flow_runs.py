@@ -0,0 +1,508 @@
+"""流程异步执行
+
+POST /api/api-flows/{flow_id}/execute?mode=async 只创建 flow_runs 记录并放入执行队列，立即返回运行ID；
+流程在本进程的 FLOW_RUN_WORKERS 个工作线程中执行，每个步骤完成即写入 flow_run_steps 并累加成功/失败数，
+状态、实时推送（SSE）和最终结果通过 /api/flow-runs/{run_id} 系列接口查询。
+
+POST /api/api-flows/{flow_id}/execute-dataset（数据驱动执行）同样创建 flow_runs 记录（run_type=dataset）后放入队列，
+每行结果分批写入 flow_run_rows 并累加成功/失败行数，结束时汇总报告写入 flow_runs.report。
+
+设置了步骤间延迟时，步骤按顺序逐个提交到工作线程，步骤之间的等待由调度线程到时再提交下一个步骤，
+等待期间不占用工作线程（同步执行时为 time.sleep）。
+
+执行只保存在创建它的服务进程中：flow_runs.worker_id 记录该进程，进程每 FLOW_RUN_HEARTBEAT_SECONDS 更新 heartbeat_at。
+进程崩溃、被杀或重启后，心跳超过 FLOW_RUN_LEASE_SECONDS 未更新的排队/执行中记录由其他（或重启后的）进程标记为失败（见 leases）。
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import blob_store
+import exec_log
+import models
+from config import SessionLocal
+from flow_runner import FlowStepPlan, run_flow, run_flow_dataset, run_flow_step, store_step_output
+from leases import Lease, LeaseMonitor, new_worker_id
+
+# 同时执行的异步流程数，超出的排队等待
+FLOW_RUN_WORKERS = int(os.getenv("FLOW_RUN_WORKERS", "4"))
+# 执行进程的心跳间隔（秒），同时按此间隔检查其他进程遗留的执行
+FLOW_RUN_HEARTBEAT_SECONDS = int(os.getenv("FLOW_RUN_HEARTBEAT_SECONDS", "15"))
+# 心跳超过该时长（秒）未更新的排队/执行中记录视为执行进程已中断
+FLOW_RUN_LEASE_SECONDS = int(os.getenv("FLOW_RUN_LEASE_SECONDS", "60"))
+# 数据驱动执行每累计多少行结果（或每隔 1 秒）写入一次数据库
+DATASET_ROW_BATCH_SIZE = int(os.getenv("DATASET_ROW_BATCH_SIZE", "100"))
+_ROW_FLUSH_SECONDS = 1.0
+
+FLOW_RUN_LEASE = Lease(
+    "流程异步执行", models.FlowRun, ("queued", "running"),
+    "执行进程中断（服务重启或异常退出），流程执行未完成", FLOW_RUN_LEASE_SECONDS,
+)
+
+
+class _Scheduler:
+    """延时调度：一个线程按到期时间依次执行回调（回调应尽快返回，如提交到线程池）"""
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def call_later(self, delay: float, fn: Callable[[], None]) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), fn))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="flow-run-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._stopped:
+                    return
+                _, _, fn = heapq.heappop(self._heap)
+            try:
+                fn()
+            except Exception as e:
+                print(f"⚠️ 流程延时步骤调度失败: {e}")
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify()
+
+
+def _json_safe(value: Any) -> Any:
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+class FlowRunner:
+    """一次异步流程执行"""
+
+    def __init__(
+        self,
+        manager: "FlowRunManager",
+        run_id: int,
+        step_plans: List[FlowStepPlan],
+        context: Dict[str, Any],
+        fail_action: str,
+        step_delay: int,
+        step_concurrency: Optional[int],
+        debug_log: Optional[List[Dict[str, Any]]],
+    ):
+        self.manager = manager
+        self.run_id = run_id
+        self.step_plans = step_plans
+        self.context = context
+        self.fail_action = fail_action
+        self.step_delay = step_delay
+        self.step_concurrency = step_concurrency
+        self.debug_log = debug_log
+        self.success = True
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def _update(self, db, **values) -> int:
+        # 已被标记为结束（如心跳超时被回收）的记录不再修改状态
+        return db.query(models.FlowRun).filter(
+            models.FlowRun.id == self.run_id,
+            models.FlowRun.status.in_(("queued", "running"))
+        ).update(values, synchronize_session=False)
+
+    def _save_step(self, idx: int, result: Dict[str, Any], elapsed: Optional[float] = None) -> None:
+        """写入步骤结果并累加计数"""
+        db = SessionLocal()
+        try:
+            values = _json_safe(result)
+            blob_refs = blob_store.offload(db, values)
+            db.add(models.FlowRunStep(
+                run_id=self.run_id,
+                step_index=idx + 1,
+                success=bool(result.get("success")),
+                status_code=result.get("status"),
+                response_time=result.get("response_time"),
+                error_message=result.get("error_message"),
+                result=values,
+                blob_refs=blob_refs or None,
+            ))
+            counter = models.FlowRun.success_count if result.get("success") else models.FlowRun.failed_count
+            self._update(db, **{counter.key: counter + 1})
+            db.commit()
+        finally:
+            db.close()
+        if not result.get("success"):
+            self.success = False
+
+    def _result_values(self) -> Dict[str, Any]:
+        """执行结束时写入 flow_runs 的结果字段"""
+        return {"context": _json_safe(self.context), "debug_log": self.debug_log}
+
+    def _finish(self, error_message: Optional[str] = None) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        status = "success" if self.success and not error_message else "failed"
+        db = SessionLocal()
+        try:
+            self._update(
+                db,
+                status=status,
+                error_message=error_message,
+                completed_at=datetime.now(),
+                **self._result_values()
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 流程执行结果写入失败: run_id={self.run_id}, {e}")
+        finally:
+            db.close()
+        self.manager._forget(self.run_id)
+        exec_log.info("flow.run.finish", {"run_id": self.run_id, "status": status})
+
+    def start(self) -> None:
+        """在工作线程中开始执行"""
+        if self.manager.stopping:
+            return
+        try:
+            db = SessionLocal()
+            try:
+                self._update(db, status="running", started_at=datetime.now())
+                db.commit()
+            finally:
+                db.close()
+            if not self.step_plans:
+                self._finish()
+            elif self.step_delay > 0:
+                self._run_step(0)
+            else:
+                with exec_log.capture_debug(self.debug_log is not None, self.debug_log):
+                    run_flow(
+                        self.step_plans, self.context, fail_action=self.fail_action,
+                        concurrency=self.step_concurrency, on_step_done=self._save_step
+                    )
+                self._finish()
+        except Exception as e:
+            print(f"⚠️ 流程异步执行失败: run_id={self.run_id}, {e}")
+            self._finish(str(e))
+
+    def _run_step(self, idx: int) -> None:
+        """执行第 idx 个步骤，之后按步骤间延迟调度下一个步骤"""
+        if self.manager.stopping:
+            return
+        try:
+            step_plan = self.step_plans[idx]
+            with exec_log.capture_debug(self.debug_log is not None, self.debug_log):
+                result, json_body = run_flow_step(idx, step_plan, self.context)
+                store_step_output(self.context, idx, step_plan, json_body)
+                last = (not result["success"] and self.fail_action == "stop") or idx + 1 >= len(self.step_plans)
+                if not last:
+                    exec_log.debug("flow.step.delay", {"step": idx + 1, "delay_ms": self.step_delay})
+            self._save_step(idx, result)
+            if last:
+                self._finish()
+                return
+            self.manager.call_later(self.step_delay / 1000.0, lambda: self.manager.submit(self._run_step, idx + 1))
+        except Exception as e:
+            print(f"⚠️ 流程异步执行失败: run_id={self.run_id}, 步骤 {idx + 1}, {e}")
+            self._finish(str(e))
+
+
+class FlowDatasetRunner(FlowRunner):
+    """一次数据驱动执行：每行结果分批写入 flow_run_rows，结束时汇总报告写入 flow_runs.report"""
+
+    def __init__(
+        self,
+        manager: "FlowRunManager",
+        run_id: int,
+        step_plans: List[FlowStepPlan],
+        context: Dict[str, Any],
+        rows: List[Dict[str, Any]],
+        fail_action: str,
+        step_delay: int,
+        concurrency: Optional[int],
+        step_concurrency: Optional[int],
+        debug: bool,
+    ):
+        super().__init__(manager, run_id, step_plans, context, fail_action, step_delay, step_concurrency, None)
+        self.rows = rows
+        self.concurrency = concurrency
+        self.debug = debug
+        self.report: Optional[Dict[str, Any]] = None
+        # 以下只在执行该数据集的工作线程中访问
+        self._pending: List[models.FlowRunRow] = []
+        self._passed = 0
+        self._failed = 0
+        self._flushed_at = time.monotonic()
+        self._lost = False  # 记录已被标记为结束（如心跳超时被回收），不再写入行结果
+
+    def _result_values(self) -> Dict[str, Any]:
+        return {"report": self.report}
+
+    def _should_stop(self) -> bool:
+        return self.manager.stopping or self._finished or self._lost
+
+    def _on_row_done(self, summary: Dict[str, Any], failed_row: Optional[Dict[str, Any]]) -> None:
+        self._pending.append(models.FlowRunRow(
+            run_id=self.run_id,
+            row_index=summary["row"],
+            success=bool(summary["success"]),
+            duration_ms=summary["duration_ms"],
+            failed_step=summary["failed_step"],
+            error_message=summary["error_message"],
+            variables=_json_safe(summary["variables"]),
+            results=_json_safe(failed_row["results"]) if failed_row is not None else None,
+            debug_log=_json_safe(failed_row.get("debug_log")) if failed_row is not None else None,
+        ))
+        if summary["success"]:
+            self._passed += 1
+        else:
+            self._failed += 1
+            self.success = False
+        if len(self._pending) >= DATASET_ROW_BATCH_SIZE or time.monotonic() - self._flushed_at >= _ROW_FLUSH_SECONDS:
+            self._flush()
+
+    def _flush(self) -> None:
+        """写入累计的行结果并累加成功/失败行数"""
+        pending, self._pending = self._pending, []
+        passed, failed, self._passed, self._failed = self._passed, self._failed, 0, 0
+        self._flushed_at = time.monotonic()
+        if not pending or self._lost:
+            return
+        db = SessionLocal()
+        try:
+            if self._update(
+                db,
+                success_count=models.FlowRun.success_count + passed,
+                failed_count=models.FlowRun.failed_count + failed,
+            ):
+                db.add_all(pending)
+            else:
+                self._lost = True
+            db.commit()
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        """在工作线程中开始执行"""
+        if self.manager.stopping:
+            return
+        try:
+            db = SessionLocal()
+            try:
+                self._lost = not self._update(db, status="running", started_at=datetime.now())
+                db.commit()
+            finally:
+                db.close()
+            if self._lost:
+                self.manager._forget(self.run_id)
+                return
+            report = run_flow_dataset(
+                self.step_plans,
+                self.context,
+                self.rows,
+                fail_action=self.fail_action,
+                step_delay=self.step_delay,
+                concurrency=self.concurrency,
+                step_concurrency=self.step_concurrency,
+                debug=self.debug,
+                on_row_done=self._on_row_done,
+                should_stop=self._should_stop,
+            )
+            self._flush()
+            self.report = _json_safe(report)
+            self._finish()
+        except Exception as e:
+            print(f"⚠️ 数据驱动执行失败: run_id={self.run_id}, {e}")
+            self._finish(str(e))
+
+
+def load_run_steps(db, rows: List[models.FlowRunStep]) -> List[Dict[str, Any]]:
+    """步骤结果行转换为步骤结果字典，并批量读取存入 content_blobs 的请求/响应内容"""
+    results = [dict(row.result) if isinstance(row.result, dict) else {} for row in rows]
+    blob_store.hydrate_dicts(db, [(result, row.blob_refs) for result, row in zip(results, rows) if row.blob_refs])
+    return results
+
+
+def row_result(row: models.FlowRunRow) -> Dict[str, Any]:
+    """行结果记录转换为与 run_flow_dataset 行摘要相同的字典（失败行另含 results / debug_log）"""
+    result = {
+        "row": row.row_index,
+        "variables": row.variables,
+        "success": row.success,
+        "duration_ms": row.duration_ms,
+        "failed_step": row.failed_step,
+        "error_message": row.error_message,
+    }
+    if row.results is not None:
+        result["results"] = row.results
+    if row.debug_log is not None:
+        result["debug_log"] = row.debug_log
+    return result
+
+
+def read_run_progress(run_id: int, after_id: int = 0, limit: int = 200) -> Optional[dict]:
+    """
+    增量读取异步执行进度（先读执行记录再读步骤结果：读到已结束状态时，所有步骤结果都已在此之前提交）
+
+    Args:
+        run_id: flow_runs 记录ID
+        after_id: 只返回ID大于该值的步骤结果
+        limit: 单次最多返回的步骤结果数
+
+    Returns:
+        {"status", "total_steps", "total_rows", "success_count", "failed_count", "error_message", "has_more", "steps": [...]}，
+        记录不存在时返回 None（数据驱动执行没有步骤结果，计数为行数）
+    """
+    db = SessionLocal()
+    try:
+        run = db.query(models.FlowRun).filter(models.FlowRun.id == run_id).first()
+        if run is None:
+            return None
+        rows = db.query(models.FlowRunStep).filter(
+            models.FlowRunStep.run_id == run_id,
+            models.FlowRunStep.id > after_id
+        ).order_by(models.FlowRunStep.id).limit(limit).all()
+        return {
+            "status": run.status,
+            "total_steps": run.total_steps,
+            "total_rows": run.total_rows,
+            "success_count": run.success_count,
+            "failed_count": run.failed_count,
+            "error_message": run.error_message,
+            "has_more": len(rows) >= limit,
+            "steps": [
+                {"id": row.id, "step_index": row.step_index, "result": result}
+                for row, result in zip(rows, load_run_steps(db, rows))
+            ],
+        }
+    finally:
+        db.close()
+
+
+class FlowRunManager:
+    """本进程中的异步流程执行：工作线程池 + 步骤间延迟的调度线程 + 心跳线程"""
+
+    def __init__(self, workers: int = FLOW_RUN_WORKERS):
+        self.workers = max(1, workers)
+        self.worker_id = new_worker_id()
+        self.stopping = False
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._scheduler = _Scheduler()
+        self._runners: Dict[int, FlowRunner] = {}
+        self._monitor = LeaseMonitor(FLOW_RUN_LEASE, FLOW_RUN_HEARTBEAT_SECONDS, "flow-run-heartbeat", before=self.heartbeat)
+
+    def heartbeat(self) -> None:
+        """更新本进程未结束的执行的心跳"""
+        with self._lock:
+            run_ids = list(self._runners)
+        FLOW_RUN_LEASE.heartbeat(self.worker_id, run_ids)
+
+    def start_monitor(self) -> None:
+        """服务启动时调用：回收之前中断的执行，并启动心跳线程"""
+        self._monitor.start()
+
+    def submit(self, fn: Callable, *args) -> None:
+        with self._lock:
+            if self.stopping:
+                return
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="flow-run")
+            self._pool.submit(fn, *args)
+
+    def call_later(self, delay: float, fn: Callable[[], None]) -> None:
+        self._scheduler.call_later(delay, fn)
+
+    def start(
+        self,
+        run_id: int,
+        step_plans: List[FlowStepPlan],
+        context: Dict[str, Any],
+        fail_action: str = "stop",
+        step_delay: int = 0,
+        step_concurrency: Optional[int] = None,
+        debug_log: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        将流程执行放入队列
+
+        Args:
+            run_id: flow_runs 记录ID（worker_id 为本进程的 worker_id）
+            step_plans: compile_flow_plan 的结果（需已从会话中分离，见 detach_flow_plan）
+            context: 流程变量上下文
+            fail_action: 步骤失败时的行为（stop / continue）
+            step_delay: 步骤间延迟（毫秒）
+            step_concurrency: 同时执行的无依赖步骤数（见 flow_runner.run_flow）
+            debug_log: 开启 debug 时的调试日志列表（执行过程中继续追加，结束时写入 flow_runs.debug_log）
+        """
+        self._queue(FlowRunner(self, run_id, step_plans, context, fail_action, step_delay, step_concurrency, debug_log))
+
+    def start_dataset(
+        self,
+        run_id: int,
+        step_plans: List[FlowStepPlan],
+        context: Dict[str, Any],
+        rows: List[Dict[str, Any]],
+        fail_action: str = "stop",
+        step_delay: int = 0,
+        concurrency: Optional[int] = None,
+        step_concurrency: Optional[int] = None,
+        debug: bool = False,
+    ) -> None:
+        """
+        将数据驱动执行放入队列（参数见 start 和 flow_runner.run_flow_dataset）
+
+        Args:
+            run_id: flow_runs 记录ID（run_type 为 dataset，worker_id 为本进程的 worker_id）
+            rows: 数据行
+            concurrency: 同时执行的行数
+            debug: 记录失败行的调试日志（写入 flow_run_rows.debug_log）
+        """
+        self._queue(FlowDatasetRunner(
+            self, run_id, step_plans, context, rows, fail_action, step_delay, concurrency, step_concurrency, debug
+        ))
+
+    def _queue(self, runner: FlowRunner) -> None:
+        with self._lock:
+            self._runners[runner.run_id] = runner
+        self.submit(runner.start)
+
+    def _forget(self, run_id: int) -> None:
+        with self._lock:
+            self._runners.pop(run_id, None)
+
+    def shutdown(self) -> None:
+        """停止执行：不再开始新的步骤，未结束的执行记为失败"""
+        with self._lock:
+            self.stopping = True
+            pool, self._pool = self._pool, None
+            runners = list(self._runners.values())
+        self._monitor.stop()
+        self._scheduler.stop()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        for runner in runners:
+            runner._finish("服务停止，流程执行中断")
+
+
+flow_runs = FlowRunManager()
@@ -0,0 +1,381 @@
+"""出站 HTTP 连接池
+
+接口执行、流程执行、测试任务以及 OpenAPI 文档拉取都会向被测环境发请求。
+直接调用 requests.request 每次都会新建 TCP/TLS 连接，这里按目标地址
+（scheme://host:port，即环境的 base_url）维护共享的客户端，开启 keep-alive 复用连接。
+
+设置 HTTP_CLIENT_HTTP2=1 且安装了 httpx[http2] 时使用 HTTP/2 客户端，
+否则使用 requests + urllib3 连接池。两种客户端抛出的异常都统一为 requests.exceptions 中的类型。
+
+每个请求按阶段计时（time.perf_counter），结果放在响应（请求失败时为异常）的 timings 属性中：
+dns / connect / tls（本次请求新建连接时才有，复用连接时为 None）、send（发送请求）、
+server（请求发送完到收到响应头）、download（读取响应体）、total（毫秒），以及 reused（是否复用了已有连接）。
+HTTP/2 客户端的 DNS 解析时间计入 connect。
+
+接口执行、流程执行和测试任务通过 fetch 发请求：响应体按块流式读取一次，同时计算大小和 SHA-256，
+内存中最多保留 RESPONSE_CAPTURE_MAX_BYTES 字节（供断言和变量提取使用），JSON 在需要时才解析，
+执行结果中只保存前 RESPONSE_PREVIEW_MAX_CHARS 个字符的预览。
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+# 每个客户端缓存的主机连接池个数（重定向到其他主机时使用）
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+# 每个主机保持的最大连接数（并发执行时超出的连接用完即关闭，不会阻塞）
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+# 最多保留的目标地址客户端数，超出时关闭最久未使用的
+HTTP_MAX_CLIENTS = int(os.getenv("HTTP_MAX_CLIENTS", "64"))
+# 是否启用 HTTP/2（需要 pip install "httpx[http2]"）
+HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "0") == "1"
+# 单个响应读取到内存中的最大字节数（供断言和变量提取使用），超出部分只计入大小和哈希
+RESPONSE_CAPTURE_MAX_BYTES = int(os.getenv("RESPONSE_CAPTURE_MAX_BYTES", str(10 * 1024 * 1024)))
+# 执行结果中保存的响应体预览最大字符数
+RESPONSE_PREVIEW_MAX_CHARS = int(os.getenv("RESPONSE_PREVIEW_MAX_CHARS", "10000"))
+
+
+# 分阶段计时的阶段名，对应 timings 中的 <阶段>_ms
+TIMING_PHASES = ("dns", "connect", "tls", "send", "server", "download", "total")
+
+
+class RequestTiming:
+    """一次请求（含重定向）各阶段的耗时"""
+    __slots__ = (
+        "started", "dns", "connect", "tls", "send", "server", "download",
+        "connections", "secure", "dns_measured", "_hop_started", "_hop_established", "_sent_at", "_headers_at",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.dns = self.connect = self.tls = self.send = self.server = self.download = 0.0
+        self.connections = 0  # 本次请求新建的连接数
+        self.secure = False  # 新建的连接是否进行了 TLS 握手
+        self.dns_measured = True
+        self._hop_started = self._sent_at = self._headers_at = None
+        self._hop_established = 0.0
+
+    def _established(self) -> float:
+        return self.dns + self.connect + self.tls
+
+    def request_started(self) -> None:
+        now = time.perf_counter()
+        if self._headers_at is not None:
+            # 重定向：上一个响应的响应体读取到此结束
+            self.download += now - self._headers_at
+            self._headers_at = None
+        self._hop_started = now
+        self._hop_established = self._established()
+
+    def request_sent(self) -> None:
+        if self._hop_started is None:
+            return
+        self._sent_at = time.perf_counter()
+        # 连接可能在发送请求时才建立，扣除建立连接的时间
+        self.send += self._sent_at - self._hop_started - (self._established() - self._hop_established)
+        self._hop_started = None
+
+    def headers_received(self) -> None:
+        if self._sent_at is None:
+            return
+        self._headers_at = time.perf_counter()
+        self.server += self._headers_at - self._sent_at
+        self._sent_at = None
+
+    def finish(self) -> Dict[str, Any]:
+        """结束计时，返回各阶段耗时（毫秒）"""
+        now = time.perf_counter()
+        if self._headers_at is not None:
+            self.download += now - self._headers_at
+            self._headers_at = None
+        ms = lambda seconds: round(seconds * 1000, 2)
+        reused = self.connections == 0
+        return {
+            "dns_ms": None if reused or not self.dns_measured else ms(self.dns),
+            "connect_ms": None if reused else ms(self.connect),
+            "tls_ms": ms(self.tls) if self.secure else None,
+            "send_ms": ms(self.send),
+            "server_ms": ms(self.server),
+            "download_ms": ms(self.download),
+            "total_ms": ms(now - self.started),
+            "reused": reused,
+        }
+
+
+# 当前线程正在计时的请求
+current_timing: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("http_request_timing", default=None)
+
+
+def timings_of(obj: Any) -> Optional[Dict[str, Any]]:
+    """取响应（或请求异常）上的分阶段耗时"""
+    return getattr(obj, "timings", None)
+
+
+_NOT_PARSED = object()
+
+
+class CapturedResponse:
+    """
+    流式读取的响应
+
+    content 为响应体的前 RESPONSE_CAPTURE_MAX_BYTES 字节（truncated 表示超出），size / sha256 按完整响应体计算；
+    parsed_json() 第一次调用时才解析 JSON 并缓存结果。
+    """
+    __slots__ = ("status_code", "headers", "encoding", "content", "size", "sha256", "truncated", "timings", "_json")
+
+    def __init__(self, status_code: int, headers, encoding: Optional[str]):
+        self.status_code = status_code
+        self.headers = headers
+        self.encoding = encoding
+        self.content = b""
+        self.size = 0
+        self.sha256 = None
+        self.truncated = False
+        self.timings = None
+        self._json = _NOT_PARSED
+
+    def _decode(self, data: bytes) -> str:
+        try:
+            return data.decode(self.encoding or "utf-8", errors="replace")
+        except LookupError:
+            return data.decode("utf-8", errors="replace")
+
+    @property
+    def text(self) -> str:
+        """已读取部分的文本"""
+        return self._decode(self.content)
+
+    def parsed_json(self) -> Any:
+        """解析后的 JSON，响应体不是 JSON 或超过读取上限时为 None"""
+        if self._json is _NOT_PARSED:
+            self._json = None
+            if self.content and not self.truncated:
+                try:
+                    self._json = json.loads(self.content)
+                except ValueError:
+                    pass
+        return self._json
+
+    def preview(self, max_chars: Optional[int] = None) -> str:
+        """保存到执行结果中的响应体预览，超出 max_chars（默认 RESPONSE_PREVIEW_MAX_CHARS）时截断"""
+        if max_chars is None:
+            max_chars = RESPONSE_PREVIEW_MAX_CHARS
+        # 每个字符最多 4 字节，只解码需要的部分
+        text = self._decode(self.content[:max_chars * 4])
+        if len(text) > max_chars or self.truncated or len(self.content) > max_chars * 4:
+            return text[:max_chars] + "... (truncated)"
+        return text
+
+    def summary(self) -> Dict[str, Any]:
+        """响应体大小和哈希，写入执行结果"""
+        return {"response_size": self.size, "response_sha256": self.sha256, "response_truncated": self.truncated}
+
+
+def _capture(client, response, max_bytes: int) -> CapturedResponse:
+    """按块读取响应体：计算大小和哈希，只保留前 max_bytes 字节；读取结束后连接归还连接池"""
+    captured = CapturedResponse(response.status_code, response.headers, getattr(response, "encoding", None))
+    digest = hashlib.sha256()
+    chunks = []
+    kept = 0
+    try:
+        for chunk in client.iter_body(response):
+            digest.update(chunk)
+            captured.size += len(chunk)
+            if kept < max_bytes:
+                chunk = chunk[:max_bytes - kept]
+                chunks.append(chunk)
+                kept += len(chunk)
+    finally:
+        response.close()
+    captured.content = b"".join(chunks)
+    captured.sha256 = digest.hexdigest()
+    captured.truncated = captured.size > kept
+    return captured
+
+
+def _http2_available() -> bool:
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def origin_of(url: str) -> str:
+    """返回 URL 的 scheme://host:port 部分，作为连接池的键"""
+    parts = urlsplit(url or "")
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class HttpClientPool:
+    """按目标地址缓存的共享客户端集合（线程安全）"""
+
+    def __init__(
+        self,
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        max_clients: int = HTTP_MAX_CLIENTS,
+        http2: bool = HTTP_CLIENT_HTTP2,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_clients = max_clients
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            print("⚠️ 已设置 HTTP_CLIENT_HTTP2=1，但未安装 httpx[http2]，使用 HTTP/1.1 连接池")
+        self._clients: "OrderedDict[str, object]" = OrderedDict()
+        self._request_counts: Dict[str, int] = {}
+        # 各客户端正在进行的请求数；被淘汰时仍有请求的客户端等请求结束后再关闭
+        self._in_flight: Dict[object, int] = {}
+        self._retired: set = set()
+        self._lock = threading.Lock()
+
+    def _new_client(self, pool_maxsize: Optional[int] = None):
+        # requests / urllib3 / httpx 在第一次发请求时才导入
+        import http_transport
+        if self.http2:
+            return http_transport.Http2Client(pool_maxsize or self.pool_maxsize)
+        return http_transport.RequestsClient(self.pool_connections, pool_maxsize or self.pool_maxsize)
+
+    def _retire(self, client, closing: list) -> None:
+        """不再使用的客户端：没有正在进行的请求时放入 closing（在锁外关闭），否则等请求结束后关闭"""
+        if self._in_flight.get(client):
+            self._retired.add(client)
+        else:
+            closing.append(client)
+
+    def _evict(self, closing: list) -> None:
+        while len(self._clients) > self.max_clients:
+            old_key, old_client = self._clients.popitem(last=False)
+            self._request_counts.pop(old_key, None)
+            self._retire(old_client, closing)
+
+    def _acquire(self, base_url: str):
+        """获取目标地址对应的共享客户端（不存在时创建）并记为使用中，用完后调用 _release"""
+        key = origin_of(base_url)
+        closing = []
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._new_client()
+                self._clients[key] = client
+                self._evict(closing)
+            else:
+                self._clients.move_to_end(key)
+            self._request_counts[key] = self._request_counts.get(key, 0) + 1
+            self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        for old_client in closing:
+            old_client.close()
+        return client
+
+    def reserve(self, base_url: str, pool_maxsize: int) -> None:
+        """
+        保证目标地址的客户端至少保持 pool_maxsize 个连接（如压测时按虚拟用户数），
+        连接池较小的现有客户端在正在进行的请求结束后关闭
+        """
+        key = origin_of(base_url)
+        closing = []
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None and client.pool_maxsize >= pool_maxsize:
+                return
+            self._clients[key] = self._new_client(pool_maxsize)
+            self._clients.move_to_end(key)
+            if client is not None:
+                self._retire(client, closing)
+            self._evict(closing)
+        for old_client in closing:
+            old_client.close()
+
+    def _release(self, client) -> None:
+        with self._lock:
+            remaining = self._in_flight[client] - 1
+            if remaining:
+                self._in_flight[client] = remaining
+                return
+            del self._in_flight[client]
+            if client not in self._retired:
+                return
+            self._retired.discard(client)
+        client.close()
+
+    def request(self, method: str, url: str, **kwargs):
+        """
+        发送请求，参数与 requests.request 相同
+
+        Args:
+            method: 请求方法
+            url: 完整请求地址，按其 scheme://host:port 选择连接池
+            **kwargs: headers / params / json / data / timeout 等
+
+        Returns:
+            响应对象（提供 status_code / headers / text / content / json()），
+            timings 属性为分阶段耗时（请求失败时在异常的 timings 属性中）
+        """
+        return self._send(method, url, None, kwargs)
+
+    def fetch(self, method: str, url: str, max_bytes: Optional[int] = None, **kwargs) -> CapturedResponse:
+        """
+        发送请求并流式读取响应体（只读取一次），参数与 request 相同
+
+        Args:
+            method: 请求方法
+            url: 完整请求地址
+            max_bytes: 内存中最多保留的响应体字节数，默认 RESPONSE_CAPTURE_MAX_BYTES
+            **kwargs: headers / params / json / data / timeout 等
+
+        Returns:
+            CapturedResponse（timings 包含读取响应体的时间）
+        """
+        if max_bytes is None:
+            max_bytes = RESPONSE_CAPTURE_MAX_BYTES
+        return self._send(method, url, max_bytes, kwargs)
+
+    def _send(self, method: str, url: str, capture_bytes: Optional[int], kwargs: Dict[str, Any]):
+        client = self._acquire(url)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            if capture_bytes is None:
+                response = client.request(method, url, **kwargs)
+            else:
+                response = _capture(client, client.request(method, url, stream=True, **kwargs), capture_bytes)
+        except Exception as e:
+            e.timings = timing.finish()
+            raise
+        finally:
+            current_timing.reset(token)
+            self._release(client)
+        response.timings = timing.finish()
+        return response
+
+    def stats(self) -> dict:
+        """当前缓存的客户端及各自处理的请求数"""
+        with self._lock:
+            return {
+                "http_version": "HTTP/2" if self.http2 else "HTTP/1.1",
+                "pool_maxsize": self.pool_maxsize,
+                "max_clients": self.max_clients,
+                "clients": len(self._clients),
+                "retired_clients": len(self._retired),
+                "requests": dict(self._request_counts),
+            }
+
+    def close_all(self) -> None:
+        """关闭所有客户端及其连接"""
+        with self._lock:
+            clients = list(self._clients.values()) + list(self._retired)
+            self._clients.clear()
+            self._request_counts.clear()
+            self._retired.clear()
+        for client in clients:
+            client.close()
+
+
+http_clients = HttpClientPool()
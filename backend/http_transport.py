@@ -0,0 +1,219 @@
+"""出站 HTTP 客户端的实现（由 http_client 在第一次创建客户端时导入）
+
+RequestsClient 基于 requests + urllib3 连接池，连接的 DNS 解析、TCP 连接、TLS 握手、发送请求和等待响应头
+按阶段记录到 http_client.current_timing；Http2Client 基于 httpx，通过 httpcore 的 trace 回调计时。
+"""
+import socket
+import time
+from http import cookiejar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import connection, connectionpool, poolmanager
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from http_client import RequestTiming, current_timing
+
+# 流式读取响应体的块大小
+_READ_CHUNK_SIZE = 64 * 1024
+
+# 共享客户端不能在请求之间保存 Cookie，否则不同用户、不同用例之间会互相影响
+_NO_COOKIES = cookiejar.DefaultCookiePolicy(allowed_domains=[])
+
+
+class _TimedConnectionMixin:
+    """在 urllib3 连接的各个阶段记录耗时"""
+
+    def _new_conn(self):
+        timing = current_timing.get()
+        if timing is None:
+            return super()._new_conn()
+        host = self._dns_host
+        timing.connections += 1
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host.strip("[]"), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        finally:
+            resolved = time.perf_counter()
+            timing.dns += resolved - started
+        # 依次连接解析出的地址（与 urllib3 相同），地址已解析，不会再次查询 DNS
+        error = None
+        try:
+            for *_, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError) as e:
+                    error = e
+        finally:
+            self._dns_host = host
+            timing.connect += time.perf_counter() - resolved
+        raise error or NewConnectionError(self, "Failed to establish a new connection: getaddrinfo returns an empty list")
+
+    def request(self, *args, **kwargs):
+        timing = current_timing.get()
+        if timing is not None:
+            timing.request_started()
+        result = super().request(*args, **kwargs)
+        if timing is not None:
+            timing.request_sent()
+        return result
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timing = current_timing.get()
+        if timing is not None:
+            timing.headers_received()
+        return response
+
+
+# 以下类名与 urllib3 相同，请求失败时的错误信息保持不变
+class HTTPConnection(_TimedConnectionMixin, connection.HTTPConnection):
+    pass
+
+
+class HTTPSConnection(_TimedConnectionMixin, connection.HTTPSConnection):
+    def connect(self):
+        timing = current_timing.get()
+        if timing is None:
+            return super().connect()
+        timing.secure = True
+        started = time.perf_counter()
+        established = timing.dns + timing.connect
+        try:
+            return super().connect()
+        finally:
+            # TLS 握手 = connect 总耗时 - DNS 解析和 TCP 连接
+            timing.tls += time.perf_counter() - started - (timing.dns + timing.connect - established)
+
+
+class HTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = HTTPConnection
+
+
+class HTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = HTTPSConnection
+
+
+_TIMED_POOL_CLASSES = {"http": HTTPConnectionPool, "https": HTTPSConnectionPool}
+
+
+class _TimedAdapter(HTTPAdapter):
+    """使用分阶段计时连接的 HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _TIMED_POOL_CLASSES
+
+    def proxy_manager_for(self, *args, **kwargs):
+        manager = super().proxy_manager_for(*args, **kwargs)
+        # SOCKS 代理使用自己的连接类，不计时
+        if isinstance(manager, poolmanager.ProxyManager):
+            manager.pool_classes_by_scheme = _TIMED_POOL_CLASSES
+        return manager
+
+
+class RequestsClient:
+    """基于 requests.Session 的连接池客户端"""
+
+    http_version = "HTTP/1.1"
+
+    def __init__(self, pool_connections: int, pool_maxsize: int):
+        self.pool_maxsize = pool_maxsize
+        self._session = requests.Session()
+        self._session.cookies.set_policy(_NO_COOKIES)
+        adapter = _TimedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self._session.request(method, url, **kwargs)
+
+    @staticmethod
+    def iter_body(response: requests.Response):
+        return response.iter_content(_READ_CHUNK_SIZE)
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class Http2Client:
+    """基于 httpx 的 HTTP/2 客户端，参数与异常对齐 requests"""
+
+    http_version = "HTTP/2"
+
+    def __init__(self, pool_maxsize: int):
+        self.pool_maxsize = pool_maxsize
+        import httpx
+        self._httpx = httpx
+        self._client = httpx.Client(
+            http2=True,
+            follow_redirects=True,
+            cookies=cookiejar.CookieJar(policy=_NO_COOKIES),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=pool_maxsize),
+        )
+
+    def request(self, method: str, url: str, params=None, data=None, timeout=None, stream=False, **kwargs):
+        httpx = self._httpx
+        if isinstance(params, dict):
+            # requests 会忽略值为 None 的查询参数
+            params = {k: v for k, v in params.items() if v is not None}
+        if data is not None:
+            kwargs["data" if isinstance(data, dict) else "content"] = data
+        timing = current_timing.get()
+        if timing is not None:
+            timing.dns_measured = False
+            kwargs["extensions"] = {"trace": self._trace(timing)}
+        try:
+            if stream:
+                request = self._client.build_request(method, url, params=params, timeout=timeout, **kwargs)
+                return self._client.send(request, stream=True)
+            return self._client.request(method, url, params=params, timeout=timeout, **kwargs)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e))
+
+    def iter_body(self, response):
+        httpx = self._httpx
+        try:
+            yield from response.iter_bytes(_READ_CHUNK_SIZE)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    @staticmethod
+    def _trace(timing: RequestTiming):
+        """httpcore 的 trace 回调：按连接和请求事件记录耗时（DNS 解析计入 connect_tcp）"""
+        marks = {}
+
+        def trace(event: str, info) -> None:
+            stage, _, state = event.rpartition(".")
+            if stage in ("connection.connect_tcp", "connection.start_tls"):
+                if state == "started":
+                    marks[stage] = time.perf_counter()
+                    if stage == "connection.start_tls":
+                        timing.secure = True
+                elif state == "complete" and stage in marks:
+                    elapsed = time.perf_counter() - marks.pop(stage)
+                    if stage == "connection.connect_tcp":
+                        timing.connect += elapsed
+                        timing.connections += 1
+                    else:
+                        timing.tls += elapsed
+            elif stage.endswith(".send_request_headers") and state == "started":
+                timing.request_started()
+            elif stage.endswith(".send_request_body") and state == "complete":
+                timing.request_sent()
+            elif stage.endswith(".receive_response_headers") and state == "complete":
+                timing.headers_received()
+        return trace
+
+    def close(self) -> None:
+        self._client.close()
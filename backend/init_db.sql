@@ -226,6 +226,7 @@ CREATE TABLE IF NOT EXISTS api_environments (
     base_url VARCHAR(255) NOT NULL COMMENT '配置信息（基础URL）',
     description TEXT COMMENT '配置说明',
     headers JSON COMMENT '默认请求头',
+    max_concurrency INT COMMENT '测试任务发往该环境的最大并发请求数',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
@@ -245,6 +246,7 @@ CREATE TABLE IF NOT EXISTS api_endpoints (
     tags JSON COMMENT '标签列表',
     parameters JSON COMMENT 'Swagger参数列表(path/query/header参数)',
     request_body JSON COMMENT 'Swagger请求体定义',
+    response_schemas JSON COMMENT '各状态码的响应结构',
     is_favorite BOOLEAN DEFAULT FALSE COMMENT '是否收藏',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
@@ -288,8 +290,11 @@ CREATE TABLE IF NOT EXISTS api_execution_records (
     response_headers JSON COMMENT '响应头',
     response_body TEXT COMMENT '响应体',
     response_time INT COMMENT '响应时间（毫秒）',
+    timings JSON COMMENT '分阶段耗时（毫秒）',
     success BOOLEAN DEFAULT FALSE COMMENT '是否成功',
     error_message TEXT COMMENT '错误信息',
+    debug_log JSON COMMENT '开启debug时记录的调试日志',
+    blob_refs JSON COMMENT '存入content_blobs的字段及内容哈希',
     executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (endpoint_id) REFERENCES api_endpoints(id) ON DELETE CASCADE,
     FOREIGN KEY (test_data_id) REFERENCES api_test_data(id) ON DELETE SET NULL,
@@ -330,6 +335,17 @@ CREATE TABLE IF NOT EXISTS flow_variables (
     UNIQUE KEY uk_flow_key (flow_id, `key`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程局部变量表';
 
+-- 流程步骤引用接口索引表（api_test_flows.steps 的反向索引）
+CREATE TABLE IF NOT EXISTS flow_step_endpoints (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    flow_id INT NOT NULL COMMENT '关联流程ID',
+    step_index INT NOT NULL COMMENT '步骤序号（从1开始）',
+    endpoint_id INT NOT NULL COMMENT '步骤引用的接口ID',
+    FOREIGN KEY (flow_id) REFERENCES api_test_flows(id) ON DELETE CASCADE,
+    INDEX idx_flow_id (flow_id),
+    INDEX idx_flow_step_endpoints_endpoint (endpoint_id, flow_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程步骤引用接口索引表';
+
 -- 流程导出记录表
 CREATE TABLE IF NOT EXISTS flow_export_records (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -342,6 +358,99 @@ CREATE TABLE IF NOT EXISTS flow_export_records (
     INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程导出记录表';
 
+-- 压测记录表
+CREATE TABLE IF NOT EXISTS load_test_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL COMMENT '所属项目ID',
+    target_type VARCHAR(20) NOT NULL COMMENT '压测对象类型：flow | api',
+    target_id INT NOT NULL COMMENT '流程ID或接口ID',
+    environment_id INT NULL COMMENT '环境ID',
+    config JSON COMMENT '压测配置：虚拟用户数、时长/迭代次数、加压时间、阈值等',
+    status ENUM('running', 'completed', 'stopped', 'failed') NOT NULL DEFAULT 'running' COMMENT '状态：执行中|完成|已停止|执行出错',
+    passed BOOLEAN NULL COMMENT '是否满足全部阈值（未设置阈值时为空）',
+    report JSON COMMENT '压测报告：各步骤耗时分位数、吞吐量、错误率',
+    error_message TEXT COMMENT '错误信息',
+    created_by INT NULL COMMENT '创建人ID',
+    started_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP COMMENT '开始时间',
+    completed_at TIMESTAMP NULL COMMENT '结束时间',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    worker_id VARCHAR(100) NULL COMMENT '执行该压测的服务进程',
+    heartbeat_at DATETIME NULL COMMENT '执行进程最近一次心跳',
+    stop_requested BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否已请求停止',
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (environment_id) REFERENCES api_environments(id) ON DELETE SET NULL,
+    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL,
+    INDEX idx_project_id (project_id),
+    INDEX idx_load_test_runs_target (target_type, target_id, id),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='压测记录表';
+
+-- 流程异步执行记录表
+CREATE TABLE IF NOT EXISTS flow_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL COMMENT '所属项目ID',
+    flow_id INT NOT NULL COMMENT '流程ID',
+    environment_id INT NULL COMMENT '环境ID',
+    status ENUM('queued', 'running', 'success', 'failed') NOT NULL DEFAULT 'queued' COMMENT '状态：排队|执行中|成功|失败',
+    run_type ENUM('flow', 'dataset') NOT NULL DEFAULT 'flow' COMMENT '执行方式：流程|数据驱动',
+    total_steps INT NOT NULL DEFAULT 0 COMMENT '启用的步骤数',
+    total_rows INT NULL COMMENT '数据驱动执行的数据行数',
+    success_count INT NOT NULL DEFAULT 0 COMMENT '成功步骤数（数据驱动执行为成功行数）',
+    failed_count INT NOT NULL DEFAULT 0 COMMENT '失败步骤数（数据驱动执行为失败行数）',
+    context JSON COMMENT '执行结束时的变量上下文',
+    debug_log JSON COMMENT '开启debug时记录的调试日志',
+    report JSON COMMENT '数据驱动执行的汇总报告',
+    error_message TEXT COMMENT '错误信息',
+    created_by INT NULL COMMENT '创建人ID',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    started_at DATETIME NULL COMMENT '开始执行时间',
+    completed_at DATETIME NULL COMMENT '结束时间',
+    worker_id VARCHAR(100) NULL COMMENT '执行该流程的服务进程',
+    heartbeat_at DATETIME NULL COMMENT '执行进程最近一次心跳',
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (flow_id) REFERENCES api_test_flows(id) ON DELETE CASCADE,
+    FOREIGN KEY (environment_id) REFERENCES api_environments(id) ON DELETE SET NULL,
+    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL,
+    INDEX idx_project_id (project_id),
+    INDEX idx_flow_runs_flow (flow_id, id),
+    INDEX idx_status (status),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程异步执行记录表';
+
+-- 流程异步执行步骤结果表
+CREATE TABLE IF NOT EXISTS flow_run_steps (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id INT NOT NULL COMMENT '关联执行记录ID',
+    step_index INT NOT NULL COMMENT '步骤序号（从1开始）',
+    success BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否成功',
+    status_code INT COMMENT 'HTTP状态码',
+    response_time INT COMMENT '耗时（毫秒）',
+    error_message TEXT COMMENT '错误信息',
+    result JSON COMMENT '步骤结果',
+    blob_refs JSON COMMENT 'result中存入content_blobs的字段及内容哈希',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (run_id) REFERENCES flow_runs(id) ON DELETE CASCADE,
+    INDEX idx_flow_run_steps_run_id (run_id, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程异步执行步骤结果表';
+
+-- 数据驱动执行行结果表
+CREATE TABLE IF NOT EXISTS flow_run_rows (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id INT NOT NULL COMMENT '关联执行记录ID',
+    row_index INT NOT NULL COMMENT '行号（从1开始）',
+    success BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否成功',
+    duration_ms INT COMMENT '耗时（毫秒）',
+    failed_step INT COMMENT '第一个失败的步骤序号',
+    error_message TEXT COMMENT '错误信息',
+    variables JSON COMMENT '该行的变量',
+    results JSON COMMENT '失败行的完整步骤结果',
+    debug_log JSON COMMENT '开启debug时失败行的调试日志',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (run_id) REFERENCES flow_runs(id) ON DELETE CASCADE,
+    INDEX idx_flow_run_rows_run (run_id, row_index),
+    INDEX idx_flow_run_rows_success (run_id, success, row_index)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='数据驱动执行行结果表';
+
 -- 测试文件管理表
 CREATE TABLE IF NOT EXISTS test_files (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -446,6 +555,7 @@ CREATE TABLE IF NOT EXISTS test_tasks (
     is_favorite BOOLEAN DEFAULT FALSE COMMENT '是否收藏',
     cron_expression VARCHAR(100) COMMENT 'Cron表达式，用于定时执行',
     environment_id INT COMMENT '定时执行时使用的环境ID',
+    max_concurrency INT COMMENT '同时执行的任务项数',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
@@ -477,7 +587,7 @@ CREATE TABLE IF NOT EXISTS test_task_executions (
     total_count INT DEFAULT 0 COMMENT '总数量',
     success_count INT DEFAULT 0 COMMENT '成功数量',
     failed_count INT DEFAULT 0 COMMENT '失败数量',
-    execution_results JSON COMMENT '执行结果详情（每个接口/流程的执行结果）',
+    execution_results JSON COMMENT '执行结果详情（仅旧记录使用，新记录见 test_task_execution_items）',
     error_message TEXT COMMENT '错误信息',
     started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP NULL COMMENT '完成时间',
@@ -488,6 +598,89 @@ CREATE TABLE IF NOT EXISTS test_task_executions (
     INDEX idx_started_at (started_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='测试任务执行记录表';
 
+-- 测试任务执行队列表
+CREATE TABLE IF NOT EXISTS task_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    execution_id INT NOT NULL COMMENT '关联执行记录ID',
+    task_id INT NOT NULL COMMENT '关联任务ID',
+    shard_index INT NOT NULL DEFAULT 0 COMMENT '分片序号',
+    shard_count INT NOT NULL DEFAULT 1 COMMENT '分片总数',
+    payload JSON COMMENT '执行参数及本分片的任务项',
+    status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued' COMMENT '状态：排队|执行中|完成|失败',
+    attempts INT NOT NULL DEFAULT 0 COMMENT '已领取次数',
+    worker_id VARCHAR(100) COMMENT '当前持有租约的worker',
+    lease_expires_at DATETIME NULL COMMENT '租约到期时间',
+    error_message TEXT COMMENT '错误信息',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL COMMENT '开始执行时间',
+    finished_at DATETIME NULL COMMENT '结束时间',
+    FOREIGN KEY (execution_id) REFERENCES test_task_executions(id) ON DELETE CASCADE,
+    FOREIGN KEY (task_id) REFERENCES test_tasks(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_execution_shard (execution_id, shard_index),
+    INDEX idx_execution (execution_id),
+    INDEX idx_task (task_id),
+    INDEX idx_task_jobs_status_id (status, id),
+    INDEX idx_task_jobs_status_lease (status, lease_expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='测试任务执行队列表';
+
+-- 队列全局锁表：领取任务时锁定对应行，并发上限检查与领取在同一个锁内完成
+CREATE TABLE IF NOT EXISTS queue_locks (
+    name VARCHAR(50) PRIMARY KEY COMMENT '锁名称（task_jobs）'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='队列全局锁表';
+
+INSERT IGNORE INTO queue_locks (name) VALUES ('task_jobs');
+
+-- 请求/响应内容存储表
+CREATE TABLE IF NOT EXISTS content_blobs (
+    hash CHAR(64) PRIMARY KEY COMMENT '原始内容的SHA-256',
+    codec VARCHAR(10) NOT NULL COMMENT '压缩算法：zstd|gzip|none',
+    raw_size INT NOT NULL COMMENT '原始字节数',
+    stored_size INT NOT NULL COMMENT '压缩后字节数',
+    data LONGBLOB NOT NULL COMMENT '压缩后的内容',
+    created_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP,
+    last_referenced_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近一次被引用的时间',
+    INDEX idx_last_referenced_at (last_referenced_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='请求/响应内容存储表（按内容哈希去重）';
+
+-- 执行历史保留策略表
+CREATE TABLE IF NOT EXISTS retention_policies (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL COMMENT '所属项目ID',
+    keep_last_runs INT NULL COMMENT '每个接口/任务/流程至少保留最近N条',
+    keep_days INT NULL COMMENT '保留最近D天的记录',
+    keep_failed_days INT NULL COMMENT '失败记录保留天数',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_project (project_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='执行历史保留策略表';
+
+-- 测试任务执行结果明细表
+CREATE TABLE IF NOT EXISTS test_task_execution_items (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    execution_id INT NOT NULL COMMENT '关联执行记录ID',
+    job_id INT COMMENT '写入该结果的分片ID',
+    item_index INT NOT NULL DEFAULT 0 COMMENT '任务项在本次执行中的序号',
+    result_index INT NOT NULL DEFAULT 0 COMMENT '同一任务项的结果序号',
+    item_type VARCHAR(20) NOT NULL COMMENT '类型：api|flow',
+    item_id INT COMMENT '接口/流程ID',
+    item_name VARCHAR(500) COMMENT '名称',
+    success BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否成功',
+    status_code INT COMMENT 'HTTP状态码',
+    execution_time INT COMMENT '耗时（毫秒）',
+    timings JSON COMMENT '分阶段耗时（毫秒）',
+    error_message TEXT COMMENT '错误信息',
+    details JSON COMMENT '请求/响应详情',
+    blob_refs JSON COMMENT 'details中存入content_blobs的字段及内容哈希',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (execution_id) REFERENCES test_task_executions(id) ON DELETE CASCADE,
+    FOREIGN KEY (job_id) REFERENCES task_jobs(id) ON DELETE CASCADE,
+    INDEX idx_execution_items_execution_id (execution_id, id),
+    INDEX idx_execution_items_execution_success (execution_id, success),
+    INDEX idx_execution_items_item (item_type, item_id),
+    INDEX idx_job (job_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='测试任务执行结果明细表';
+
 -- 用例目录表（独立持久化，不依赖占位用例）
 CREATE TABLE IF NOT EXISTS testcase_directories (
     id INT AUTO_INCREMENT PRIMARY KEY,
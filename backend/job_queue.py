@@ -0,0 +1,672 @@
+"""测试任务执行队列与 worker 池
+
+执行请求写入 task_jobs 表，worker 通过 SELECT ... FOR UPDATE SKIP LOCKED 领取，
+领取后持有租约并定期心跳续期。进程崩溃或重启后，租约过期的任务会被重新排队
+（超过最大尝试次数则标记为失败），不会再出现永远停留在“运行中”的任务。
+
+任务项较多时，一次执行会按顺序切成多个分片（每个分片一条队列记录），可被多个 worker
+进程（可在不同机器上）同时领取；最后一个结束的分片负责汇总结果。
+
+每个任务项执行完即写入 test_task_execution_items 并原子累加执行记录的成功/失败数，
+执行过程中可以通过 /api/test-tasks/{task_id}/executions/{execution_id}/stream 实时查看进度。
+
+worker 可以跑在 API 进程内（JOB_WORKERS > 0），也可以单独启动：
+
+    python job_queue.py --workers 4
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import blob_store
+import exec_log
+import models
+import schemas
+from config import SessionLocal
+from task_runner import (
+    PlanItem, snapshot_items, split_into_shards, execute_task_items,
+    count_results, item_error_results, save_execution_summary,
+)
+
+# API 进程内启动的 worker 线程数，0 表示只入队、由独立 worker 进程执行
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 所有 worker 合计同时执行的任务数上限
+JOB_MAX_RUNNING = int(os.getenv("JOB_MAX_RUNNING", "4"))
+# 租约时长（秒），worker 失联超过这个时间后任务会被回收
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+# 心跳续约间隔（秒）
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+# 队列为空时的轮询间隔（秒）
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# 每个任务最多被领取的次数（包含崩溃后的重试）
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+# 回收孤儿任务的间隔（秒）
+JOB_RECOVER_SECONDS = int(os.getenv("JOB_RECOVER_SECONDS", "30"))
+# 自动分片时每个分片的任务项数
+TASK_SHARD_SIZE = int(os.getenv("TASK_SHARD_SIZE", "200"))
+# 单次执行最多拆分的分片数
+TASK_MAX_SHARDS = int(os.getenv("TASK_MAX_SHARDS", "8"))
+
+
+def resolve_shard_count(item_count: int, requested: Optional[int] = None) -> int:
+    """分片数：优先使用请求指定的值，否则按 TASK_SHARD_SIZE 计算，不超过 TASK_MAX_SHARDS"""
+    if requested:
+        return max(1, min(requested, TASK_MAX_SHARDS))
+    return max(1, min(TASK_MAX_SHARDS, -(-item_count // TASK_SHARD_SIZE)))
+
+
+def enqueue_task_execution(
+    db: Session,
+    task: models.TestTask,
+    execution: models.TestTaskExecution,
+    request: schemas.TestTaskExecutionRequest
+) -> List[models.TaskJob]:
+    """
+    为执行记录创建排队任务（与执行记录在同一事务中提交）
+
+    Args:
+        db: 数据库会话
+        task: 测试任务（含任务项）
+        execution: 已 flush 的执行记录
+        request: 执行参数
+
+    Returns:
+        各分片的排队记录
+    """
+    items = snapshot_items(task)
+    shards = split_into_shards(items, resolve_shard_count(len(items), request.shard_count))
+    request_payload = request.model_dump(mode="json")
+    jobs = []
+    for shard_index, shard_items in enumerate(shards):
+        job = models.TaskJob(
+            execution_id=execution.id,
+            task_id=execution.task_id,
+            shard_index=shard_index,
+            shard_count=len(shards),
+            payload={"request": request_payload, "items": [item.to_dict() for item in shard_items]},
+            status='queued',
+        )
+        db.add(job)
+        jobs.append(job)
+    return jobs
+
+
+# 领取任务时锁定的 queue_locks 行
+_CLAIM_LOCK = "task_jobs"
+
+
+def _lock_queue(db: Session, name: str) -> None:
+    """在当前事务中锁定 queue_locks 的一行（不存在时先创建），事务结束时释放"""
+    if db.query(models.QueueLock).filter(models.QueueLock.name == name).with_for_update().first() is not None:
+        return
+    try:
+        db.add(models.QueueLock(name=name))
+        db.commit()
+    except IntegrityError:
+        # 其他 worker 同时创建了该行
+        db.rollback()
+    db.query(models.QueueLock).filter(models.QueueLock.name == name).with_for_update().one()
+
+
+def claim_job(worker_id: str, max_running: int = JOB_MAX_RUNNING) -> Optional[models.TaskJob]:
+    """
+    领取一个排队中的任务
+
+    并发上限检查和领取在锁定 queue_locks 行的同一个事务中完成，多个 worker（进程）同时领取时不会超过上限。
+
+    Returns:
+        领取到的任务（已脱离会话），没有可执行的任务或已达到并发上限时返回 None
+    """
+    db = SessionLocal()
+    try:
+        _lock_queue(db, _CLAIM_LOCK)
+        now = datetime.now()
+        running = db.query(func.count(models.TaskJob.id)).filter(
+            models.TaskJob.status == 'running',
+            models.TaskJob.lease_expires_at > now
+        ).scalar()
+        if running >= max_running:
+            db.rollback()
+            return None
+        job_id = db.query(models.TaskJob.id).filter(
+            models.TaskJob.status == 'queued'
+        ).order_by(models.TaskJob.id).with_for_update(skip_locked=True).limit(1).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        # 带状态条件更新，数据库不支持 SKIP LOCKED 时也不会被两个 worker 同时领取
+        claimed = db.query(models.TaskJob).filter(
+            models.TaskJob.id == job_id,
+            models.TaskJob.status == 'queued'
+        ).update({
+            models.TaskJob.status: 'running',
+            models.TaskJob.worker_id: worker_id,
+            models.TaskJob.attempts: models.TaskJob.attempts + 1,
+            models.TaskJob.started_at: now,
+            models.TaskJob.lease_expires_at: now + timedelta(seconds=JOB_LEASE_SECONDS),
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return None
+        job = db.query(models.TaskJob).filter(models.TaskJob.id == job_id).first()
+        db.expunge(job)
+        return job
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def renew_lease(job_id: int, worker_id: str) -> bool:
+    """心跳续约，返回 False 表示租约已被回收"""
+    db = SessionLocal()
+    try:
+        updated = db.query(models.TaskJob).filter(
+            models.TaskJob.id == job_id,
+            models.TaskJob.worker_id == worker_id,
+            models.TaskJob.status == 'running'
+        ).update(
+            {models.TaskJob.lease_expires_at: datetime.now() + timedelta(seconds=JOB_LEASE_SECONDS)},
+            synchronize_session=False
+        )
+        db.commit()
+        return updated > 0
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ 任务租约续期失败: job_id={job_id}, {e}")
+        return True
+    finally:
+        db.close()
+
+
+def _job_items(job: models.TaskJob) -> List[PlanItem]:
+    return [PlanItem.from_dict(item) for item in (job.payload or {}).get("items", [])]
+
+
+def _add_execution_counts(db: Session, execution_id: int, success_count: int, failed_count: int) -> None:
+    # 在数据库中累加，多个分片并发写入时不会互相覆盖
+    db.query(models.TestTaskExecution).filter(
+        models.TestTaskExecution.id == execution_id
+    ).update({
+        models.TestTaskExecution.success_count: func.coalesce(models.TestTaskExecution.success_count, 0) + success_count,
+        models.TestTaskExecution.failed_count: func.coalesce(models.TestTaskExecution.failed_count, 0) + failed_count,
+    }, synchronize_session=False)
+
+
+def _delete_job_items(db: Session, job: models.TaskJob) -> None:
+    """删除分片已写入的结果明细，并从执行记录的计数中扣除"""
+    rows = db.query(models.TestTaskExecutionItem.success, func.count(models.TestTaskExecutionItem.id)).filter(
+        models.TestTaskExecutionItem.job_id == job.id
+    ).group_by(models.TestTaskExecutionItem.success).all()
+    if not rows:
+        return
+    counts = {bool(success): count for success, count in rows}
+    db.query(models.TestTaskExecutionItem).filter(
+        models.TestTaskExecutionItem.job_id == job.id
+    ).delete(synchronize_session=False)
+    _add_execution_counts(db, job.execution_id, -counts.get(True, 0), -counts.get(False, 0))
+
+
+def _add_job_items(db: Session, job: models.TaskJob, item: PlanItem, results: List[dict]) -> None:
+    for result_index, result in enumerate(results):
+        details = dict(result["details"]) if isinstance(result.get("details"), dict) else result.get("details")
+        blob_refs = blob_store.offload(db, details) if isinstance(details, dict) else {}
+        db.add(models.TestTaskExecutionItem(
+            execution_id=job.execution_id,
+            job_id=job.id,
+            item_index=item.position,
+            result_index=result_index,
+            item_type=result.get("item_type") or item.item_type,
+            item_id=result.get("item_id"),
+            item_name=(result.get("item_name") or "")[:500],
+            success=bool(result.get("success", False)),
+            status_code=result.get("status_code"),
+            execution_time=result.get("execution_time"),
+            timings=result.get("timings"),
+            error_message=result.get("error_message"),
+            details=details,
+            blob_refs=blob_refs or None,
+        ))
+    success_count, failed_count = count_results(results)
+    _add_execution_counts(db, job.execution_id, success_count, failed_count)
+
+
+def reset_shard_progress(job_id: int, worker_id: str) -> None:
+    """分片开始执行前清除上一次（已中断的）尝试写入的结果明细"""
+    db = SessionLocal()
+    try:
+        job = db.query(models.TaskJob).filter(
+            models.TaskJob.id == job_id,
+            models.TaskJob.worker_id == worker_id,
+            models.TaskJob.status == 'running'
+        ).with_for_update().first()
+        if job is not None:
+            _delete_job_items(db, job)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def record_item_results(job_id: int, worker_id: str, item: PlanItem, results: List[dict]) -> bool:
+    """
+    写入一个任务项的执行结果并累加执行记录的计数（仅当租约仍属于当前 worker）
+
+    Args:
+        job_id: 队列记录ID
+        worker_id: 当前 worker
+        item: 已执行完的任务项
+        results: 该任务项的执行结果
+
+    Returns:
+        是否已写入
+    """
+    db = SessionLocal()
+    try:
+        # 锁住分片记录，避免租约被回收、重新执行后旧 worker 继续写入
+        job = db.query(models.TaskJob).filter(
+            models.TaskJob.id == job_id,
+            models.TaskJob.worker_id == worker_id,
+            models.TaskJob.status == 'running'
+        ).with_for_update().first()
+        if job is None:
+            db.rollback()
+            return False
+        _add_job_items(db, job, item, results)
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def item_row_to_result(row: models.TestTaskExecutionItem, include_details: bool = True) -> Dict[str, Any]:
+    """结果明细行转换为 TestTaskExecutionResult 格式（details 中存入 content_blobs 的字段为空，见 load_item_results）"""
+    return {
+        "item_type": row.item_type,
+        "item_id": row.item_id,
+        "item_name": row.item_name,
+        "success": row.success,
+        "status_code": row.status_code,
+        "error_message": row.error_message,
+        "execution_time": row.execution_time,
+        "timings": row.timings,
+        "details": (dict(row.details) if isinstance(row.details, dict) else row.details) if include_details else None,
+    }
+
+
+def load_item_results(db: Session, rows: List[models.TestTaskExecutionItem], include_details: bool = True) -> List[Dict[str, Any]]:
+    """结果明细行转换为结果字典，并批量读取 details 中存入 content_blobs 的请求/响应内容"""
+    results = [item_row_to_result(row, include_details) for row in rows]
+    if include_details:
+        blob_store.hydrate_dicts(db, [
+            (result["details"], row.blob_refs)
+            for result, row in zip(results, rows)
+            if isinstance(result["details"], dict) and row.blob_refs
+        ])
+    return results
+
+
+def _finalize_if_complete(db: Session, execution_id: int) -> bool:
+    """
+    所有分片都结束后汇总结果明细，写入执行记录（调用方需已锁定执行记录并负责提交）
+
+    Returns:
+        是否已汇总
+    """
+    jobs = db.query(models.TaskJob).filter(
+        models.TaskJob.execution_id == execution_id
+    ).order_by(models.TaskJob.shard_index).all()
+    if not jobs or any(job.status in ('queued', 'running') for job in jobs):
+        return False
+    errors = []
+    for job in jobs:
+        if job.status == 'failed':
+            error_message = job.error_message or "分片执行失败"
+            errors.append(error_message)
+            # 失败分片的明细替换为每个任务项一条失败结果
+            _delete_job_items(db, job)
+            for item in _job_items(job):
+                _add_job_items(db, job, item, item_error_results([item], error_message))
+    save_execution_summary(db, jobs[0].task_id, execution_id, "; ".join(dict.fromkeys(errors)) or None)
+    return True
+
+
+def _lock_execution(db: Session, execution_id: int) -> Optional[models.TestTaskExecution]:
+    # 同一次执行的分片串行完成，保证只有最后一个分片负责汇总
+    return db.query(models.TestTaskExecution).filter(
+        models.TestTaskExecution.id == execution_id
+    ).with_for_update().first()
+
+
+def complete_shard(
+    job_id: int,
+    worker_id: str,
+    error_message: Optional[str] = None,
+    unsaved: Optional[List[Tuple[PlanItem, List[dict]]]] = None
+) -> None:
+    """
+    标记分片结束；最后一个完成的分片负责汇总（仅当租约仍属于当前 worker）
+
+    Args:
+        job_id: 队列记录ID
+        worker_id: 当前 worker
+        error_message: 分片执行异常信息，不为空时分片标记为失败
+        unsaved: 执行过程中未能写入的任务项结果，在这里补写
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(models.TaskJob).filter(
+            models.TaskJob.id == job_id,
+            models.TaskJob.worker_id == worker_id,
+            models.TaskJob.status == 'running'
+        ).with_for_update().first()
+        if job is None:
+            # 租约已被回收，由重新领取的 worker 负责写入结果
+            db.rollback()
+            print(f"⚠️ 租约已失效，丢弃分片结果: job_id={job_id}, worker={worker_id}")
+            return
+        execution = _lock_execution(db, job.execution_id)
+        for item, item_results in unsaved or []:
+            _add_job_items(db, job, item, item_results)
+        job.status = 'failed' if error_message else 'done'
+        job.error_message = error_message
+        job.finished_at = datetime.now()
+        job.lease_expires_at = None
+        db.flush()
+        if execution is not None:
+            _finalize_if_complete(db, job.execution_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _fail_legacy_execution(db: Session, execution: models.TestTaskExecution, error_message: str) -> None:
+    execution.status = 'failed'
+    execution.error_message = error_message
+    execution.completed_at = datetime.now()
+    task = db.query(models.TestTask).filter(models.TestTask.id == execution.task_id).first()
+    if task and task.status == 'running':
+        task.status = 'failed'
+
+
+def recover_orphans() -> int:
+    """
+    回收租约已过期的任务：未超过最大尝试次数的重新排队，否则标记为失败。
+    同时修复没有排队记录、却一直处于“运行中”的旧执行记录。
+
+    Returns:
+        处理的任务数
+    """
+    db = SessionLocal()
+    recovered = 0
+    try:
+        now = datetime.now()
+        expired = db.query(models.TaskJob).filter(
+            models.TaskJob.status == 'running',
+            models.TaskJob.lease_expires_at < now
+        ).with_for_update(skip_locked=True).all()
+        for job in expired:
+            if job.attempts < JOB_MAX_ATTEMPTS:
+                job.status = 'queued'
+                job.worker_id = None
+                job.lease_expires_at = None
+                print(f"🔄 任务执行中断，重新排队: job_id={job.id}, execution_id={job.execution_id}, attempts={job.attempts}")
+            else:
+                job.status = 'failed'
+                job.error_message = "执行进程中断，已达到最大重试次数"
+                job.finished_at = now
+                job.lease_expires_at = None
+                db.flush()
+                if _lock_execution(db, job.execution_id) is not None:
+                    _finalize_if_complete(db, job.execution_id)
+                print(f"❌ 任务执行中断且不再重试: job_id={job.id}, execution_id={job.execution_id}, shard={job.shard_index}")
+            recovered += 1
+
+        # 引入队列之前创建、进程重启后遗留的运行中记录
+        stale_before = now - timedelta(seconds=JOB_LEASE_SECONDS)
+        legacy = db.query(models.TestTaskExecution).outerjoin(
+            models.TaskJob, models.TaskJob.execution_id == models.TestTaskExecution.id
+        ).filter(
+            models.TestTaskExecution.status == 'running',
+            models.TestTaskExecution.started_at < stale_before,
+            models.TaskJob.id.is_(None)
+        ).all()
+        for execution in legacy:
+            _fail_legacy_execution(db, execution, "任务执行异常: 服务重启，任务未完成")
+            recovered += 1
+
+        # 没有任何排队/执行中任务的“运行中”测试任务
+        active_task_ids = db.query(models.TaskJob.task_id).filter(models.TaskJob.status.in_(['queued', 'running']))
+        active_execution_task_ids = db.query(models.TestTaskExecution.task_id).filter(models.TestTaskExecution.status == 'running')
+        db.query(models.TestTask).filter(
+            models.TestTask.status == 'running',
+            models.TestTask.id.notin_(active_task_ids),
+            models.TestTask.id.notin_(active_execution_task_ids)
+        ).update({models.TestTask.status: 'failed'}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ 回收中断任务失败: {e}")
+        traceback.print_exc()
+    finally:
+        db.close()
+    return recovered
+
+
+def read_execution_progress(execution_id: int, after_id: int = 0, limit: int = 200) -> Optional[dict]:
+    """
+    增量读取执行进度
+
+    先读执行记录再读明细：读到已结束状态时，所有明细都已在此之前提交。
+
+    Args:
+        execution_id: 执行记录ID
+        after_id: 只返回ID大于该值的明细（上次读取的最后一条）
+        limit: 单次最多返回的明细数
+
+    Returns:
+        {"status", "total_count", "success_count", "failed_count", "items": [...]}，执行记录不存在时返回 None
+    """
+    db = SessionLocal()
+    try:
+        execution = db.query(models.TestTaskExecution).filter(models.TestTaskExecution.id == execution_id).first()
+        if execution is None:
+            return None
+        rows = db.query(models.TestTaskExecutionItem).filter(
+            models.TestTaskExecutionItem.execution_id == execution_id,
+            models.TestTaskExecutionItem.id > after_id
+        ).order_by(models.TestTaskExecutionItem.id).limit(limit).all()
+        return {
+            "status": execution.status,
+            "total_count": execution.total_count or 0,
+            "success_count": execution.success_count or 0,
+            "failed_count": execution.failed_count or 0,
+            "error_message": execution.error_message,
+            "has_more": len(rows) >= limit,
+            "items": [{
+                "id": row.id,
+                "item_index": row.item_index,
+                "result_index": row.result_index,
+                "result": result,
+            } for row, result in zip(rows, load_item_results(db, rows))],
+        }
+    finally:
+        db.close()
+
+
+class _Heartbeat:
+    """执行期间定期续约"""
+
+    def __init__(self, job_id: int, worker_id: str):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            if not renew_lease(self.job_id, self.worker_id):
+                self.mark_lost()
+                return
+
+    def mark_lost(self) -> None:
+        """租约已被回收（由其他 worker 重新执行），当前 worker 不再执行剩余的任务项"""
+        if not self.lost:
+            self.lost = True
+            print(f"⚠️ 任务租约已被回收，停止执行剩余任务项: job_id={self.job_id}, worker={self.worker_id}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+class JobWorkerPool:
+    """领取并执行排队任务的 worker 线程池"""
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_recover = 0.0
+        self._recover_lock = threading.Lock()
+
+    def notify(self) -> None:
+        """有新任务入队时唤醒空闲 worker"""
+        self._wakeup.set()
+
+    def _maybe_recover(self) -> None:
+        now = datetime.now().timestamp()
+        if now - self._last_recover < JOB_RECOVER_SECONDS or not self._recover_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_recover = now
+            recover_orphans()
+        finally:
+            self._recover_lock.release()
+
+    def run_job(self, job: models.TaskJob, worker_id: str) -> None:
+        payload = job.payload or {}
+        request = schemas.TestTaskExecutionRequest(**payload.get("request", {}))
+        error_message = None
+        unsaved: List[Tuple[PlanItem, List[dict]]] = []
+
+        heartbeat = _Heartbeat(job.id, worker_id)
+
+        def on_item_done(item: PlanItem, item_results: List[dict]) -> None:
+            try:
+                if not record_item_results(job.id, worker_id, item, item_results):
+                    heartbeat.mark_lost()
+            except Exception as e:
+                print(f"⚠️ 保存任务项结果失败，分片结束时重试: job_id={job.id}, item={item.item_type}:{item.item_id}, {e}")
+                unsaved.append((item, item_results))
+
+        with heartbeat:
+            try:
+                if job.attempts > 1:
+                    reset_shard_progress(job.id, worker_id)
+                execute_task_items(
+                    job.task_id, request.environment_id, request, _job_items(job), on_item_done,
+                    should_stop=lambda: heartbeat.lost
+                )
+            except Exception as e:
+                traceback.print_exc()
+                error_message = str(e)
+        if heartbeat.lost:
+            # 租约已被其他 worker 接管，由它写入分片结果
+            return
+        try:
+            complete_shard(job.id, worker_id, error_message, unsaved)
+        except Exception as e:
+            # 保存失败时不标记完成，租约过期后会被重新执行
+            print(f"❌ 保存分片结果失败: job_id={job.id}, {e}")
+            traceback.print_exc()
+
+    def _run(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            self._maybe_recover()
+            try:
+                job = claim_job(worker_id)
+            except Exception as e:
+                print(f"⚠️ 领取任务失败: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(JOB_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            # 队列中可能还有其他分片，唤醒空闲的 worker 继续领取
+            self._wakeup.set()
+            exec_log.info("task.job.claim", {
+                "worker_id": worker_id,
+                "job_id": job.id,
+                "task_id": job.task_id,
+                "execution_id": job.execution_id,
+                "shard": f"{job.shard_index + 1}/{job.shard_count}",
+            })
+            self.run_job(job, worker_id)
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._threads:
+            return
+        self._stop.clear()
+        for idx in range(self.workers):
+            worker_id = f"{self.worker_prefix}-{idx}"
+            thread = threading.Thread(target=self._run, args=(worker_id,), name=f"job-worker-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5) -> None:
+        """停止领取新任务；正在执行的任务不等待，租约过期后由其他 worker 回收"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+
+job_workers = JobWorkerPool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试任务执行 worker")
+    parser.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1), help="worker 线程数")
+    args = parser.parse_args()
+
+    pool = JobWorkerPool(workers=args.workers)
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    recover_orphans()
+    pool.start()
+    print(f"✅ 测试任务 worker 已启动: {pool.worker_prefix}, workers={args.workers}, 全局并发上限={JOB_MAX_RUNNING}")
+    stopped.wait()
+    pool.stop(timeout=JOB_LEASE_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""耗时统计
+
+LatencyHistogram 按 HDR 方式（对数分桶、桶内线性细分，相对误差约 1.6%）记录耗时，用于计算分位数；
+PhaseStats 按请求的各个阶段（http_client 的 timings：dns/connect/tls/send/server/download/total）分别统计，
+dns/connect/tls 只统计新建连接的请求，同时记录复用连接的请求数。
+"""
+from typing import Any, Dict, Iterable, Optional
+
+from http_client import TIMING_PHASES
+
+# 桶内细分为 2^7 个子桶
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+
+
+class LatencyHistogram:
+    """HDR 风格的耗时直方图（单位微秒），小于 128us 精确记录，更大的值按 2 的幂分桶、每桶 64 个子桶"""
+    __slots__ = ("counts", "total", "sum", "min", "max")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        if value < _SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - _SUB_BUCKET_BITS
+        return shift * _SUB_BUCKET_HALF + (value >> shift)
+
+    @staticmethod
+    def _upper(index: int) -> int:
+        """桶内的最大值"""
+        if index < _SUB_BUCKET_COUNT:
+            return index
+        shift = index // _SUB_BUCKET_HALF - 1
+        return ((index - shift * _SUB_BUCKET_HALF + 1) << shift) - 1
+
+    def record(self, micros: int) -> None:
+        micros = max(int(micros), 0)
+        index = self._index(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = max(self.max, micros)
+
+    def percentile(self, percent: float) -> int:
+        """第 percent 百分位的耗时（微秒），不超过实际记录的最大值"""
+        if not self.total:
+            return 0
+        rank = max(1, -(-self.total * percent // 100))  # 向上取整
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        """各项耗时统计（毫秒）"""
+        ms = lambda micros: round(micros / 1000, 2)
+        return {
+            "min": ms(self.min or 0),
+            "mean": ms(self.sum / self.total) if self.total else 0,
+            "p50": ms(self.percentile(50)),
+            "p90": ms(self.percentile(90)),
+            "p95": ms(self.percentile(95)),
+            "p99": ms(self.percentile(99)),
+            "max": ms(self.max),
+        }
+
+
+class PhaseStats:
+    """请求分阶段耗时的统计"""
+    __slots__ = ("requests", "reused", "histograms")
+
+    def __init__(self):
+        self.requests = 0
+        self.reused = 0
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def record(self, timings: Optional[Dict[str, Any]]) -> None:
+        """记录一个请求的 timings（为空时忽略）"""
+        if not timings:
+            return
+        self.requests += 1
+        if timings.get("reused"):
+            self.reused += 1
+        for phase in TIMING_PHASES:
+            value = timings.get(f"{phase}_ms")
+            if value is None:
+                continue
+            histogram = self.histograms.get(phase)
+            if histogram is None:
+                histogram = self.histograms[phase] = LatencyHistogram()
+            histogram.record(value * 1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """请求数、复用连接的请求数及各阶段的耗时分位数（毫秒）"""
+        return {
+            "requests": self.requests,
+            "reused_connections": self.reused,
+            "phases": {
+                phase: self.histograms[phase].to_dict()
+                for phase in TIMING_PHASES
+                if phase in self.histograms
+            },
+        }
+
+
+def summarize_timings(timings_list: Iterable[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """按阶段汇总多个请求的 timings"""
+    stats = PhaseStats()
+    for timings in timings_list:
+        stats.record(timings)
+    return stats.to_dict()
@@ -0,0 +1,118 @@
+"""执行进程租约
+
+异步流程执行（flow_runs）和压测（load_test）只在创建它的服务进程中执行：记录的 worker_id 为该进程，
+执行进程定期更新 heartbeat_at。进程崩溃、被杀或重启后，心跳超过租约时长未更新的未结束记录
+由其他（或重启后的）进程标记为失败；没有心跳的旧记录按创建时间判断。
+"""
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Optional, Sequence
+
+from sqlalchemy import and_, or_
+
+from config import SessionLocal
+
+
+def new_worker_id() -> str:
+    """本进程的执行者标识：主机名:进程号:随机后缀（进程号复用时也不会相同）"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class Lease:
+    """一类带心跳的执行记录（模型需有 status / worker_id / heartbeat_at / created_at / error_message / completed_at）"""
+
+    def __init__(self, name: str, model, active_statuses: Sequence[str], error_message: str, lease_seconds: int):
+        self.name = name
+        self.model = model
+        self.active_statuses = tuple(active_statuses)
+        self.error_message = error_message
+        self.lease_seconds = lease_seconds
+
+    def heartbeat(self, worker_id: str, run_ids: Iterable[int]) -> None:
+        """更新本进程未结束的记录的心跳"""
+        run_ids = list(run_ids)
+        if not run_ids:
+            return
+        model = self.model
+        db = SessionLocal()
+        try:
+            db.query(model).filter(
+                model.id.in_(run_ids),
+                model.worker_id == worker_id,
+                model.status.in_(self.active_statuses)
+            ).update({model.heartbeat_at: datetime.now()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ {self.name}心跳更新失败: {e}")
+        finally:
+            db.close()
+
+    def recover(self, lease_seconds: Optional[int] = None) -> int:
+        """
+        将执行进程已中断（心跳超时）的未结束记录标记为失败
+
+        Args:
+            lease_seconds: 租约时长（秒），默认为创建时指定的时长
+
+        Returns:
+            标记为失败的记录数
+        """
+        model = self.model
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            stale_before = now - timedelta(seconds=lease_seconds or self.lease_seconds)
+            recovered = db.query(model).filter(
+                model.status.in_(self.active_statuses),
+                or_(
+                    model.heartbeat_at < stale_before,
+                    and_(model.heartbeat_at.is_(None), model.created_at < stale_before),
+                )
+            ).update({
+                model.status: "failed",
+                model.error_message: self.error_message,
+                model.completed_at: now,
+            }, synchronize_session=False)
+            db.commit()
+            if recovered:
+                print(f"🔄 已将 {recovered} 个中断的{self.name}标记为失败")
+            return recovered
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 回收中断的{self.name}失败: {e}")
+            return 0
+        finally:
+            db.close()
+
+
+class LeaseMonitor:
+    """后台线程：启动时回收一次中断的记录，之后每隔 interval 秒先执行 before（如更新本进程的心跳）再回收"""
+
+    def __init__(self, lease: Lease, interval: float, name: str, before: Optional[Callable[[], None]] = None):
+        self.lease = lease
+        self.interval = interval
+        self.name = name
+        self.before = before
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.before is not None:
+                self.before()
+            self.lease.recover()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.lease.recover()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,389 @@
+"""流程/接口压测
+
+用 N 个虚拟用户重复执行同一个流程（或单个接口），每个虚拟用户按顺序执行流程步骤，
+直到达到压测时长或总迭代次数；设置了 ramp_up_seconds 时虚拟用户在该时间内逐个启动。
+
+每个步骤按 HDR 方式（对数分桶、桶内线性细分，相对误差约 1.6%，见 latency）记录耗时直方图，
+统计 p50/p90/p95/p99/max、吞吐量、错误率和状态码分布，以及请求各阶段（DNS、建立连接、TLS、服务端处理、下载）
+的耗时分位数；整次迭代（整个流程）单独统计。
+报告每隔 LOAD_TEST_REPORT_INTERVAL_SECONDS 秒写入 load_test_runs.report，结束时写入最终报告，
+并按阈值（与接口断言相同的 check_assertion 比较规则）判定是否通过。
+
+压测只在启动它的服务进程中执行：load_test_runs.worker_id 记录该进程，写入报告时同时更新 heartbeat_at
+并读取 stop_requested（停止请求可以由任一服务进程写入）。进程崩溃、被杀或重启后，心跳超过 LOAD_TEST_LEASE_SECONDS
+未更新的执行中记录由其他（或重启后的）进程标记为失败（见 leases）；报告连续 LOAD_TEST_LEASE_SECONDS 写入失败时
+执行进程自行结束压测。
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import models
+from api_runtime import check_assertion
+from config import SessionLocal
+from flow_runner import FlowStepPlan, run_flow
+from http_client import http_clients
+from latency import LatencyHistogram, PhaseStats
+from leases import Lease, LeaseMonitor, new_worker_id
+
+# 单次压测最多的虚拟用户数
+LOAD_TEST_MAX_VIRTUAL_USERS = int(os.getenv("LOAD_TEST_MAX_VIRTUAL_USERS", "200"))
+# 单次压测最长时间（秒），只设置迭代次数时也以此为上限
+LOAD_TEST_MAX_DURATION_SECONDS = int(os.getenv("LOAD_TEST_MAX_DURATION_SECONDS", "3600"))
+# 压测过程中写入报告（同时更新心跳、检查停止请求）的间隔（秒）
+LOAD_TEST_REPORT_INTERVAL_SECONDS = float(os.getenv("LOAD_TEST_REPORT_INTERVAL_SECONDS", "5"))
+# 心跳超过该时长（秒）未更新的执行中记录视为执行进程已中断，同时按此间隔检查其他进程遗留的压测
+LOAD_TEST_LEASE_SECONDS = int(os.getenv("LOAD_TEST_LEASE_SECONDS", "60"))
+
+# 阈值支持的指标：耗时类为毫秒，error_rate 为百分比，throughput 为每秒请求数（整个流程为每秒迭代数）
+THRESHOLD_METRICS = ("p50", "p90", "p95", "p99", "max", "mean", "error_rate", "throughput")
+# 每个步骤最多保留的不同错误信息条数
+_MAX_ERROR_SAMPLES = 10
+
+# LoadTestRunner._save 的结果：继续执行 | 已请求停止 | 记录已结束（如心跳超时被回收） | 写入失败
+SAVE_RUNNING = "running"
+SAVE_STOP_REQUESTED = "stop_requested"
+SAVE_ENDED = "ended"
+SAVE_FAILED = "failed"
+
+LOAD_TEST_LEASE = Lease(
+    "压测", models.LoadTestRun, ("running",),
+    "执行进程中断（服务重启或异常退出），压测未完成", LOAD_TEST_LEASE_SECONDS,
+)
+
+
+class _Stats:
+    """一个步骤（或整个流程）的统计"""
+    __slots__ = ("requests", "errors", "histogram", "phases", "status_codes", "error_samples")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.histogram = LatencyHistogram()
+        self.phases = PhaseStats()
+        self.status_codes: Dict[str, int] = {}
+        self.error_samples: Dict[str, int] = {}
+
+    def record(
+        self,
+        seconds: float,
+        success: bool,
+        status: Any = None,
+        error: Optional[str] = None,
+        timings: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.requests += 1
+        self.histogram.record(seconds * 1_000_000)
+        self.phases.record(timings)
+        if status is not None:
+            key = str(status)
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if not success:
+            self.errors += 1
+            message = (error or (f"HTTP {status}" if status is not None else "请求失败"))[:500]
+            if message in self.error_samples or len(self.error_samples) < _MAX_ERROR_SAMPLES:
+                self.error_samples[message] = self.error_samples.get(message, 0) + 1
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        stats = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors * 100 / self.requests, 2) if self.requests else 0,
+            "throughput": round(self.requests / elapsed, 2) if elapsed > 0 else 0,
+            "latency": self.histogram.to_dict(),
+            "status_codes": dict(self.status_codes),
+            "error_samples": dict(self.error_samples),
+        }
+        if self.phases.requests:
+            stats["timings"] = self.phases.to_dict()
+        return stats
+
+
+def evaluate_thresholds(report: Dict[str, Any], thresholds: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    按阈值检查报告
+
+    Args:
+        report: 压测报告
+        thresholds: [{metric, operator, expected, step}]，step 为步骤序号（从 1 开始），为空时检查整个流程
+
+    Returns:
+        每个阈值的检查结果（增加 actual 和 passed）
+    """
+    results = []
+    for threshold in thresholds:
+        step = threshold.get("step")
+        if step:
+            steps = report.get("steps") or []
+            stats = steps[step - 1] if 0 < step <= len(steps) else None
+        else:
+            stats = report.get("iterations")
+        actual = None
+        if stats:
+            metric = threshold.get("metric")
+            actual = stats[metric] if metric in ("error_rate", "throughput") else stats["latency"].get(metric)
+        passed = actual is not None and check_assertion(actual, threshold.get("operator"), threshold.get("expected"))
+        results.append({**threshold, "actual": actual, "passed": passed})
+    return results
+
+
+class LoadTestRunner:
+    """一次压测：虚拟用户线程执行流程，协调线程定期写入报告"""
+
+    def __init__(
+        self,
+        run_id: int,
+        step_plans: List[FlowStepPlan],
+        context: Dict[str, Any],
+        config: Dict[str, Any],
+        on_finish=None,
+    ):
+        self.run_id = run_id
+        self.step_plans = step_plans
+        self.context = context
+        self.config = config
+        self.on_finish = on_finish
+        self.virtual_users = config["virtual_users"]
+        self.iterations = config.get("iterations")
+        duration = config.get("duration_seconds") or LOAD_TEST_MAX_DURATION_SECONDS
+        self.duration = min(duration, LOAD_TEST_MAX_DURATION_SECONDS)
+        self.ramp_up = config.get("ramp_up_seconds") or 0
+        self.think_time = (config.get("think_time_ms") or 0) / 1000.0
+        self.fail_action = config.get("fail_action") or "stop"
+        self.thresholds = config.get("thresholds") or []
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._started = 0.0
+        self._deadline = 0.0
+        self._issued = 0  # 已开始的迭代数
+        self._active = 0  # 正在运行的虚拟用户数
+        self._remaining = self.virtual_users  # 尚未结束的虚拟用户数
+        self._iterations = _Stats()
+        self._steps = [_Stats() for _ in step_plans]
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._coordinate, name=f"load-test-{self.run_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止压测：不再开始新的迭代，正在执行的迭代执行完后结束"""
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def _next_iteration(self) -> bool:
+        if self._stop.is_set() or time.monotonic() >= self._deadline:
+            return False
+        with self._lock:
+            if self.iterations and self._issued >= self.iterations:
+                return False
+            self._issued += 1
+        return True
+
+    def _record_step(self, idx: int, result: Dict[str, Any], elapsed: float) -> None:
+        with self._lock:
+            self._steps[idx].record(
+                elapsed, result["success"], result.get("status"), result.get("error_message"), result.get("timings")
+            )
+
+    def _virtual_user(self, number: int) -> None:
+        active = False
+        try:
+            # 逐步加压：第 number 个虚拟用户在 ramp_up * number / N 秒后启动
+            if self.ramp_up and self._stop.wait(self.ramp_up * number / self.virtual_users):
+                return
+            with self._lock:
+                self._active += 1
+            active = True
+            while self._next_iteration():
+                started = time.perf_counter()
+                try:
+                    outcome = run_flow(
+                        self.step_plans,
+                        dict(self.context),
+                        fail_action=self.fail_action,
+                        concurrency=1,
+                        on_step_done=self._record_step,
+                    )
+                    success, error = outcome["success"], None
+                except Exception as e:
+                    success, error = False, str(e)
+                with self._lock:
+                    self._iterations.record(time.perf_counter() - started, success, error=error or "流程执行失败")
+                if self.think_time and self._stop.wait(self.think_time):
+                    break
+        finally:
+            with self._lock:
+                if active:
+                    self._active -= 1
+                self._remaining -= 1
+                if self._remaining == 0:
+                    self._done.set()
+
+    def report(self) -> Dict[str, Any]:
+        """当前的压测报告"""
+        with self._lock:
+            elapsed = time.monotonic() - self._started if self._started else 0
+            report = {
+                "elapsed_seconds": round(elapsed, 2),
+                "active_virtual_users": self._active,
+                "iterations": self._iterations.to_dict(elapsed),
+                "steps": [
+                    {
+                        "index": idx + 1,
+                        "endpoint_id": plan.endpoint.id,
+                        "name": plan.step.get("alias") or plan.endpoint.name,
+                        "method": plan.endpoint.method,
+                        **stats.to_dict(elapsed),
+                    }
+                    for idx, (plan, stats) in enumerate(zip(self.step_plans, self._steps))
+                ],
+            }
+        if self.thresholds:
+            report["thresholds"] = evaluate_thresholds(report, self.thresholds)
+        return report
+
+    def _save(self, **values) -> str:
+        """
+        更新执行中的记录（已被标记为结束，如心跳超时被回收的记录不再修改）
+
+        Returns:
+            SAVE_RUNNING / SAVE_STOP_REQUESTED / SAVE_ENDED / SAVE_FAILED
+        """
+        db = SessionLocal()
+        try:
+            run_filter = (models.LoadTestRun.id == self.run_id, models.LoadTestRun.status == "running")
+            updated = db.query(models.LoadTestRun).filter(*run_filter).update(values, synchronize_session=False)
+            stop_requested = db.query(models.LoadTestRun.stop_requested).filter(*run_filter).scalar()
+            db.commit()
+            if not updated:
+                return SAVE_ENDED
+            return SAVE_STOP_REQUESTED if stop_requested else SAVE_RUNNING
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 压测报告写入失败: run_id={self.run_id}, {e}")
+            return SAVE_FAILED
+        finally:
+            db.close()
+
+    def _coordinate(self) -> None:
+        status, error_message = "completed", None
+        try:
+            self._started = time.monotonic()
+            self._deadline = self._started + self.duration
+            # 每个虚拟用户一个连接，超出共享连接池大小的连接用完即关闭，会把建连耗时计入报告
+            for base_url in {plan.environment.base_url for plan in self.step_plans if plan.environment is not None}:
+                http_clients.reserve(base_url, self.virtual_users)
+            threads = [
+                threading.Thread(target=self._virtual_user, args=(number,), name=f"load-test-{self.run_id}-vu{number}", daemon=True)
+                for number in range(self.virtual_users)
+            ]
+            for thread in threads:
+                thread.start()
+            last_saved = time.monotonic()
+            while not self._done.wait(LOAD_TEST_REPORT_INTERVAL_SECONDS):
+                saved = self._save(report=self.report(), heartbeat_at=datetime.now())
+                if saved == SAVE_FAILED:
+                    # 心跳同样无法写入，租约过期后记录会被其他进程标记为失败，不再继续压测
+                    if time.monotonic() - last_saved >= LOAD_TEST_LEASE_SECONDS:
+                        status, error_message = "failed", "压测报告持续写入失败，停止压测"
+                        self._stop.set()
+                    continue
+                last_saved = time.monotonic()
+                if saved == SAVE_ENDED:
+                    print(f"⚠️ 压测记录已结束（执行进程心跳超时被回收），停止压测: run_id={self.run_id}")
+                    self._stop.set()
+                elif saved == SAVE_STOP_REQUESTED:
+                    self._stop.set()
+            if self._stop.is_set() and status == "completed":
+                status = "stopped"
+        except Exception as e:
+            status, error_message = "failed", str(e)
+            self._stop.set()
+            print(f"⚠️ 压测执行失败: run_id={self.run_id}, {e}")
+
+        report = self.report()
+        thresholds = report.get("thresholds")
+        passed = all(t["passed"] for t in thresholds) if thresholds else None
+        self._save(
+            status=status,
+            passed=passed,
+            report=report,
+            error_message=error_message,
+            completed_at=datetime.now(),
+        )
+        iterations = report["iterations"]
+        print(
+            f"📈 压测结束: run_id={self.run_id}, 状态={status}, 迭代 {iterations['requests']} 次, "
+            f"错误率 {iterations['error_rate']}%, p99 {iterations['latency']['p99']}ms"
+        )
+        if self.on_finish is not None:
+            self.on_finish(self.run_id)
+
+
+class LoadTestManager:
+    """本进程中正在执行的压测，以及回收其他进程遗留压测的后台线程"""
+
+    def __init__(self):
+        self.worker_id = new_worker_id()
+        self._lock = threading.Lock()
+        self._runners: Dict[int, LoadTestRunner] = {}
+        # 压测的心跳随报告写入，监控线程只回收其他进程遗留的压测
+        self._monitor = LeaseMonitor(LOAD_TEST_LEASE, LOAD_TEST_LEASE_SECONDS, "load-test-monitor")
+
+    def start_monitor(self) -> None:
+        """服务启动时调用：回收之前中断的压测，并定期回收其他进程遗留的压测"""
+        self._monitor.start()
+
+    def start(self, run_id: int, step_plans: List[FlowStepPlan], context: Dict[str, Any], config: Dict[str, Any]) -> None:
+        """
+        启动压测
+
+        Args:
+            run_id: load_test_runs 记录ID（worker_id 为本进程的 worker_id）
+            step_plans: compile_flow_plan 的结果（需已从会话中分离，见 detach_flow_plan）
+            context: 流程变量上下文，每次迭代使用一份副本
+            config: 压测配置（schemas.LoadTestCreate）
+        """
+        runner = LoadTestRunner(run_id, step_plans, context, config, on_finish=self._finished)
+        with self._lock:
+            self._runners[run_id] = runner
+        runner.start()
+
+    def _finished(self, run_id: int) -> None:
+        with self._lock:
+            self._runners.pop(run_id, None)
+
+    def stop(self, run_id: int) -> bool:
+        """立即停止本进程中的压测，压测不在本进程中执行时返回 False（由执行进程读取 stop_requested 停止）"""
+        with self._lock:
+            runner = self._runners.get(run_id)
+        if runner is None:
+            return False
+        runner.stop()
+        return True
+
+    def shutdown(self, timeout: float = 10) -> None:
+        """停止所有压测并等待最终报告写入"""
+        self._monitor.stop()
+        with self._lock:
+            runners = list(self._runners.values())
+        for runner in runners:
+            runner.stop()
+        deadline = time.monotonic() + timeout
+        for runner in runners:
+            runner.join(max(deadline - time.monotonic(), 0))
+
+
+load_tests = LoadTestManager()
@@ -0,0 +1,176 @@
+"""项目成员权限缓存
+
+维护 user_id -> 项目ID集合 的成员索引，供写操作的权限校验使用，
+避免每个请求都查询用户并加载整个项目成员列表。
+"""
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+
+import models
+from config import get_db
+from auth import get_current_user, get_stream_user, CurrentUser
+
+# 缓存有效期（秒），写操作会主动失效，TTL 用于兜底多进程间的数据一致性
+MEMBERSHIP_CACHE_TTL = int(os.getenv("MEMBERSHIP_CACHE_TTL", "60"))
+# 最多缓存的用户数
+MEMBERSHIP_CACHE_MAX_USERS = int(os.getenv("MEMBERSHIP_CACHE_MAX_USERS", "10000"))
+
+
+class UserAccess:
+    """用户的角色与项目成员关系快照"""
+    __slots__ = ("user_id", "is_admin", "project_ids", "expires_at")
+
+    def __init__(self, user_id: int, is_admin: bool, project_ids: FrozenSet[int], expires_at: float):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.project_ids = project_ids
+        self.expires_at = expires_at
+
+
+class MembershipCache:
+    """带 TTL 的成员索引缓存（线程安全）"""
+
+    def __init__(self, ttl: int = MEMBERSHIP_CACHE_TTL, max_users: int = MEMBERSHIP_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries: Dict[int, UserAccess] = {}
+        self._lock = threading.Lock()
+        # 每次失效都会递增，用于丢弃失效前发起、失效后才写回的加载结果
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, user_id: int) -> Optional[UserAccess]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            with self._lock:
+                if self._entries.get(user_id) is entry:
+                    del self._entries[user_id]
+            return None
+        return entry
+
+    def put(self, user_id: int, is_admin: bool, project_ids: Iterable[int], generation: int) -> UserAccess:
+        entry = UserAccess(user_id, is_admin, frozenset(project_ids), time.monotonic() + self.ttl)
+        with self._lock:
+            if generation != self._generation:
+                # 加载期间发生过失效，结果可能已过期，不写入缓存
+                return entry
+            if len(self._entries) >= self.max_users and user_id not in self._entries:
+                self._entries.clear()
+            self._entries[user_id] = entry
+        return entry
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.invalidate_users([user_id])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+membership_cache = MembershipCache()
+
+
+def load_user_access(db: Session, user_id: int) -> Optional[UserAccess]:
+    """
+    获取用户的权限快照（优先读缓存）
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+
+    Returns:
+        UserAccess，如果用户不存在返回 None
+    """
+    cached = membership_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    generation = membership_cache.generation
+    row = db.query(models.User.roles).filter(models.User.id == user_id).first()
+    if row is None:
+        return None
+    roles = row[0] or []
+    project_ids = [
+        project_id for (project_id,) in db.query(models.project_members.c.project_id).filter(
+            models.project_members.c.user_id == user_id
+        )
+    ]
+    return membership_cache.put(user_id, 'admin' in roles, project_ids, generation)
+
+
+class ProjectAccess:
+    """当前请求用户的项目权限检查器"""
+
+    def __init__(self, access: UserAccess):
+        self._access = access
+
+    @property
+    def user_id(self) -> int:
+        return self._access.user_id
+
+    @property
+    def is_admin(self) -> bool:
+        return self._access.is_admin
+
+    def is_member(self, project_id: Optional[int]) -> bool:
+        """admin 视为所有项目的成员"""
+        if self._access.is_admin:
+            return True
+        return project_id is not None and project_id in self._access.project_ids
+
+    def require_member(self, project_id: Optional[int], action: str = "操作") -> None:
+        """
+        检查用户是否是项目成员（admin 可以操作所有项目）
+
+        Args:
+            project_id: 项目ID
+            action: 操作描述（用于错误消息）
+
+        Raises:
+            HTTPException: 如果用户不是项目成员且不是 admin
+        """
+        if not self.is_member(project_id):
+            raise HTTPException(
+                status_code=403,
+                detail=f"您不是该项目成员，无权{action}"
+            )
+
+
+def get_project_access(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> ProjectAccess:
+    """FastAPI 依赖：获取当前用户的项目权限检查器"""
+    return _project_access(db, current_user)
+
+
+def get_stream_project_access(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_stream_user)
+) -> ProjectAccess:
+    """FastAPI 依赖：同 get_project_access，认证方式见 get_stream_user"""
+    return _project_access(db, current_user)
+
+
+def _project_access(db: Session, current_user: CurrentUser) -> ProjectAccess:
+    access = load_user_access(db, current_user.id)
+    if access is None:
+        raise HTTPException(status_code=401, detail="用户不存在")
+    return ProjectAccess(access)
@@ -0,0 +1,5 @@
+-- 测试任务并发执行：任务级与环境级并发上限（为空时使用 TASK_MAX_CONCURRENCY / ENV_MAX_CONCURRENCY）
+
+ALTER TABLE test_tasks ADD COLUMN max_concurrency INT COMMENT '同时执行的任务项数';
+
+ALTER TABLE api_environments ADD COLUMN max_concurrency INT COMMENT '测试任务发往该环境的最大并发请求数';
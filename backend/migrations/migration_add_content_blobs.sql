@@ -0,0 +1,15 @@
+-- 请求/响应内容按哈希去重、压缩后存入 content_blobs，执行记录只保存引用
+
+CREATE TABLE IF NOT EXISTS content_blobs (
+    hash CHAR(64) PRIMARY KEY COMMENT '原始内容的SHA-256',
+    codec VARCHAR(10) NOT NULL COMMENT '压缩算法：zstd|gzip|none',
+    raw_size INT NOT NULL COMMENT '原始字节数',
+    stored_size INT NOT NULL COMMENT '压缩后字节数',
+    data LONGBLOB NOT NULL COMMENT '压缩后的内容',
+    created_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP,
+    last_referenced_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近一次被引用的时间',
+    INDEX idx_last_referenced_at (last_referenced_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='请求/响应内容存储表（按内容哈希去重）';
+
+ALTER TABLE api_execution_records ADD COLUMN blob_refs JSON COMMENT '存入content_blobs的字段及内容哈希' AFTER error_message;
+ALTER TABLE test_task_execution_items ADD COLUMN blob_refs JSON COMMENT 'details中存入content_blobs的字段及内容哈希' AFTER details;
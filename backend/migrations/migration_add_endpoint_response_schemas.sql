@@ -0,0 +1,8 @@
+-- 为 api_endpoints 表添加 response_schemas 字段：从 OpenAPI / Swagger 文档同步的各状态码响应结构，
+-- 供 schema（响应结构）断言使用；升级后重新同步接口即可写入
+-- 执行方式：mysql -u root -p bug_management < migration_add_endpoint_response_schemas.sql
+
+USE bug_management;
+
+ALTER TABLE api_endpoints
+ADD COLUMN response_schemas JSON COMMENT '各状态码的响应结构' AFTER request_body;
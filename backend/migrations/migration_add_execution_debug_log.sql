@@ -0,0 +1,7 @@
+-- 为 api_execution_records 表添加 debug_log 字段：执行接口时开启 debug 记录的调试日志（内容较大时存入 content_blobs）
+-- 执行方式：mysql -u root -p bug_management < migration_add_execution_debug_log.sql
+
+USE bug_management;
+
+ALTER TABLE api_execution_records
+ADD COLUMN debug_log JSON COMMENT '开启debug时记录的调试日志' AFTER error_message;
@@ -0,0 +1,8 @@
+-- 流程异步执行：记录执行进程和心跳，服务崩溃或重启后遗留的排队/执行中记录会被标记为失败（见 flow_runs.recover_orphan_runs）
+-- 执行方式：mysql -u root -p bug_management < migration_add_flow_run_heartbeat.sql
+
+USE bug_management;
+
+ALTER TABLE flow_runs
+    ADD COLUMN worker_id VARCHAR(100) NULL COMMENT '执行该流程的服务进程' AFTER completed_at,
+    ADD COLUMN heartbeat_at DATETIME NULL COMMENT '执行进程最近一次心跳' AFTER worker_id;
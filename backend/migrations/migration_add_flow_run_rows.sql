@@ -0,0 +1,27 @@
+-- 数据驱动执行改为异步执行：flow_runs 记录执行方式和汇总报告，flow_run_rows 记录每行的结果（见 flow_runs.FlowDatasetRunner）
+-- 执行方式：mysql -u root -p bug_management < migration_add_flow_run_rows.sql
+
+USE bug_management;
+
+ALTER TABLE flow_runs
+    ADD COLUMN run_type ENUM('flow', 'dataset') NOT NULL DEFAULT 'flow' COMMENT '执行方式：流程|数据驱动' AFTER status,
+    ADD COLUMN total_rows INT NULL COMMENT '数据驱动执行的数据行数' AFTER total_steps,
+    ADD COLUMN report JSON NULL COMMENT '数据驱动执行的汇总报告' AFTER debug_log;
+
+-- 数据驱动执行行结果表
+CREATE TABLE IF NOT EXISTS flow_run_rows (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id INT NOT NULL COMMENT '关联执行记录ID',
+    row_index INT NOT NULL COMMENT '行号（从1开始）',
+    success BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否成功',
+    duration_ms INT COMMENT '耗时（毫秒）',
+    failed_step INT COMMENT '第一个失败的步骤序号',
+    error_message TEXT COMMENT '错误信息',
+    variables JSON COMMENT '该行的变量',
+    results JSON COMMENT '失败行的完整步骤结果',
+    debug_log JSON COMMENT '开启debug时失败行的调试日志',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (run_id) REFERENCES flow_runs(id) ON DELETE CASCADE,
+    INDEX idx_flow_run_rows_run (run_id, row_index),
+    INDEX idx_flow_run_rows_success (run_id, success, row_index)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='数据驱动执行行结果表';
@@ -0,0 +1,47 @@
+-- 流程异步执行：flow_runs 记录每次执行的状态和计数，flow_run_steps 记录每个步骤的结果（见 flow_runs）
+-- 执行方式：mysql -u root -p bug_management < migration_add_flow_runs.sql
+
+USE bug_management;
+
+-- 流程异步执行记录表
+CREATE TABLE IF NOT EXISTS flow_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL COMMENT '所属项目ID',
+    flow_id INT NOT NULL COMMENT '流程ID',
+    environment_id INT NULL COMMENT '环境ID',
+    status ENUM('queued', 'running', 'success', 'failed') NOT NULL DEFAULT 'queued' COMMENT '状态：排队|执行中|成功|失败',
+    total_steps INT NOT NULL DEFAULT 0 COMMENT '启用的步骤数',
+    success_count INT NOT NULL DEFAULT 0 COMMENT '成功步骤数',
+    failed_count INT NOT NULL DEFAULT 0 COMMENT '失败步骤数',
+    context JSON COMMENT '执行结束时的变量上下文',
+    debug_log JSON COMMENT '开启debug时记录的调试日志',
+    error_message TEXT COMMENT '错误信息',
+    created_by INT NULL COMMENT '创建人ID',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    started_at DATETIME NULL COMMENT '开始执行时间',
+    completed_at DATETIME NULL COMMENT '结束时间',
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (flow_id) REFERENCES api_test_flows(id) ON DELETE CASCADE,
+    FOREIGN KEY (environment_id) REFERENCES api_environments(id) ON DELETE SET NULL,
+    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL,
+    INDEX idx_project_id (project_id),
+    INDEX idx_flow_runs_flow (flow_id, id),
+    INDEX idx_status (status),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程异步执行记录表';
+
+-- 流程异步执行步骤结果表
+CREATE TABLE IF NOT EXISTS flow_run_steps (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id INT NOT NULL COMMENT '关联执行记录ID',
+    step_index INT NOT NULL COMMENT '步骤序号（从1开始）',
+    success BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否成功',
+    status_code INT COMMENT 'HTTP状态码',
+    response_time INT COMMENT '耗时（毫秒）',
+    error_message TEXT COMMENT '错误信息',
+    result JSON COMMENT '步骤结果',
+    blob_refs JSON COMMENT 'result中存入content_blobs的字段及内容哈希',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (run_id) REFERENCES flow_runs(id) ON DELETE CASCADE,
+    INDEX idx_flow_run_steps_run_id (run_id, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程异步执行步骤结果表';
@@ -0,0 +1,29 @@
+-- 流程步骤 → 接口反向索引：删除接口时的依赖检查和接口引用查询按 endpoint_id 查询（见 flow_index）
+-- 执行方式：mysql -u root -p bug_management < migration_add_flow_step_endpoints.sql
+
+USE bug_management;
+
+-- 流程步骤引用接口索引表（api_test_flows.steps 的反向索引）
+CREATE TABLE IF NOT EXISTS flow_step_endpoints (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    flow_id INT NOT NULL COMMENT '关联流程ID',
+    step_index INT NOT NULL COMMENT '步骤序号（从1开始）',
+    endpoint_id INT NOT NULL COMMENT '步骤引用的接口ID',
+    FOREIGN KEY (flow_id) REFERENCES api_test_flows(id) ON DELETE CASCADE,
+    INDEX idx_flow_id (flow_id),
+    INDEX idx_flow_step_endpoints_endpoint (endpoint_id, flow_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='流程步骤引用接口索引表';
+
+-- 回填已有流程的索引
+INSERT INTO flow_step_endpoints (flow_id, step_index, endpoint_id)
+SELECT f.id, s.step_index, s.endpoint_id
+FROM api_test_flows f,
+     JSON_TABLE(
+         f.steps, '$[*]' COLUMNS (
+             step_index FOR ORDINALITY,
+             endpoint_id INT PATH '$.endpoint_id' NULL ON ERROR
+         )
+     ) AS s
+WHERE f.steps IS NOT NULL
+  AND s.endpoint_id IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM flow_step_endpoints e WHERE e.flow_id = f.id);
@@ -0,0 +1,10 @@
+-- 压测：记录执行进程、心跳和停止请求。服务崩溃或重启后遗留的执行中记录会被标记为失败（见 load_test.recover_orphan_load_tests），
+-- 停止请求写入数据库，由执行该压测的进程在写入报告时读取（多个服务进程时任一进程都可以停止）
+-- 执行方式：mysql -u root -p bug_management < migration_add_load_test_heartbeat.sql
+
+USE bug_management;
+
+ALTER TABLE load_test_runs
+    ADD COLUMN worker_id VARCHAR(100) NULL COMMENT '执行该压测的服务进程' AFTER created_at,
+    ADD COLUMN heartbeat_at DATETIME NULL COMMENT '执行进程最近一次心跳' AFTER worker_id,
+    ADD COLUMN stop_requested BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否已请求停止' AFTER heartbeat_at;
@@ -0,0 +1,24 @@
+-- 压测记录：用 N 个虚拟用户重复执行流程或接口，保存各步骤的耗时分位数、吞吐量、错误率和阈值判定结果
+
+CREATE TABLE IF NOT EXISTS load_test_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL COMMENT '所属项目ID',
+    target_type VARCHAR(20) NOT NULL COMMENT '压测对象类型：flow | api',
+    target_id INT NOT NULL COMMENT '流程ID或接口ID',
+    environment_id INT NULL COMMENT '环境ID',
+    config JSON COMMENT '压测配置：虚拟用户数、时长/迭代次数、加压时间、阈值等',
+    status ENUM('running', 'completed', 'stopped', 'failed') NOT NULL DEFAULT 'running' COMMENT '状态：执行中|完成|已停止|执行出错',
+    passed BOOLEAN NULL COMMENT '是否满足全部阈值（未设置阈值时为空）',
+    report JSON COMMENT '压测报告：各步骤耗时分位数、吞吐量、错误率',
+    error_message TEXT COMMENT '错误信息',
+    created_by INT NULL COMMENT '创建人ID',
+    started_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP COMMENT '开始时间',
+    completed_at TIMESTAMP NULL COMMENT '结束时间',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (environment_id) REFERENCES api_environments(id) ON DELETE SET NULL,
+    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL,
+    INDEX idx_project_id (project_id),
+    INDEX idx_load_test_runs_target (target_type, target_id, id),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='压测记录表';
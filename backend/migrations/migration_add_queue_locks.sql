@@ -0,0 +1,11 @@
+-- 测试任务队列：JOB_MAX_RUNNING 并发上限在锁定 queue_locks 行的事务内检查并领取，多个 worker 进程同时领取时也不会超过上限
+-- 执行方式：mysql -u root -p bug_management < migration_add_queue_locks.sql
+
+USE bug_management;
+
+-- 队列全局锁表：领取任务时锁定对应行，并发上限检查与领取在同一个锁内完成
+CREATE TABLE IF NOT EXISTS queue_locks (
+    name VARCHAR(50) PRIMARY KEY COMMENT '锁名称（task_jobs）'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='队列全局锁表';
+
+INSERT IGNORE INTO queue_locks (name) VALUES ('task_jobs');
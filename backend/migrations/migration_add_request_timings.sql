@@ -0,0 +1,11 @@
+-- 为 api_execution_records、test_task_execution_items 表添加 timings 字段：请求的分阶段耗时
+-- （dns/connect/tls/send/server/download/total，毫秒，以及是否复用连接）
+-- 执行方式：mysql -u root -p bug_management < migration_add_request_timings.sql
+
+USE bug_management;
+
+ALTER TABLE api_execution_records
+ADD COLUMN timings JSON COMMENT '分阶段耗时（毫秒）' AFTER response_time;
+
+ALTER TABLE test_task_execution_items
+ADD COLUMN timings JSON COMMENT '分阶段耗时（毫秒）' AFTER execution_time;
@@ -0,0 +1,13 @@
+-- 执行历史保留策略：按项目配置保留最近 N 条 / 最近 D 天 / 失败记录保留天数，由后台清理任务分批删除
+
+CREATE TABLE IF NOT EXISTS retention_policies (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL COMMENT '所属项目ID',
+    keep_last_runs INT NULL COMMENT '每个接口/任务/流程至少保留最近N条',
+    keep_days INT NULL COMMENT '保留最近D天的记录',
+    keep_failed_days INT NULL COMMENT '失败记录保留天数',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_project (project_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='执行历史保留策略表';
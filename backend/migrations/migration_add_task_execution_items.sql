@@ -0,0 +1,16 @@
+-- 测试任务执行结果明细：每个任务项执行完即写入一行，执行过程中可以增量读取进度
+
+CREATE TABLE IF NOT EXISTS test_task_execution_items (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    execution_id INT NOT NULL COMMENT '关联执行记录ID',
+    job_id INT COMMENT '写入该结果的分片ID',
+    item_index INT NOT NULL DEFAULT 0 COMMENT '任务项在本次执行中的序号',
+    result_index INT NOT NULL DEFAULT 0 COMMENT '同一任务项的结果序号',
+    success BOOLEAN NOT NULL DEFAULT FALSE COMMENT '是否成功',
+    result JSON COMMENT '结果详情',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (execution_id) REFERENCES test_task_executions(id) ON DELETE CASCADE,
+    FOREIGN KEY (job_id) REFERENCES task_jobs(id) ON DELETE CASCADE,
+    INDEX idx_execution_items_execution_id (execution_id, id),
+    INDEX idx_job (job_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='测试任务执行结果明细表';
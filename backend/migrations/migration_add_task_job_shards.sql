@@ -0,0 +1,11 @@
+-- 测试任务分片执行：一次执行拆成多条队列记录，由多个 worker 并行领取
+
+ALTER TABLE task_jobs ADD COLUMN shard_index INT NOT NULL DEFAULT 0 COMMENT '分片序号' AFTER task_id;
+ALTER TABLE task_jobs ADD COLUMN shard_count INT NOT NULL DEFAULT 1 COMMENT '分片总数' AFTER shard_index;
+ALTER TABLE task_jobs ADD COLUMN results JSON COMMENT '本分片的执行结果' AFTER payload;
+ALTER TABLE task_jobs MODIFY COLUMN payload JSON COMMENT '执行参数及本分片的任务项';
+
+-- 外键需要 execution_id 上的索引，先建普通索引再删除原唯一索引
+CREATE INDEX idx_execution ON task_jobs(execution_id);
+ALTER TABLE task_jobs DROP INDEX uk_execution;
+ALTER TABLE task_jobs ADD UNIQUE KEY uk_execution_shard (execution_id, shard_index);
@@ -0,0 +1,22 @@
+-- 测试任务执行队列：worker 通过 SELECT ... FOR UPDATE SKIP LOCKED 领取任务（需要 MySQL 8.0+）
+
+CREATE TABLE IF NOT EXISTS task_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    execution_id INT NOT NULL COMMENT '关联执行记录ID',
+    task_id INT NOT NULL COMMENT '关联任务ID',
+    payload JSON COMMENT '执行参数',
+    status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued' COMMENT '状态：排队|执行中|完成|失败',
+    attempts INT NOT NULL DEFAULT 0 COMMENT '已领取次数',
+    worker_id VARCHAR(100) COMMENT '当前持有租约的worker',
+    lease_expires_at DATETIME NULL COMMENT '租约到期时间',
+    error_message TEXT COMMENT '错误信息',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL COMMENT '开始执行时间',
+    finished_at DATETIME NULL COMMENT '结束时间',
+    FOREIGN KEY (execution_id) REFERENCES test_task_executions(id) ON DELETE CASCADE,
+    FOREIGN KEY (task_id) REFERENCES test_tasks(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_execution (execution_id),
+    INDEX idx_task (task_id),
+    INDEX idx_task_jobs_status_id (status, id),
+    INDEX idx_task_jobs_status_lease (status, lease_expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='测试任务执行队列表';
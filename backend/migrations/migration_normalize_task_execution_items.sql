@@ -0,0 +1,29 @@
+-- 测试任务执行结果明细拆成独立列，支持按成功/失败、接口/流程筛选和分页
+-- 新的执行记录不再写入 test_task_executions.execution_results 和 task_jobs.results
+
+ALTER TABLE test_task_execution_items
+    ADD COLUMN item_type VARCHAR(20) NOT NULL DEFAULT 'api' COMMENT '类型：api|flow' AFTER result_index,
+    ADD COLUMN item_id INT COMMENT '接口/流程ID' AFTER item_type,
+    ADD COLUMN item_name VARCHAR(500) COMMENT '名称' AFTER item_id,
+    ADD COLUMN status_code INT COMMENT 'HTTP状态码' AFTER success,
+    ADD COLUMN execution_time INT COMMENT '耗时（毫秒）' AFTER status_code,
+    ADD COLUMN error_message TEXT COMMENT '错误信息' AFTER execution_time,
+    ADD COLUMN details JSON COMMENT '请求/响应详情' AFTER error_message;
+
+UPDATE test_task_execution_items SET
+    item_type = COALESCE(JSON_UNQUOTE(JSON_EXTRACT(result, '$.item_type')), 'api'),
+    item_id = JSON_EXTRACT(result, '$.item_id'),
+    item_name = LEFT(JSON_UNQUOTE(JSON_EXTRACT(result, '$.item_name')), 500),
+    status_code = NULLIF(JSON_EXTRACT(result, '$.status_code'), CAST('null' AS JSON)),
+    execution_time = NULLIF(JSON_EXTRACT(result, '$.execution_time'), CAST('null' AS JSON)),
+    error_message = NULLIF(JSON_UNQUOTE(JSON_EXTRACT(result, '$.error_message')), 'null'),
+    details = JSON_EXTRACT(result, '$.details')
+WHERE result IS NOT NULL;
+
+ALTER TABLE test_task_execution_items
+    ALTER COLUMN item_type DROP DEFAULT,
+    DROP COLUMN result,
+    ADD INDEX idx_execution_items_execution_success (execution_id, success),
+    ADD INDEX idx_execution_items_item (item_type, item_id);
+
+ALTER TABLE task_jobs DROP COLUMN results;
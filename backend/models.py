@@ -1,5 +1,6 @@
 """数据库模型"""
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Date, DECIMAL, JSON, Boolean, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Date, DECIMAL, JSON, Boolean, Table, Index, UniqueConstraint, LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 from config import Base
@@ -188,6 +189,7 @@ class ApiEnvironment(Base):
     base_url = Column(String(255), nullable=False)
     description = Column(Text)
     headers = Column(JSON)  # 默认请求头
+    max_concurrency = Column(Integer)  # 测试任务发往该环境的最大并发请求数，为空时使用默认值
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
@@ -240,6 +242,7 @@ class ApiEndpoint(Base):
     tags = Column(JSON)  # 标签列表
     parameters = Column(JSON)  # Swagger参数列表(path/query/header参数)
     request_body = Column(JSON)  # Swagger请求体定义
+    response_schemas = Column(JSON)  # 各状态码的响应结构 {状态码: JSON Schema}（$ref 已展开）
     is_favorite = Column(Boolean, default=False, index=True)  # 是否收藏
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -282,8 +285,11 @@ class ApiExecutionRecord(Base):
     response_headers = Column(JSON)  # 响应头
     response_body = Column(Text)  # 响应体（可能是大文本）
     response_time = Column(Integer)  # 响应时间（毫秒）
+    timings = Column(JSON)  # 分阶段耗时（毫秒）：dns/connect/tls/send/server/download/total 及是否复用连接
     success = Column(Boolean, default=False)  # 是否成功
     error_message = Column(Text)  # 错误信息
+    debug_log = Column(JSON)  # 执行时开启 debug 记录的调试日志
+    blob_refs = Column(JSON)  # 存入 content_blobs 的字段 {字段名: 内容哈希}，对应字段为空
     executed_at = Column(DateTime, default=datetime.now, index=True)
 
 
@@ -319,6 +325,19 @@ class FlowVariable(Base):
     flow = relationship("ApiTestFlow", back_populates="variables")
 
 
+class FlowStepEndpoint(Base):
+    """流程步骤引用的接口（api_test_flows.steps 的反向索引，见 flow_index）"""
+    __tablename__ = "flow_step_endpoints"
+    __table_args__ = (
+        Index("idx_flow_step_endpoints_endpoint", "endpoint_id", "flow_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    flow_id = Column(Integer, ForeignKey("api_test_flows.id", ondelete="CASCADE"), nullable=False, index=True)
+    step_index = Column(Integer, nullable=False)  # 步骤序号（从 1 开始）
+    endpoint_id = Column(Integer, nullable=False)  # 接口ID（步骤可能引用已不存在的接口，不设外键）
+
+
 class Model(Base):
     """AI模型配置"""
     __tablename__ = "models"
@@ -350,6 +369,7 @@ class TestTask(Base):
     is_favorite = Column(Boolean, default=False, index=True)  # 是否收藏
     cron_expression = Column(String(100))  # Cron表达式，用于定时执行
     environment_id = Column(Integer, ForeignKey("api_environments.id", ondelete="SET NULL"))  # 定时执行时使用的环境ID
+    max_concurrency = Column(Integer)  # 同时执行的任务项数，为空时使用默认值
     created_at = Column(DateTime, default=datetime.now, index=True)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
@@ -383,7 +403,7 @@ class TestTaskExecution(Base):
     total_count = Column(Integer, default=0)  # 总数量
     success_count = Column(Integer, default=0)  # 成功数量
     failed_count = Column(Integer, default=0)  # 失败数量
-    execution_results = Column(JSON)  # 执行结果详情（每个接口/流程的执行结果）
+    execution_results = Column(JSON)  # 执行结果详情（仅旧记录使用，新记录的结果在 test_task_execution_items 表中）
     error_message = Column(Text)  # 错误信息
     started_at = Column(DateTime, default=datetime.now, index=True)
     completed_at = Column(DateTime)  # 完成时间
@@ -392,6 +412,91 @@ class TestTaskExecution(Base):
     environment = relationship("ApiEnvironment", foreign_keys=[environment_id])
 
 
+class TaskJob(Base):
+    """测试任务执行队列（由 job_queue 中的 worker 领取执行）"""
+    __tablename__ = "task_jobs"
+    __table_args__ = (
+        Index("idx_task_jobs_status_id", "status", "id"),  # 按入队顺序领取
+        Index("idx_task_jobs_status_lease", "status", "lease_expires_at"),  # 查找租约过期的任务
+        UniqueConstraint("execution_id", "shard_index", name="uk_execution_shard"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    execution_id = Column(Integer, ForeignKey("test_task_executions.id", ondelete="CASCADE"), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey("test_tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    shard_index = Column(Integer, default=0, nullable=False)  # 分片序号（从 0 开始）
+    shard_count = Column(Integer, default=1, nullable=False)  # 该次执行的分片总数
+    payload = Column(JSON)  # 执行参数（TestTaskExecutionRequest）和本分片的任务项
+    status = Column(Enum('queued', 'running', 'done', 'failed'), default='queued', nullable=False)  # 状态：排队|执行中|完成|失败
+    attempts = Column(Integer, default=0, nullable=False)  # 已领取次数
+    worker_id = Column(String(100))  # 当前持有租约的 worker
+    lease_expires_at = Column(DateTime)  # 租约到期时间，worker 通过心跳续期
+    error_message = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class QueueLock(Base):
+    """队列全局锁：领取任务时 SELECT ... FOR UPDATE 锁定对应行，使并发上限检查与领取不会被其他 worker 穿插"""
+    __tablename__ = "queue_locks"
+
+    name = Column(String(50), primary_key=True)  # 锁名称（task_jobs）
+
+
+class TestTaskExecutionItem(Base):
+    """测试任务执行结果明细（每条结果一行，任务项执行完即写入）"""
+    __tablename__ = "test_task_execution_items"
+    __table_args__ = (
+        Index("idx_execution_items_execution_id", "execution_id", "id"),  # 按写入顺序增量读取
+        Index("idx_execution_items_execution_success", "execution_id", "success"),  # 按成功/失败筛选、统计
+        Index("idx_execution_items_item", "item_type", "item_id"),  # 查询某个接口/流程的历史结果
+    )
+
+    id = Column(Integer, primary_key=True)
+    execution_id = Column(Integer, ForeignKey("test_task_executions.id", ondelete="CASCADE"), nullable=False)
+    job_id = Column(Integer, ForeignKey("task_jobs.id", ondelete="CASCADE"), index=True)  # 写入该结果的分片
+    item_index = Column(Integer, default=0, nullable=False)  # 任务项在本次执行中的序号
+    result_index = Column(Integer, default=0, nullable=False)  # 同一任务项的第几条结果（流程每个步骤一条）
+    item_type = Column(String(20), nullable=False)  # 'api' | 'flow'（流程步骤按 api 记录）
+    item_id = Column(Integer)
+    item_name = Column(String(500))
+    success = Column(Boolean, default=False, nullable=False)
+    status_code = Column(Integer)
+    execution_time = Column(Integer)  # 毫秒
+    timings = Column(JSON)  # 分阶段耗时（毫秒），见 http_client
+    error_message = Column(Text)
+    details = Column(JSON)  # 请求/响应详情
+    blob_refs = Column(JSON)  # details 中存入 content_blobs 的字段 {字段名: 内容哈希}
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class ContentBlob(Base):
+    """请求/响应内容（按 SHA-256 去重，压缩存储，见 blob_store）"""
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)  # 原始内容的 SHA-256
+    codec = Column(String(10), nullable=False)  # 压缩算法：zstd | gzip | none
+    raw_size = Column(Integer, nullable=False)  # 原始字节数
+    stored_size = Column(Integer, nullable=False)  # 压缩后字节数
+    data = Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    last_referenced_at = Column(DateTime, default=datetime.now, index=True)  # 最近一次被引用的时间，用于清理
+
+
+class RetentionPolicy(Base):
+    """项目的执行历史保留策略（未配置时使用环境变量中的默认值，见 retention）"""
+    __tablename__ = "retention_policies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, unique=True)
+    keep_last_runs = Column(Integer)  # 每个接口/任务/流程至少保留最近 N 条
+    keep_days = Column(Integer)  # 保留最近 D 天的记录
+    keep_failed_days = Column(Integer)  # 失败记录保留天数（通常长于 keep_days）
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
 class FlowExportRecord(Base):
     """流程导出记录"""
     __tablename__ = "flow_export_records"
@@ -405,6 +510,101 @@ class FlowExportRecord(Base):
     flow = relationship("ApiTestFlow", backref="export_records")
 
 
+class LoadTestRun(Base):
+    """压测记录（见 load_test）"""
+    __tablename__ = "load_test_runs"
+    __table_args__ = (
+        Index("idx_load_test_runs_target", "target_type", "target_id", "id"),  # 查询某个流程/接口的压测历史
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    target_type = Column(String(20), nullable=False)  # 'flow' | 'api'
+    target_id = Column(Integer, nullable=False)  # 流程ID或接口ID
+    environment_id = Column(Integer, ForeignKey("api_environments.id", ondelete="SET NULL"))
+    config = Column(JSON)  # 压测配置：虚拟用户数、时长/迭代次数、加压时间、阈值等
+    status = Column(Enum('running', 'completed', 'stopped', 'failed'), default='running', nullable=False)  # 状态：执行中|完成|已停止|执行出错
+    passed = Column(Boolean)  # 是否满足全部阈值（未设置阈值时为空）
+    report = Column(JSON)  # 压测报告：各步骤耗时分位数、吞吐量、错误率
+    error_message = Column(Text)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    started_at = Column(DateTime, default=datetime.now)
+    completed_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+    worker_id = Column(String(100))  # 执行该压测的服务进程
+    heartbeat_at = Column(DateTime)  # 执行进程最近一次心跳，长时间未更新的执行中记录会被标记为失败
+    stop_requested = Column(Boolean, default=False, nullable=False)  # 已请求停止，执行进程写入报告时检查
+
+
+class FlowRun(Base):
+    """流程异步执行记录（见 flow_runs）"""
+    __tablename__ = "flow_runs"
+    __table_args__ = (
+        Index("idx_flow_runs_flow", "flow_id", "id"),  # 查询某个流程的执行历史
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    flow_id = Column(Integer, ForeignKey("api_test_flows.id", ondelete="CASCADE"), nullable=False)
+    environment_id = Column(Integer, ForeignKey("api_environments.id", ondelete="SET NULL"))
+    status = Column(Enum('queued', 'running', 'success', 'failed'), default='queued', nullable=False, index=True)  # 状态：排队|执行中|成功|失败
+    run_type = Column(Enum('flow', 'dataset'), default='flow', nullable=False)  # 执行方式：流程|数据驱动
+    total_steps = Column(Integer, default=0, nullable=False)  # 启用的步骤数
+    total_rows = Column(Integer)  # 数据驱动执行的数据行数
+    success_count = Column(Integer, default=0, nullable=False)  # 已完成的成功步骤数（数据驱动执行为成功行数）
+    failed_count = Column(Integer, default=0, nullable=False)  # 已完成的失败步骤数（数据驱动执行为失败行数）
+    context = Column(JSON)  # 执行结束时的变量上下文
+    debug_log = Column(JSON)  # 执行时开启 debug 记录的调试日志
+    report = Column(JSON)  # 数据驱动执行的汇总报告（各步骤失败次数和耗时分位数）
+    error_message = Column(Text)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    worker_id = Column(String(100))  # 执行该流程的服务进程
+    heartbeat_at = Column(DateTime)  # 执行进程最近一次心跳，长时间未更新的排队/执行中记录会被标记为失败
+
+
+class FlowRunStep(Base):
+    """流程异步执行的步骤结果（每个步骤完成即写入）"""
+    __tablename__ = "flow_run_steps"
+    __table_args__ = (
+        Index("idx_flow_run_steps_run_id", "run_id", "id"),  # 按写入顺序增量读取
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("flow_runs.id", ondelete="CASCADE"), nullable=False)
+    step_index = Column(Integer, nullable=False)  # 步骤序号（从 1 开始）
+    success = Column(Boolean, default=False, nullable=False)
+    status_code = Column(Integer)
+    response_time = Column(Integer)  # 毫秒
+    error_message = Column(Text)
+    result = Column(JSON)  # 步骤结果（与同步执行返回的 results 中的一项相同）
+    blob_refs = Column(JSON)  # result 中存入 content_blobs 的字段 {字段名: 内容哈希}
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class FlowRunRow(Base):
+    """数据驱动执行的每行结果（见 flow_runs.FlowDatasetRunner）"""
+    __tablename__ = "flow_run_rows"
+    __table_args__ = (
+        Index("idx_flow_run_rows_run", "run_id", "row_index"),  # 按行号分页查询
+        Index("idx_flow_run_rows_success", "run_id", "success", "row_index"),  # 只查询失败（或成功）的行
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("flow_runs.id", ondelete="CASCADE"), nullable=False)
+    row_index = Column(Integer, nullable=False)  # 行号（从 1 开始）
+    success = Column(Boolean, default=False, nullable=False)
+    duration_ms = Column(Integer)
+    failed_step = Column(Integer)  # 第一个失败的步骤序号
+    error_message = Column(Text)
+    variables = Column(JSON)  # 该行的变量
+    results = Column(JSON)  # 失败行的完整步骤结果（最多 DATASET_MAX_FAILED_DETAILS 行）
+    debug_log = Column(JSON)  # 开启 debug 时失败行的调试日志
+    created_at = Column(DateTime, default=datetime.now)
+
+
 class TestFile(Base):
     """测试文件管理"""
     __tablename__ = "test_files"
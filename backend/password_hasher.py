@@ -0,0 +1,177 @@
+"""密码哈希工作池
+
+bcrypt 单次计算耗时数百毫秒，登录高峰时会占满线程池。这里把 hashpw/checkpw
+放到独立的、大小受限的进程池中执行（避免 GIL 竞争），并限制排队长度，
+超出时直接拒绝，保证其他请求不受影响。
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+
+# bcrypt 工作因子（cost），修改后用户下次登录时会自动重新哈希
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 哈希进程数，0 表示在调用线程内直接计算
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 允许同时排队/执行的哈希任务数，超出后直接拒绝，避免占满 Web 线程池
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+
+
+# 是否为哈希进程池的工作进程（由进程池的 initializer 设置）
+_in_hash_worker = False
+
+
+def _mark_hash_worker() -> None:
+    global _in_hash_worker
+    _in_hash_worker = True
+
+
+class PasswordHasherBusy(Exception):
+    """哈希任务排队已满"""
+
+
+def _hashpw(password_bytes: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=rounds))
+
+
+def _checkpw(password_bytes: bytes, hashed_bytes: bytes) -> bool:
+    return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+def _timed(fn, *args):
+    """在工作进程中执行，同时返回开始执行的时间，用于统计排队耗时"""
+    started_at = time.monotonic()
+    return fn(*args), started_at
+
+
+def get_hash_rounds(hashed_password: str) -> Optional[int]:
+    """从 bcrypt 哈希串（$2b$12$...）中解析工作因子"""
+    parts = hashed_password.split('$')
+    if len(parts) < 4:
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+
+class PasswordHasher:
+    """大小受限的 bcrypt 进程池，附带排队统计"""
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        rounds: int = BCRYPT_ROUNDS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_wait = 0.0
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        # 哈希工作进程中不再嵌套创建进程池；uvicorn --workers / --reload 启动的服务子进程仍使用进程池
+        if self.workers <= 0 or _in_hash_worker:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                # 使用 spawn，避免 fork 带有线程的服务进程
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_mark_hash_worker,
+                )
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise PasswordHasherBusy("密码校验请求过多，请稍后重试")
+        with self._stats_lock:
+            self._pending += 1
+        try:
+            pool = self._get_pool()
+            if pool is None:
+                queued_at = started_at = time.monotonic()
+                result = fn(*args)
+            else:
+                queued_at = time.monotonic()
+                try:
+                    result, started_at = pool.submit(_timed, fn, *args).result()
+                except BrokenProcessPool:
+                    # 工作进程异常退出，重建进程池，本次在当前线程内计算
+                    self._reset_pool()
+                    started_at = time.monotonic()
+                    result = fn(*args)
+            finished_at = time.monotonic()
+            with self._stats_lock:
+                # time.monotonic 在同一台机器的进程间可比较（Linux 上基于 CLOCK_MONOTONIC）
+                wait = max(0.0, started_at - queued_at)
+                self._completed += 1
+                self._total_wait += wait
+                self._total_run += finished_at - queued_at - wait
+                self._max_wait = max(self._max_wait, wait)
+            return result
+        finally:
+            with self._stats_lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def hash(self, password: str, rounds: Optional[int] = None) -> str:
+        # bcrypt 限制密码最多 72 字节
+        password_bytes = password.encode('utf-8')[:72]
+        return self._run(_hashpw, password_bytes, rounds or self.rounds).decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        password_bytes = password.encode('utf-8')[:72]
+        return self._run(_checkpw, password_bytes, hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """哈希的工作因子与当前配置不一致时需要重新哈希"""
+        return get_hash_rounds(hashed_password) != self.rounds
+
+    def stats(self) -> dict:
+        """排队与耗时统计"""
+        with self._stats_lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / completed * 1000, 2) if completed else 0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "avg_run_ms": round(self._total_run / completed * 1000, 2) if completed else 0,
+            }
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+password_hasher = PasswordHasher()
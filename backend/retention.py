@@ -0,0 +1,353 @@
+"""执行历史保留策略与后台清理
+
+接口执行记录、测试任务执行记录、流程导出记录按项目的保留策略清理：
+
+- keep_last_runs：每个接口/任务/流程至少保留最近 N 条
+- keep_days：保留最近 D 天的记录
+- keep_failed_days：失败记录保留天数（通常长于 keep_days）
+
+满足任意一条保留规则的记录都会保留；keep_last_runs 和 keep_days 都未设置时不清理。
+项目没有单独配置时使用 RETENTION_KEEP_* 环境变量（默认都为空，即不清理）。
+
+清理每批只删除 RETENTION_BATCH_SIZE 行并立即提交，批次之间短暂停顿，避免长时间持有锁；
+测试任务执行记录先分批删除结果明细和队列记录，再删除执行记录本身。
+
+content_blobs 按引用清理：候选内容为本次删除的记录引用的内容，加上最久未被引用的 RETENTION_BLOB_SWEEP_LIMIT 条内容；
+扫描剩余记录的 blob_refs，没有被任何记录引用的候选内容删除，仍被引用的候选内容更新引用时间（下次不再重复检查）。
+最近 BLOB_TOUCH_INTERVAL + BLOB_GC_GRACE 内被引用过的内容不删除，避免与正在写入、尚未提交的记录冲突。
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+import models
+from blob_store import BLOB_TOUCH_INTERVAL
+from config import SessionLocal
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+# 默认保留策略（为空表示不按该规则清理）
+RETENTION_KEEP_LAST_RUNS = _env_int("RETENTION_KEEP_LAST_RUNS")
+RETENTION_KEEP_DAYS = _env_int("RETENTION_KEEP_DAYS")
+RETENTION_KEEP_FAILED_DAYS = _env_int("RETENTION_KEEP_FAILED_DAYS")
+# 后台清理间隔（秒），0 表示不启动后台清理
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+# 每批删除的行数
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+# 批次之间的停顿（秒）
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.05"))
+# 每次清理额外检查的最久未被引用的内容条数
+RETENTION_BLOB_SWEEP_LIMIT = int(os.getenv("RETENTION_BLOB_SWEEP_LIMIT", "10000"))
+# 清理内容存储时额外保留的时间，覆盖正在写入、尚未提交的记录
+BLOB_GC_GRACE = timedelta(days=1)
+# 记录中保存内容哈希（blob_refs）的表
+BLOB_REFERRERS = (models.ApiExecutionRecord, models.TestTaskExecutionItem, models.FlowRunStep)
+
+
+class Policy:
+    """生效的保留策略"""
+    __slots__ = ("keep_last_runs", "keep_days", "keep_failed_days")
+
+    def __init__(self, keep_last_runs: Optional[int], keep_days: Optional[int], keep_failed_days: Optional[int]):
+        self.keep_last_runs = keep_last_runs
+        self.keep_days = keep_days
+        self.keep_failed_days = keep_failed_days
+
+    @property
+    def active(self) -> bool:
+        return bool(self.keep_last_runs or self.keep_days)
+
+    def to_dict(self) -> Dict[str, Optional[int]]:
+        return {
+            "keep_last_runs": self.keep_last_runs,
+            "keep_days": self.keep_days,
+            "keep_failed_days": self.keep_failed_days,
+        }
+
+
+def default_policy() -> Policy:
+    return Policy(RETENTION_KEEP_LAST_RUNS, RETENTION_KEEP_DAYS, RETENTION_KEEP_FAILED_DAYS)
+
+
+def resolve_policy(row: Optional[models.RetentionPolicy]) -> Policy:
+    """项目配置的字段优先，未配置的字段使用默认值"""
+    default = default_policy()
+    if row is None:
+        return default
+    return Policy(
+        row.keep_last_runs if row.keep_last_runs is not None else default.keep_last_runs,
+        row.keep_days if row.keep_days is not None else default.keep_days,
+        row.keep_failed_days if row.keep_failed_days is not None else default.keep_failed_days,
+    )
+
+
+class _History:
+    """一类执行历史：按 group 列（接口/任务/流程）分组，通过 parent 表关联项目"""
+
+    def __init__(self, name, model, group_col, time_col, parent, failed=None, where=None, children=()):
+        self.name = name
+        self.model = model
+        self.group_col = group_col
+        self.time_col = time_col
+        self.parent = parent
+        self.failed = failed
+        self.where = where
+        # 需要先分批删除的子表：(名称, 模型, 外键列)
+        self.children = children
+
+
+HISTORIES = (
+    _History(
+        "api_execution_records", models.ApiExecutionRecord,
+        models.ApiExecutionRecord.endpoint_id, models.ApiExecutionRecord.executed_at, models.ApiEndpoint,
+        failed=or_(models.ApiExecutionRecord.success.is_(None), models.ApiExecutionRecord.success == False),
+    ),
+    _History(
+        "test_task_executions", models.TestTaskExecution,
+        models.TestTaskExecution.task_id, models.TestTaskExecution.started_at, models.TestTask,
+        failed=models.TestTaskExecution.status == 'failed',
+        where=models.TestTaskExecution.status != 'running',
+        children=(
+            ("test_task_execution_items", models.TestTaskExecutionItem, models.TestTaskExecutionItem.execution_id),
+            ("task_jobs", models.TaskJob, models.TaskJob.execution_id),
+        ),
+    ),
+    _History(
+        "flow_runs", models.FlowRun,
+        models.FlowRun.flow_id, models.FlowRun.created_at, models.ApiTestFlow,
+        failed=models.FlowRun.status == 'failed',
+        where=models.FlowRun.status.notin_(('queued', 'running')),
+        children=(
+            ("flow_run_steps", models.FlowRunStep, models.FlowRunStep.run_id),
+            ("flow_run_rows", models.FlowRunRow, models.FlowRunRow.run_id),
+        ),
+    ),
+    _History(
+        "flow_export_records", models.FlowExportRecord,
+        models.FlowExportRecord.flow_id, models.FlowExportRecord.created_at, models.ApiTestFlow,
+    ),
+)
+
+
+def _expired_ids(db: Session, history: _History, project_id: int, policy: Policy, now: datetime, limit: int) -> List[int]:
+    """查找项目中不满足任何保留规则的记录ID"""
+    model = history.model
+    columns = [
+        model.id.label("id"),
+        history.time_col.label("t"),
+        func.row_number().over(
+            partition_by=history.group_col,
+            order_by=(history.time_col.desc(), model.id.desc())
+        ).label("rn"),
+    ]
+    if history.failed is not None:
+        columns.append(case((history.failed, 1), else_=0).label("failed"))
+    query = select(*columns).join(
+        history.parent, history.parent.id == history.group_col
+    ).where(history.parent.project_id == project_id)
+    if history.where is not None:
+        query = query.where(history.where)
+    ranked = query.subquery()
+
+    conditions = []
+    if policy.keep_last_runs:
+        conditions.append(ranked.c.rn > policy.keep_last_runs)
+    if policy.keep_days:
+        conditions.append(ranked.c.t < now - timedelta(days=policy.keep_days))
+    if policy.keep_failed_days and history.failed is not None:
+        conditions.append(or_(ranked.c.failed == 0, ranked.c.t < now - timedelta(days=policy.keep_failed_days)))
+    return [row[0] for row in db.execute(select(ranked.c.id).where(and_(*conditions)).limit(limit))]
+
+
+class RetentionCompactor:
+    """按保留策略分批清理执行历史"""
+
+    def __init__(
+        self,
+        interval_seconds: int = RETENTION_INTERVAL_SECONDS,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        batch_pause: float = RETENTION_BATCH_PAUSE_SECONDS,
+    ):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _pause(self) -> None:
+        if self.batch_pause:
+            self._stop.wait(self.batch_pause)
+
+    def _delete_ids(self, db: Session, model, ids: List[Any], key_col=None) -> int:
+        key_col = key_col if key_col is not None else model.id
+        result = db.execute(delete(model).where(key_col.in_(ids)))
+        db.commit()
+        self._pause()
+        return result.rowcount
+
+    def _collect_refs(self, db: Session, model, ids: List[int], released: Set[str]) -> None:
+        """记录删除前收集它们引用的内容哈希"""
+        if model not in BLOB_REFERRERS:
+            return
+        for (refs,) in db.execute(select(model.blob_refs).where(model.id.in_(ids))):
+            released.update(digest for digest in (refs or {}).values() if digest)
+
+    def _delete_children(
+        self, db: Session, history: _History, ids: List[int], deleted: Dict[str, int], released: Set[str]
+    ) -> None:
+        for name, child, fk_col in history.children:
+            while not self._stop.is_set():
+                child_ids = [row[0] for row in db.execute(
+                    select(child.id).where(fk_col.in_(ids)).limit(self.batch_size)
+                )]
+                if not child_ids:
+                    break
+                self._collect_refs(db, child, child_ids, released)
+                deleted[name] = deleted.get(name, 0) + self._delete_ids(db, child, child_ids)
+
+    def _compact_project(
+        self, db: Session, project_id: int, policy: Policy, now: datetime, deleted: Dict[str, int], released: Set[str]
+    ) -> None:
+        for history in HISTORIES:
+            while not self._stop.is_set():
+                ids = _expired_ids(db, history, project_id, policy, now, self.batch_size)
+                db.rollback()  # 结束只读事务，避免一直持有快照
+                if not ids:
+                    break
+                self._delete_children(db, history, ids, deleted, released)
+                self._collect_refs(db, history.model, ids, released)
+                deleted[history.name] = deleted.get(history.name, 0) + self._delete_ids(db, history.model, ids)
+                if len(ids) < self.batch_size:
+                    break
+
+    def _referenced(self, db: Session, candidates: Set[str]) -> Set[str]:
+        """扫描所有记录的 blob_refs，返回候选内容中仍被引用的哈希"""
+        referenced: Set[str] = set()
+        for model in BLOB_REFERRERS:
+            last_id = 0
+            while not self._stop.is_set():
+                rows = db.execute(
+                    select(model.id, model.blob_refs).where(
+                        model.id > last_id, model.blob_refs.isnot(None)
+                    ).order_by(model.id).limit(self.batch_size)
+                ).all()
+                db.rollback()
+                for _, refs in rows:
+                    referenced.update(digest for digest in (refs or {}).values() if digest in candidates)
+                if len(rows) < self.batch_size:
+                    break
+                last_id = rows[-1][0]
+        return referenced
+
+    def _compact_blobs(self, db: Session, now: datetime, released: Set[str], deleted: Dict[str, int]) -> int:
+        """删除候选内容中不再被任何记录引用、且超过宽限期未被引用的内容，返回释放的字节数"""
+        cutoff = now - BLOB_TOUCH_INTERVAL - BLOB_GC_GRACE
+        candidates = set(released)
+        if RETENTION_BLOB_SWEEP_LIMIT > 0:
+            candidates.update(digest for (digest,) in db.execute(
+                select(models.ContentBlob.hash).where(
+                    models.ContentBlob.last_referenced_at < cutoff
+                ).order_by(models.ContentBlob.last_referenced_at).limit(RETENTION_BLOB_SWEEP_LIMIT)
+            ))
+        db.rollback()
+        if not candidates:
+            return 0
+        referenced = self._referenced(db, candidates)
+        if self._stop.is_set():
+            return 0
+        reclaimed = 0
+        ordered = sorted(candidates)
+        for start in range(0, len(ordered), self.batch_size):
+            if self._stop.is_set():
+                break
+            batch = ordered[start:start + self.batch_size]
+            orphaned = [digest for digest in batch if digest not in referenced]
+            still_used = [digest for digest in batch if digest in referenced]
+            if orphaned:
+                stale = and_(models.ContentBlob.hash.in_(orphaned), models.ContentBlob.last_referenced_at < cutoff)
+                reclaimed += db.execute(
+                    select(func.coalesce(func.sum(models.ContentBlob.stored_size), 0)).where(stale)
+                ).scalar() or 0
+                # 删除时再次检查引用时间：扫描期间被重新引用（put 会更新引用时间）的内容不删除
+                result = db.execute(delete(models.ContentBlob).where(stale))
+                deleted["content_blobs"] = deleted.get("content_blobs", 0) + result.rowcount
+            if still_used:
+                # 仍被引用的旧内容更新引用时间，之后的清理不再重复检查
+                db.execute(update(models.ContentBlob).where(
+                    models.ContentBlob.hash.in_(still_used), models.ContentBlob.last_referenced_at < cutoff
+                ).values(last_referenced_at=now))
+            db.commit()
+            self._pause()
+        return int(reclaimed)
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """
+        执行一次清理
+
+        Returns:
+            清理报告（各表删除的行数、释放的内容存储字节数、耗时），已有清理在执行时返回 None
+        """
+        if not self._run_lock.acquire(blocking=False):
+            return None
+        started = time.monotonic()
+        now = datetime.now()
+        deleted: Dict[str, int] = {}
+        released: Set[str] = set()
+        report: Dict[str, Any] = {"started_at": now, "deleted": deleted, "reclaimed_blob_bytes": 0, "projects": 0}
+        db = SessionLocal()
+        try:
+            policies = {row.project_id: row for row in db.query(models.RetentionPolicy)}
+            project_ids = [pid for (pid,) in db.query(models.Project.id).order_by(models.Project.id)]
+            for project_id in project_ids:
+                policy = resolve_policy(policies.get(project_id))
+                if not policy.active:
+                    continue
+                report["projects"] += 1
+                self._compact_project(db, project_id, policy, now, deleted, released)
+            report["reclaimed_blob_bytes"] = self._compact_blobs(db, now, released, deleted)
+            total = sum(deleted.values())
+            if total:
+                print(f"🧹 执行历史清理完成: 删除 {total} 行 {deleted}, 释放内容存储 {report['reclaimed_blob_bytes']} 字节")
+        except Exception as e:
+            db.rollback()
+            report["error"] = str(e)
+            print(f"⚠️ 执行历史清理失败: {e}")
+        finally:
+            db.close()
+            report["duration_seconds"] = round(time.monotonic() - started, 3)
+            self.last_report = report
+            self._run_lock.release()
+        return report
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+
+    def start(self) -> None:
+        """启动后台清理线程"""
+        if self.interval_seconds <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程（正在执行的清理在当前批次后结束）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+retention_compactor = RetentionCompactor()
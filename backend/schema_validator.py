@@ -0,0 +1,354 @@
+"""接口响应结构校验
+
+从 OpenAPI / Swagger 文档同步接口时保存各状态码的响应结构（api_endpoints.response_schemas，$ref 已展开），
+schema 断言按响应状态码选择结构（精确状态码 > 2XX 形式 > default）校验响应体。
+
+结构在第一次使用时编译为校验函数：每个节点要检查的关键字、正则和子结构在编译时确定，校验时只做判断。
+编译结果按 接口ID + 接口更新时间 + 状态码 缓存（SCHEMA_VALIDATOR_CACHE_SIZE 条），接口修改后自动重新编译。
+
+支持 OpenAPI 3.0 / Swagger 2.0 使用的结构子集：type（含 nullable / x-nullable）、enum、const、
+properties / required / additionalProperties、items / minItems / maxItems / uniqueItems、
+minLength / maxLength / pattern、minimum / maximum / exclusiveMinimum / exclusiveMaximum / multipleOf、
+allOf / anyOf / oneOf / not。format 和未能展开的 $ref（循环或无法解析的引用）不校验。
+enum / const 按 JSON 语义比较，布尔值与数字不相等。
+"""
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# 编译后的校验函数缓存条数
+SCHEMA_VALIDATOR_CACHE_SIZE = int(os.getenv("SCHEMA_VALIDATOR_CACHE_SIZE", "1024"))
+# 单次校验最多报告的错误数
+_MAX_ERRORS = 10
+
+# 节点校验函数：(值, 路径, 错误列表) -> None
+_Node = Callable[[Any, str, List[str]], None]
+# 校验函数：响应体 -> 错误列表（为空表示通过）
+Validator = Callable[[Any], List[str]]
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "null": lambda v: v is None,
+    "boolean": lambda v: isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "string": lambda v: isinstance(v, str),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+}
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return type(value).__name__
+
+
+def _display(value: Any) -> str:
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    return text if len(text) <= 100 else text[:100] + "..."
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """按 JSON 语义比较：布尔值与数字不相等（Python 中 True == 1）"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _passes(node: Optional[_Node], value: Any, path: str) -> bool:
+    if node is None:
+        return True
+    errors: List[str] = []
+    node(value, path, errors)
+    return not errors
+
+
+def _compile_object(schema: Dict[str, Any], checks: List[_Node]) -> None:
+    properties = schema.get("properties") if isinstance(schema.get("properties"), dict) else {}
+    compiled = [(name, _compile(sub)) for name, sub in properties.items()]
+    compiled = [(name, node) for name, node in compiled if node is not None]
+    required = [name for name in schema.get("required") or [] if isinstance(name, str)]
+    additional = schema.get("additionalProperties")
+    additional_node = _compile(additional) if isinstance(additional, dict) else None
+    forbid_additional = additional is False
+
+    if required:
+        def check_required(value, path, errors):
+            if isinstance(value, dict):
+                for name in required:
+                    if name not in value:
+                        errors.append(f"{path}.{name} 缺少必填字段")
+        checks.append(check_required)
+    if compiled:
+        def check_properties(value, path, errors):
+            if isinstance(value, dict):
+                for name, node in compiled:
+                    if name in value:
+                        node(value[name], f"{path}.{name}", errors)
+        checks.append(check_properties)
+    if forbid_additional or additional_node is not None:
+        known = set(properties)
+
+        def check_additional(value, path, errors):
+            if isinstance(value, dict):
+                for name in value:
+                    if name in known:
+                        continue
+                    if forbid_additional:
+                        errors.append(f"{path}.{name} 不允许的字段")
+                    else:
+                        additional_node(value[name], f"{path}.{name}", errors)
+        checks.append(check_additional)
+
+
+def _compile_array(schema: Dict[str, Any], checks: List[_Node]) -> None:
+    items = schema.get("items")
+    item_node = _compile(items) if isinstance(items, dict) else None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    unique = schema.get("uniqueItems") is True
+
+    if item_node is not None:
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    if len(errors) >= _MAX_ERRORS:
+                        return
+                    item_node(item, f"{path}[{index}]", errors)
+        checks.append(check_items)
+    if isinstance(min_items, int) or isinstance(max_items, int) or unique:
+        def check_size(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if isinstance(min_items, int) and len(value) < min_items:
+                errors.append(f"{path} 至少应有 {min_items} 个元素，实际 {len(value)} 个")
+            if isinstance(max_items, int) and len(value) > max_items:
+                errors.append(f"{path} 最多 {max_items} 个元素，实际 {len(value)} 个")
+            if unique and len({json.dumps(item, sort_keys=True, default=str) for item in value}) < len(value):
+                errors.append(f"{path} 元素不能重复")
+        checks.append(check_size)
+
+
+def _compile_string(schema: Dict[str, Any], checks: List[_Node]) -> None:
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    pattern = None
+    if isinstance(schema.get("pattern"), str):
+        try:
+            pattern = re.compile(schema["pattern"])
+        except re.error:
+            pattern = None
+    if not isinstance(min_length, int) and not isinstance(max_length, int) and pattern is None:
+        return
+
+    def check_string(value, path, errors):
+        if not isinstance(value, str):
+            return
+        if isinstance(min_length, int) and len(value) < min_length:
+            errors.append(f"{path} 长度至少为 {min_length}，实际 {len(value)}")
+        if isinstance(max_length, int) and len(value) > max_length:
+            errors.append(f"{path} 长度最多为 {max_length}，实际 {len(value)}")
+        if pattern is not None and not pattern.search(value):
+            errors.append(f"{path} 不匹配 {pattern.pattern}")
+    checks.append(check_string)
+
+
+def _compile_number(schema: Dict[str, Any], checks: List[_Node]) -> None:
+    minimum = schema.get("minimum") if _is_number(schema.get("minimum")) else None
+    maximum = schema.get("maximum") if _is_number(schema.get("maximum")) else None
+    exclusive_min = schema.get("exclusiveMinimum")
+    exclusive_max = schema.get("exclusiveMaximum")
+    # OpenAPI 3.0 / Swagger 中为布尔值（修饰 minimum / maximum），JSON Schema 中为数值
+    if _is_number(exclusive_min):
+        minimum, exclusive_min = exclusive_min, True
+    if _is_number(exclusive_max):
+        maximum, exclusive_max = exclusive_max, True
+    exclusive_min = exclusive_min is True
+    exclusive_max = exclusive_max is True
+    multiple_of = schema.get("multipleOf") if _is_number(schema.get("multipleOf")) and schema.get("multipleOf") > 0 else None
+    if minimum is None and maximum is None and multiple_of is None:
+        return
+
+    def check_number(value, path, errors):
+        if not _is_number(value):
+            return
+        if minimum is not None and (value <= minimum if exclusive_min else value < minimum):
+            errors.append(f"{path} 应{'大于' if exclusive_min else '不小于'} {minimum}，实际 {value}")
+        if maximum is not None and (value >= maximum if exclusive_max else value > maximum):
+            errors.append(f"{path} 应{'小于' if exclusive_max else '不大于'} {maximum}，实际 {value}")
+        if multiple_of is not None:
+            quotient = value / multiple_of
+            if abs(quotient - round(quotient)) > 1e-9:
+                errors.append(f"{path} 应为 {multiple_of} 的倍数，实际 {value}")
+    checks.append(check_number)
+
+
+def _compile_combinators(schema: Dict[str, Any], checks: List[_Node]) -> None:
+    all_of = [node for node in (_compile(sub) for sub in schema.get("allOf") or []) if node is not None]
+    any_of = [_compile(sub) for sub in schema.get("anyOf") or []]
+    one_of = [_compile(sub) for sub in schema.get("oneOf") or []]
+    not_node = _compile(schema["not"]) if isinstance(schema.get("not"), dict) else None
+
+    if all_of:
+        def check_all_of(value, path, errors):
+            for node in all_of:
+                node(value, path, errors)
+        checks.append(check_all_of)
+    if any_of and all(node is not None for node in any_of):
+        def check_any_of(value, path, errors):
+            if not any(_passes(node, value, path) for node in any_of):
+                errors.append(f"{path} 不符合 anyOf 中的任何一个结构")
+        checks.append(check_any_of)
+    if one_of:
+        def check_one_of(value, path, errors):
+            matched = sum(1 for node in one_of if _passes(node, value, path))
+            if matched != 1:
+                errors.append(f"{path} 应恰好符合 oneOf 中的一个结构，实际符合 {matched} 个")
+        checks.append(check_one_of)
+    if not_node is not None:
+        def check_not(value, path, errors):
+            if _passes(not_node, value, path):
+                errors.append(f"{path} 不应符合 not 中的结构")
+        checks.append(check_not)
+
+
+def _compile(schema: Any) -> Optional[_Node]:
+    """编译一个结构节点，不做任何限制时返回 None"""
+    if not isinstance(schema, dict) or not schema:
+        return None
+
+    nullable = schema.get("nullable") is True or schema.get("x-nullable") is True
+    type_names = schema.get("type")
+    if isinstance(type_names, str):
+        type_names = [type_names]
+    type_tests = None
+    type_text = ""
+    if isinstance(type_names, list):
+        type_names = [name for name in type_names if name in _TYPE_CHECKS]
+        if type_names:
+            type_tests = [_TYPE_CHECKS[name] for name in type_names]
+            type_text = " 或 ".join(type_names)
+
+    checks: List[_Node] = []
+    if isinstance(schema.get("enum"), list):
+        options = schema["enum"]
+
+        def check_enum(value, path, errors):
+            if not any(_json_equal(value, option) for option in options):
+                errors.append(f"{path} 应为 {_display(options)} 之一，实际 {_display(value)}")
+        checks.append(check_enum)
+    if "const" in schema:
+        const = schema["const"]
+
+        def check_const(value, path, errors):
+            if not _json_equal(value, const):
+                errors.append(f"{path} 应为 {_display(const)}，实际 {_display(value)}")
+        checks.append(check_const)
+    _compile_object(schema, checks)
+    _compile_array(schema, checks)
+    _compile_string(schema, checks)
+    _compile_number(schema, checks)
+    _compile_combinators(schema, checks)
+
+    if type_tests is None and not checks:
+        return None
+
+    def validate(value, path, errors):
+        if value is None and nullable:
+            return
+        if type_tests is not None and not any(test(value) for test in type_tests):
+            errors.append(f"{path} 应为 {type_text}，实际为 {_type_name(value)}")
+            return
+        for check in checks:
+            if len(errors) >= _MAX_ERRORS:
+                return
+            check(value, path, errors)
+    return validate
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    将响应结构编译为校验函数
+
+    Args:
+        schema: JSON Schema（OpenAPI 响应结构，$ref 已展开）
+
+    Returns:
+        校验函数 validate(value) -> 错误列表（路径以 $ 表示响应体根，最多 10 条），为空表示通过
+    """
+    node = _compile(schema)
+
+    def validate(value: Any) -> List[str]:
+        if node is None:
+            return []
+        errors: List[str] = []
+        node(value, "$", errors)
+        return errors[:_MAX_ERRORS]
+    return validate
+
+
+def select_status(response_schemas: Dict[str, Any], status_code: Optional[int]) -> Optional[str]:
+    """按响应状态码选择响应结构的键：精确状态码 > 2XX 形式 > default"""
+    if status_code is not None:
+        for key in (str(status_code), f"{status_code // 100}XX", f"{status_code // 100}xx"):
+            if key in response_schemas:
+                return key
+    return "default" if "default" in response_schemas else None
+
+
+_cache: "OrderedDict[tuple, Validator]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def validator_for(endpoint, status_code: Optional[int]) -> Optional[Validator]:
+    """
+    获取接口在该状态码下的响应结构校验函数（编译结果缓存）
+
+    Args:
+        endpoint: 接口（models.ApiEndpoint）
+        status_code: 响应状态码
+
+    Returns:
+        校验函数，接口没有对应状态码的响应结构时返回 None
+    """
+    response_schemas = getattr(endpoint, "response_schemas", None)
+    if not isinstance(response_schemas, dict) or not response_schemas:
+        return None
+    status_key = select_status(response_schemas, status_code)
+    if status_key is None:
+        return None
+    key = (endpoint.id, getattr(endpoint, "updated_at", None), status_key)
+    with _cache_lock:
+        validator = _cache.get(key)
+        if validator is not None:
+            _cache.move_to_end(key)
+            return validator
+    validator = compile_schema(response_schemas[status_key])
+    with _cache_lock:
+        _cache[key] = validator
+        while len(_cache) > SCHEMA_VALIDATOR_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return validator
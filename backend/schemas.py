@@ -23,6 +23,19 @@ class ProjectUpdate(BaseModel):
     lead: Optional[str] = None
     member_ids: Optional[List[int]] = None  # 项目成员ID列表
 
+class RetentionPolicyUpdate(BaseModel):
+    """执行历史保留策略，字段为空时使用系统默认值"""
+    keep_last_runs: Optional[int] = Field(None, ge=1)  # 每个接口/任务/流程至少保留最近 N 条
+    keep_days: Optional[int] = Field(None, ge=1)  # 保留最近 D 天
+    keep_failed_days: Optional[int] = Field(None, ge=1)  # 失败记录保留天数
+
+
+class RetentionPolicy(RetentionPolicyUpdate):
+    project_id: int
+    configured: bool = False  # 项目是否单独配置过
+    effective: Dict[str, Optional[int]]  # 合并默认值后实际生效的策略
+
+
 class Project(ProjectBase):
     id: int
     created_at: datetime
@@ -230,8 +243,9 @@ class TestCase(TestCaseBase):
 
 # ===== API Test Schemas =====
 class Assertion(BaseModel):
-    type: Literal['status_code', 'response_body', 'response_header', 'response_time', 'json_path', 'contains']
-    operator: Literal['eq', 'ne', 'gt', 'lt', 'gte', 'lte', 'contains', 'not_contains', 'exists', 'not_exists', 'is_empty', 'is_not_empty', 'regex']
+    type: Literal['status_code', 'response_body', 'response_header', 'response_time', 'json_path', 'contains', 'schema']
+    # schema 断言（响应体符合接口的响应结构定义）不需要比较符和期望值
+    operator: Optional[Literal['eq', 'ne', 'gt', 'lt', 'gte', 'lte', 'contains', 'not_contains', 'exists', 'not_exists', 'is_empty', 'is_not_empty', 'regex']] = None
     target: Optional[str] = None
     expected: Optional[Any] = None
 
@@ -242,6 +256,7 @@ class ApiEnvironmentBase(BaseModel):
     base_url: str
     description: Optional[str] = None
     headers: Optional[Dict[str, Any]] = None
+    max_concurrency: Optional[int] = Field(None, ge=1)  # 测试任务发往该环境的最大并发请求数
 
 class ApiEnvironmentCreate(ApiEnvironmentBase):
     pass
@@ -252,6 +267,7 @@ class ApiEnvironmentUpdate(BaseModel):
     base_url: Optional[str] = None
     description: Optional[str] = None
     headers: Optional[Dict[str, Any]] = None
+    max_concurrency: Optional[int] = Field(None, ge=1)
 
 class ApiEnvironment(ApiEnvironmentBase):
     id: int
@@ -271,6 +287,7 @@ class ApiEndpointBase(BaseModel):
     tags: Optional[List[str]] = None
     parameters: Optional[List[Dict[str, Any]]] = None  # Swagger参数列表
     request_body: Optional[Dict[str, Any]] = None  # Swagger请求体定义
+    response_schemas: Optional[Dict[str, Any]] = None  # 各状态码的响应结构 {状态码: JSON Schema}
     is_favorite: Optional[bool] = False
 
 class ApiEndpointCreate(ApiEndpointBase):
@@ -283,6 +300,7 @@ class ApiEndpointUpdate(BaseModel):
     method: Optional[str] = None
     description: Optional[str] = None
     tags: Optional[List[str]] = None
+    response_schemas: Optional[Dict[str, Any]] = None
     is_favorite: Optional[bool] = None
 
 class ApiEndpoint(ApiEndpointBase):
@@ -333,6 +351,7 @@ class ApiExecuteRequest(BaseModel):
     body: Optional[Dict[str, Any]] = None
     assertions: Optional[List[Dict[str, Any]]] = None  # 断言列表（可选，如果不提供则使用测试数据中的断言）
     global_variables: Optional[Dict[str, Any]] = None  # 全局变量，用于模板替换
+    debug: bool = False  # 记录调试日志（变量上下文、请求头、断言明细）到执行记录的 debug_log
 
 class ApiExecutionRecord(BaseModel):
     id: int
@@ -349,8 +368,10 @@ class ApiExecutionRecord(BaseModel):
     response_headers: Optional[Dict[str, Any]] = None
     response_body: Optional[str] = None
     response_time: Optional[int] = None
+    timings: Optional[Dict[str, Any]] = None  # 分阶段耗时（毫秒）
     success: bool = False
     error_message: Optional[str] = None
+    debug_log: Optional[List[Dict[str, Any]]] = None
     executed_at: datetime
     
     class Config:
@@ -489,6 +510,7 @@ class TestTaskBase(BaseModel):
     items: Optional[List[TestTaskItemCreate]] = None  # 任务项列表
     cron_expression: Optional[str] = None  # Cron表达式
     environment_id: Optional[int] = None  # 定时执行时使用的环境ID
+    max_concurrency: Optional[int] = Field(None, ge=1)  # 同时执行的任务项数
 
 
 class TestTaskCreate(TestTaskBase):
@@ -502,6 +524,7 @@ class TestTaskUpdate(BaseModel):
     is_favorite: Optional[bool] = None
     cron_expression: Optional[str] = None  # Cron表达式
     environment_id: Optional[int] = None  # 定时执行时使用的环境ID
+    max_concurrency: Optional[int] = Field(None, ge=1)  # 同时执行的任务项数
 
 
 class TestTask(TestTaskBase):
@@ -527,16 +550,18 @@ class HeaderReplacement(BaseModel):
 
 class AssertionReplacement(BaseModel):
     """断言替换配置"""
-    type: str  # status_code, json_path, response_time, contains
+    type: str  # status_code, json_path, response_time, contains, schema
     target: Optional[str] = None  # json_path 时需要
-    operator: str  # eq, ne, gt, gte, lt, lte, contains, not_contains
-    expected: Any
+    operator: Optional[str] = None  # eq, ne, gt, gte, lt, lte, contains, not_contains；schema 时不需要
+    expected: Any = None
 
 
 class TestTaskExecutionRequest(BaseModel):
     environment_id: int
     header_replacements: Optional[List[HeaderReplacement]] = None  # Header 替换列表
     assertion_replacements: Optional[List[AssertionReplacement]] = None  # 断言替换列表
+    shard_count: Optional[int] = Field(None, ge=1)  # 拆分成多少个分片并行执行，为空时按任务项数自动计算
+    debug: bool = False  # 记录调试日志到每条结果的 details.debug_log
 
 
 class TestTaskExecutionResult(BaseModel):
@@ -547,6 +572,7 @@ class TestTaskExecutionResult(BaseModel):
     status_code: Optional[int] = None
     error_message: Optional[str] = None
     execution_time: Optional[int] = None  # 毫秒
+    timings: Optional[Dict[str, Any]] = None  # 分阶段耗时（毫秒）
     details: Optional[Dict[str, Any]] = None
 
 
@@ -585,6 +611,25 @@ class TestTaskExecution(BaseModel):
         from_attributes = True
 
 
+class TestTaskExecutionItem(TestTaskExecutionResult):
+    """执行结果明细（分页查询）"""
+    id: int
+    execution_id: int
+    item_index: int  # 任务项在本次执行中的序号
+    result_index: int  # 同一任务项的结果序号（流程每个步骤一条）
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TestTaskExecutionItemList(BaseModel):
+    total: int
+    items: List[TestTaskExecutionItem]
+    page: int
+    page_size: int
+
+
 class FlowVariableBase(BaseModel):
     key: str
     value: str
@@ -616,6 +661,84 @@ class FlowExecuteRequest(BaseModel):
     global_variables: Optional[Dict[str, Any]] = None
     failAction: Optional[str] = "stop"  # 执行失败时的行为：stop 或 continue
     delay: Optional[int] = 0  # 步骤间延迟（毫秒），0表示不延迟
+    debug: bool = False  # 调试日志随结果返回（debug_log），不输出到标准输出
+    # 同时执行的无依赖步骤数，默认 FLOW_STEP_CONCURRENCY（1，按顺序执行）；只通过服务端状态关联的步骤不要开启
+    step_concurrency: Optional[int] = Field(None, ge=1)
+
+
+class FlowDatasetExecuteRequest(FlowExecuteRequest):
+    """按数据集逐行执行流程，test_file_id、rows、matrix 三选一"""
+    test_file_id: Optional[int] = None  # 测试文件（CSV / XLSX 第一行为变量名，JSON 为对象数组）
+    rows: Optional[List[Dict[str, Any]]] = None  # 数据行，每行为一组变量
+    matrix: Optional[Dict[str, List[Any]]] = None  # 参数矩阵：{变量名: [取值, ...]}，按所有组合执行
+    concurrency: Optional[int] = Field(None, ge=1)  # 同时执行的行数
+
+
+# ===== Load Test Schemas =====
+class LoadTestThreshold(BaseModel):
+    """压测阈值：指标与期望值按接口断言的比较规则判定"""
+    metric: Literal["p50", "p90", "p95", "p99", "max", "mean", "error_rate", "throughput"]  # 耗时为毫秒，error_rate 为百分比，throughput 为每秒请求数
+    operator: Literal["eq", "ne", "gt", "gte", "lt", "lte"]
+    expected: float
+    step: Optional[int] = Field(None, ge=1)  # 步骤序号（从 1 开始），为空时检查整个流程
+
+
+class LoadTestCreate(BaseModel):
+    target_type: Literal["flow", "api"]  # 压测流程或单个接口
+    target_id: int
+    environment_id: Optional[int] = None  # 为空时使用流程的环境
+    test_data_id: Optional[int] = None  # 压测接口时使用的测试数据，为空时使用接口的第一条测试数据
+    global_variables: Optional[Dict[str, Any]] = None  # 覆盖流程变量
+    failAction: Optional[str] = None  # 单次迭代中步骤失败时的行为：stop 或 continue，为空时使用流程配置
+    virtual_users: int = Field(1, ge=1)  # 虚拟用户数
+    duration_seconds: Optional[int] = Field(None, ge=1)  # 压测时长（秒）
+    iterations: Optional[int] = Field(None, ge=1)  # 所有虚拟用户合计的迭代次数
+    ramp_up_seconds: int = Field(0, ge=0)  # 在该时间内逐个启动虚拟用户
+    think_time_ms: int = Field(0, ge=0)  # 每个虚拟用户两次迭代之间的等待时间（毫秒）
+    thresholds: List[LoadTestThreshold] = Field(default_factory=list)
+
+
+class LoadTestRun(BaseModel):
+    id: int
+    project_id: int
+    target_type: str
+    target_id: int
+    environment_id: Optional[int] = None
+    config: Optional[Dict[str, Any]] = None
+    status: str
+    passed: Optional[bool] = None
+    report: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+    created_by: Optional[int] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    stop_requested: Optional[bool] = None
+
+    class Config:
+        from_attributes = True
+
+
+class FlowRun(BaseModel):
+    """流程异步执行记录（状态和计数）"""
+    id: int
+    project_id: int
+    flow_id: int
+    environment_id: Optional[int] = None
+    status: str  # queued | running | success | failed
+    run_type: str = "flow"  # flow | dataset（数据驱动执行，计数为行数）
+    total_steps: int
+    total_rows: Optional[int] = None
+    success_count: int
+    failed_count: int
+    error_message: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
 
 
 # ===== Record API Request Schema =====
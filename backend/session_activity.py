@@ -0,0 +1,162 @@
+"""会话活动时间合并写入与过期会话清理
+
+/api/auth/me 被前端频繁轮询，逐次提交 last_activity_at 会产生大量写操作。
+这里先在内存中记录最后活动时间，由后台线程按固定粒度批量 UPDATE，
+同时定期分批删除已过期的 UserSession 记录。
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, delete, select, update
+
+import models
+from config import SessionLocal
+
+# 同一会话最后活动时间的写入粒度（秒）
+SESSION_ACTIVITY_FLUSH_SECONDS = int(os.getenv("SESSION_ACTIVITY_FLUSH_SECONDS", "60"))
+# 过期会话清理间隔（秒）
+SESSION_PURGE_INTERVAL_SECONDS = int(os.getenv("SESSION_PURGE_INTERVAL_SECONDS", "3600"))
+# 过期后保留多久再删除（小时）
+SESSION_PURGE_GRACE_HOURS = int(os.getenv("SESSION_PURGE_GRACE_HOURS", "24"))
+# 每批删除的行数
+SESSION_PURGE_BATCH_SIZE = int(os.getenv("SESSION_PURGE_BATCH_SIZE", "500"))
+
+
+class SessionActivityTracker:
+    """缓冲会话最后活动时间，并在后台批量写入数据库"""
+
+    def __init__(
+        self,
+        flush_seconds: int = SESSION_ACTIVITY_FLUSH_SECONDS,
+        purge_interval_seconds: int = SESSION_PURGE_INTERVAL_SECONDS,
+    ):
+        self.flush_seconds = flush_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        self._pending: Dict[str, datetime] = {}
+        # 每个会话上次写入数据库的时间（monotonic），用于按粒度合并
+        self._last_flushed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+
+    def touch(self, token_hash: str, at: Optional[datetime] = None) -> None:
+        """记录会话活动（仅写内存）"""
+        with self._lock:
+            self._pending[token_hash] = at or datetime.utcnow()
+
+    def discard(self, token_hash: str) -> None:
+        """会话登出后丢弃未写入的活动时间"""
+        with self._lock:
+            self._pending.pop(token_hash, None)
+            self._last_flushed.pop(token_hash, None)
+
+    def _take_due(self, force: bool) -> Dict[str, datetime]:
+        now = time.monotonic()
+        with self._lock:
+            due = {
+                token_hash: at for token_hash, at in self._pending.items()
+                if force or now - self._last_flushed.get(token_hash, 0.0) >= self.flush_seconds
+            }
+            for token_hash in due:
+                del self._pending[token_hash]
+                self._last_flushed[token_hash] = now
+            # 清理长时间没有活动的会话的写入记录，防止字典无限增长
+            stale_before = now - self.flush_seconds * 10
+            for token_hash in [h for h, t in self._last_flushed.items() if t < stale_before and h not in self._pending]:
+                del self._last_flushed[token_hash]
+        return due
+
+    def flush(self, force: bool = False) -> int:
+        """
+        将到期的活动时间批量写入数据库
+
+        Args:
+            force: 是否忽略写入粒度，写入所有缓冲的数据
+
+        Returns:
+            写入的会话数
+        """
+        due = self._take_due(force)
+        if not due:
+            return 0
+        table = models.UserSession.__table__
+        stmt = update(table).where(
+            table.c.token_hash == bindparam("b_token_hash"),
+            table.c.is_active == True,
+        ).values(last_activity_at=bindparam("b_last_activity_at"))
+        db = SessionLocal()
+        try:
+            db.execute(stmt, [
+                {"b_token_hash": token_hash, "b_last_activity_at": at}
+                for token_hash, at in due.items()
+            ])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 写入会话活动时间失败: {e}")
+            return 0
+        finally:
+            db.close()
+        return len(due)
+
+    def purge_expired(self, batch_size: int = SESSION_PURGE_BATCH_SIZE) -> int:
+        """
+        分批删除已过期的会话记录
+
+        Returns:
+            删除的记录数
+        """
+        table = models.UserSession.__table__
+        cutoff = datetime.utcnow() - timedelta(hours=SESSION_PURGE_GRACE_HOURS)
+        deleted = 0
+        db = SessionLocal()
+        try:
+            while not self._stop.is_set():
+                ids = [row[0] for row in db.execute(
+                    select(table.c.id).where(table.c.expires_at < cutoff).limit(batch_size)
+                )]
+                if not ids:
+                    break
+                db.execute(delete(table).where(table.c.id.in_(ids)))
+                db.commit()
+                deleted += len(ids)
+                if len(ids) < batch_size:
+                    break
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 清理过期会话失败: {e}")
+        finally:
+            db.close()
+        return deleted
+
+    def _run(self) -> None:
+        interval = max(1, min(self.flush_seconds, 30))
+        while not self._stop.wait(interval):
+            self.flush()
+            if time.monotonic() - self._last_purge >= self.purge_interval_seconds:
+                self._last_purge = time.monotonic()
+                self.purge_expired()
+
+    def start(self) -> None:
+        """启动后台写入线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._last_purge = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="session-activity", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并写入剩余数据"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush(force=True)
+
+
+session_activity = SessionActivityTracker()
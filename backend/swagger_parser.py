@@ -72,6 +72,7 @@ class OpenAPIParser:
                     'parameters': parameters,
                     'request_body': request_body,
                     'responses': details.get('responses', {}),
+                    'response_schemas': self._parse_response_schemas(details),
                 }
                 apis.append(api)
         
@@ -144,10 +145,14 @@ class OpenAPIParser:
             # OpenAPI 3.x 路径通常已经是完整的
             return path
     
-    def _resolve_ref(self, schema: Dict[str, Any], visited: set = None) -> Dict[str, Any]:
-        """解析 $ref 引用，返回完整的 schema"""
-        if visited is None:
-            visited = set()
+    def _resolve_ref(self, schema: Dict[str, Any], visited: frozenset = frozenset()) -> Dict[str, Any]:
+        """
+        解析 $ref 引用，返回完整的 schema
+
+        visited 只包含当前路径上正在展开的引用：同一个结构在兄弟字段中多次引用时每处都会展开，
+        只有引用自身（循环引用）时才停止。循环或无法解析的引用返回不含任何约束的结构（只有 description），
+        响应结构校验时不校验该节点。
+        """
         
         if not isinstance(schema, dict):
             return schema
@@ -176,9 +181,9 @@ class OpenAPIParser:
         
         # 避免循环引用
         if ref in visited:
-            return {'type': 'object', 'description': f'循环引用: {ref}'}
+            return {'description': f'循环引用: {ref}'}
         
-        visited.add(ref)
+        visited = visited | {ref}
         
         # 提取引用的 schema 名称
         if ref.startswith('#/'):
@@ -200,9 +205,45 @@ class OpenAPIParser:
                     
                     return result
         
-        # 如果找不到引用，返回一个默认的 object 类型
-        return {'type': 'object', 'description': f'无法解析的引用: {ref}'}
+        # 找不到引用时不限制结构
+        return {'description': f'无法解析的引用: {ref}'}
+    
+    
+    def _lookup_ref(self, ref: str) -> Any:
+        """按 #/a/b/c 形式的引用在文档中查找（如 #/components/responses/Error）"""
+        if not isinstance(ref, str) or not ref.startswith('#/'):
+            return None
+        node = self.spec
+        for part in ref[2:].split('/'):
+            part = part.replace('~1', '/').replace('~0', '~')
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
     
+    def _parse_response_schemas(self, details: Dict[str, Any]) -> Dict[str, Any]:
+        """解析各状态码的 JSON 响应结构（展开 $ref），返回 {状态码: schema}，没有响应结构的状态码不返回"""
+        schemas = {}
+        responses = details.get('responses') or {}
+        if not isinstance(responses, dict):
+            return schemas
+        for status, response in responses.items():
+            if isinstance(response, dict) and '$ref' in response:
+                response = self._lookup_ref(response['$ref'])
+            if not isinstance(response, dict):
+                continue
+            if self.is_openapi_v3:
+                content = response.get('content') or {}
+                # 优先 application/json，其次 *+json 和 */*（Springdoc 默认）
+                media = content.get('application/json')
+                if media is None:
+                    media = next((v for k, v in content.items() if 'json' in k), None) or content.get('*/*')
+                schema = media.get('schema') if isinstance(media, dict) else None
+            else:
+                schema = response.get('schema')
+            if isinstance(schema, dict) and schema:
+                schemas[str(status)] = self._resolve_ref(schema)
+        return schemas
     
     def _parse_openapi3_parameters(self, details: Dict[str, Any], path_level_params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """解析 OpenAPI 3.x 参数"""
@@ -0,0 +1,791 @@
+"""测试任务执行引擎
+
+任务项之间相互独立：接口项、流程项由 asyncio 调度并发执行（流程内部的步骤仍按顺序执行），
+每个任务项执行完即回调 on_item_done（由 job_queue 写入 test_task_execution_items），全部完成后汇总到执行记录。
+
+并发上限：
+- 任务级：TestTask.max_concurrency，未设置时使用 TASK_MAX_CONCURRENCY，限制同时执行的任务项数
+- 环境级：ApiEnvironment.max_concurrency，未设置时使用 ENV_MAX_CONCURRENCY，
+  限制发往同一环境的并发请求数，由所有正在执行的任务共享
+
+HTTP 请求仍通过 http_client 的共享连接池发送（阻塞调用放在受限的线程池中执行）。
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+import exec_log
+import models
+from assertions import compile_assertions, evaluate_assertions
+from config import SessionLocal
+from http_client import http_clients, timings_of
+from api_runtime import render_template, step_reads
+
+# 任务默认的并发任务项数
+TASK_MAX_CONCURRENCY = int(os.getenv("TASK_MAX_CONCURRENCY", "5"))
+# 每个环境默认的并发请求数
+ENV_MAX_CONCURRENCY = int(os.getenv("ENV_MAX_CONCURRENCY", "10"))
+# 单个请求超时（秒）
+TASK_REQUEST_TIMEOUT = 30
+
+
+class EnvironmentLimiter:
+    """按环境限制并发请求数（跨任务、跨线程共享）"""
+
+    def __init__(self):
+        self._slots: Dict[int, Tuple[int, threading.BoundedSemaphore]] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, environment_id: int, limit: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            current = self._slots.get(environment_id)
+            # 上限被修改后换新的信号量，正在执行的请求仍释放到旧信号量上
+            if current is None or current[0] != limit:
+                current = (limit, threading.BoundedSemaphore(limit))
+                self._slots[environment_id] = current
+            return current[1]
+
+
+environment_limiter = EnvironmentLimiter()
+
+
+def resolve_task_concurrency(task: models.TestTask) -> int:
+    return max(1, task.max_concurrency or TASK_MAX_CONCURRENCY)
+
+
+def resolve_environment_concurrency(env: models.ApiEnvironment) -> int:
+    return max(1, env.max_concurrency or ENV_MAX_CONCURRENCY)
+
+
+class PlanItem:
+    """任务项快照，入队时保存，执行时不依赖 test_task_items 表中的记录"""
+    __slots__ = ("item_type", "item_id", "sort_order", "position")
+
+    def __init__(self, item_type: str, item_id: int, sort_order: int = 0, position: Optional[int] = None):
+        self.item_type = item_type
+        self.item_id = item_id
+        self.sort_order = sort_order
+        # 在整次执行中的序号（跨分片唯一），结果明细按它排序
+        self.position = sort_order if position is None else position
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"item_type": self.item_type, "item_id": self.item_id, "sort_order": self.sort_order, "position": self.position}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PlanItem":
+        return cls(data["item_type"], data["item_id"], data.get("sort_order", 0), data.get("position"))
+
+
+def snapshot_items(task: models.TestTask) -> List[PlanItem]:
+    """按 sort_order 排序的任务项快照"""
+    return [
+        PlanItem(item.item_type, item.item_id, item.sort_order, position)
+        for position, item in enumerate(sorted(task.items or [], key=lambda x: x.sort_order))
+    ]
+
+
+def split_into_shards(items: List[PlanItem], shard_count: int) -> List[List[PlanItem]]:
+    """
+    将任务项按顺序切成连续的若干片（各片数量尽量均衡），合并时按分片顺序拼接即可保持 sort_order
+
+    Args:
+        items: 已排序的任务项
+        shard_count: 分片数
+
+    Returns:
+        非空分片列表（任务项少于分片数时分片数相应减少）
+    """
+    shard_count = max(1, min(shard_count, len(items)))
+    size, extra = divmod(len(items), shard_count)
+    shards, start = [], 0
+    for idx in range(shard_count):
+        end = start + size + (1 if idx < extra else 0)
+        shards.append(items[start:end])
+        start = end
+    return shards
+
+
+class TaskPlan:
+    """一次任务执行需要的全部数据，执行前一次性加载，执行期间不再访问数据库"""
+
+    def __init__(self, task: models.TestTask, env: models.ApiEnvironment, items: List[PlanItem]):
+        self.task = task
+        self.env = env
+        self.items = items
+        self.endpoints: Dict[int, models.ApiEndpoint] = {}
+        self.flows: Dict[int, models.ApiTestFlow] = {}
+        # 接口项使用该接口的第一条测试数据
+        self.default_test_data: Dict[int, models.ApiTestData] = {}
+        self.test_data: Dict[int, models.ApiTestData] = {}
+
+
+def load_task_plan(db: Session, task_id: int, environment_id: int, items: Optional[List[PlanItem]] = None) -> TaskPlan:
+    """
+    加载任务项及其引用的接口、流程和测试数据（每类一次 IN 查询）
+
+    Args:
+        db: 数据库会话
+        task_id: 任务ID
+        environment_id: 执行环境ID
+        items: 只执行这些任务项（分片执行时使用），为空时执行任务的全部任务项
+
+    Raises:
+        Exception: 任务或环境不存在
+    """
+    task = db.query(models.TestTask).options(
+        joinedload(models.TestTask.items)
+    ).filter(models.TestTask.id == task_id).first()
+    if not task:
+        raise Exception("任务不存在")
+    env = db.query(models.ApiEnvironment).filter(models.ApiEnvironment.id == environment_id).first()
+    if not env:
+        raise Exception(f"环境不存在 (ID: {environment_id})")
+
+    plan = TaskPlan(task, env, items if items is not None else snapshot_items(task))
+    api_ids = {item.item_id for item in plan.items if item.item_type == 'api'}
+    flow_ids = {item.item_id for item in plan.items if item.item_type == 'flow'}
+
+    if flow_ids:
+        for flow in db.query(models.ApiTestFlow).filter(models.ApiTestFlow.id.in_(flow_ids)):
+            plan.flows[flow.id] = flow
+
+    endpoint_ids = set(api_ids)
+    step_test_data_ids = set()
+    for flow in plan.flows.values():
+        for step in flow.steps or []:
+            if step.get("endpoint_id"):
+                endpoint_ids.add(step["endpoint_id"])
+            if step.get("test_data_id"):
+                step_test_data_ids.add(step["test_data_id"])
+
+    if endpoint_ids:
+        for endpoint in db.query(models.ApiEndpoint).filter(models.ApiEndpoint.id.in_(endpoint_ids)):
+            plan.endpoints[endpoint.id] = endpoint
+    if api_ids:
+        for test_data in db.query(models.ApiTestData).filter(
+            models.ApiTestData.endpoint_id.in_(api_ids)
+        ).order_by(models.ApiTestData.id):
+            plan.default_test_data.setdefault(test_data.endpoint_id, test_data)
+    if step_test_data_ids:
+        for test_data in db.query(models.ApiTestData).filter(models.ApiTestData.id.in_(step_test_data_ids)):
+            plan.test_data[test_data.id] = test_data
+
+    # 与会话脱离，工作线程只读取已加载的字段
+    db.expunge_all()
+    return plan
+
+
+def _send(env_slot: threading.BoundedSemaphore, **request_kwargs):
+    with env_slot:
+        return http_clients.fetch(**request_kwargs)
+
+
+def run_api_item(plan: TaskPlan, item: PlanItem, request, env_slot) -> List[Dict[str, Any]]:
+    """执行接口类型的任务项，返回一条结果"""
+    import requests
+
+    endpoint = plan.endpoints.get(item.item_id)
+    if not endpoint:
+        return [{
+            "item_type": "api",
+            "item_id": item.item_id,
+            "item_name": f"接口 {item.item_id}",
+            "success": False,
+            "error_message": "接口不存在"
+        }]
+
+    test_data = plan.default_test_data.get(item.item_id)
+    env = plan.env
+    api_result = {
+        "item_type": "api",
+        "item_id": item.item_id,
+        "item_name": endpoint.name or endpoint.path,
+        "success": False,
+        "status_code": None,
+        "error_message": None,
+        "execution_time": None,
+        "details": {}
+    }
+
+    try:
+        # 构建URL
+        base_url = env.base_url.rstrip('/')
+        path = endpoint.path.lstrip('/')
+        url = f"{base_url}/{path}"
+
+        # 处理路径参数
+        path_params = {}
+        if test_data and test_data.path_params:
+            path_params = test_data.path_params
+            for key, value in path_params.items():
+                url = url.replace(f'{{{key}}}', str(value))
+
+        # 准备请求参数
+        headers = {}
+        if env.headers:
+            headers.update(env.headers)
+        if test_data and test_data.headers:
+            headers.update(test_data.headers)
+
+        # 应用 Header 替换
+        if request.header_replacements:
+            for replacement in request.header_replacements:
+                if replacement.key and replacement.value:
+                    headers[replacement.key] = replacement.value
+
+        query_params = {}
+        if test_data and test_data.query_params:
+            query_params = test_data.query_params
+
+        body = None
+        if endpoint.method.upper() in ['POST', 'PUT', 'PATCH']:
+            if test_data and test_data.body:
+                body = test_data.body
+
+        # 获取断言信息
+        assertions_list = []
+        if test_data and test_data.assertions:
+            assertions_list = test_data.assertions
+
+        # 应用断言替换（如果有替换配置，则使用替换的断言）
+        if request.assertion_replacements:
+            assertions_list = [
+                {
+                    "type": a.type,
+                    "target": a.target,
+                    "operator": a.operator,
+                    "expected": a.expected
+                }
+                for a in request.assertion_replacements
+                if a.type == 'schema' or (a.type and a.operator and a.expected is not None)
+            ]
+
+        request_kwargs = {
+            'method': endpoint.method.upper(),
+            'url': url,
+            'headers': headers,
+            'timeout': TASK_REQUEST_TIMEOUT
+        }
+        if query_params:
+            request_kwargs['params'] = query_params
+        if body:
+            request_kwargs['json'] = body
+
+        # 记录请求详情
+        api_result["details"] = {
+            "request_url": url,
+            "request_method": endpoint.method.upper(),
+            "request_headers": headers,
+            "request_query_params": query_params,
+            "request_path_params": path_params,
+            "request_body": body,
+            "request_assertions": assertions_list,
+            "environment": {
+                "id": env.id,
+                "name": env.name,
+                "base_url": env.base_url
+            }
+        }
+
+        start_time = time.perf_counter()
+        try:
+            response = _send(env_slot, **request_kwargs)
+            response_time = int((time.perf_counter() - start_time) * 1000)
+            api_result["timings"] = timings_of(response)
+
+            # 结果中只保存响应体预览
+            response_body = response.preview()
+
+            api_result["status_code"] = response.status_code
+            api_result["execution_time"] = response_time
+            api_result["details"].update({
+                "response_status": response.status_code,
+                "response_headers": dict(response.headers),
+                "response_body": response_body,
+                "response_time": response_time,
+                **response.summary()
+            })
+
+            if assertions_list:
+                assertion_errors = evaluate_assertions(compile_assertions(assertions_list), response, response_time, endpoint=endpoint)
+                assertion_success = not assertion_errors
+
+                api_result["details"]["assertion_results"] = assertion_errors if assertion_errors else ["所有断言通过"]
+                api_result["success"] = assertion_success
+                if not assertion_success:
+                    api_result["error_message"] = "; ".join(assertion_errors)
+            else:
+                # 没有断言时按 HTTP 状态码判断
+                api_result["success"] = response.status_code < 400
+                if not api_result["success"]:
+                    api_result["error_message"] = f"HTTP {response.status_code}: {response_body[:200] if response_body else '无响应内容'}"
+
+        except requests.exceptions.Timeout as e:
+            api_result["execution_time"] = int((time.perf_counter() - start_time) * 1000)
+            api_result["timings"] = timings_of(e)
+            api_result["error_message"] = f"请求超时 (超过{TASK_REQUEST_TIMEOUT}秒)"
+            api_result["details"]["error_type"] = "timeout"
+
+        except requests.exceptions.ConnectionError as e:
+            api_result["execution_time"] = int((time.perf_counter() - start_time) * 1000)
+            api_result["timings"] = timings_of(e)
+            api_result["error_message"] = f"连接错误: {str(e)}"
+            api_result["details"]["error_type"] = "connection_error"
+
+        except requests.exceptions.RequestException as e:
+            api_result["execution_time"] = int((time.perf_counter() - start_time) * 1000)
+            api_result["timings"] = timings_of(e)
+            api_result["error_message"] = f"请求异常: {str(e)}"
+            api_result["details"]["error_type"] = "request_exception"
+
+    except Exception as exec_error:
+        traceback.print_exc()
+        api_result["error_message"] = f"执行失败: {str(exec_error)}"
+        api_result["details"]["error_type"] = "execution_error"
+        api_result["details"]["error_traceback"] = traceback.format_exc()
+
+    return [api_result]
+
+
+def _run_flow_step(
+    plan: TaskPlan, step: Dict[str, Any], step_idx: int, context: Dict[str, Any], env_slot, keep_response: bool = True
+) -> Tuple[Dict[str, Any], Any]:
+    """执行流程中的一个步骤，返回步骤结果和响应体 JSON（keep_response 为 False 时不解析，为 None）"""
+    import requests
+
+    env = plan.env
+    step_result = {
+        "step_index": step_idx + 1,
+        "step_name": step.get("alias") or f"步骤 {step_idx + 1}",
+        "success": False,
+        "error_message": None,
+        "execution_time": None,
+        "details": {}
+    }
+
+    step_endpoint_id = step.get("endpoint_id")
+    if not step_endpoint_id:
+        step_result["error_message"] = "步骤中未指定接口ID"
+        return step_result, None
+    step_endpoint = plan.endpoints.get(step_endpoint_id)
+    if not step_endpoint:
+        step_result["error_message"] = f"步骤中的接口 {step_endpoint_id} 不存在"
+        return step_result, None
+
+    step_test_data = plan.test_data.get(step.get("test_data_id")) if step.get("test_data_id") else None
+
+    # 组装请求数据（和 execute_api_flow 中的逻辑一致，支持模板渲染）
+    headers = {}
+    if env.headers:
+        headers.update(env.headers)
+    if step_test_data and step_test_data.headers:
+        headers.update(step_test_data.headers)
+    if step.get("headers") is not None:
+        rendered_headers = render_template(step["headers"], context)
+        if isinstance(rendered_headers, dict):
+            headers = rendered_headers
+
+    # 路径参数、查询参数、请求体：步骤自己的参数优先级最高，支持模板渲染
+    path_params = step_test_data.path_params if step_test_data else None
+    if step.get("path_params") is not None:
+        path_params = render_template(step["path_params"], context)
+    query_params = step_test_data.query_params if step_test_data else None
+    if step.get("query_params") is not None:
+        query_params = render_template(step["query_params"], context)
+    body = step_test_data.body if step_test_data else None
+    if step.get("body") is not None:
+        body = render_template(step["body"], context)
+
+    # 拼接 URL 并替换路径参数
+    step_url = f"{env.base_url.rstrip('/')}/{step_endpoint.path.lstrip('/')}"
+    if path_params:
+        for key, value in path_params.items():
+            step_url = step_url.replace(f"{{{key}}}", str(value))
+
+    step_result["details"] = {
+        "request_url": step_url,
+        "request_method": step_endpoint.method.upper(),
+        "request_headers": headers,
+        "request_path_params": path_params,
+        "request_query_params": query_params,
+        "request_body": body,
+        "endpoint_id": step_endpoint_id,
+        "endpoint_name": step_endpoint.name or step_endpoint.path
+    }
+
+    step_request_kwargs = {
+        'method': step_endpoint.method.upper(),
+        'url': step_url,
+        'headers': headers,
+        'timeout': TASK_REQUEST_TIMEOUT
+    }
+    if query_params:
+        step_request_kwargs['params'] = query_params
+    if body is not None:
+        step_request_kwargs['json'] = body
+    exec_log.debug("task.flow.step.request", lambda: {"step": step_idx + 1, "context": context, **step_result["details"]})
+
+    step_json_body = None
+    step_start_time = time.perf_counter()
+    try:
+        step_response = _send(env_slot, **step_request_kwargs)
+        step_response_time = int((time.perf_counter() - step_start_time) * 1000)
+        step_result["timings"] = timings_of(step_response)
+
+        step_response_body = step_response.preview()
+
+        step_result["execution_time"] = step_response_time
+        step_result["status_code"] = step_response.status_code
+        step_assertions_list = step.get("assertions") or []
+
+        # 后续步骤引用 API[N] 时解析响应体为JSON（断言需要时由断言解析，结果缓存）
+        if keep_response:
+            step_json_body = step_response.parsed_json()
+
+        step_result["details"].update({
+            "response_status": step_response.status_code,
+            "response_headers": dict(step_response.headers),
+            "response_body": step_response_body,
+            "response_time": step_response_time,
+            "request_assertions": step_assertions_list,
+            **step_response.summary()
+        })
+
+        if step_assertions_list:
+            step_assertion_errors = evaluate_assertions(
+                compile_assertions(step_assertions_list), step_response, step_response_time,
+                context=context, endpoint=step_endpoint, step=step_idx + 1
+            )
+            step_assertion_success = not step_assertion_errors
+            step_result["success"] = step_assertion_success
+            step_result["details"]["assertion_results"] = step_assertion_errors if step_assertion_errors else ["所有断言通过"]
+            if not step_assertion_success:
+                step_result["error_message"] = "; ".join(step_assertion_errors)
+        else:
+            # 没有断言，使用HTTP状态码判断
+            step_result["success"] = step_response.status_code < 400
+            if step_response.status_code >= 400:
+                step_result["error_message"] = f"HTTP {step_response.status_code}: {step_response_body[:200] if step_response_body else '无响应内容'}"
+
+    except requests.exceptions.Timeout as e:
+        step_result["execution_time"] = int((time.perf_counter() - step_start_time) * 1000)
+        step_result["timings"] = timings_of(e)
+        step_result["error_message"] = f"请求超时 (超过{TASK_REQUEST_TIMEOUT}秒)"
+        step_result["details"]["error_type"] = "timeout"
+
+    except requests.exceptions.ConnectionError as e:
+        step_result["execution_time"] = int((time.perf_counter() - step_start_time) * 1000)
+        step_result["timings"] = timings_of(e)
+        step_result["error_message"] = f"连接错误: {str(e)}"
+        step_result["details"]["error_type"] = "connection_error"
+
+    except requests.exceptions.RequestException as e:
+        step_result["execution_time"] = int((time.perf_counter() - step_start_time) * 1000)
+        step_result["timings"] = timings_of(e)
+        step_result["error_message"] = f"请求异常: {str(e)}"
+        step_result["details"]["error_type"] = "request_exception"
+
+    except Exception as exc:
+        step_result["execution_time"] = int((time.perf_counter() - step_start_time) * 1000)
+        step_result["error_message"] = f"执行异常: {str(exc)}"
+        step_result["details"]["error_type"] = "execution_error"
+
+    return step_result, step_json_body
+
+
+def _step_to_item_result(step_result: Dict[str, Any]) -> Dict[str, Any]:
+    """将流程步骤结果转换为独立的执行结果项（前端将流程拆成多个单接口展示）"""
+    details = step_result.get("details", {})
+    return {
+        "item_type": "api",  # 标记为api类型，以便前端统一展示
+        "item_id": details.get("endpoint_id", 0),
+        "item_name": step_result.get("step_name", ""),
+        "success": step_result.get("success", False),
+        "status_code": step_result.get("status_code"),
+        "error_message": step_result.get("error_message"),
+        "execution_time": step_result.get("execution_time"),
+        "timings": step_result.get("timings"),
+        "details": {
+            "request_url": details.get("request_url", ""),
+            "request_method": details.get("request_method", ""),
+            "request_headers": details.get("request_headers", {}),
+            "request_path_params": details.get("request_path_params", {}),
+            "request_query_params": details.get("request_query_params", {}),
+            "request_body": details.get("request_body"),
+            "request_assertions": details.get("request_assertions", []),
+            "response_status": details.get("response_status"),
+            "response_headers": details.get("response_headers", {}),
+            "response_body": details.get("response_body"),
+            "response_time": details.get("response_time", 0),
+            "debug_log": details.get("debug_log"),
+        }
+    }
+
+
+def run_flow_item(plan: TaskPlan, item: PlanItem, env_slot, debug: bool = False) -> List[Dict[str, Any]]:
+    """执行流程类型的任务项，每个步骤返回一条结果（debug 时每个步骤的调试日志记录到 details.debug_log）"""
+    flow = plan.flows.get(item.item_id)
+    if not flow:
+        return [{
+            "item_type": "flow",
+            "item_id": item.item_id,
+            "item_name": f"流程 {item.item_id}",
+            "success": False,
+            "error_message": "流程不存在"
+        }]
+
+    # 初始化上下文（用于变量替换和模板渲染）
+    context: Dict[str, Any] = {}
+    if isinstance(flow.global_variables, dict):
+        context.update(flow.global_variables)
+    elif isinstance(flow.global_variables, str):
+        try:
+            parsed_vars = json.loads(flow.global_variables)
+            if isinstance(parsed_vars, dict):
+                context.update(parsed_vars)
+        except:
+            pass
+
+    # 流程不保存 failAction，任务中的流程失败即停止
+    fail_action = "stop"
+    # 过滤掉被禁用的步骤
+    enabled_steps = [step for step in (flow.steps or []) if step.get("enabled") is not False]
+    # 被其他步骤引用的 API[N]，未被引用的步骤不在上下文中保留响应体
+    referenced = set()
+    for step in enabled_steps:
+        referenced |= step_reads(step)
+    step_results = []
+    try:
+        for step_idx, step in enumerate(enabled_steps):
+            api_key = f"API[{step_idx + 1}]"
+            json_body = None
+            try:
+                with exec_log.capture_debug(debug) as debug_log:
+                    step_result, json_body = _run_flow_step(
+                        plan, step, step_idx, context, env_slot, keep_response=api_key in referenced
+                    )
+                if debug_log is not None:
+                    step_result["details"]["debug_log"] = debug_log
+            except Exception as step_error:
+                step_result = {
+                    "step_index": step_idx + 1,
+                    "step_name": step.get("alias") or f"步骤 {step_idx + 1}",
+                    "success": False,
+                    "error_message": f"步骤执行异常: {str(step_error)}",
+                    "execution_time": None,
+                    "details": {
+                        "error_type": "step_execution_error",
+                        "error_traceback": traceback.format_exc()
+                    }
+                }
+            step_results.append(step_result)
+
+            # 将步骤的响应体和提取变量放入 context，供后续步骤引用
+            details = step_result.get("details", {})
+            if json_body is not None and api_key in referenced:
+                context[api_key] = json_body or {}
+            if details.get("extracted"):
+                context.update(details["extracted"])
+
+            # 请求已发出但失败（断言失败、HTTP 错误、超时等）时按 failAction 决定是否继续
+            if not step_result.get("success") and step_result.get("execution_time") is not None and fail_action == "stop":
+                break
+    except Exception as flow_error:
+        traceback.print_exc()
+        return [_step_to_item_result(s) for s in step_results] + [{
+            "item_type": "flow",
+            "item_id": item.item_id,
+            "item_name": flow.name,
+            "success": False,
+            "error_message": f"执行失败: {str(flow_error)}",
+            "details": {"error_type": "flow_execution_error", "error_traceback": traceback.format_exc()}
+        }]
+
+    return [_step_to_item_result(s) for s in step_results]
+
+
+def run_item(plan: TaskPlan, item: PlanItem, request, env_slot) -> List[Dict[str, Any]]:
+    """执行单个任务项，异常不会向外抛出"""
+    try:
+        if item.item_type == 'api':
+            with exec_log.capture_debug(request.debug) as debug_log:
+                results = run_api_item(plan, item, request, env_slot)
+            if debug_log is not None:
+                results[0].setdefault("details", {})["debug_log"] = debug_log
+            return results
+        if item.item_type == 'flow':
+            return run_flow_item(plan, item, env_slot, request.debug)
+        return []
+    except Exception as e:
+        traceback.print_exc()
+        return [{
+            "item_type": item.item_type,
+            "item_id": item.item_id,
+            "item_name": f"{item.item_type} {item.item_id}",
+            "success": False,
+            "error_message": str(e)
+        }]
+
+
+ItemCallback = Callable[[PlanItem, List[Dict[str, Any]]], None]
+
+
+def _run_and_report(
+    plan: TaskPlan, item: PlanItem, request, env_slot, on_item_done: Optional[ItemCallback],
+    should_stop: Optional[Callable[[], bool]] = None
+) -> List[Dict[str, Any]]:
+    if should_stop is not None and should_stop():
+        return []
+    results = run_item(plan, item, request, env_slot)
+    if on_item_done is not None:
+        try:
+            on_item_done(item, results)
+        except Exception as e:
+            # 进度写入失败不影响执行，最终结果仍会在全部完成后保存
+            print(f"⚠️ 保存任务项进度失败: item={item.item_type}:{item.item_id}, {e}")
+    return results
+
+
+async def execute_plan(
+    plan: TaskPlan,
+    request,
+    concurrency: int,
+    on_item_done: Optional[ItemCallback] = None,
+    should_stop: Optional[Callable[[], bool]] = None
+) -> List[Dict[str, Any]]:
+    """
+    并发执行所有任务项
+
+    Args:
+        plan: 任务执行计划
+        request: 执行请求（Header/断言替换）
+        concurrency: 同时执行的任务项数
+        on_item_done: 每个任务项执行完后在工作线程中调用，参数为任务项及其结果
+        should_stop: 每个任务项开始前调用，返回 True 时跳过剩余的任务项（已开始的会执行完）
+
+    Returns:
+        按 sort_order 排列的执行结果
+    """
+    loop = asyncio.get_running_loop()
+    env_slot = environment_limiter.slot(plan.env.id, resolve_environment_concurrency(plan.env))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"task-{plan.task.id}") as pool:
+        async def run_one(item):
+            async with semaphore:
+                return await loop.run_in_executor(pool, _run_and_report, plan, item, request, env_slot, on_item_done, should_stop)
+
+        item_results = await asyncio.gather(*(run_one(item) for item in plan.items))
+    return [result for results in item_results for result in results]
+
+
+def execute_task_items(
+    task_id: int,
+    environment_id: int,
+    request,
+    items: Optional[List[PlanItem]] = None,
+    on_item_done: Optional[ItemCallback] = None,
+    should_stop: Optional[Callable[[], bool]] = None
+) -> List[Dict[str, Any]]:
+    """
+    执行任务项并返回结果（不写执行记录）
+
+    Args:
+        task_id: 任务ID
+        environment_id: 执行环境ID
+        request: TestTaskExecutionRequest
+        items: 只执行这些任务项，为空时执行全部
+        on_item_done: 每个任务项执行完后的回调
+        should_stop: 返回 True 时不再开始剩余的任务项（如分片租约已被回收）
+
+    Returns:
+        按 sort_order 排列的执行结果
+
+    Raises:
+        Exception: 任务或环境不存在
+    """
+    db_session = SessionLocal()
+    try:
+        plan = load_task_plan(db_session, task_id, environment_id, items)
+    finally:
+        db_session.close()
+    concurrency = resolve_task_concurrency(plan.task)
+    started = time.perf_counter()
+    results = asyncio.run(execute_plan(plan, request, concurrency, on_item_done, should_stop))
+    exec_log.info("task.run.finish", {
+        "task_id": task_id,
+        "items": len(plan.items),
+        "concurrency": concurrency,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    })
+    return results
+
+
+def count_results(results: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """返回 (成功数, 失败数)"""
+    success_count = sum(1 for r in results if r.get("success", False))
+    return success_count, len(results) - success_count
+
+
+def item_error_results(items: List[PlanItem], error_message: str) -> List[Dict[str, Any]]:
+    """任务项未能执行时，为每一项生成失败结果"""
+    return [{
+        "item_type": item.item_type,
+        "item_id": item.item_id,
+        "item_name": f"{item.item_type} {item.item_id}",
+        "success": False,
+        "error_message": error_message
+    } for item in items]
+
+
+def save_execution_summary(db: Session, task_id: int, execution_id: int, error_message: Optional[str] = None) -> None:
+    """
+    根据结果明细汇总执行记录并更新任务状态（由调用方提交事务）
+
+    Args:
+        error_message: 执行异常信息，为空时根据失败项生成汇总
+    """
+    db.flush()
+    Item = models.TestTaskExecutionItem
+    counts = dict(db.query(Item.success, func.count(Item.id)).filter(
+        Item.execution_id == execution_id
+    ).group_by(Item.success).all())
+    success_count, failed_count = counts.get(True, 0), counts.get(False, 0)
+    db_execution = db.query(models.TestTaskExecution).filter(models.TestTaskExecution.id == execution_id).first()
+    if db_execution:
+        db_execution.status = 'success' if failed_count == 0 and not error_message else 'failed'
+        db_execution.success_count = success_count
+        db_execution.failed_count = failed_count
+        db_execution.total_count = success_count + failed_count
+        db_execution.completed_at = datetime.now()
+        if error_message:
+            db_execution.error_message = f"任务执行异常: {error_message}"
+        elif failed_count > 0:
+            # 记录汇总错误信息
+            failed_names = [name for (name,) in db.query(Item.item_name).filter(
+                Item.execution_id == execution_id,
+                Item.success.is_(False)
+            ).order_by(Item.item_index, Item.result_index).limit(5)]
+            error_summary = f"共 {failed_count} 个接口/流程执行失败"
+            error_summary += f"，失败项: {', '.join([name or '未知' for name in failed_names])}"
+            if failed_count > 5:
+                error_summary += " 等"
+            db_execution.error_message = error_summary
+        exec_log.info("task.execution.saved", {
+            "task_id": task_id,
+            "execution_id": execution_id,
+            "success": success_count,
+            "failed": failed_count,
+        })
+    db_task = db.query(models.TestTask).filter(models.TestTask.id == task_id).first()
+    if db_task:
+        db_task.status = db_execution.status if db_execution else 'failed'
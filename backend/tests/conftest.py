@@ -0,0 +1,67 @@
+"""后端单元测试公共配置：在 backend 目录外运行 pytest 时也能导入后端模块"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def session_factory():
+    """内存 SQLite 数据库（已建表）的会话工厂，测试中替换模块的 SessionLocal 使用"""
+    import models
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+# 使用 SessionLocal 的后台模块，测试中统一替换为内存数据库
+_SESSION_MODULES = ("flow_runs", "job_queue", "leases", "load_test", "retention")
+
+
+@pytest.fixture
+def db(session_factory, monkeypatch):
+    """替换后台模块的 SessionLocal，返回同一数据库的会话"""
+    import importlib
+
+    for name in _SESSION_MODULES:
+        monkeypatch.setattr(importlib.import_module(name), "SessionLocal", session_factory)
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def project(db):
+    import models
+
+    project = models.Project(name="p")
+    db.add(project)
+    db.commit()
+    return project
+
+
+@pytest.fixture
+def add_run(db, project):
+    """创建带心跳的执行记录：add_run(模型, 状态, heartbeat_age=秒, created_age=秒, 其他字段...)，返回记录ID"""
+    def add(model, status, heartbeat_age=None, created_age=0, worker_id="other:1:abc", **values):
+        now = datetime.now()
+        run = model(
+            project_id=project.id,
+            status=status,
+            worker_id=worker_id,
+            created_at=now - timedelta(seconds=created_age),
+            heartbeat_at=now - timedelta(seconds=heartbeat_age) if heartbeat_age is not None else None,
+            **values
+        )
+        db.add(run)
+        db.commit()
+        return run.id
+    return add
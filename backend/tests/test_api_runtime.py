@@ -0,0 +1,154 @@
+"""测试接口执行公共逻辑：编译后的模板渲染结果与原来逐个正则替换的结果一致
+
+期望值由改造前 app.py 中的 _render_template 对同一组用例运行得到。
+"""
+import pytest
+
+from api_runtime import _render_passes, compile_template, render_template
+
+DATA = {
+    "code": 0,
+    "data": {
+        "token": 't"k\\1',
+        "count": 3,
+        "ratio": 2.0,
+        "flag": True,
+        "none": None,
+        "list": [{"id": 1, "name": "a", "v": "10"}, {"id": 122, "name": "b", "v": 2.5}],
+    },
+}
+CONTEXT = {
+    "API[1]": DATA,
+    "API[2]": {"id": 9, "items": [1, 2]},
+    "token": "abc",
+    "num": 42,
+    "fnum": 3.0,
+    "s": "7.5",
+    "b": True,
+    "obj": {"k": [1, "x"]},
+    "bad": "x1",
+    "Tenant": "T-1",
+    "nul": None,
+}
+
+
+@pytest.mark.parametrize("template, expected", [
+    ("$token", '"abc"'),
+    ("Bearer $token", 'Bearer "abc"'),
+    ("$num", "42"),
+    ("$fnum", "3.0"),
+    ("$b", "True"),
+    ("$obj", '{"k": [1, "x"]}'),
+    ("$missing", "$missing"),
+    ("$nul", "$nul"),
+    ("$$token", '$"abc"'),
+    ("x$token.y", "x$token.y"),
+    ("$token[0]", "$token[0]"),
+    ("$API[1].code", "0"),
+    ("$API[1].data.token", '"t\\"k\\\\1"'),
+    ("$API[1].data.list.1.name", '"b"'),
+    ("$API[1].data.list.-1.id", "$API[1].data.list.-1.id"),
+    ("$API[1].data.none", "$API[1].data.none"),
+    ("$API[1].data.list", '[{"id": 1, "name": "a", "v": "10"}, {"id": 122, "name": "b", "v": 2.5}]'),
+    ("$API[1].data.list.0", '{"id": 1, "name": "a", "v": "10"}'),
+    ("$API[3].code", "$API[3].code"),
+    ("$API[1]", "$API[1]"),
+    ("API[1].code", "API[1].code"),
+    ("$API[1].data.flag", "True"),
+    ("$API[2].items.5", "$API[2].items.5"),
+    ("NUM($num)", "42"),
+    ("NUM($fnum)", "3"),
+    ("NUM($s)", "7.5"),
+    ("NUM($b)", "1"),
+    ("NUM($bad)", "0"),
+    ("NUM($missing)", "0"),
+    ("NUM($API[1].data.ratio)", "2"),
+    ("NUM(API[1].data.count)", "3"),
+    ("NUM($API[1].data.list.0.v)", "10"),
+    ("NUM($API[1].data.token)", "0"),
+    ("NUM($API[9].x)", "0"),
+    ("NUM($num)NUM($fnum)", "423"),
+    ("NUM()", "NUM()"),
+    ("STR($num)", '"42"'),
+    ("STR($token)", '"abc"'),
+    ("STR($API[1].data.token)", '"t\\"k\\\\1"'),
+    ("STR($missing)", '""'),
+    ("STR(API[2].id)", '"9"'),
+    ("STR($obj)", "\"{'k': [1, 'x']}\""),
+    ("STR($API[1].)", "STR($API[1].)"),
+    ("{{token}}", '"abc"'),
+    ("{{ num }}", "42"),
+    ("{{ $token }}", '{{ "abc" }}'),
+    ("{{API[1].data.count}}", "3"),
+    ("{{ $API[1].data.list.0 }}", '{{ {"id": 1, "name": "a", "v": "10"} }}'),
+    ("{{ missing }}", "{{ missing }}"),
+    ("{{ nul }}", "{{ nul }}"),
+    ("{{ {{token}} }}", '{{ "abc" }}'),
+    ("{{}}", "{{}}"),
+    ('{"a": $num, "b": $token, "c": NUM($s), "d": STR($num)}', '{"a": 42, "b": "abc", "c": 7.5, "d": "42"}'),
+    ("$Tenant-$num", '"T-1"-42'),
+    ("$token$num", '"abc"42'),
+    ("中文$token", '中文"abc"'),
+    ("$_u", "$_u"),
+    ("$1x", "$1x"),
+    ("$", "$"),
+    ("plain text", "plain text"),
+    ("", ""),
+])
+def test_render_string_matches_previous_output(template, expected):
+    assert render_template(template, CONTEXT) == expected
+    assert _render_passes(template, CONTEXT) == expected
+    # 第二次渲染走缓存的编译结果
+    assert render_template(template, CONTEXT) == expected
+
+
+@pytest.mark.parametrize("template, expected", [
+    # 替换结果中含有模板语法，会被后面的规则再次替换
+    ("$d", '"$num"'),
+    ("$br", '""X""'),
+    ("$API[1].code", '"1"'),
+    ("$API[1].t", '""X""'),
+    ("{{ d }}", '"$num"'),
+    ("{{br}}", '"{{x}}"'),
+    ("STR($d)", '"1"'),
+    ("$s", '"NUM($num)"'),
+    ("$d NUM($num)", '"$num" 1'),
+    ("$x$num", '"X"1'),
+    # 未找到的 $API[N].path 原样保留后，其中的 $AP 被当作变量替换
+    ("$API[2].code", '"ap"I[2].code'),
+])
+def test_render_string_rescans_substituted_values(template, expected):
+    context = {
+        "API[1]": {"code": "$num", "t": "{{x}}"},
+        "num": 1, "x": "X", "d": "$num", "br": "{{x}}", "AP": "ap", "s": "NUM($num)",
+    }
+    assert render_template(template, context) == expected
+
+
+def test_render_structures_matches_previous_output():
+    template = {
+        "a": "$token", "b": "STR($num)", "c": "$num", "d": "$obj",
+        "e": ["$token", {"f": "$API[1].data.list.0.id"}],
+        "g": 1, "h": None, "i": '"$token"', "j": "$missing", "k": "{{token}}",
+        "nested": {"deep": "STR($API[1].data.none)", "q": "$API[1].data.token"},
+    }
+    assert render_template(template, CONTEXT) == {
+        "a": "abc", "b": "42", "c": "42", "d": '{"k": [1, "x"]}',
+        "e": ['"abc"', {"f": "1"}],
+        "g": 1, "h": None, "i": '""abc""', "j": "$missing", "k": "abc",
+        "nested": {"deep": "", "q": 't"k\\1'},
+    }
+    assert render_template(["$b", "NUM($s)", [{"x": "$API[2].items"}]], CONTEXT) == ["True", "7.5", [{"x": "[1, 2]"}]]
+    assert render_template(5, CONTEXT) == 5
+    assert render_template(None, CONTEXT) is None
+
+
+def test_compile_template_handles_structures_and_nested_braces():
+    assert compile_template("plain").parts == ("plain",)
+    assert compile_template("Bearer $token").parts[0] == "Bearer "
+    # {{ $var }}：先替换 $var，再对结果执行 {{ }} 替换
+    assert compile_template("{{ $token }}").rescan_braces
+    assert not compile_template('{"a": $num, "b": $obj}').rescan_braces
+    assert len(compile_template("$token$num").parts) == 2
+    # 未被识别的 $ 后面紧跟替换结果时，片段边界取决于替换结果
+    assert compile_template("$$token") is None
@@ -0,0 +1,116 @@
+"""已验证 token 缓存：会话吊销的复查间隔、过期 token 与 LRU 淘汰"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import app
+import auth
+import models
+from auth import CurrentUser, VerifiedTokenCache, _authenticate, create_access_token, hash_token
+
+
+class _Clock:
+    """替换 auth 模块的 time：time() 与 monotonic() 同步推进"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(auth, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    cache = VerifiedTokenCache(maxsize=100, revalidate_seconds=30)
+    monkeypatch.setattr(auth, "token_cache", cache)
+    monkeypatch.setattr(app, "token_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def login(db):
+    """创建用户和有效会话，返回 (token, 会话)"""
+    user = models.User(username="u", email="u@example.com", password="x", roles=[])
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id), "username": user.username, "role": "guest"})
+    session = models.UserSession(
+        user_id=user.id, token_hash=hash_token(token), expires_at=datetime.now() + timedelta(days=1)
+    )
+    db.add(session)
+    db.commit()
+    return token, session
+
+
+def _rejected(token, db):
+    with pytest.raises(HTTPException) as exc:
+        _authenticate(token, db)
+    return exc.value.status_code == 401
+
+
+def test_session_revoked_elsewhere_is_rejected_within_check_interval(db, cache, clock, login):
+    token, session = login
+    assert _authenticate(token, db).username == "u"
+
+    # 其他进程登出：本进程在复查间隔内仍使用缓存的会话状态
+    session.is_active = False
+    db.commit()
+    clock.now += 29
+    assert _authenticate(token, db).username == "u"
+
+    clock.now += 1
+    assert _rejected(token, db)
+    # 吊销状态保留在缓存中，之后的请求不再查询数据库
+    assert _rejected(token, None)
+
+
+def test_logout_takes_effect_immediately(db, cache, login):
+    token, _ = login
+    user = _authenticate(token, db)
+
+    app.logout(None, current_user=user, db=db)
+    assert _rejected(token, db)
+    db.expire_all()
+    assert db.query(models.UserSession.is_active).scalar() is False
+
+
+def test_expired_token_is_not_served_from_cache(db, cache, clock, login):
+    token, _ = login
+    user = _authenticate(token, db)
+    token_hash = hash_token(token)
+    assert cache.get(token_hash) is not None
+
+    clock.now = cache.get(token_hash).expires_at
+    assert cache.get(token_hash) is None
+
+    cache.put("expired", user, clock.now - 1)
+    assert cache.get("expired") is None
+
+
+def test_expired_token_is_rejected(db, cache, login):
+    token = create_access_token({"sub": "1", "username": "u", "role": "guest"}, timedelta(seconds=-1))
+    assert _rejected(token, db)
+    assert cache.get(hash_token(token)) is None
+
+
+def test_least_recently_used_token_is_evicted(clock):
+    cache = VerifiedTokenCache(maxsize=2, revalidate_seconds=30)
+    user = CurrentUser(id=1, username="u", role="guest")
+    for token_hash in ("a", "b"):
+        cache.put(token_hash, user, None)
+    cache.get("a")
+
+    cache.put("c", user, None)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
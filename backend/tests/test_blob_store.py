@@ -0,0 +1,98 @@
+"""内容存储：去重、压缩算法回退与字段还原"""
+import copy
+
+import pytest
+
+import blob_store
+import models
+
+RESPONSE = {"code": 0, "data": {"items": [{"id": i, "name": f"名称{i}", "ok": i % 2 == 0} for i in range(20)], "next": None}}
+HEADERS = {"Content-Type": "application/json", "X-Trace": "t" * 200}
+
+
+@pytest.fixture(autouse=True)
+def codec(monkeypatch):
+    """每个测试重新确定压缩算法"""
+    monkeypatch.setattr(blob_store, "_codec", None)
+
+
+def _blobs(db):
+    return db.query(models.ContentBlob).all()
+
+
+def test_same_content_is_stored_once(db):
+    first = blob_store.put(db, RESPONSE)
+    second = blob_store.put(db, copy.deepcopy(RESPONSE))
+    db.commit()
+    assert first == second
+    assert len(_blobs(db)) == 1
+
+    refs = blob_store.offload(db, {"response_body": copy.deepcopy(RESPONSE), "response_headers": HEADERS})
+    db.commit()
+    assert refs["response_body"] == first
+    assert len(_blobs(db)) == 2
+
+
+def test_small_values_stay_inline(db):
+    values = {"request_body": {"a": 1}, "response_body": None}
+    assert blob_store.offload(db, values) == {}
+    assert values == {"request_body": {"a": 1}, "response_body": None}
+    assert _blobs(db) == []
+
+
+def test_gzip_is_used_when_zstandard_is_missing(db, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_COMPRESSION", "zstd")
+    monkeypatch.setattr(blob_store, "_zstd", lambda: None)
+    digest = blob_store.put(db, RESPONSE)
+    db.commit()
+
+    blob = _blobs(db)[0]
+    assert blob.codec == "gzip"
+    assert blob.stored_size < blob.raw_size
+    assert blob_store.get_many(db, [digest]) == {digest: RESPONSE}
+
+
+def test_zstd_round_trip(db, monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(blob_store, "BLOB_COMPRESSION", "zstd")
+    digest = blob_store.put(db, RESPONSE)
+    db.commit()
+    assert _blobs(db)[0].codec == "zstd"
+    assert blob_store.get_many(db, [digest]) == {digest: RESPONSE}
+
+
+def test_stored_codec_is_used_after_configuration_changes(db, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_COMPRESSION", "gzip")
+    digest = blob_store.put(db, RESPONSE)
+    db.commit()
+
+    monkeypatch.setattr(blob_store, "BLOB_COMPRESSION", "none")
+    monkeypatch.setattr(blob_store, "_codec", None)
+    other = blob_store.put(db, HEADERS)
+    db.commit()
+    assert {blob.hash: blob.codec for blob in _blobs(db)} == {digest: "gzip", other: "none"}
+    assert blob_store.get_many(db, [digest, other]) == {digest: RESPONSE, other: HEADERS}
+
+
+def test_hydrate_dicts_restores_original_values(db):
+    original = {
+        "request_headers": HEADERS,
+        "request_body": None,
+        "response_headers": {"a": "b"},
+        "response_body": RESPONSE,
+        "debug_log": "日志" * 100,
+        "status_code": 200,
+    }
+    values = copy.deepcopy(original)
+    refs = blob_store.offload(db, values)
+    db.commit()
+    assert set(refs) == {"request_headers", "response_body", "debug_log"}
+    assert values["response_body"] is None and values["response_headers"] == {"a": "b"}
+
+    # 同一内容被多条记录引用，未单独存储的记录不受影响
+    shared = {"response_body": None}
+    plain = {"response_body": "x"}
+    blob_store.hydrate_dicts(db, [(values, refs), (shared, {"response_body": refs["response_body"]}), (plain, None)])
+    assert values == original
+    assert shared == {"response_body": RESPONSE}
+    assert plain == {"response_body": "x"}
@@ -0,0 +1,131 @@
+"""流程步骤 → 接口反向索引：随流程重写、删除接口的依赖检查与引用查询"""
+import pytest
+from fastapi import HTTPException
+
+import app
+import models
+import schemas
+from auth import CurrentUser
+from flow_index import flows_using_endpoint, step_endpoints, sync_flow_index, tasks_using_endpoint
+from membership import ProjectAccess, UserAccess
+
+ADMIN = CurrentUser(id=0, username="admin", role="admin")
+
+
+@pytest.fixture
+def access():
+    return ProjectAccess(UserAccess(0, True, frozenset(), float("inf")))
+
+
+@pytest.fixture
+def endpoints(db, project):
+    rows = [models.ApiEndpoint(project_id=project.id, name=f"e{i}", path=f"/e{i}", method="GET") for i in range(3)]
+    db.add_all(rows)
+    db.commit()
+    return [row.id for row in rows]
+
+
+def _flow(db, project, steps, name="f"):
+    flow = models.ApiTestFlow(project_id=project.id, name=name, steps=steps)
+    db.add(flow)
+    db.flush()
+    sync_flow_index(db, flow.id, steps)
+    db.commit()
+    return flow
+
+
+def _task(db, project, *items, name="t"):
+    task = models.TestTask(name=name, project_id=project.id)
+    db.add(task)
+    db.flush()
+    db.add_all([
+        models.TestTaskItem(task_id=task.id, item_type=item_type, item_id=item_id, sort_order=order)
+        for order, (item_type, item_id) in enumerate(items)
+    ])
+    db.commit()
+    return task
+
+
+def _index(db, flow_id):
+    return [
+        (row.step_index, row.endpoint_id)
+        for row in db.query(models.FlowStepEndpoint).filter(
+            models.FlowStepEndpoint.flow_id == flow_id
+        ).order_by(models.FlowStepEndpoint.step_index)
+    ]
+
+
+def test_step_endpoints_accepts_string_ids_and_skips_steps_without_endpoint():
+    steps = [
+        {"endpoint_id": 3},
+        {"endpoint_id": "4"},
+        {"alias": "wait"},
+        {"endpoint_id": None},
+        {"endpoint_id": "abc"},
+        "bad",
+        {"endpoint_id": 3},
+    ]
+    assert step_endpoints(steps) == [(1, 3), (2, 4), (7, 3)]
+    assert step_endpoints(None) == []
+    assert step_endpoints({"endpoint_id": 1}) == []
+
+
+def test_update_rewrites_index(db, project, endpoints, access):
+    first, second, third = endpoints
+    flow = _flow(db, project, [{"endpoint_id": first}, {"endpoint_id": second}])
+    assert _index(db, flow.id) == [(1, first), (2, second)]
+
+    update = schemas.ApiTestFlowUpdate(steps=[{"endpoint_id": third}, {"endpoint_id": first}])
+    app.update_api_flow(flow.id, update, db=db, current_user=ADMIN, access=access)
+    assert _index(db, flow.id) == [(1, third), (2, first)]
+    assert flows_using_endpoint(db, second) == []
+
+    # 未传 steps 的更新同样会重写 steps，索引始终与保存的 steps 一致
+    app.update_api_flow(flow.id, schemas.ApiTestFlowUpdate(description="d"), db=db, current_user=ADMIN, access=access)
+    db.refresh(flow)
+    assert _index(db, flow.id) == step_endpoints(flow.steps)
+
+
+def test_import_rewrites_index(db, project, endpoints, access):
+    first, second, _ = endpoints
+    flow = _flow(db, project, [{"endpoint_id": first}])
+    export = models.FlowExportRecord(flow_id=flow.id, name="x", export_data={
+        "flow": {"steps": [{"alias": "no endpoint"}, {"endpoint_id": str(second)}]},
+    })
+    db.add(export)
+    db.commit()
+
+    app.import_api_flow(flow.id, export.id, db=db, current_user=ADMIN, access=access)
+    assert _index(db, flow.id) == [(2, second)]
+    assert flows_using_endpoint(db, first) == []
+
+
+def test_delete_endpoint_is_blocked_by_indexed_flow(db, project, endpoints, access):
+    first, second, _ = endpoints
+    _flow(db, project, [{"endpoint_id": str(first)}], name="登录流程")
+
+    with pytest.raises(HTTPException) as exc:
+        app.delete_api_endpoint(first, db=db, current_user=ADMIN, access=access)
+    assert exc.value.status_code == 400
+    assert "登录流程" in exc.value.detail
+    assert db.get(models.ApiEndpoint, first) is not None
+
+    app.delete_api_endpoint(second, db=db, current_user=ADMIN, access=access)
+    assert db.get(models.ApiEndpoint, second) is None
+
+
+def test_usages_list_flows_and_tasks_reaching_endpoint(db, project, endpoints):
+    first, second, _ = endpoints
+    flow = _flow(db, project, [{"endpoint_id": first}, {"endpoint_id": second}, {"endpoint_id": first}], name="f1")
+    other = _flow(db, project, [{"endpoint_id": second}], name="f2")
+    direct = _task(db, project, ("api", first), name="direct")
+    via_flow = _task(db, project, ("api", second), ("flow", flow.id), name="via flow")
+    _task(db, project, ("flow", other.id), name="unrelated")
+
+    usages = app.get_api_endpoint_usages(first, db=db)
+    assert usages["flows"] == [{"id": flow.id, "name": "f1", "project_id": project.id, "steps": [1, 3]}]
+    assert usages["tasks"] == [
+        {"id": direct.id, "name": "direct", "project_id": project.id, "item_type": "api", "item_id": first},
+        {"id": via_flow.id, "name": "via flow", "project_id": project.id, "item_type": "flow", "item_id": flow.id},
+    ]
+    assert tasks_using_endpoint(db, first, []) == usages["tasks"][:1]
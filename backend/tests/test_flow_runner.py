@@ -0,0 +1,113 @@
+"""run_flow 的 failAction（stop / continue）和步骤并行执行语义"""
+import threading
+import time
+
+import pytest
+
+import flow_runner
+from flow_runner import FlowStepPlan, run_flow
+
+
+def _plans(steps):
+    return [FlowStepPlan(step, None, None, None, keep_response=False) for step in steps]
+
+
+@pytest.fixture
+def fake_steps(monkeypatch):
+    """用脚本代替发送请求：outcomes[下标] = (是否成功, 耗时秒数, 响应 JSON)"""
+    outcomes = {}
+    started = []
+    lock = threading.Lock()
+
+    def run_flow_step(idx, step_plan, context):
+        with lock:
+            started.append(idx)
+        success, delay, body = outcomes.get(idx, (True, 0, {}))
+        seen = dict(context)
+        time.sleep(delay)
+        return {"index": idx + 1, "success": success, "seen": seen}, body
+
+    monkeypatch.setattr(flow_runner, "run_flow_step", run_flow_step)
+    return outcomes, started
+
+
+def test_sequential_is_default():
+    assert flow_runner.FLOW_STEP_CONCURRENCY == 1
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_stop_returns_results_up_to_failed_step(fake_steps, concurrency):
+    outcomes, _ = fake_steps
+    outcomes[1] = (False, 0, {})
+    done = []
+    result = run_flow(_plans([{}, {}, {}, {}]), {}, fail_action="stop", concurrency=concurrency,
+                      on_step_done=lambda idx, step_result, elapsed: done.append(idx))
+    assert result["success"] is False
+    assert [r["index"] for r in result["results"]] == [1, 2]
+    assert done == [0, 1]
+
+
+def test_stop_sequential_does_not_start_later_steps(fake_steps):
+    outcomes, started = fake_steps
+    outcomes[0] = (False, 0, {})
+    run_flow(_plans([{}, {}, {}]), {}, fail_action="stop", concurrency=1)
+    assert started == [0]
+
+
+def test_stop_parallel_discards_later_steps_already_started(fake_steps):
+    outcomes, started = fake_steps
+    # 步骤 1 较慢且失败，互不依赖的步骤 2、3 已先执行完
+    outcomes[0] = (False, 0.1, {})
+    outcomes[1] = (True, 0, {"v": 2})
+    outcomes[2] = (True, 0, {"v": 3})
+    steps = [{}, {"extracts": [{"name": "b", "path": "v"}]}, {"extracts": [{"name": "c", "path": "v"}]}]
+    done = []
+    context = {}
+    result = run_flow(_plans(steps), context, fail_action="stop", concurrency=4,
+                      on_step_done=lambda idx, step_result, elapsed: done.append(idx))
+    assert sorted(started) == [0, 1, 2]
+    assert [r["index"] for r in result["results"]] == [1]
+    assert done == [0]
+    assert "b" not in context and "c" not in context
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_continue_runs_all_steps_in_step_order(fake_steps, concurrency):
+    outcomes, started = fake_steps
+    outcomes[0] = (False, 0.05, {})
+    outcomes[2] = (False, 0, {})
+    done = []
+    result = run_flow(_plans([{}, {}, {}, {}]), {}, fail_action="continue", concurrency=concurrency,
+                      on_step_done=lambda idx, step_result, elapsed: done.append(idx))
+    assert result["success"] is False
+    assert [r["index"] for r in result["results"]] == [1, 2, 3, 4]
+    assert [r["success"] for r in result["results"]] == [False, True, False, True]
+    assert done == [0, 1, 2, 3]
+    assert sorted(started) == [0, 1, 2, 3]
+
+
+def test_parallel_context_matches_sequential(fake_steps):
+    outcomes, _ = fake_steps
+    # 步骤 1 提取 tok，步骤 2 引用 tok；步骤 3、4 写入同一个变量，最后的值应为步骤 4 的
+    outcomes[0] = (True, 0.05, {"t": "tk"})
+    outcomes[2] = (True, 0.05, {"v": 3})
+    outcomes[3] = (True, 0, {"v": 4})
+    steps = [
+        {"extracts": [{"name": "tok", "path": "t"}]},
+        {"headers": {"Authorization": "{{tok}}"}},
+        {"extracts": [{"name": "v", "path": "v"}]},
+        {"extracts": [{"name": "v", "path": "v"}]},
+    ]
+    sequential, parallel = {}, {}
+    seq_result = run_flow(_plans(steps), sequential, fail_action="continue", concurrency=1)
+    par_result = run_flow(_plans(steps), parallel, fail_action="continue", concurrency=4)
+    assert parallel == sequential == {"tok": "tk", "v": 4}
+    assert par_result["results"][1]["seen"] == seq_result["results"][1]["seen"] == {"tok": "tk"}
+
+
+def test_step_delay_forces_sequential(fake_steps):
+    outcomes, started = fake_steps
+    outcomes[0] = (False, 0, {})
+    result = run_flow(_plans([{}, {}]), {}, fail_action="stop", step_delay=1, concurrency=4)
+    assert started == [0]
+    assert len(result["results"]) == 1
@@ -0,0 +1,96 @@
+"""流程异步执行：本进程执行的心跳、结束时不覆盖已回收的记录、数据驱动执行的行结果"""
+from types import SimpleNamespace
+
+import pytest
+
+import flow_runner
+import flow_runs
+import models
+from flow_runner import FlowStepPlan
+from flow_runs import FLOW_RUN_LEASE, FlowDatasetRunner, FlowRunManager, FlowRunner, row_result
+
+
+@pytest.fixture
+def new_run(db, project, add_run):
+    """new_run(状态, heartbeat_age=秒, worker_id=...)：创建流程执行记录"""
+    flow = models.ApiTestFlow(project_id=project.id, name="f", steps=[])
+    db.add(flow)
+    db.commit()
+    return lambda status, **values: add_run(models.FlowRun, status, flow_id=flow.id, **values)
+
+
+def _status(db, run_id):
+    db.expire_all()
+    return db.query(models.FlowRun).filter(models.FlowRun.id == run_id).one().status
+
+
+def test_heartbeat_keeps_own_runs_alive(db, new_run):
+    manager = FlowRunManager(workers=1)
+    own = new_run("running", heartbeat_age=120, worker_id=manager.worker_id)
+    other = new_run("running", heartbeat_age=120)
+    manager._runners[own] = object()
+    manager._runners[other] = object()
+
+    manager.heartbeat()
+    assert FLOW_RUN_LEASE.recover(60) == 1
+    assert _status(db, own) == "running"
+    assert _status(db, other) == "failed"
+
+
+def test_finish_does_not_overwrite_recovered_run(db, new_run):
+    manager = FlowRunManager(workers=1)
+    run_id = new_run("running", heartbeat_age=120, worker_id=manager.worker_id)
+    FLOW_RUN_LEASE.recover(60)
+
+    runner = FlowRunner(manager, run_id, [], {}, "stop", 0, None, None)
+    runner._finish()
+    db.expire_all()
+    run = db.query(models.FlowRun).filter(models.FlowRun.id == run_id).one()
+    assert run.status == "failed"
+    assert "中断" in run.error_message
+
+
+def _dataset_runner(manager, run_id, rows, monkeypatch, failing_rows=()):
+    """用脚本代替发送请求：failing_rows 中的行（按变量 n）第一个步骤失败"""
+    def run_flow_step(idx, step_plan, context):
+        success = context["n"] not in failing_rows
+        return {"index": idx + 1, "success": success, "status": 200 if success else 500}, None
+
+    monkeypatch.setattr(flow_runner, "run_flow_step", run_flow_step)
+    endpoint = SimpleNamespace(id=1, name="e")
+    plans = [FlowStepPlan({}, endpoint, None, None, keep_response=False)]
+    return FlowDatasetRunner(manager, run_id, plans, {}, rows, "stop", 0, 2, None, False)
+
+
+def test_dataset_run_persists_rows_and_report(db, new_run, monkeypatch):
+    monkeypatch.setattr(flow_runs, "DATASET_ROW_BATCH_SIZE", 2)
+    manager = FlowRunManager(workers=1)
+    run_id = new_run("queued", heartbeat_age=0, worker_id=manager.worker_id)
+    rows = [{"n": n} for n in range(5)]
+    _dataset_runner(manager, run_id, rows, monkeypatch, failing_rows=(1, 3)).start()
+
+    db.expire_all()
+    run = db.query(models.FlowRun).filter(models.FlowRun.id == run_id).one()
+    assert run.status == "failed" and run.error_message is None
+    assert (run.success_count, run.failed_count) == (3, 2)
+    assert run.report["total"] == 5 and run.report["failed"] == 2
+    assert run.report["steps"][0]["failed"] == 2
+    assert "rows" not in run.report and "failed_rows" not in run.report
+
+    stored = db.query(models.FlowRunRow).filter(models.FlowRunRow.run_id == run_id).order_by(
+        models.FlowRunRow.row_index
+    ).all()
+    assert [row_result(row)["row"] for row in stored] == [1, 2, 3, 4, 5]
+    failed = [row_result(row) for row in stored if not row.success]
+    assert [row["variables"] for row in failed] == [{"n": 1}, {"n": 3}]
+    assert failed[0]["failed_step"] == 1 and failed[0]["results"][0]["status"] == 500
+
+
+def test_dataset_run_stops_writing_after_recovery(db, new_run, monkeypatch):
+    manager = FlowRunManager(workers=1)
+    run_id = new_run("running", heartbeat_age=120, worker_id=manager.worker_id)
+    FLOW_RUN_LEASE.recover(60)
+
+    _dataset_runner(manager, run_id, [{"n": n} for n in range(3)], monkeypatch).start()
+    assert _status(db, run_id) == "failed"
+    assert db.query(models.FlowRunRow).filter(models.FlowRunRow.run_id == run_id).count() == 0
@@ -0,0 +1,88 @@
+"""流式读取响应体：读取上限、按完整响应体计算的大小与哈希、预览与 JSON 解析"""
+import hashlib
+import json
+
+import pytest
+
+from http_client import _capture
+
+
+class _Response:
+    def __init__(self, chunks, encoding="utf-8"):
+        self.status_code = 200
+        self.headers = {"Content-Type": "application/json"}
+        self.encoding = encoding
+        self.chunks = chunks
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _Client:
+    def iter_body(self, response):
+        return iter(response.chunks)
+
+
+def _fetch(body: bytes, max_bytes: int, chunk_size: int = 7, **kwargs):
+    response = _Response([body[i:i + chunk_size] for i in range(0, len(body), chunk_size)], **kwargs)
+    captured = _capture(_Client(), response, max_bytes)
+    assert response.closed
+    return captured
+
+
+BODY = json.dumps({"items": list(range(30))}).encode()
+
+
+def test_body_within_cap_is_kept_whole():
+    captured = _fetch(BODY, len(BODY))
+    assert captured.content == BODY
+    assert captured.truncated is False
+    assert captured.parsed_json() == {"items": list(range(30))}
+    assert captured.summary() == {
+        "response_size": len(BODY), "response_sha256": hashlib.sha256(BODY).hexdigest(), "response_truncated": False,
+    }
+
+
+@pytest.mark.parametrize("max_bytes", [0, 1, 10, 14, len(BODY) - 1])
+def test_body_is_truncated_at_cap(max_bytes):
+    captured = _fetch(BODY, max_bytes)
+    assert captured.content == BODY[:max_bytes]
+    assert captured.truncated is True
+    # 大小和哈希按完整响应体计算
+    assert captured.size == len(BODY)
+    assert captured.sha256 == hashlib.sha256(BODY).hexdigest()
+
+
+def test_truncated_json_is_not_parsed():
+    captured = _fetch(BODY, len(BODY) - 1)
+    assert captured.parsed_json() is None
+    # 截断的内容恰好是合法 JSON 时也不解析
+    assert _fetch(b"[1, 2]    ", 6).parsed_json() is None
+    assert _fetch(b"[1, 2]", 6).parsed_json() == [1, 2]
+
+
+def test_preview_of_truncated_body():
+    captured = _fetch(BODY, 20)
+    assert captured.preview() == BODY[:20].decode() + "... (truncated)"
+    assert captured.preview(5) == BODY[:5].decode() + "... (truncated)"
+
+    whole = _fetch(BODY, len(BODY))
+    assert whole.preview() == BODY.decode()
+    assert whole.preview(5) == BODY[:5].decode() + "... (truncated)"
+
+
+def test_preview_counts_characters_not_bytes():
+    body = "中文响应".encode("utf-8")
+    captured = _fetch(body, len(body), chunk_size=2)
+    assert captured.text == "中文响应"
+    assert captured.preview(4) == "中文响应"
+    assert captured.preview(2) == "中文... (truncated)"
+
+
+def test_empty_body():
+    captured = _fetch(b"", 10)
+    assert captured.content == b"" and captured.size == 0 and captured.truncated is False
+    assert captured.sha256 == hashlib.sha256(b"").hexdigest()
+    assert captured.parsed_json() is None
+    assert captured.preview() == ""
@@ -0,0 +1,143 @@
+"""测试任务队列：并发上限、租约过期回收、租约被接管后停止执行、分片完成后汇总"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import job_queue
+import models
+import schemas
+from job_queue import claim_job, complete_shard, enqueue_task_execution, record_item_results, recover_orphans
+
+
+def _enqueue(db, item_count=4, shard_count=2):
+    project = models.Project(name=f"p{datetime.now().timestamp()}")
+    db.add(project)
+    db.flush()
+    task = models.TestTask(name="t", project_id=project.id, status="running")
+    db.add(task)
+    db.flush()
+    for idx in range(item_count):
+        db.add(models.TestTaskItem(task_id=task.id, item_type="api", item_id=idx + 1, sort_order=idx))
+    db.flush()
+    db.refresh(task)
+    execution = models.TestTaskExecution(task_id=task.id, status="running")
+    db.add(execution)
+    db.flush()
+    request = schemas.TestTaskExecutionRequest(environment_id=1, shard_count=shard_count)
+    jobs = enqueue_task_execution(db, task, execution, request)
+    db.commit()
+    return execution.id, [job.id for job in jobs]
+
+
+def _results(job, success=True):
+    return [{
+        "item_type": item.item_type,
+        "item_id": item.item_id,
+        "item_name": f"api {item.item_id}",
+        "success": success,
+        "error_message": None if success else "断言失败",
+    } for item in job_queue._job_items(job)]
+
+
+def _job(db, job_id):
+    db.expire_all()
+    return db.query(models.TaskJob).filter(models.TaskJob.id == job_id).one()
+
+
+def _execution(db, execution_id):
+    db.expire_all()
+    return db.query(models.TestTaskExecution).filter(models.TestTaskExecution.id == execution_id).one()
+
+
+def test_claim_respects_max_running(db):
+    _enqueue(db, item_count=3, shard_count=3)
+    assert claim_job("w1", max_running=2) is not None
+    assert claim_job("w2", max_running=2) is not None
+    assert claim_job("w3", max_running=2) is None
+    assert db.query(models.QueueLock).filter(models.QueueLock.name == "task_jobs").count() == 1
+
+
+def test_expired_lease_is_requeued_and_old_worker_is_fenced(db):
+    _, (job_id,) = _enqueue(db, item_count=2, shard_count=1)
+    job = claim_job("w1")
+    db.query(models.TaskJob).filter(models.TaskJob.id == job_id).update(
+        {models.TaskJob.lease_expires_at: datetime.now() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+    assert recover_orphans() == 1
+    requeued = _job(db, job_id)
+    assert (requeued.status, requeued.worker_id) == ("queued", None)
+
+    reclaimed = claim_job("w2")
+    assert reclaimed.id == job_id and reclaimed.attempts == 2
+    # 旧 worker 的租约已被接管，不能再写入结果或结束分片
+    item = job_queue._job_items(job)[0]
+    assert record_item_results(job_id, "w1", item, _results(job)[:1]) is False
+    complete_shard(job_id, "w1")
+    assert _job(db, job_id).status == "running"
+
+
+def test_expired_lease_fails_after_max_attempts(db, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 1)
+    execution_id, (job_id,) = _enqueue(db, item_count=2, shard_count=1)
+    claim_job("w1")
+    db.query(models.TaskJob).filter(models.TaskJob.id == job_id).update(
+        {models.TaskJob.lease_expires_at: datetime.now() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+    recover_orphans()
+    assert _job(db, job_id).status == "failed"
+    # 唯一的分片失败，执行记录汇总为失败，每个任务项一条失败结果
+    execution = _execution(db, execution_id)
+    assert execution.status == "failed"
+    assert (execution.success_count, execution.failed_count) == (0, 2)
+
+
+def test_complete_shard_finalizes_after_last_shard(db):
+    execution_id, job_ids = _enqueue(db, item_count=4, shard_count=2)
+    jobs = [claim_job("w1"), claim_job("w2")]
+    assert sorted(job.id for job in jobs) == sorted(job_ids)
+
+    first, second = sorted(jobs, key=lambda job: job.shard_index)
+    for item, result in zip(job_queue._job_items(first), _results(first)):
+        assert record_item_results(first.id, "w1", item, [result])
+    complete_shard(first.id, "w1")
+    assert _execution(db, execution_id).status == "running"
+
+    results = _results(second)
+    results[-1] = {**results[-1], "success": False, "error_message": "断言失败"}
+    for item, result in zip(job_queue._job_items(second), results):
+        assert record_item_results(second.id, "w2", item, [result])
+    complete_shard(second.id, "w2")
+
+    execution = _execution(db, execution_id)
+    assert execution.status == "failed"
+    assert (execution.total_count, execution.success_count, execution.failed_count) == (4, 3, 1)
+    assert "api 4" in execution.error_message
+    assert {job.status for job in db.query(models.TaskJob).filter(models.TaskJob.id.in_(job_ids))} == {"done"}
+
+
+def test_worker_stops_when_lease_is_taken_over(db, monkeypatch):
+    _, (job_id,) = _enqueue(db, item_count=4, shard_count=1)
+    job = claim_job("w1")
+    executed = []
+
+    def fake_execute(task_id, environment_id, request, items, on_item_done, should_stop=None):
+        for item in items:
+            if should_stop is not None and should_stop():
+                break
+            executed.append(item.item_id)
+            on_item_done(item, _results(job)[:1])
+            # 第一个任务项执行后租约被其他 worker 接管
+            db.query(models.TaskJob).filter(models.TaskJob.id == job_id).update({models.TaskJob.worker_id: "w2"})
+            db.commit()
+
+    monkeypatch.setattr(job_queue, "execute_task_items", fake_execute)
+    job_queue.JobWorkerPool(workers=0).run_job(job, "w1")
+
+    # 第一个任务项在接管前已写入；第二个写入被拒绝后不再执行剩余任务项，也不结束分片
+    assert executed == [1, 2]
+    reclaimed = _job(db, job_id)
+    assert (reclaimed.status, reclaimed.worker_id) == ("running", "w2")
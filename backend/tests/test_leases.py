@@ -0,0 +1,61 @@
+"""执行进程租约：心跳超时记录的回收（异步流程执行与压测共用）"""
+import pytest
+
+import models
+from flow_runs import FLOW_RUN_LEASE
+from leases import new_worker_id
+from load_test import LOAD_TEST_LEASE
+
+
+@pytest.fixture(params=["flow_run", "load_test"])
+def lease(request, db, project, add_run):
+    """(租约, 创建记录的函数)"""
+    if request.param == "flow_run":
+        flow = models.ApiTestFlow(project_id=project.id, name="f", steps=[])
+        db.add(flow)
+        db.commit()
+        return FLOW_RUN_LEASE, lambda status, **values: add_run(models.FlowRun, status, flow_id=flow.id, **values)
+    return LOAD_TEST_LEASE, lambda status, **values: add_run(
+        models.LoadTestRun, status, target_type="flow", target_id=1, **values
+    )
+
+
+def _load(db, model, run_id):
+    db.expire_all()
+    return db.query(model).filter(model.id == run_id).one()
+
+
+def test_recover_fails_only_stale_runs(db, lease):
+    lease, new_run = lease
+    status = lease.active_statuses[-1]
+    stale = new_run(status, heartbeat_age=120)
+    live = new_run(status, heartbeat_age=5)
+    legacy = new_run(status, heartbeat_age=None, created_age=120)
+    recent_legacy = new_run(status, heartbeat_age=None, created_age=5)
+    finished = new_run("failed", heartbeat_age=600, error_message="原有错误")
+
+    assert lease.recover(60) == 2
+    assert _load(db, lease.model, live).status == status
+    assert _load(db, lease.model, recent_legacy).status == status
+    assert _load(db, lease.model, finished).error_message == "原有错误"
+    for run_id in (stale, legacy):
+        run = _load(db, lease.model, run_id)
+        assert run.status == "failed"
+        assert run.error_message == lease.error_message and run.completed_at is not None
+
+
+def test_heartbeat_refreshes_only_own_active_runs(db, lease):
+    lease, new_run = lease
+    worker_id = new_worker_id()
+    status = lease.active_statuses[-1]
+    own = new_run(status, heartbeat_age=120, worker_id=worker_id)
+    other = new_run(status, heartbeat_age=120)
+
+    lease.heartbeat(worker_id, [own, other])
+    assert lease.recover(60) == 1
+    assert _load(db, lease.model, own).status == status
+    assert _load(db, lease.model, other).status == "failed"
+
+
+def test_worker_ids_are_unique_per_manager():
+    assert new_worker_id() != new_worker_id()
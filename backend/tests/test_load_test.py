@@ -0,0 +1,101 @@
+"""压测：报告写入时的心跳与停止请求、结束时不覆盖已回收的记录"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import load_test
+import models
+from load_test import (
+    LOAD_TEST_LEASE, SAVE_ENDED, SAVE_FAILED, SAVE_RUNNING, SAVE_STOP_REQUESTED, LoadTestRunner,
+)
+
+
+@pytest.fixture
+def new_run(add_run):
+    """new_run(状态="running", heartbeat_age=秒)：创建压测记录"""
+    return lambda status="running", **values: add_run(
+        models.LoadTestRun, status, target_type="flow", target_id=1, **values
+    )
+
+
+def _load(db, run_id):
+    db.expire_all()
+    return db.query(models.LoadTestRun).filter(models.LoadTestRun.id == run_id).one()
+
+
+def _runner(run_id):
+    return LoadTestRunner(run_id, [], {}, {"virtual_users": 1, "iterations": 1})
+
+
+def test_report_write_refreshes_heartbeat_and_reads_stop_request(db, new_run):
+    run_id = new_run(heartbeat_age=120)
+    runner = _runner(run_id)
+
+    assert runner._save(report={"x": 1}, heartbeat_at=datetime.now()) == SAVE_RUNNING
+    assert LOAD_TEST_LEASE.recover(60) == 0
+
+    run = _load(db, run_id)
+    run.stop_requested = True
+    db.commit()
+    assert runner._save(heartbeat_at=datetime.now()) == SAVE_STOP_REQUESTED
+
+
+def test_save_does_not_overwrite_recovered_run(db, new_run):
+    run_id = new_run(heartbeat_age=120)
+    LOAD_TEST_LEASE.recover(60)
+
+    assert _runner(run_id)._save(status="completed", report={}) == SAVE_ENDED
+    run = _load(db, run_id)
+    assert run.status == "failed"
+    assert "中断" in run.error_message
+
+
+def test_stop_request_ends_run_as_stopped(db, new_run, monkeypatch):
+    monkeypatch.setattr(load_test, "LOAD_TEST_REPORT_INTERVAL_SECONDS", 0.01)
+    run_id = new_run(heartbeat_age=0)
+    run = _load(db, run_id)
+    run.stop_requested = True
+    db.commit()
+
+    runner = LoadTestRunner(run_id, [], {}, {"virtual_users": 1, "duration_seconds": 30, "think_time_ms": 10})
+    monkeypatch.setattr(load_test, "run_flow", lambda *args, **kwargs: {"success": True})
+    runner.start()
+    runner.join(5)
+    assert _load(db, run_id).status == "stopped"
+
+
+class _BrokenSession:
+    """数据库不可用：所有查询抛出异常"""
+
+    def query(self, *args):
+        raise OperationalError("UPDATE", {}, Exception("database is down"))
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_save_reports_write_failure(monkeypatch):
+    monkeypatch.setattr(load_test, "SessionLocal", _BrokenSession)
+    assert _runner(1)._save(heartbeat_at=datetime.now()) == SAVE_FAILED
+
+
+def test_persistent_write_failure_ends_run_as_failed(monkeypatch):
+    monkeypatch.setattr(load_test, "LOAD_TEST_REPORT_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(load_test, "LOAD_TEST_LEASE_SECONDS", 0)
+    monkeypatch.setattr(load_test, "run_flow", lambda *args, **kwargs: {"success": True})
+    runner = LoadTestRunner(1, [], {}, {"virtual_users": 1, "duration_seconds": 30, "think_time_ms": 10})
+    saves = []
+
+    def save(**values):
+        saves.append(values)
+        return SAVE_FAILED
+
+    monkeypatch.setattr(runner, "_save", save)
+    runner.start()
+    runner.join(5)
+    assert saves[-1]["status"] == "failed"
+    assert "写入失败" in saves[-1]["error_message"]
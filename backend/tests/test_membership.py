@@ -0,0 +1,114 @@
+"""项目成员权限缓存：写操作后立即失效、TTL 兜底与容量上限"""
+import pytest
+
+import app
+import membership
+import models
+import schemas
+from auth import CurrentUser
+from membership import MembershipCache, load_user_access
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(membership, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    cache = MembershipCache(ttl=60, max_users=100)
+    monkeypatch.setattr(membership, "membership_cache", cache)
+    monkeypatch.setattr(app, "membership_cache", cache)
+    return cache
+
+
+def _user(db, name, roles=None):
+    user = models.User(username=name, email=f"{name}@example.com", password="x", roles=roles or [])
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _project(db, *members):
+    project = models.Project(name="p")
+    project.members.extend(members)
+    db.add(project)
+    db.commit()
+    return project
+
+
+ADMIN = CurrentUser(id=0, username="admin", role="admin")
+
+
+def test_access_is_served_from_cache_until_ttl(db, cache, clock):
+    user = _user(db, "u")
+    project = _project(db, user)
+    assert load_user_access(db, user.id).project_ids == {project.id}
+
+    # 绕过接口直接修改（相当于其他进程的写操作），TTL 内仍使用缓存
+    project.members.clear()
+    db.commit()
+    assert load_user_access(db, user.id).project_ids == {project.id}
+
+    clock.now += 60
+    assert load_user_access(db, user.id).project_ids == frozenset()
+
+
+def test_project_member_changes_take_effect_immediately(db, cache):
+    alice = _user(db, "alice")
+    bob = _user(db, "bob")
+    project = _project(db, alice)
+    assert load_user_access(db, alice.id).project_ids == {project.id}
+    assert load_user_access(db, bob.id).project_ids == frozenset()
+
+    app.update_project(project.id, schemas.ProjectUpdate(member_ids=[bob.id]), db=db, current_user=ADMIN)
+    assert load_user_access(db, alice.id).project_ids == frozenset()
+    assert load_user_access(db, bob.id).project_ids == {project.id}
+
+    app.delete_project(project.id, db=db, current_user=ADMIN)
+    assert load_user_access(db, bob.id).project_ids == frozenset()
+
+
+def test_user_changes_take_effect_immediately(db, cache):
+    user = _user(db, "u")
+    assert load_user_access(db, user.id).is_admin is False
+
+    app.update_user(user.id, schemas.UserUpdate(roles=["admin"]), db=db)
+    assert load_user_access(db, user.id).is_admin is True
+
+    app.delete_user(user.id, db=db)
+    assert load_user_access(db, user.id) is None
+
+
+def test_load_started_before_invalidation_is_not_cached(cache):
+    generation = cache.generation
+    cache.invalidate_user(1)
+    # 失效前读取的数据仍返回给本次请求，但不写入缓存
+    assert cache.put(1, False, [1], generation).project_ids == {1}
+    assert cache.get(1) is None
+
+    cache.put(1, False, [2], cache.generation)
+    assert cache.get(1).project_ids == {2}
+
+
+def test_cache_is_rebuilt_when_full(clock):
+    cache = MembershipCache(ttl=60, max_users=2)
+    for user_id in (1, 2):
+        cache.put(user_id, False, [], cache.generation)
+    # 已缓存的用户更新时不清空
+    cache.put(2, True, [], cache.generation)
+    assert cache.get(1) is not None
+
+    cache.put(3, False, [], cache.generation)
+    assert cache.get(1) is None and cache.get(2) is None
+    assert cache.get(3) is not None
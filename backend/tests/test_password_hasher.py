@@ -0,0 +1,39 @@
+"""密码哈希进程池：服务子进程（uvicorn --workers / --reload）中仍使用进程池，只有哈希工作进程内不嵌套创建"""
+import multiprocessing
+
+import pytest
+
+import password_hasher
+from password_hasher import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=4, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_pool_used_in_spawned_server_process(hasher, monkeypatch):
+    # uvicorn 通过 multiprocessing spawn 启动 worker，parent_process() 不为空
+    monkeypatch.setattr(multiprocessing, "parent_process", lambda: object())
+    assert hasher._get_pool() is not None
+
+
+def test_no_nested_pool_in_hash_worker(hasher, monkeypatch):
+    monkeypatch.setattr(password_hasher, "_in_hash_worker", True)
+    assert hasher._get_pool() is None
+
+
+def test_hash_workers_are_marked(hasher):
+    pool = hasher._get_pool()
+    assert pool.submit(eval, "__import__('password_hasher')._in_hash_worker").result() is True
+    assert password_hasher._in_hash_worker is False
+
+
+def test_hash_and_verify_round_trip(hasher):
+    hashed = hasher.hash("secret")
+    assert password_hasher.get_hash_rounds(hashed) == 4
+    assert hasher.verify("secret", hashed)
+    assert not hasher.verify("wrong", hashed)
+    assert hasher.stats()["completed"] == 3
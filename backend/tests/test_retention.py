@@ -0,0 +1,146 @@
+"""执行历史保留：保留规则的判定与 content_blobs 按引用清理"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import blob_store
+import models
+import retention
+from retention import RetentionCompactor
+
+
+@pytest.fixture(autouse=True)
+def no_default_policy(monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_KEEP_LAST_RUNS", None)
+    monkeypatch.setattr(retention, "RETENTION_KEEP_DAYS", None)
+    monkeypatch.setattr(retention, "RETENTION_KEEP_FAILED_DAYS", None)
+
+
+def _endpoint(db, policy=None):
+    project = models.Project(name="p")
+    db.add(project)
+    db.flush()
+    if policy:
+        db.add(models.RetentionPolicy(project_id=project.id, **policy))
+    endpoint = models.ApiEndpoint(project_id=project.id, name="e", path="/e", method="GET")
+    db.add(endpoint)
+    db.commit()
+    return endpoint
+
+
+def _record(db, endpoint, age_days, success=True, body=None):
+    values = {"response_body": body}
+    refs = blob_store.offload(db, values)
+    record = models.ApiExecutionRecord(
+        endpoint_id=endpoint.id,
+        environment_id=1,
+        success=success,
+        response_body=values["response_body"],
+        blob_refs=refs or None,
+        executed_at=datetime.now() - timedelta(days=age_days, minutes=1),
+    )
+    db.add(record)
+    db.commit()
+    return record.id
+
+
+def _remaining(db):
+    db.expire_all()
+    return {row.id for row in db.query(models.ApiExecutionRecord)}
+
+
+def _compactor():
+    return RetentionCompactor(interval_seconds=0, batch_size=2, batch_pause=0)
+
+
+def test_record_is_kept_when_any_rule_keeps_it(db):
+    endpoint = _endpoint(db, {"keep_last_runs": 1, "keep_days": 10, "keep_failed_days": 30})
+    latest = _record(db, endpoint, 50)
+    recent = _record(db, endpoint, 5)
+    failed = _record(db, endpoint, 20, success=False)
+    old = _record(db, endpoint, 20)
+    old_failed = _record(db, endpoint, 40, success=False)
+    # 最近一条按执行时间排序，而不是按写入顺序
+    db.query(models.ApiExecutionRecord).filter(models.ApiExecutionRecord.id == latest).update(
+        {models.ApiExecutionRecord.executed_at: datetime.now()}
+    )
+    db.commit()
+
+    report = _compactor().run_once()
+    assert report["deleted"]["api_execution_records"] == 2
+    assert _remaining(db) == {latest, recent, failed}
+
+
+def test_keep_last_runs_ranks_each_endpoint_separately(db):
+    first = _endpoint(db, {"keep_last_runs": 2})
+    second = models.ApiEndpoint(project_id=first.project_id, name="e2", path="/e2", method="GET")
+    db.add(second)
+    db.commit()
+    first_ids = [_record(db, first, age) for age in (1, 2, 3, 4)]
+    second_ids = [_record(db, second, age) for age in (5, 6)]
+
+    _compactor().run_once()
+    assert _remaining(db) == set(first_ids[:2]) | set(second_ids)
+
+
+def test_project_without_policy_keeps_everything(db):
+    endpoint = _endpoint(db)
+    ids = {_record(db, endpoint, age) for age in (100, 200)}
+    report = _compactor().run_once()
+    assert report["projects"] == 0
+    assert _remaining(db) == ids
+
+
+def _blob(db, digest):
+    db.expire_all()
+    return db.query(models.ContentBlob).filter(models.ContentBlob.hash == digest).first()
+
+
+def _age_blobs(db, days):
+    db.query(models.ContentBlob).update({models.ContentBlob.last_referenced_at: datetime.now() - timedelta(days=days)})
+    db.commit()
+
+
+def test_blobs_are_reclaimed_by_reference(db):
+    endpoint = _endpoint(db, {"keep_days": 10})
+    shared = "s" * 300
+    kept_body = "k" * 300
+    released_body = "r" * 300
+    _record(db, endpoint, 20, body=shared)
+    _record(db, endpoint, 20, body=released_body)
+    _record(db, endpoint, 1, body=shared)
+    _record(db, endpoint, 1, body=kept_body)
+    orphan = blob_store.put(db, "o" * 300)
+    # 内容已存在，put 只返回哈希（刚被引用过，不更新引用时间）
+    digests = {body: blob_store.put(db, body) for body in (shared, kept_body, released_body)}
+    db.commit()
+    _age_blobs(db, 30)
+    released_size = _blob(db, digests[released_body]).stored_size
+    orphan_size = _blob(db, orphan).stored_size
+
+    report = _compactor().run_once()
+    assert report["deleted"]["api_execution_records"] == 2
+    assert report["deleted"]["content_blobs"] == 2
+    assert report["reclaimed_blob_bytes"] == released_size + orphan_size
+    assert _blob(db, digests[released_body]) is None
+    assert _blob(db, orphan) is None
+    # 仍被引用的旧内容保留，并更新引用时间
+    assert _blob(db, digests[shared]) is not None
+    kept = _blob(db, digests[kept_body])
+    assert kept is not None and kept.last_referenced_at > datetime.now() - timedelta(hours=1)
+
+
+def test_recently_referenced_blobs_wait_for_grace_period(db):
+    endpoint = _endpoint(db, {"keep_days": 10})
+    _record(db, endpoint, 20, body="r" * 300)
+    digest = blob_store.put(db, "r" * 300)
+
+    report = _compactor().run_once()
+    assert report["deleted"]["api_execution_records"] == 1
+    assert _blob(db, digest) is not None
+
+    # 超过宽限期后由最久未引用内容的检查清理
+    _age_blobs(db, 3)
+    report = _compactor().run_once()
+    assert report["deleted"] == {"content_blobs": 1}
+    assert _blob(db, digest) is None
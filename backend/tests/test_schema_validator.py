@@ -0,0 +1,93 @@
+"""响应结构校验：OpenAPI 引用展开与各关键字的校验结果"""
+import pytest
+
+from schema_validator import compile_schema
+from swagger_parser import OpenAPIParser
+
+
+def _parser(schemas):
+    return OpenAPIParser({"openapi": "3.0.0", "paths": {}, "components": {"schemas": schemas}})
+
+
+def test_repeated_sibling_refs_are_each_expanded():
+    parser = _parser({"S": {"type": "string", "enum": ["x", "y"]}})
+    schema = parser._resolve_ref({
+        "type": "object",
+        "properties": {"a": {"$ref": "#/components/schemas/S"}, "b": {"$ref": "#/components/schemas/S"}},
+    })
+    assert schema["properties"]["b"] == {"type": "string", "enum": ["x", "y"]}
+
+    validate = compile_schema(schema)
+    assert validate({"a": "x", "b": "y"}) == []
+    assert validate({"a": "x", "b": "z"}) == ['$.b 应为 ["x", "y"] 之一，实际 "z"']
+
+
+def test_cyclic_and_unresolvable_refs_are_not_validated():
+    parser = _parser({
+        "Node": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "child": {"$ref": "#/components/schemas/Node"}},
+        },
+    })
+    schema = parser._resolve_ref({
+        "type": "object",
+        "properties": {"root": {"$ref": "#/components/schemas/Node"}, "other": {"$ref": "#/components/schemas/Missing"}},
+    })
+    assert "type" not in schema["properties"]["other"]
+    assert "type" not in schema["properties"]["root"]["properties"]["child"]
+
+    validate = compile_schema(schema)
+    assert validate({"root": {"name": "a", "child": "anything"}, "other": [1, 2]}) == []
+    assert validate({"root": {"name": 1}}) == ["$.root.name 应为 string，实际为 integer"]
+
+
+@pytest.mark.parametrize("schema", [
+    {"type": "string", "nullable": True},
+    {"type": "string", "x-nullable": True},
+])
+def test_nullable(schema):
+    validate = compile_schema(schema)
+    assert validate(None) == []
+    assert validate("a") == []
+    assert validate(1) == ["$ 应为 string，实际为 integer"]
+
+
+def test_not_nullable_rejects_null():
+    assert compile_schema({"type": "string"})(None) == ["$ 应为 string，实际为 null"]
+
+
+def test_any_of_and_one_of():
+    any_of = compile_schema({"anyOf": [{"type": "string"}, {"type": "integer"}]})
+    assert any_of("a") == [] and any_of(1) == []
+    assert any_of(1.5) == ["$ 不符合 anyOf 中的任何一个结构"]
+
+    one_of = compile_schema({"oneOf": [{"type": "number"}, {"type": "integer"}]})
+    assert one_of(1.5) == []
+    assert one_of(1) == ["$ 应恰好符合 oneOf 中的一个结构，实际符合 2 个"]
+    assert one_of("a") == ["$ 应恰好符合 oneOf 中的一个结构，实际符合 0 个"]
+
+
+@pytest.mark.parametrize("schema", [
+    {"type": "number", "minimum": 0, "exclusiveMinimum": True},  # OpenAPI 3.0 / Swagger
+    {"type": "number", "exclusiveMinimum": 0},  # JSON Schema
+])
+def test_exclusive_minimum(schema):
+    validate = compile_schema(schema)
+    assert validate(0.5) == []
+    assert validate(0) == ["$ 应大于 0，实际 0"]
+
+
+def test_inclusive_minimum():
+    validate = compile_schema({"type": "number", "minimum": 0, "exclusiveMinimum": False})
+    assert validate(0) == []
+    assert validate(-1) == ["$ 应不小于 0，实际 -1"]
+
+
+def test_enum_and_const_do_not_match_booleans_to_numbers():
+    enum = compile_schema({"enum": [1]})
+    assert enum(1) == []
+    assert enum(1.0) == []
+    assert enum(True) == ["$ 应为 [1] 之一，实际 true"]
+    assert compile_schema({"enum": [[0]]})([False]) == ["$ 应为 [[0]] 之一，实际 [false]"]
+    assert compile_schema({"const": False})(0) == ["$ 应为 false，实际 0"]
+    assert compile_schema({"const": True})(True) == []
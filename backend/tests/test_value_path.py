@@ -0,0 +1,88 @@
+"""测试响应取值路径：缓存的路径编译结果与原来各调用方的取值结果一致
+
+期望值由改造前的 _extract_json_path（断言）、_extract_value（变量提取）和
+APIExecutor._extract_value_by_jsonpath（apitest）对同一组用例运行得到。
+"""
+import pytest
+
+from api_runtime import extract_json_path, extract_value
+from value_path import ASSERTION, QUERY, compile_path, get_path
+
+DATA = {
+    "code": 0,
+    "data": {
+        "token": "abc",
+        "count": 3,
+        "none": None,
+        "list": [{"id": 1, "name": "a", "v": "10"}, {"id": 122, "name": "b", "v": 2.5}],
+        "empty": [],
+        "nums": [5, 6, 7],
+        "1.5": "dot",
+    },
+}
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("code", 0),
+    ("data.token", "abc"),
+    ("data.list[1].name", "b"),
+    # 在列表上取键时使用第一个元素
+    ("data.list.name", "a"),
+    ("data.list[5].id", None),
+    ("data.nums[0]", 5),
+    # 数字前的点不分割
+    ("data.nums.1", None),
+    ("data.1.5", None),
+    ("data.empty.x", None),
+    ("data.none", None),
+    ("missing.x", None),
+    ("data..count", 3),
+    ("data.list[x].id", None),
+    ("", None),
+])
+def test_assertion_path_matches_previous_output(path, expected):
+    assert extract_json_path(DATA, path) == expected
+    assert extract_json_path(DATA, path) == expected
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("code", 0),
+    ("data.list.1.name", "b"),
+    ("data.list.-1.id", 122),
+    ("data.list.01.id", 122),
+    ("data.list.x", None),
+    ("data.nums.9", None),
+    ("data.none.x", None),
+    ("data.1.5", None),
+    ("data..count", None),
+])
+def test_extract_path_matches_previous_output(path, expected):
+    assert extract_value(DATA, path) == expected
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("data.list.find(id=122).name", "b"),
+    ("data.list.find(id='1').v", "10"),
+    ("data.list.find(name=b)", {"id": 122, "name": "b", "v": 2.5}),
+    ("data.list.find(id=7).name", None),
+    ("data.list.find(v=2.5).id", 122),
+    ("data.list.find(v=10).id", 1),
+    ("data.list.find(id=1.0).name", "a"),
+    ("$.data.list[1].id", 122),
+    ("$.data.missing", None),
+    (".data.count", 3),
+    ("data.list[0].name", "a"),
+    ("data.list.name", "a"),
+    ("data.nums[3]", None),
+    ("data.list[x]", None),
+])
+def test_query_path_matches_previous_output(path, expected):
+    assert get_path(DATA, path, QUERY) == expected
+
+
+def test_query_empty_path_returns_data():
+    assert get_path(DATA, "", QUERY) is DATA
+
+
+def test_compile_path_is_cached():
+    assert compile_path("data.list[1].name", ASSERTION) is compile_path("data.list[1].name", ASSERTION)
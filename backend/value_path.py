@@ -0,0 +1,219 @@
+"""响应取值路径的解析与缓存
+
+断言目标（data.list[0].name）、变量提取（data.list.0.name）、$API[N].path 模板以及 apitest 中的
+list.find(id=122).name、$.data.token（JSONPath）都通过这里取值：路径第一次出现时解析为操作序列并缓存，
+之后每次取值只按操作序列访问数据，不再重复分割路径、匹配正则或解析 JSONPath。
+
+为保证已有用例的结果不变，各调用方沿用原来的路径规则（mode）：
+
+- assertion：按点分割（数字前的点不分割），支持 key[N]，在列表上取键时使用第一个元素
+- extract：按点分割，在列表上数字段作为下标（支持负数）
+- query：在 assertion 规则的基础上支持 .find(key=value) 和 $. 开头的 JSONPath
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+# 路径解析结果的缓存条数
+PATH_CACHE_SIZE = int(os.getenv("PATH_CACHE_SIZE", "4096"))
+
+ASSERTION = "assertion"
+EXTRACT = "extract"
+QUERY = "query"
+
+# 操作类型
+_KEY, _INDEX, _ITEM, _FIND, _JSONPATH, _ERROR = range(6)
+
+_ASSERTION_SPLIT = re.compile(r'\.(?!\d)')  # 按点分割，但不分割数字前的点
+_KEY_INDEX = re.compile(r'^([^\[]+)\[(\d+)\]$')
+_FIND_CALL = re.compile(r'\.find\(([^)]+)\)')
+_NO_NUMBER = object()
+
+
+def _to_int(text: str) -> Optional[int]:
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_jsonpath(expr: str):
+    """解析 $. 开头的 JSONPath 表达式（结果会缓存）"""
+    from jsonpath_ng import parse as jsonpath_parse
+    return jsonpath_parse(expr)
+
+
+def _compile_assertion(path: str) -> Optional[Tuple]:
+    ops = []
+    for part in _ASSERTION_SPLIT.split(path):
+        if not part:
+            continue
+        if '[' in part and ']' in part:
+            key_match = _KEY_INDEX.match(part)
+            if not key_match:
+                return None
+            ops.append((_KEY, key_match.group(1), False))
+            ops.append((_INDEX, int(key_match.group(2))))
+        else:
+            ops.append((_KEY, part, True))
+    return tuple(ops)
+
+
+def _compile_extract(path: str) -> Tuple:
+    return tuple((_ITEM, part, _to_int(part)) for part in path.split('.'))
+
+
+def _compile_query_path(path: str) -> Tuple:
+    path = path.lstrip('.')
+    if path.startswith('$.'):
+        try:
+            return ((_JSONPATH, path, compile_jsonpath(path)),)
+        except Exception as e:
+            return ((_ERROR, path, str(e)),)
+
+    ops = []
+    for key in path.split('.'):
+        if not key:
+            continue
+        if '[' in key and ']' in key:
+            try:
+                key_name, index_str = key.split('[')
+                index = int(index_str.rstrip(']'))
+            except ValueError as e:
+                # 前面的键不存在时直接返回 None，只有取到这里才报告路径错误
+                ops.append((_ERROR, path, str(e)))
+                break
+            ops.append((_KEY, key_name, False))
+            ops.append((_INDEX, index))
+        else:
+            ops.append((_KEY, key, True))
+    return tuple(ops)
+
+
+def _compile_query(path: str) -> Tuple:
+    if not path:
+        return ()
+
+    find_match = _FIND_CALL.search(path)
+    if find_match and '=' in find_match.group(1):
+        key, value = find_match.group(1).split('=', 1)
+        value = value.strip().strip('"\'')
+        try:
+            number = float(value) if '.' in value else int(value)
+        except ValueError:
+            number = _NO_NUMBER
+        before = path[:find_match.start()]
+        after = path[find_match.end():]
+        return ((
+            _FIND,
+            _compile_query(before) if before else (),
+            key.strip(),
+            value,
+            number,
+            _compile_query(after) if after else (),
+            # find 之前的路径取到的不是列表时，整个路径按普通路径取值
+            _compile_query_path(path),
+        ),)
+    return _compile_query_path(path)
+
+
+_COMPILERS = {
+    ASSERTION: _compile_assertion,
+    EXTRACT: _compile_extract,
+    QUERY: _compile_query,
+}
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_path(path: str, mode: str = ASSERTION) -> Optional[Tuple]:
+    """
+    解析取值路径（结果会缓存）
+
+    Args:
+        path: 取值路径
+        mode: 路径规则，ASSERTION / EXTRACT / QUERY
+
+    Returns:
+        操作序列；路径格式不合法（取值结果一定为 None）时返回 None
+    """
+    return _COMPILERS[mode](path)
+
+
+def evaluate(ops: Optional[Tuple], value: Any) -> Any:
+    """按 compile_path 的结果从数据中取值，路径不存在时返回 None"""
+    if ops is None:
+        return None
+    for op in ops:
+        kind = op[0]
+        if kind == _KEY:
+            name = op[1]
+            if isinstance(value, dict) and name in value:
+                value = value[name]
+            elif op[2] and isinstance(value, list) and value:
+                # 在列表上取键时使用第一个元素
+                value = value[0]
+                if isinstance(value, dict) and name in value:
+                    value = value[name]
+                else:
+                    return None
+            else:
+                return None
+        elif kind == _INDEX:
+            if isinstance(value, list) and 0 <= op[1] < len(value):
+                value = value[op[1]]
+            else:
+                return None
+        elif kind == _ITEM:
+            if isinstance(value, dict):
+                value = value.get(op[1])
+            elif isinstance(value, list):
+                if op[2] is None:
+                    return None
+                try:
+                    value = value[op[2]]
+                except IndexError:
+                    return None
+            else:
+                return None
+        elif kind == _FIND:
+            return _find(op, value)
+        elif kind == _JSONPATH:
+            try:
+                matches = op[2].find(value)
+            except Exception as e:
+                print(f"  ⚠️ JSONPath 提取失败: {op[1]}, 错误: {str(e)}")
+                return None
+            value = matches[0].value if matches else None
+        else:
+            print(f"  ⚠️ JSONPath 提取失败: {op[1]}, 错误: {op[2]}")
+            return None
+    return value
+
+
+def _find(op: Tuple, value: Any) -> Any:
+    """list.find(key=value)：返回列表中第一个 key 等于 value 的元素（数字按数值比较），再取后续路径"""
+    _, before, key, expected, number, rest, fallback = op
+    items = evaluate(before, value)
+    if not isinstance(items, list):
+        return evaluate(fallback, value)
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_value = item.get(key)
+        if item_value is None:
+            continue
+        try:
+            if isinstance(item_value, (int, float)) and number is not _NO_NUMBER and item_value == number:
+                return evaluate(rest, item)
+            if str(item_value) == str(expected):
+                return evaluate(rest, item)
+        except Exception:
+            pass
+    return None
+
+
+def get_path(data: Any, path: str, mode: str = ASSERTION) -> Any:
+    """按路径从数据中取值"""
+    return evaluate(compile_path(path, mode), data)
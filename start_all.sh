@@ -72,6 +72,9 @@ if ! python -c "import fastapi" &>/dev/null; then
     pip install -r requirements.txt
 fi
 
+# 初始化数据库表和默认管理员（幂等）
+python3 bootstrap.py
+
 python3 run_server.py &
 BACKEND_PID=$!
 echo "✅ 后端服务已启动 (PID: $BACKEND_PID)"
@@ -29,6 +29,9 @@ echo "按 Ctrl+C 停止服务"
 echo "======================================"
 echo ""
 
+# 初始化数据库表和默认管理员（幂等）
+python3 bootstrap.py
+
 # 前台运行（使用自定义启动脚本，过滤 401 日志）
 python3 run_server.py
 